@@ -5,6 +5,7 @@ from source.configuration import Configuration
 from source.messagebus.message import Message
 from source.tts import TTSFactory
 from source.tts.mimic3_tts import Mimic3
+from source.tts.warmup import CacheWarmup, dialog_sentences
 from source.util import check_for_signal, create_signal
 from source.util.log import LOG
 from source.util.metrics import Stopwatch
@@ -15,6 +16,7 @@ tts = None
 tts_hash = None
 lock = Lock()
 mimic_fallback_obj = None
+warmup = None  # Warmup of the TTS cache
 
 _last_stop_signal = 0
 interrupted_utterance = None
@@ -55,9 +57,12 @@ def speak(utterance, ident, listen=False, audio_config=None):
         LOG.info("TTS configuration changed, re-initializing TTS")
         if tts:
             tts.playback.detach_tts(tts)
+            stop_cache_warmup()
+            tts.shutdown()
         tts = TTSFactory.create()
         tts.init(bus)
         tts_hash = new_hash
+        start_cache_warmup(tts)
 
     try:
         if audio_config.get("audio", {}).get("stream_tts", {}) and tts.tts_name == "ElevenLabsTTS":
@@ -128,13 +133,52 @@ def init(messagebus):
     tts.init(bus)
     tts_hash = hash(str(audio_config.get("tts", "")))
     LOG.debug(f"TTS initialized hash: {tts_hash}")
+    start_cache_warmup(tts)
+
+
+def start_cache_warmup(tts):
+    """Pre-renders the dialog resources into the persistent TTS cache.
+
+    Stops the warmup of a previous TTS engine.
+    """
+    global warmup
+    stop_cache_warmup()
+
+    cache_config = Configuration.get().get("audio", {}).get("tts", {}).get("cache", {})
+    warmup_config = cache_config.get("warmup", {})
+    if not warmup_config.get("enabled", False) or not tts.cache.persistent:
+        return
+    directory = tts.cache.resource_dir.joinpath("text", tts.lang.lower())
+    sentences = dialog_sentences(directory)
+    if sentences:
+        warmup = CacheWarmup(
+            tts,
+            sentences,
+            workers=warmup_config.get("workers", 2),
+            idle_seconds=warmup_config.get("idle_seconds", 5),
+            max_sentences=warmup_config.get("max_sentences"),
+        )
+        warmup.start()
+
+
+def stop_cache_warmup():
+    """Stops the warmup of the TTS cache, waiting for the sentence being
+    rendered, so the cache can be shut down."""
+    global warmup
+    if warmup:
+        warmup.stop()
+        warmup.join()
+        warmup = None
 
 
 def shutdown():
     """Shuts down the audio service cleanly, stopping any playing audio."""
+    stop_cache_warmup()
     if tts:
         tts.playback.stop()
         tts.playback.join()
+        tts.shutdown()
     if mimic_fallback_obj:
         mimic_fallback_obj.playback.stop()
         mimic_fallback_obj.playback.join()
+        mimic_fallback_obj.shutdown()
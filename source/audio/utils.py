@@ -1,6 +1,6 @@
 import time
 
-from source.util.signal import check_for_signal
+from source.util.signal import check_for_signal, wait_for_signal_clear
 
 
 def is_speaking():
@@ -20,8 +20,7 @@ def wait_while_speaking():
     begin.
     """
     time.sleep(0.3)  # Wait briefly in for any queued speech to begin
-    while is_speaking():
-        time.sleep(0.1)
+    wait_for_signal_clear("isSpeaking")
 
 
 def stop_speaking():
@@ -35,5 +34,4 @@ def stop_speaking():
         send("core.audio.speech.stop")
 
         # Block until stopped
-        while check_for_signal("isSpeaking", -1):
-            time.sleep(0.25)
+        wait_for_signal_clear("isSpeaking")
@@ -10,6 +10,7 @@ from source.util import (create_daemon, reset_sigint_handler,
                          start_message_bus_client, wait_for_exit_signal)
 from source.util.file_utils import FileWatcher
 from source.util.log import LOG
+from source.util.metrics import get_metrics
 from source.util.process_utils import ProcessStatus, StatusCallbackMap
 
 bus = None  # messagebus connection
@@ -45,10 +46,10 @@ def handle_awoken():
     bus.emit(Message("core.awoken", context=context))
 
 
-def handle_wakeword():
+def handle_wakeword(event=None):
     LOG.info("WAKEWORD DETECTED")
     context = {"client_name": "core_listener", "source": "audio"}
-    bus.emit(Message("core.wakeword", context=context))
+    bus.emit(Message("core.wakeword", event, context))
 
 
 def handle_utterance(event):
@@ -60,6 +61,11 @@ def handle_utterance(event):
     bus.emit(Message("recognizer_loop:utterance", event, context))
 
 
+def handle_partial_utterance(event):
+    context = {"client_name": "core_listener", "source": "audio"}
+    bus.emit(Message("recognizer_loop:partial_utterance", event, context))
+
+
 def handle_unknown():
     context = {"client_name": "core_listener", "source": "audio"}
     bus.emit(Message("core.speech.recognition.unknown", context=context))
@@ -138,6 +144,11 @@ def handle_mic_get_status(event):
     bus.emit(event.response(data))
 
 
+def handle_get_metrics(event):
+    """Send the metrics of the listener, such as the noise floor."""
+    bus.emit(event.response({"metrics": get_metrics()}))
+
+
 def handle_audio_start(event):
     """Mute recognizer loop."""
     if config.get("listener").get("mute_during_output"):
@@ -155,6 +166,7 @@ def handle_audio_end(event):
 def handle_stop(event):
     """Handler for core.stop, i.e. button press."""
     loop.force_unmute()
+    loop.cancel_transcriptions()
 
 
 def handle_configuration_update(event):
@@ -202,6 +214,7 @@ def on_change(path: str):
 
 def connect_loop_events(loop):
     loop.on("recognizer_loop:utterance", handle_utterance)
+    loop.on("recognizer_loop:partial_utterance", handle_partial_utterance)
     loop.on("recognizer_loop:speech.recognition.unknown", handle_unknown)
     loop.on("speak", handle_speak)
     loop.on("core.wakeword", handle_wakeword)
@@ -221,8 +234,10 @@ def connect_bus_events(bus):
     bus.on("core.mic.mute", handle_mic_mute)
     bus.on("core.mic.unmute", handle_mic_unmute)
     bus.on("core.mic.get_status", handle_mic_get_status)
+    bus.on("core.listener.metrics.get", handle_get_metrics)
     bus.on("core.mic.listen", handle_mic_listen)
     bus.on("core.mic.stop", handle_stop_listen)
+    bus.on("core.stop", handle_stop)
     # bus.on("core.wakeword", handle_wakeword)
     bus.on("recognizer_loop:audio_output_start", handle_audio_start)
     bus.on("recognizer_loop:audio_output_timeout", handle_info_taking_too_long)
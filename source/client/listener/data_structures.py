@@ -13,13 +13,18 @@
 # limitations under the License.
 #
 """Data structures used by the speech client."""
+import math
+from threading import Condition
+
+import numpy as np
 
 
 class RollingMean:
-    """Simple rolling mean calculation optimized for speed.
+    """Rolling mean and variance of the most recent samples.
 
-    The optimization is made for cases where value retrieval is made at a
-    comparative rate to the sample additions.
+    Running sums make adding a sample and reading the statistics O(1). The
+    sums are recomputed exactly once per pass over the samples so rounding
+    errors don't accumulate.
 
     Args:
         mean_samples: Number of samples to use for mean value
@@ -29,6 +34,8 @@ class RollingMean:
         self.samples = []
         self.value = None  # Leave unintialized
         self.replace_pos = 0  # Position to replace
+        self._sum = 0.0
+        self._sum_squares = 0.0
 
     def append_sample(self, sample):
         """Add a sample to the buffer.
@@ -37,43 +44,129 @@ class RollingMean:
         otherwise it will replace the oldest sample in the buffer.
         """
         sample = float(sample)
-        current_len = len(self.samples)
-        if current_len < self.num_samples:
-            # build the mean
+        if len(self.samples) < self.num_samples:
             self.samples.append(sample)
-            if self.value is not None:
-                avgsum = self.value * current_len + sample
-                self.value = avgsum / (current_len + 1)
-            else:  # If no samples are in the buffer set the sample as mean
-                self.value = sample
         else:
-            # Remove the contribution of the old sample
-            replace_val = self.samples[self.replace_pos]
-            self.value -= replace_val / self.num_samples
-
-            # Replace it with the new sample and update the mean with it's
-            # contribution
-            self.value += sample / self.num_samples
+            # Replace the contribution of the old sample
+            old = self.samples[self.replace_pos]
+            self._sum -= old
+            self._sum_squares -= old * old
             self.samples[self.replace_pos] = sample
 
             # Update replace position
             self.replace_pos = (self.replace_pos + 1) % self.num_samples
+            if self.replace_pos == 0:
+                self._sum = math.fsum(self.samples)
+                self._sum_squares = math.fsum(s * s for s in self.samples)
+                self.value = self._sum / self.num_samples
+                return
+
+        self._sum += sample
+        self._sum_squares += sample * sample
+        self.value = self._sum / len(self.samples)
+
+    @property
+    def variance(self):
+        """Population variance of the samples, None without samples."""
+        if not self.samples:
+            return None
+        mean = self.value
+        return max(self._sum_squares / len(self.samples) - mean * mean, 0.0)
+
+
+class AmbientNoiseEstimator:
+    """Running estimate of the background noise energy.
+
+    The noise floor is an exponential moving average of the log energy that
+    follows the energy down quickly and up slowly. Energy above the threshold
+    raises the floor even slower, so speech only lifts it a little, and that
+    is undone by the first pause. A lasting change of the background noise,
+    like a fan being turned on, is still picked up.
+
+    Args:
+        ratio (float): threshold over the noise floor above which audio is
+                       considered sound
+        fall_seconds (float): time constant while the energy is below the
+                              floor
+        rise_seconds (float): time constant while the energy is between the
+                              floor and the threshold
+        sound_rise_seconds (float): time constant while the energy is above
+                                    the threshold
+    """
+    def __init__(self, ratio=1.5, fall_seconds=0.5, rise_seconds=5.0,
+                 sound_rise_seconds=20.0):
+        self.ratio = ratio
+        self.fall_seconds = fall_seconds
+        self.rise_seconds = rise_seconds
+        self.sound_rise_seconds = sound_rise_seconds
+        self._level = None  # log1p of the noise floor
+
+    def update(self, energy, seconds):
+        """Update the estimate with the energy of a chunk of audio.
+
+        Args:
+            energy (float): energy of the chunk, e.g. its RMS
+            seconds (float): duration of the chunk
+        """
+        level = math.log1p(energy)
+        if self._level is None:
+            self._level = level
+            return
+
+        if level < self._level:
+            time_constant = self.fall_seconds
+        elif energy < self.threshold:
+            time_constant = self.rise_seconds
+        else:
+            time_constant = self.sound_rise_seconds
+        weight = 1 - math.exp(-seconds / time_constant)
+        self._level += (level - self._level) * weight
+
+    @property
+    def calibrated(self):
+        """True once an energy has been added."""
+        return self._level is not None
+
+    @property
+    def floor(self):
+        """Estimated noise energy, None before the first update."""
+        if self._level is None:
+            return None
+        return math.expm1(self._level)
+
+    @property
+    def threshold(self):
+        """Energy above which audio is considered sound, None before the
+        first update."""
+        if self._level is None:
+            return None
+        return self.floor * self.ratio
 
 
 class CyclicAudioBuffer:
     """A Cyclic audio buffer for storing binary data.
 
-    TODO: The class is still unoptimized and performance can probably be
-    enhanced.
+    The buffer is preallocated to its full capacity and never reallocated.
+    Data is written twice, once at the write position and once mirrored
+    one capacity further on. This makes any window ending at the write
+    position available as a single contiguous zero-copy memoryview, without
+    having to re-slice or concatenate the stored data on each append.
+
+    Views returned by view() and view_last() reference the internal storage
+    and are only valid until the next append, use get() or get_last() to
+    export a copy of the data.
 
     Args:
         size (int): size in bytes
         initial_data (bytes): initial buffer data
     """
-    def __init__(self, size, initial_data):
+    def __init__(self, size, initial_data=b''):
         self.size = size
-        # Get at most size bytes from the end of the initial data
-        self._buffer = initial_data[-size:]
+        self._storage = bytearray(2 * size)
+        self._view = memoryview(self._storage)
+        self._head = 0  # Write position in the first half of the storage
+        self._length = 0  # Number of valid bytes in the buffer
+        self.append(initial_data)
 
     def append(self, data):
         """Add new data to the buffer, and slide out data if the buffer is full
@@ -82,21 +175,229 @@ class CyclicAudioBuffer:
             data (bytes): binary data to append to the buffer. If buffer size
                           is exceeded the oldest data will be dropped.
         """
-        buff = self._buffer + data
-        if len(buff) > self.size:
-            buff = buff[-self.size:]
-        self._buffer = buff
+        data = memoryview(data).cast('B')
+        num_bytes = len(data)
+        if num_bytes == 0 or self.size == 0:
+            return
+        if num_bytes >= self.size:
+            # Only the last part of the data will fit
+            data = data[-self.size:]
+            self._view[:self.size] = data
+            self._view[self.size:] = data
+            self._head = 0
+            self._length = self.size
+            return
+
+        head = self._head
+        first = min(num_bytes, self.size - head)
+        rest = num_bytes - first
+        self._view[head:head + first] = data[:first]
+        self._view[head + self.size:head + self.size + first] = data[:first]
+        if rest:
+            self._view[:rest] = data[first:]
+            self._view[self.size:self.size + rest] = data[first:]
+        self._head = (head + num_bytes) % self.size
+        self._length = min(self._length + num_bytes, self.size)
+
+    def clear(self):
+        """Drop all data from the buffer, keeping the allocated storage."""
+        self._head = 0
+        self._length = 0
+
+    def view_last(self, size):
+        """Get a zero-copy view of the last entries of the buffer.
+
+        Args:
+            size (int): number of bytes to include in the view
+
+        Returns:
+            (memoryview) view of at most size bytes
+        """
+        size = max(0, min(size, self._length))
+        end = self._head + self.size
+        return self._view[end - size:end]
+
+    def view(self):
+        """Get a zero-copy view of all data in the buffer."""
+        return self.view_last(self._length)
 
     def get(self):
         """Get the binary data."""
-        return self._buffer
+        return bytes(self.view())
 
     def get_last(self, size):
         """Get the last entries of the buffer."""
-        return self._buffer[-size:]
+        return bytes(self.view_last(size))
 
     def __getitem__(self, key):
-        return self._buffer[key]
+        return self.view()[key]
+
+    def __len__(self):
+        return self._length
+
+
+class FrameAdapter:
+    """Split a stream of 16-bit audio chunks into frames of a fixed size.
+
+    Engines like Porcupine take frames of an exact number of samples while
+    the microphone delivers chunks of another size. Frames lying within a
+    chunk are handed out as int16 views of the chunk. Only a frame spanning
+    two chunks is assembled in a preallocated buffer, so no Python objects
+    are created per sample.
+
+    Frames are views and only valid until the next call of frames(), copy
+    them if they need to be kept.
+
+    Args:
+        frame_length (int): number of samples per frame
+    """
+    def __init__(self, frame_length):
+        self.frame_length = frame_length
+        self._partial = np.zeros(frame_length, dtype=np.int16)
+        self._pending = 0  # Samples of the incomplete frame in _partial
+
+    def frames(self, chunk):
+        """Add audio to the stream and iterate over the completed frames.
+
+        Args:
+            chunk (bytes): 16-bit mono audio, of any length
+
+        Yields:
+            np.ndarray: int16 frame of frame_length samples
+        """
+        samples = np.frombuffer(chunk, dtype=np.int16)
+        frame_length = self.frame_length
+        start = 0
+        if self._pending:
+            pending = self._pending
+            start = min(frame_length - pending, len(samples))
+            self._partial[pending:pending + start] = samples[:start]
+            self._pending += start
+            if self._pending < frame_length:
+                return
+            self._pending = 0
+            yield self._partial
+
+        end = start + (len(samples) - start) // frame_length * frame_length
+        for offset in range(start, end, frame_length):
+            yield samples[offset:offset + frame_length]
+
+        rest = len(samples) - end
+        if rest:
+            self._partial[:rest] = samples[end:]
+            self._pending = rest
+
+    def clear(self):
+        """Drop the samples of the incomplete frame."""
+        self._pending = 0
+
+    def __len__(self):
+        return self._pending
+
+
+class AudioRingBuffer:
+    """Ring buffer passing audio from a capture thread to a reader.
+
+    There must be a single writer and a single reader. Each side only
+    advances its own position, so the data is exchanged without locking.
+    The condition variable is only used to wake a reader blocked in
+    wait_for() once enough data has been written.
+
+    Data that doesn't fit is dropped, the number of writes affected is
+    counted in overflows and the number of bytes lost in dropped.
+
+    Args:
+        size (int): capacity in bytes
+    """
+    def __init__(self, size):
+        self.size = size
+        self._storage = bytearray(size)
+        self._view = memoryview(self._storage)
+        self._written = 0  # Total bytes written, only changed by the writer
+        self._read = 0  # Total bytes read, only changed by the reader
+        self._wanted = 0  # Bytes the blocked reader is waiting for
+        self._ready = Condition()
+        self.closed = False
+        self.overflows = 0
+        self.dropped = 0
+
+    def write(self, data):
+        """Add data, dropping what doesn't fit.
+
+        Args:
+            data (bytes): binary data to append
+        """
+        data = memoryview(data).cast('B')
+        free = self.size - (self._written - self._read)
+        if len(data) > free:
+            self.overflows += 1
+            self.dropped += len(data) - free
+            data = data[:free]
+
+        num_bytes = len(data)
+        if num_bytes:
+            pos = self._written % self.size
+            first = min(num_bytes, self.size - pos)
+            self._view[pos:pos + first] = data[:first]
+            if first < num_bytes:
+                self._view[:num_bytes - first] = data[first:]
+            # Publish the data before checking for a waiting reader, the
+            # reader registers before checking the length
+            self._written += num_bytes
+
+        wanted = self._wanted
+        if wanted and self._written - self._read >= wanted:
+            with self._ready:
+                self._ready.notify()
+
+    def wait_for(self, size, timeout=None):
+        """Block until the buffer holds at least size bytes.
+
+        Args:
+            size (int): number of bytes to wait for
+            timeout (float): maximum seconds to wait, None to wait forever
+
+        Returns:
+            bool: True if the data is available, False on timeout or close
+        """
+        if len(self) >= size:
+            return True
+        with self._ready:
+            self._wanted = size
+            try:
+                return self._ready.wait_for(
+                    lambda: len(self) >= size or self.closed, timeout
+                ) and len(self) >= size
+            finally:
+                self._wanted = 0
+
+    def read(self, size):
+        """Remove and return up to size bytes without blocking.
+
+        Args:
+            size (int): maximum number of bytes to read
+
+        Returns:
+            bytes: the oldest data in the buffer
+        """
+        size = min(size, len(self))
+        pos = self._read % self.size
+        first = min(size, self.size - pos)
+        data = bytes(self._view[pos:pos + first])
+        if first < size:
+            data += bytes(self._view[:size - first])
+        self._read += size
+        return data
+
+    def clear(self):
+        """Drop all data in the buffer, must be called by the reader."""
+        self._read = self._written
+
+    def close(self):
+        """Wake up a waiting reader, no more data will be written."""
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
 
     def __len__(self):
-        return len(self._buffer)
+        return self._written - self._read
@@ -0,0 +1,102 @@
+"""Signal processing helpers for 16-bit mono PCM audio.
+
+The functions accept bytes, bytearrays, memoryviews or int16 numpy arrays.
+Binary audio is viewed as samples without copying, so slices of the audio
+buffers can be measured directly.
+
+rms() and debiased_energy() give the same results as the audioop based
+code they replace (audioop is removed in Python 3.13).
+"""
+import math
+
+import numpy as np
+
+INT16_MIN = -32768
+
+
+def as_samples(audio) -> np.ndarray:
+    """View audio as an array of int16 samples.
+
+    Args:
+        audio: 16-bit PCM audio, binary or as numpy array
+
+    Returns:
+        np.ndarray: int16 samples, sharing memory with binary input
+    """
+    if isinstance(audio, np.ndarray):
+        return audio
+    return np.frombuffer(audio, dtype=np.int16)
+
+
+def rms(audio) -> int:
+    """Root mean square of the samples, as audioop.rms(audio, 2).
+
+    Args:
+        audio: 16-bit PCM audio
+
+    Returns:
+        int: truncated RMS, 0 for empty audio
+    """
+    samples = as_samples(audio)
+    count = len(samples)
+    if count == 0:
+        return 0
+    values = samples.astype(np.float64)
+    return int(math.sqrt(values.dot(values) / count))
+
+
+def debiased_energy(audio) -> int:
+    """RMS of the audio after subtracting its RMS from every sample.
+
+    Matches the previous audioop implementation, including clipping the
+    shifted samples to the int16 range.
+
+    Args:
+        audio: 16-bit PCM audio
+
+    Returns:
+        int: debiased energy, above ~30 the audio probably contains sound
+    """
+    samples = as_samples(audio)
+    count = len(samples)
+    if count == 0:
+        return 0
+    values = samples.astype(np.float64)
+    bias = int(math.sqrt(values.dot(values) / count))
+    # The bias is positive, only the lower bound can be exceeded
+    values -= bias
+    np.maximum(values, INT16_MIN, out=values)
+    return int(math.sqrt(values.dot(values) / count))
+
+
+def frame_rms(audio, frame_samples: int) -> np.ndarray:
+    """RMS of each complete frame of the audio.
+
+    Args:
+        audio: 16-bit PCM audio
+        frame_samples: samples per frame
+
+    Returns:
+        np.ndarray: float RMS per frame, trailing samples are ignored
+    """
+    samples = as_samples(audio)
+    frames = len(samples) // frame_samples
+    values = samples[: frames * frame_samples].astype(np.float64)
+    values = values.reshape(frames, frame_samples)
+    return np.sqrt(np.einsum("ij,ij->i", values, values) / frame_samples)
+
+
+def zero_crossing_rate(audio) -> float:
+    """Share of consecutive samples changing sign.
+
+    Args:
+        audio: 16-bit PCM audio
+
+    Returns:
+        float: zero crossing rate [0-1]
+    """
+    samples = as_samples(audio)
+    if len(samples) < 2:
+        return 0.0
+    signs = np.signbit(samples)
+    return np.count_nonzero(signs[1:] != signs[:-1]) / (len(samples) - 1)
@@ -1,20 +1,35 @@
 """Factory functions for loading hotword engines - both internal and plugins.
 """
 
-import struct
+import time
+from collections import namedtuple
 from os.path import abspath, dirname, expanduser, join
 from threading import Thread
 from time import sleep
 
+from source.client.listener.data_structures import FrameAdapter
 from source.configuration import Configuration
 # from mycroft.configuration.locations import OLD_USER_CONFIG
 from source.util.log import LOG
+from source.util.metrics import histogram
 from source.util.monotonic_event import MonotonicEvent
 from source.util.plugins import load_plugin
 
 RECOGNIZER_DIR = join(abspath(dirname(__file__)), "recognizer")
 INIT_TIMEOUT = 10  # In seconds
 
+HotWordDetection = namedtuple(
+    "HotWordDetection", ["key_phrase", "score", "timestamp", "offset"]
+)
+HotWordDetection.__doc__ = """A wake word detected by a HotWordMultiplexer.
+
+Args:
+    key_phrase (str): key phrase of the engine that fired
+    score (float): confidence reported by the engine, None if unknown
+    timestamp (float): time.time() of the detection
+    offset (float): seconds into the audio stream the detection was made
+"""
+
 
 class TriggerReload(Exception):
     pass
@@ -61,6 +76,8 @@ class HotWordEngine:
 
         self.listener_config = Configuration.get().get("voice", {}).get("listener", {})
         self.lang = str(self.config.get("lang", lang)).lower()
+        # Confidence of the last detection, for engines reporting one
+        self.score = None
 
     def found_wake_word(self, frame_data):
         """Check if wake word has been found.
@@ -95,7 +112,58 @@ class HotWordEngine:
         """
 
 
-class PorcupineHotWord(HotWordEngine):
+class FrameHotWordEngine(HotWordEngine):
+    """Base class for engines processing audio in frames of a fixed size.
+
+    update() splits the incoming chunks into frames of frame_length samples
+    and passes each to process_frame() as an int16 numpy array. Subclasses
+    set frame_length before the first update and implement process_frame().
+    """
+
+    frame_length = 512
+
+    def __init__(self, key_phrase="hey mycroft", config=None, lang="en-us"):
+        super().__init__(key_phrase, config, lang)
+        self.has_found = False
+        self._frames = None
+
+    def process_frame(self, frame):
+        """Run the engine on a single frame.
+
+        Args:
+            frame (np.ndarray): frame_length int16 samples, only valid
+                                during the call
+
+        Returns:
+            bool: True if the wake word was detected in the frame, engines
+                  computing a confidence store it in self.score
+        """
+        return False
+
+    def update(self, chunk):
+        """Update detection state from a chunk of audio data.
+
+        Args:
+            chunk (bytes): Audio data to parse
+        """
+        if self._frames is None:
+            self._frames = FrameAdapter(self.frame_length)
+        for frame in self._frames.frames(chunk):
+            self.has_found |= self.process_frame(frame)
+
+    def found_wake_word(self, frame_data):
+        """Check if wakeword has been found.
+
+        Returns:
+            (bool) True if wakeword was found otherwise False.
+        """
+        if self.has_found:
+            self.has_found = False
+            return True
+        return False
+
+
+class PorcupineHotWord(FrameHotWordEngine):
     """Hotword engine using picovoice's Porcupine hot word engine."""
 
     def __init__(self, key_phrase="hey mycroft", config=None, lang="en-us"):
@@ -125,8 +193,6 @@ class PorcupineHotWord(HotWordEngine):
         else:
             sensitivities = [float(x) for x in sensitivities.split(",")]
 
-        self.audio_buffer = []
-        self.has_found = False
         self.num_keywords = len(keyword_file_paths)
 
         LOG.debug(
@@ -142,38 +208,22 @@ class PorcupineHotWord(HotWordEngine):
             access_key=access_key,
         )
 
+        self.frame_length = self.porcupine.frame_length
         LOG.info("LOADED PORCUPINE")
 
-    def update(self, chunk):
-        """Update detection state from a chunk of audio data.
+    def process_frame(self, frame):
+        """Run Porcupine on a frame.
 
         Args:
-            chunk (bytes): Audio data to parse
-        """
-        pcm = struct.unpack_from("h" * (len(chunk) // 2), chunk)
-        self.audio_buffer += pcm
-        while True:
-            if len(self.audio_buffer) >= self.porcupine.frame_length:
-                result = self.porcupine.process(
-                    self.audio_buffer[0 : self.porcupine.frame_length]
-                )
-                # result will be the index of the found keyword or -1 if
-                # nothing has been found.
-                self.has_found |= result >= 0
-                self.audio_buffer = self.audio_buffer[self.porcupine.frame_length :]
-            else:
-                return
-
-    def found_wake_word(self, frame_data):
-        """Check if wakeword has been found.
+            frame (np.ndarray): porcupine.frame_length int16 samples
 
         Returns:
-            (bool) True if wakeword was found otherwise False.
+            bool: True if any of the keywords was found
         """
-        if self.has_found:
-            self.has_found = False
-            return True
-        return False
+        # pvporcupine copies the frame into a ctypes array, which is fastest
+        # from a list of ints. result will be the index of the found keyword
+        # or -1 if nothing has been found.
+        return self.porcupine.process(frame.tolist()) >= 0
 
     def stop(self):
         """Stop the hotword engine.
@@ -184,6 +234,141 @@ class PorcupineHotWord(HotWordEngine):
             self.porcupine.delete()
 
 
+class HotWordMultiplexer(HotWordEngine):
+    """Run several hotword engines on one audio stream.
+
+    Frame based engines of the same frame length share one FrameAdapter,
+    so the audio is split into frames once and every engine only pays for
+    its own inference. Other engines get the chunks through update() and
+    are polled in found_wake_word() as when they run alone.
+
+    The CPU time of each engine is measured and recorded every LOAD_PERIOD
+    seconds of audio in the "hotword.<key phrase>.cpu_load" histogram, as
+    CPU seconds per second of audio. A warning is logged when an engine
+    uses more than the "cpu_budget" set in its hotword config.
+
+    Args:
+        engines (list): HotWordEngine instances, the first one is the
+                        main wake word
+        sample_rate (int): sample rate of the audio stream
+    """
+
+    LOAD_PERIOD = 10  # Seconds of audio between CPU load measurements
+
+    def __init__(self, engines, sample_rate=16000):
+        main = engines[0]
+        super().__init__(main.key_phrase, main.config, main.lang)
+        self.engines = list(engines)
+        self.expected_duration = max(e.expected_duration for e in self.engines)
+        self.sample_rate = sample_rate
+        self.detection = None
+        self._detections = []
+        self._samples = 0  # Samples received so far
+
+        # frame_length -> [adapter, frames emitted, engines]
+        self._frame_groups = {}
+        self._chunk_engines = []
+        for engine in self.engines:
+            if isinstance(engine, FrameHotWordEngine):
+                group = self._frame_groups.setdefault(
+                    engine.frame_length,
+                    [FrameAdapter(engine.frame_length), 0, []],
+                )
+                group[2].append(engine)
+            else:
+                self._chunk_engines.append(engine)
+
+        self._cpu = {engine: 0.0 for engine in self.engines}
+        self._load_samples = 0
+
+    def _detect(self, engine, offset_samples):
+        detection = HotWordDetection(
+            engine.key_phrase,
+            getattr(engine, "score", None),
+            time.time(),
+            offset_samples / self.sample_rate,
+        )
+        LOG.debug("Hotword detected: {}".format(detection))
+        self._detections.append(detection)
+
+    def update(self, chunk):
+        """Update all engines with a chunk of audio data.
+
+        Args:
+            chunk (bytes): Audio data to parse
+        """
+        cpu = self._cpu
+        for frame_length, group in self._frame_groups.items():
+            adapter, emitted, engines = group
+            for frame in adapter.frames(chunk):
+                emitted += 1
+                for engine in engines:
+                    start = time.thread_time()
+                    found = engine.process_frame(frame)
+                    cpu[engine] += time.thread_time() - start
+                    if found:
+                        self._detect(engine, emitted * frame_length)
+            group[1] = emitted
+
+        for engine in self._chunk_engines:
+            start = time.thread_time()
+            engine.update(chunk)
+            cpu[engine] += time.thread_time() - start
+
+        num_samples = len(chunk) // 2
+        self._samples += num_samples
+        self._load_samples += num_samples
+        if self._load_samples >= self.LOAD_PERIOD * self.sample_rate:
+            self._record_load()
+
+    def _record_load(self):
+        """Record the CPU load of each engine since the last measurement."""
+        seconds = self._load_samples / self.sample_rate
+        for engine, cpu in self._cpu.items():
+            load = cpu / seconds
+            histogram("hotword.{}.cpu_load".format(engine.key_phrase)).observe(
+                load
+            )
+            budget = engine.config.get("cpu_budget")
+            if budget is not None and load > budget:
+                LOG.warning(
+                    "Hotword {} used {:.1%} CPU, above its budget of "
+                    "{:.1%}".format(engine.key_phrase, load, budget)
+                )
+            self._cpu[engine] = 0.0
+        self._load_samples = 0
+
+    def found_wake_word(self, frame_data):
+        """Check if any of the wake words has been found.
+
+        The first detection is stored in self.detection.
+
+        Args:
+            frame_data (binary data): passed on to engines not processing
+                                      frames
+
+        Returns:
+            bool: True if a wake word was detected, else False
+        """
+        for engine in self._chunk_engines:
+            start = time.thread_time()
+            found = engine.found_wake_word(frame_data)
+            self._cpu[engine] += time.thread_time() - start
+            if found:
+                self._detect(engine, self._samples)
+
+        if not self._detections:
+            return False
+        self.detection = min(self._detections, key=lambda d: d.offset)
+        self._detections = []
+        return True
+
+    def stop(self):
+        """Stop all engines."""
+        for engine in self.engines:
+            engine.stop()
+
+
 def load_wake_word_plugin(module_name):
     """Wrapper function for loading wake word plugin.
 
@@ -255,3 +440,40 @@ class HotWordFactory:
             or cls.load_module("porcupine", hotword, config, lang, loop)
             or cls.CLASSES["porcupine"]()
         )
+
+    @classmethod
+    def create_multiplexer(
+        cls, hotwords, config=None, lang="en-us", loop=None, sample_rate=16000
+    ):
+        """Create a HotWordMultiplexer listening for several hotwords.
+
+        Hotwords that can't be loaded are skipped. If none can be loaded the
+        first hotword is created as by create_hotword().
+
+        Args:
+            hotwords (list): names of the hotwords, the first is the main one
+            config (dict): hotwords config, the core config by default
+            lang (str): language code (BCP-47)
+            loop: listener loop to reload if an engine requests it
+            sample_rate (int): sample rate of the audio stream
+
+        Returns:
+            HotWordEngine: multiplexer of the loaded engines
+        """
+        if not config:
+            config = Configuration.get()["voice"]["hotwords"]
+
+        engines = []
+        for hotword in hotwords:
+            hotword_config = config.get(hotword)
+            if hotword_config is None:
+                LOG.warning("No config for hotword {}, skipping".format(hotword))
+                continue
+            module = hotword_config.get("module", "precise")
+            engine = cls.load_module(module, hotword, hotword_config, lang, loop)
+            if engine is not None:
+                engines.append(engine)
+
+        if not engines:
+            return cls.create_hotword(hotwords[0], config, lang, loop)
+        return HotWordMultiplexer(engines, sample_rate)
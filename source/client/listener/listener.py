@@ -1,7 +1,7 @@
 import json
 import time
 from copy import deepcopy
-from queue import Empty, Queue
+from queue import Empty, Full, Queue
 from threading import Lock, Thread
 
 import pyaudio
@@ -12,14 +12,17 @@ from requests.exceptions import ConnectionError
 
 from source.client.listener.hotword_factory import HotWordFactory
 from source.client.listener.mic import MutableMicrophone, ResponsiveRecognizer
+from source.client.listener.trim import SpeechTrimmer
 from source.configuration import Configuration
-from source.stt import STTFactory
+from source.stt import STTFactory, STTService
 from source.util import connected_to_the_internet, find_input_device
 from source.util.log import LOG
-from source.util.metrics import Stopwatch
 
 MAX_MIC_RESTARTS = 20
 
+# STT module settings that are switched without reloading the listener
+STT_MODEL_SETTINGS = ("model", "precision")
+
 
 AUDIO_DATA = 0
 STREAM_START = 1
@@ -86,13 +89,10 @@ class AudioProducer(Thread):
         self.recognizer = recognizer
         self.emitter = emitter
         self.stream_handler = stream_handler
-        # if self.recognizer.can_stream:
-        #     self.stream_handler = AudioStreamHandler(self.queue)
 
     def run(self):
         restart_attempts = 0
         with self.mic as source:
-            self.recognizer.adjust_for_ambient_noise(source)
             while self.state.running:
                 try:
                     LOG.debug("AUDIO PRODUCER RUNNING")
@@ -161,13 +161,22 @@ class AudioConsumer(Thread):
             stt (SpeechToText): The speech-to-text engine.
             wakeup_recognizer (WakeupRecognizer): The wake-up word recognizer.
             wakeword_recognizer (WakeWordRecognizer): The wake word recognizer.
+            stt_service (STTService): Service transcribing the utterances,
+                                      by default one worker using stt.
     """
 
     # In seconds, the minimum audio size to be sent to remote STT
     MIN_AUDIO_SIZE = 0.5
 
     def __init__(
-        self, state, queue, emitter, stt, wakeup_recognizer, wakeword_recognizer
+        self,
+        state,
+        queue,
+        emitter,
+        stt,
+        wakeup_recognizer,
+        wakeword_recognizer,
+        stt_service=None,
     ):
         super(AudioConsumer, self).__init__()
         self.daemon = True
@@ -178,6 +187,12 @@ class AudioConsumer(Thread):
         self.wakeup_recognizer = wakeup_recognizer
         self.wakeword_recognizer = wakeword_recognizer
         self.transcription = None
+        if getattr(self.stt, "can_stream", False):
+            self.stt.on_partial = self.send_partial_utterance
+        if stt_service is None:
+            stt_service = STTService(stt, warmup=False)
+            stt_service.start()
+        self.stt_service = stt_service
 
     def run(self):
         LOG.debug("AUDIO CONSUMER RUNNING")
@@ -201,6 +216,7 @@ class AudioConsumer(Thread):
             if data is not None:
                 # self.stt.execute(data)
                 if self.state.sleeping:
+                    self._discard_stream()
                     self.wake_up(data)
                 else:
                     self.process(data)
@@ -210,17 +226,23 @@ class AudioConsumer(Thread):
             self.stt.stream_data(data)
 
         elif tag == STREAM_STOP:
-            self.transcription = self.stt.stream_stop()
-            payload = {
-                "utterances": [self.transcription],
-                "lang": self.stt.lang,
-            }
-            self.emitter.emit("recognizer_loop:utterance", payload)
+            # The transcription is normally collected when the AUDIO_DATA
+            # queued before STREAM_STOP is processed, this only emits if the
+            # recording was interrupted before any audio could be queued.
+            stream = self.stt.detach_stream()
+            if stream is not None:
+                self._submit(None, self._handle_interrupted_stream, stream)
 
         else:
             # LOG.error("Unknown audio queue type %r" % message)
             LOG.error("Unknown audio queue type {}".format(tag))
 
+    def _discard_stream(self):
+        """Stop a running STT stream without using its transcription."""
+        if getattr(self.stt, "can_stream", False):
+            # Let it finish in the background, its result isn't needed
+            self.stt.detach_stream()
+
     def wake_up(self, audio):
         if self.wakeup_recognizer.found_wake_word(audio.frame_data):
             self.state.sleeping = False
@@ -232,54 +254,85 @@ class AudioConsumer(Thread):
 
     def process(self, audio):
         if self._audio_length(audio) >= self.MIN_AUDIO_SIZE:
-            stopwatch = Stopwatch()
-            with stopwatch:
-                transcription = self.transcribe(audio)
-            if transcription:
-                ident = str(stopwatch.timestamp) + str(hash(transcription))
-                # STT succeeded, send the transcribed speech on for processing
-                payload = {
-                    "utterances": [transcription],
-                    "lang": self.stt.lang,
-                    "ident": ident,
-                }
-                if self.state.running:
-                    self.emitter.emit("recognizer_loop:utterance", payload)
-
-            else:
-                ident = str(stopwatch.timestamp)
+            # Hand the utterance to the STT workers, the consumer continues
+            # with the next audio while it is transcribed
+            stream = None
+            if getattr(self.stt, "can_stream", False):
+                stream = self.stt.detach_stream()
+            self._submit(audio, self.handle_transcription, stream)
         else:
+            self._discard_stream()
             LOG.warning("Audio too short to be processed")
             # self.__speak("Didn't get that. Could you repeat it?")
             # self.send_unknown_intent()
 
-    def transcribe(self, audio):
+    def _submit(self, audio, callback, stream=None):
         try:
-            # Invoke the STT engine on the audio clip
-            stopwatch = Stopwatch()
-            with stopwatch:
-                text = self.stt.execute(audio)
-            LOG.info("TIME TO TRANSCRIBE SPEECH: " + str(stopwatch))
-            if text is not None:
-                LOG.info("STT: " + text)
-            else:
-                self.send_unknown_intent()
-                LOG.info("no words were transcribed")
-            return text
-
-        except sr.RequestError as e:
-            LOG.error("Could not request Speech Recognition {0}".format(e))
-        except ConnectionError as e:
-            LOG.error("Connection Error: {0}".format(e))
+            self.stt_service.submit(audio, callback, stream=stream)
+        except Full:
+            LOG.warning("Too many utterances waiting for STT, dropping one")
+            self.send_unknown_intent()
+
+    def handle_transcription(self, request):
+        """Emit the result of an STT request, called by the STT workers.
+
+        Args:
+            request (STTRequest): the finished request
+        """
+        if request.error is not None:
+            self.handle_stt_error(request.error)
+            return
+
+        text = request.text
+        LOG.info(
+            "TIME TO TRANSCRIBE SPEECH: {:.3f}".format(
+                time.monotonic() - request.submitted
+            )
+        )
+        if not text:
+            self.send_unknown_intent()
+            LOG.info("no words were transcribed")
+            return
+
+        LOG.info("STT: " + text)
+        ident = str(time.time()) + str(hash(text))
+        # STT succeeded, send the transcribed speech on for processing
+        payload = {
+            "utterances": [text],
+            "lang": self.stt.lang,
+            "ident": ident,
+        }
+        if self.state.running:
+            self.emitter.emit("recognizer_loop:utterance", payload)
+
+    def _handle_interrupted_stream(self, request):
+        if request.error is None and request.text and self.state.running:
+            payload = {"utterances": [request.text], "lang": self.stt.lang}
+            self.emitter.emit("recognizer_loop:utterance", payload)
+
+    def handle_stt_error(self, error):
+        """Report a failed transcription.
+
+        Args:
+            error (Exception): the error raised by the STT engine
+        """
+        if isinstance(error, TimeoutError):
+            LOG.warning("STT timed out: {}".format(error))
+            self.send_unknown_intent()
+            return
+        if isinstance(error, sr.RequestError):
+            LOG.error("Could not request Speech Recognition {0}".format(error))
+        elif isinstance(error, ConnectionError):
+            LOG.error("Connection Error: {0}".format(error))
 
             self.emitter.emit("recognizer_loop:no_internet")
-        except RequestException as e:
-            LOG.error(e.__class__.__name__ + ": " + str(e))
-        except Exception as e:
+        elif isinstance(error, RequestException):
+            LOG.error(error.__class__.__name__ + ": " + str(error))
+        else:
             self.send_unknown_intent()
-            LOG.error(e)
+            LOG.error(error)
             LOG.error("Speech Recognition could not understand audio")
-            return None
+            return
 
         if not connected_to_the_internet():
             dialog_name = "not_connected_to_the_internet"
@@ -289,6 +342,11 @@ class AudioConsumer(Thread):
         payload = {"utterance": utterance}
         self.emitter.emit("speak", payload)
 
+    def send_partial_utterance(self, text):
+        """Send the stable part of an utterance still being spoken."""
+        payload = {"utterance": text, "lang": self.stt.lang}
+        self.emitter.emit("recognizer_loop:partial_utterance", payload)
+
     def send_unknown_intent(self):
         """Send message that nothing was transcribed."""
         self.emitter.emit("recognizer_loop:speech.recognition.unknown")
@@ -316,6 +374,23 @@ def recognizer_conf_hash(config):
     return hash(json.dumps(c, sort_keys=True))
 
 
+def stt_model_settings(config):
+    """Get the model settings of the configured STT module.
+
+    Returns:
+        tuple: the voice config without the model settings and the settings
+    """
+    config = deepcopy(config)
+    stt = config.get("stt") or {}
+    module_config = stt.get(stt.get("module")) or {}
+    settings = {
+        key: module_config.pop(key)
+        for key in STT_MODEL_SETTINGS
+        if key in module_config
+    }
+    return config, settings
+
+
 class ListenerLoop(EventEmitter):
     """EventEmitter loop running speech recognition.
 
@@ -337,8 +412,10 @@ class ListenerLoop(EventEmitter):
 
     def _load_config(self):
         """Load configuration parameters from configuration."""
-        config = Configuration.get()["voice"]
+        generation, config = Configuration.snapshot()
+        config = config["voice"]
         self.config_core = config
+        self._config_generation = generation
         self._config_hash = recognizer_conf_hash(config)
         self.lang = config.get("lang")
         self.config = config.get("listener")
@@ -375,28 +452,73 @@ class ListenerLoop(EventEmitter):
 
         If the hotword entry doesn't include phoneme and threshold values these
         will be patched in using the defaults from the config listnere entry.
+
+        If several wake words are listed in "wake_words" they are all run by
+        a HotWordMultiplexer.
         """
         LOG.info("Creating wake word engine")
         word = self.config.get("wake_word", "hey mycroft")
+        words = self.config.get("wake_words") or [word]
 
         # Since we're editing it for server backwards compatibility
         # use a copy so we don't alter the hash of the config and
         # trigger a reload.
         config = deepcopy(self.config_core.get("hotwords", {}))
-        return HotWordFactory.create_hotword(word, config, self.lang, loop=self)
+        if len(words) > 1:
+            return HotWordFactory.create_multiplexer(
+                words,
+                config,
+                self.lang,
+                loop=self,
+                sample_rate=self.config.get("sample_rate", 16000),
+            )
+        return HotWordFactory.create_hotword(words[0], config, self.lang, loop=self)
 
     def create_wakeup_recognizer(self):
         LOG.debug("creating stand up word engine")
         word = self.config.get("stand_up_word", "wake up")
         return HotWordFactory.create_hotword(word, lang=self.lang, loop=self)
 
+    def create_speech_trimmer(self):
+        """Create the trimming of non-speech audio before STT, if enabled.
+
+        Returns:
+            callable: SpeechTrimmer.trim, None if trimming is disabled
+        """
+        trim_config = self.config_core.get("stt", {}).get("trim_silence", {})
+        if not trim_config.get("enabled", False):
+            return None
+        try:
+            trimmer = SpeechTrimmer(
+                self.config.get("VAD", {}),
+                padding=trim_config.get("padding_seconds", 0.25),
+                compact=trim_config.get("compact", False),
+            )
+        except Exception:
+            LOG.exception("Failed to load the VAD, STT audio isn't trimmed")
+            return None
+        return trimmer.trim
+
     def start_async(self):
         """Start consumer and producer threads."""
         LOG.debug("Starting Asynchronous Listener threads")
         self.state.running = True
         stt = STTFactory.create()
+        stt_config = self.config_core.get("stt", {})
+        self.stt_service = STTService(
+            stt,
+            workers=stt_config.get("workers", 1),
+            queue_size=stt_config.get("queue_size", 4),
+            timeout=stt_config.get("timeout"),
+            create_stt=STTFactory.create,
+            warmup=stt_config.get("warmup", True),
+            preprocess=self.create_speech_trimmer(),
+        )
+        self.stt_service.start()
         queue = Queue()
         stream_handler = None
+        if getattr(stt, "can_stream", False):
+            stream_handler = AudioStreamHandler(queue)
 
         self.producer = AudioProducer(
             self.state,
@@ -414,6 +536,7 @@ class ListenerLoop(EventEmitter):
             stt,
             self.wakeup_recognizer,
             self.wakeword_recognizer,
+            self.stt_service,
         )
         self.consumer.start()
 
@@ -443,6 +566,12 @@ class ListenerLoop(EventEmitter):
         else:
             return True  # consider 'no mic' muted
 
+    def cancel_transcriptions(self):
+        """Drop the results of all utterances waiting for STT."""
+        cancelled = self.stt_service.cancel_all()
+        if cancelled:
+            LOG.info("Cancelled {} STT requests".format(cancelled))
+
     def sleep(self):
         self.state.sleeping = True
 
@@ -464,11 +593,17 @@ class ListenerLoop(EventEmitter):
         while self.state.running:
             try:
                 time.sleep(1)
-                current_hash = recognizer_conf_hash(
-                    Configuration().get().get("voice", {})
-                )
+                # Only hash the listener settings when a new config snapshot
+                # has been published
+                generation, config = Configuration.snapshot()
+                if generation == self._config_generation:
+                    continue
+                self._config_generation = generation
+                current_hash = recognizer_conf_hash(config.get("voice", {}))
                 if current_hash != self._config_hash:
                     self._config_hash = current_hash
+                    if self.swap_stt_model(config.get("voice", {})):
+                        continue
                     LOG.info("Voice: Config has changed, reloading...")
                     self.reload()
             except KeyboardInterrupt as e:
@@ -479,6 +614,28 @@ class ListenerLoop(EventEmitter):
                 LOG.exception("Exception in RecognizerLoop")
                 raise
 
+    def swap_stt_model(self, config):
+        """Switch the STT model in place if nothing else changed.
+
+        Loading a model takes seconds, so changing only the model or its
+        precision doesn't restart the listener.
+
+        Args:
+            config (dict): new voice configuration
+
+        Returns:
+            bool: True if the model was swapped, False if a reload is needed
+        """
+        current, _ = stt_model_settings(self.config_core)
+        new, settings = stt_model_settings(config)
+        if recognizer_conf_hash(current) != recognizer_conf_hash(new):
+            return False
+        LOG.info("Voice: STT model has changed, swapping to {}".format(settings))
+        if not self.stt_service.swap_model(**settings):
+            return False
+        self.config_core = config
+        return True
+
     def reload(self):
         """Reload configuration and restart consumer and producer."""
         # with self.lock:
@@ -500,3 +657,4 @@ class ListenerLoop(EventEmitter):
         # wait for threads to shutdown
         self.producer.join()
         self.consumer.join()
+        self.stt_service.stop()
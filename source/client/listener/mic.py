@@ -1,9 +1,6 @@
-import audioop
-import os
 import random
 import time
 from collections import deque, namedtuple
-from threading import Lock
 from time import sleep
 
 import pyaudio
@@ -13,110 +10,138 @@ from speech_recognition import AudioData, AudioSource, Microphone
 from source.api import SystemApi
 from source.audio import wait_while_speaking
 from source.configuration import Configuration
-from source.util import (check_for_signal, get_ipc_directory, play_wav,
-                         resolve_resource_file)
+from source.util import check_for_signal, play_wav, resolve_resource_file
 from source.util.log import LOG
-from source.util.metrics import Stopwatch
+from source.util.metrics import Stopwatch, gauge
 
-from .data_structures import CyclicAudioBuffer, RollingMean
+from . import dsp
+from .data_structures import AmbientNoiseEstimator, AudioRingBuffer, CyclicAudioBuffer
 from .silence import SilenceDetector, SilenceResultType
+from .telemetry import RECORDING, WAITING, MicLevelPage
 
 WakeWordData = namedtuple("WakeWordData", ["audio", "found", "stopped", "end_audio"])
 
+STREAM_BUFFERS = 100  # Default ring buffer size of a MutableStream, in reads
+STREAM_BUFFER_SECONDS = 2  # Audio buffered by the microphone stream
+READ_TIMEOUT = 2  # Seconds without audio before a read fails
+
 
 class MutableStream:
     """
     This class wraps an audio stream from the microphone, allowing it to be muted
     or unmuted.
-    It controls the audio input from the Microphone by stopping and starting the stream.
+    The stream runs in pyaudio callback mode. The callback copies each block of
+    captured audio into a ring buffer and read() blocks until enough audio has
+    arrived, without polling the device. While muted the callback writes
+    silence instead of the captured audio, keeping the timing of the stream.
+
+    Audio that doesn't fit in the buffer because the reader falls behind, and
+    input overflows reported by the device, are counted in overflows.
 
     Attributes:
-        wrapped_stream: The original audio stream from the microphone.
+        wrapped_stream: The pyaudio stream, opened with callback as its
+            stream_callback.
         format: The format of the audio stream.
         frames_per_buffer: The number of frames per buffer.
         SAMPLE_WIDTH: The sample width of the audio stream.
         bytes_per_buffer: The number of bytes per buffer.
-        muted_buffer: A buffer filled with zero bytes.
-        read_lock: A lock for thread-safety while reading from the stream.
-        chunk: A chunk of audio data.
-        chunk_ready: An event that signals when a chunk is ready to be read.
+        buffer: AudioRingBuffer between the callback and read().
         muted: A flag indicating whether the stream is currently muted.
-        chunk_deque: A deque that holds chunks of audio data.
+        input_overflows: Number of callbacks reporting an input overflow.
     """
 
-    def __init__(self, wrapped_stream, format, muted=False, frames_per_buffer=4000):
-        assert wrapped_stream is not None
+    def __init__(
+        self,
+        wrapped_stream=None,
+        format=pyaudio.paInt16,
+        muted=False,
+        frames_per_buffer=4000,
+        buffer_size=None,
+    ):
         self.wrapped_stream = wrapped_stream
 
         self.format = format
         self.frames_per_buffer = frames_per_buffer
         self.SAMPLE_WIDTH = pyaudio.get_sample_size(format)
         self.bytes_per_buffer = self.frames_per_buffer * self.SAMPLE_WIDTH
-        self.muted_buffer = b"".join([b"\x00" * self.SAMPLE_WIDTH])
-        self.read_lock = Lock()
+        self.buffer = AudioRingBuffer(
+            buffer_size or self.bytes_per_buffer * STREAM_BUFFERS
+        )
+        self.input_overflows = 0
+        self._reported_overflows = 0
 
         self.muted = muted
-        if muted:
-            self.mute()
+
+    @property
+    def overflows(self):
+        """Number of input overflows and dropped writes to the buffer."""
+        return self.input_overflows + self.buffer.overflows
+
+    def callback(self, in_data, frame_count, time_info, status_flags):
+        """Callback from pyaudio with a block of captured audio.
+
+        Runs on the pyaudio capture thread.
+        """
+        if status_flags & pyaudio.paInputOverflow:
+            self.input_overflows += 1
+        if self.muted:
+            in_data = bytes(frame_count * self.SAMPLE_WIDTH)
+        self.buffer.write(in_data)
+        return None, pyaudio.paContinue
 
     def mute(self):
-        """Stop the stream and set the muted flag."""
-        with self.read_lock:
-            self.muted = True
-            self.wrapped_stream.stop_stream()
+        """Replace the captured audio with silence."""
+        self.muted = True
 
     def unmute(self):
-        """Start the stream and clear the muted flag."""
-        with self.read_lock:
-            self.muted = False
-            self.wrapped_stream.start_stream()
+        """Pass the captured audio on again."""
+        self.muted = False
 
     def read(self, size, of_exc=False):
         """
         Read data from the stream.
 
+        Blocks until size frames have been captured.
+
         Args:
-            size (int): Number of bytes to read.
+            size (int): Number of frames to read.
             of_exc (bool): Flag determining if the audio producer thread should
             throw IOError at overflows.
 
         Returns:
-            bytes: Data read from the device.
+            bytes: Data read from the device, silence while muted.
         """
+        num_bytes = size * self.SAMPLE_WIDTH
+        if not self.buffer.wait_for(num_bytes, READ_TIMEOUT):
+            if self.buffer.closed:
+                raise IOError("Microphone stream is closed")
+            raise IOError(
+                "No audio from the microphone in {} seconds".format(READ_TIMEOUT)
+            )
 
-        frames = deque()
-        remaining = size
-
-        with self.read_lock:
-            while remaining > 0:
-                # If muted during read return empty buffer. This ensures no
-                # reads occur while the stream is stopped
-                if self.muted:
-                    LOG.debug("returning self.muted_buffer")
-                    return self.muted_buffer
-
-                to_read = min(self.wrapped_stream.get_read_available(), remaining)
-                if to_read <= 0:
-                    sleep(0.01)
-                    continue
-                result = self.wrapped_stream.read(to_read, exception_on_overflow=of_exc)
-                frames.append(result)
-                remaining -= to_read
+        overflows = self.overflows
+        if overflows != self._reported_overflows:
+            LOG.warning(
+                "Microphone input overflowed {} times, {} bytes dropped".format(
+                    overflows - self._reported_overflows, self.buffer.dropped
+                )
+            )
+            self._reported_overflows = overflows
+            if of_exc:
+                raise IOError(pyaudio.paInputOverflowed, "Input overflowed")
 
         input_latency = self.wrapped_stream.get_input_latency()
         # NOTE: initially 0.2 but for mac I get input latency to 0.4
         if input_latency > 0.5:
-            pass
-            # LOG.warning("High input latency: %f" % input_latency)
             LOG.warning("High input latency: %f" % input_latency)
-        audio = b"".join(list(frames))
-        return audio
+        return self.buffer.read(num_bytes)
 
     def close(self):
         """Close the wrapped stream."""
         self.wrapped_stream.stop_stream()
         self.wrapped_stream.close()
         self.wrapped_stream = None
+        self.buffer.close()
 
     def is_stopped(self):
         """
@@ -187,16 +212,6 @@ class MutableMicrophone(Microphone):
                 LOG.exception("Can't start mic!")
             sleep(1)
 
-    # def _stream_callback(self, in_data, frame_count, time_info, status):
-    #     """Callback from pyaudio.
-
-    #     Rather than buffer chunks, we simply assigned the current chunk to the
-    #     class instance and signal that it's ready.
-    #     """
-    #     self.stream.chunk_deque.append(in_data)
-    #     self.stream.chunk_ready.set()
-    #     return (None, pyaudio.paContinue)
-
     def _start(self):
         """Open the selected device and setup the stream."""
         assert (
@@ -204,21 +219,22 @@ class MutableMicrophone(Microphone):
         ), "This audio source is already inside a context manager"
         self.audio = pyaudio.PyAudio()
 
-        wrapped_stream = self.audio.open(
+        stream = MutableStream(
+            format=self.format,
+            muted=self.muted,
+            frames_per_buffer=self.CHUNK,
+            buffer_size=self.duration_to_bytes(STREAM_BUFFER_SECONDS),
+        )
+        stream.wrapped_stream = self.audio.open(
             input_device_index=self.device_index,
             channels=1,
             format=self.format,
             rate=self.SAMPLE_RATE,
             frames_per_buffer=self.CHUNK,
             input=True,  # stream is an input stream
+            stream_callback=stream.callback,
         )
-
-        self.stream = MutableStream(
-            wrapped_stream=wrapped_stream,
-            format=self.format,
-            muted=self.muted,
-            frames_per_buffer=self.CHUNK,
-        )
+        self.stream = stream
 
         return self
 
@@ -303,7 +319,7 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         threshold for silence detection.
         energy_ratio: The energy ratio for adjusting the energy threshold for
         silence detection.
-        mic_level_file: The file path for the microphone level file.
+        mic_level: Page publishing the microphone level to other processes.
         _stop_signaled: Flag indicating whether a stop signal has been received.
         _listen_triggered: Flag indicating whether listening has been triggered.
         _stop_recording: Flag indicating whether to stop recording.
@@ -340,8 +356,21 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         self.audio = pyaudio.PyAudio()
         self.multiplier = listener_config.get("multiplier")
         self.energy_ratio = listener_config.get("energy_ratio")
+        # Seconds of audio before the wake word detection handed to the
+        # phrase recorder, the engines report the wake word a little after
+        # it ended
+        self.pre_roll_seconds = listener_config.get("pre_roll_seconds", 0.1)
+
+        # Background noise, estimated continuously while waiting for the
+        # wake word so no audio has to be spent on calibration per listen
+        self.noise = AmbientNoiseEstimator(
+            ratio=self.energy_ratio or 1.5,
+            rise_seconds=listener_config.get("noise_rise_seconds", 5.0),
+        )
+        self._noise_floor_metric = gauge("listener.noise_floor")
+        self._energy_threshold_metric = gauge("listener.energy_threshold")
 
-        self.mic_level_file = os.path.join(get_ipc_directory(), "mic_level")
+        self.mic_level = MicLevelPage()
 
         # Signal statuses
         self._stop_signaled = False
@@ -396,7 +425,9 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         Returns:
             The calculated energy of the sound chunk.
         """
-        return audioop.rms(sound_chunk, sample_width)
+        if sample_width != 2:
+            raise ValueError("Only 16-bit audio is supported")
+        return dsp.rms(sound_chunk)
 
     def _record_phrase(
         self,
@@ -404,7 +435,8 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         sec_per_buffer: float,
         stream=None,
         ww_frames: deque = None,
-    ) -> bytearray:
+        confirmation=None,
+    ) -> bytes:
         """
         Records an entire spoken phrase.
 
@@ -418,10 +450,12 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
             stream (AudioStreamHandler): Stream target that will receive chunks of the
             utterance audio while it is being recorded.
             ww_frames (deque):  Frames of audio data from the last part of wake word
-            detection.
+            detection, recorded first as pre-roll.
+            confirmation (Popen): Playback of the confirmation sound, audio captured
+            while it plays is recorded but not checked for silence.
 
         Returns:
-            bytearray: Complete audio buffer recorded, including any silence at the end
+            bytes: Complete audio buffer recorded, including any silence at the end
             of the user's utterance.
         """
 
@@ -430,17 +464,17 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
 
         num_chunks = 0
 
-        # bytearray to store audio in, initialized with a single sample of
-        # silence.
-        byte_data = get_silence(source.SAMPLE_WIDTH)
+        # Preallocated buffer large enough to hold the longest possible
+        # phrase, initialized with a single sample of silence.
+        byte_data = CyclicAudioBuffer(
+            source.SAMPLE_WIDTH * (1 + max_chunks * source.CHUNK),
+            get_silence(source.SAMPLE_WIDTH),
+        )
 
-        self.silence_detector.start()
+        self.silence_detector.start(energy_threshold=self.noise.threshold)
         if stream:
             stream.stream_start()
 
-        last_phrase_end_chunk = None
-        chunk_sent = False
-
         stopwatch = Stopwatch()
         with stopwatch:
             # for chunk in source.stream.iter_chunks():
@@ -452,8 +486,20 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
                     chunk = ww_frames.popleft()
                 else:
                     chunk = self.record_sound_chunk(source)
-
-                byte_data += chunk
+                    if confirmation is not None:
+                        if confirmation.poll() is None:
+                            # Keep the audio, but don't let the confirmation
+                            # sound count as speech
+                            byte_data.append(chunk)
+                            if stream:
+                                stream.stream_chunk(chunk)
+                            num_chunks += 1
+                            continue
+                        confirmation = None
+
+                byte_data.append(chunk)
+                if stream:
+                    stream.stream_chunk(chunk)
 
                 result = self.silence_detector.process(chunk)
 
@@ -473,34 +519,12 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
                 # LOG.info("VOICE RECOGNITION STATE: " + repr(result.type))
                 if result.type == SilenceResultType.SPEECH:
                     stopwatch.lap()
-
-                if (
-                    result.type == SilenceResultType.SPEECH
-                    and last_phrase_end_chunk is not None
-                    and not chunk_sent
-                ):
-                    LOG.info(
-                        "VOICE RECOGNITION STATE: " + repr(SilenceResultType.PHRASE_END)
+                elif result.type == SilenceResultType.SILENCE:
+                    # Keep the noise estimate current during long recordings
+                    self._update_noise(
+                        self.calc_energy(chunk, source.SAMPLE_WIDTH), sec_per_buffer
                     )
-                    #  NOTE: on an assumption that result.phrase_chunk returns chunk
-                    # from phrase start to end
-                    if stream:
-                        LOG.info("streaming data")
-                        stream.stream_chunk(last_phrase_end_chunk)
-                        last_phrase_end_chunk = None
-                        chunk_sent = True
-
-                # NOTE: this needs to be changed to the number of silence/ 2 for when
-                # the last_phrase should be stored and sent
-                if result.type in {
-                    SilenceResultType.PHRASE_END,
-                }:
-                    LOG.debug("VOICE RECOGNITION STATE: " + repr(result.type))
-                    last_phrase_end_chunk = result.phrase_chunk
-                    chunk_sent = False
 
-                    # NOTE: the chunk gotten here might not be the complete phrase,
-                    # how can I get that?
                 if result.type in {
                     SilenceResultType.TIMEOUT,
                     SilenceResultType.PHRASE_END,
@@ -508,31 +532,38 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
                     LOG.debug("voice recognition state: " + repr(result.type))
                     break
 
-                # Periodically write the energy level to the mic level file.
+                self.publish_mic_level(
+                    result.energy,
+                    source,
+                    RECORDING,
+                    getattr(self.silence_detector, "vad", None),
+                )
                 if num_chunks % 10 == 0:
                     self._watchdog()
-                    self.write_mic_level(result.energy, source)
                 num_chunks += 1
 
         LOG.debug("THE RECORDED MAX SILENCE TO END PHRASE IS: " + str(stopwatch))
 
         self.silence_detector.stop()
-        return byte_data
+        return byte_data.get()
 
-    def write_mic_level(self, energy, source):
+    def publish_mic_level(self, energy, source, state, vad=None):
         """
-        Writes the microphone level to the file log.
+        Publishes the microphone level for other processes, e.g. a meter.
 
         Args:
-            energy: The energy level to write.
+            energy: The energy level of the last chunk.
             source: The AudioSource instance.
+            state: The listener state, WAITING or RECORDING.
+            vad: The SileroVAD run on the audio, if any.
         """
-        with open(self.mic_level_file, "w") as f:
-            f.write(
-                "Energy:  cur={} thresh={:.3f} muted={}".format(
-                    energy, self.energy_threshold, int(source.muted)
-                )
-            )
+        self.mic_level.publish(
+            energy,
+            self.energy_threshold,
+            vad.speech_probability if vad is not None else None,
+            state,
+            getattr(source, "muted", False),
+        )
 
     def _skip_wake_word(self):
         """
@@ -587,7 +618,12 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
             source: The AudioSource instance.
             emitter: The EventEmitter instance.
         """
-        emitter.emit("recognizer_loop:wakeword")
+        detection = getattr(self.wake_word_recognizer, "detection", None)
+        if detection is not None:
+            # Report which of the multiplexed wake words was heard
+            emitter.emit("recognizer_loop:wakeword", detection._asdict())
+        else:
+            emitter.emit("recognizer_loop:wakeword")
 
     def _wait_until_wake_word(
         self, source: AudioSource, sec_per_buffer: float
@@ -626,18 +662,7 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         buffers_per_check = self.SEC_BETWEEN_WW_CHECKS / sec_per_buffer
         buffers_since_check = 0.0
 
-        # Rolling buffer to track the audio energy (loudness) heard on
-        # the source recently.  An average audio energy is maintained
-        # based on these levels.
-        average_samples = int(5 / sec_per_buffer)  # average over last 5 secs
-        audio_mean = RollingMean(average_samples)
-
-        # These are frames immediately after wake word is detected
-        # that we want to keep to send to STT
-        ww_frames = deque(maxlen=7)
-
         said_wake_word = False
-        audio_data = silence
 
         while (
             not said_wake_word
@@ -646,22 +671,14 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         ):
             chunk = self.record_sound_chunk(source)
             audio_buffer.append(chunk)
-            ww_frames.append(chunk)
             energy = self.calc_energy(chunk, source.SAMPLE_WIDTH)
-            audio_mean.append_sample(energy)
+            self._update_noise(energy, sec_per_buffer)
 
-            if energy < self.energy_threshold * self.multiplier:
-                self._adjust_threshold(energy, sec_per_buffer)
-            # maintain the threshold using average
-            if self.energy_threshold < energy < audio_mean.value * 1.5:
-                # bump the threshold to just above this value
-                self.energy_threshold = energy * 1.2
-
-            # Periodically output energy level stats. This can be used to
-            # visualize the microphone input, e.g. a needle on a meter.
+            # Output energy level stats. This can be used to visualize the
+            # microphone input, e.g. a needle on a meter.
+            self.publish_mic_level(energy, source, WAITING)
             if mic_write_counter % 3:
                 self._watchdog()
-                self.write_mic_level(energy, source)
             mic_write_counter += 1
 
             buffers_since_check += 1.0
@@ -670,8 +687,21 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
 
             if buffers_since_check > buffers_per_check:
                 buffers_since_check -= buffers_per_check
-                audio_data = audio_buffer.get_last(test_size) + silence
-                said_wake_word = self.wake_word_recognizer.found_wake_word(audio_data)
+                said_wake_word = self.wake_word_recognizer.found_wake_word(
+                    audio_buffer.view_last(test_size)
+                )
+
+        # Only export a copy of the audio once the wait is over. The audio
+        # right before the detection point is handed to the phrase recorder
+        # as pre-roll, so a command spoken right after the wake word isn't
+        # cut off, and left out of the wake word audio.
+        audio_data = audio_buffer.view_last(test_size)
+        pre_roll_size = min(
+            source.duration_to_bytes(self.pre_roll_seconds), len(audio_data)
+        )
+        split = len(audio_data) - pre_roll_size
+        ww_frames = deque([bytes(audio_data[split:])] if pre_roll_size else [])
+        audio_data = bytes(audio_data[:split])
         return WakeWordData(audio_data, said_wake_word, self._stop_signaled, ww_frames)
 
     @staticmethod
@@ -689,16 +719,19 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         """
         return AudioData(raw_data, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
 
-    def mute_and_confirm_listening(self, source):
+    def confirm_listening(self, source):
         """
-        Mutes the source and plays a confirmation sound indicating
-        that the system is listening.
+        Starts playing a confirmation sound indicating that the system is
+        listening.
+
+        The microphone is not muted, audio captured while the sound plays is
+        recorded but ignored by the silence detection.
 
         Args:
             source: The AudioSource instance.
 
         Returns:
-            True if a confirmation sound was played, False otherwise.
+            The playback process if a confirmation sound is playing, else None.
         """
         audio_file = None
         if self._skip_wake_word():
@@ -712,12 +745,8 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         #     )
         if audio_file:
             LOG.debug(f"audio file source: {audio_file}")
-            source.mute()
-            play_wav(audio_file).wait()
-            source.unmute()
-            return True
-        else:
-            return False
+            return play_wav(audio_file)
+        return None
 
     def play_end_listening_sound(self, source):
         audio_file = resolve_resource_file(
@@ -754,19 +783,14 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         # bytes_per_sec = source.SAMPLE_RATE * source.SAMPLE_WIDTH
         sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
 
-        # Every time a new 'listen()' request begins, reset the threshold
-        # used for silence detection.  This is as good of a reset point as
-        # any, as we expect the user and system to not be talking.
-        # NOTE: adjust_for_ambient_noise() doc claims it will stop early if
-        #       speech is detected, but there is no code to actually do that.
-        self.adjust_for_ambient_noise(source, 0.3)
-
+        # The energy threshold is kept calibrated by the noise estimate
+        # updated while waiting for the wake word, no audio is discarded to
+        # calibrate it here.
         self._stop_recording = False
 
         LOG.debug("WAITING FOR WAKE WORD...")
         ww_data = self._wait_until_wake_word(source, sec_per_buffer)
 
-        ww_frames = None
         if ww_data.found:
             self._handle_wakeword_found(ww_data.audio, source, emitter)
         if ww_data.stopped:
@@ -777,18 +801,16 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         # If enabled, play a wave file with a short sound to audibly
         # indicate recording has begun.
         # if self.config.get("voice").get("confirm_listening"):
-        # NOTE: Aim is to avoid interference of the activation
-        # sound with system speech
-
-        if self.mute_and_confirm_listening(source):
-            # Clear frames from wakeword detections since they're
-            # irrelevant after mute - play wav - unmute sequence
-            ww_frames = None
+        # NOTE: The microphone keeps recording while the sound plays, so a
+        # command spoken right after the wake word isn't lost
+        confirmation = self.confirm_listening(source)
 
         # Notify system of recording start
         emitter.emit("recognizer_loop:record_begin")
 
-        frame_data = self._record_phrase(source, sec_per_buffer, stream, ww_frames)
+        frame_data = self._record_phrase(
+            source, sec_per_buffer, stream, ww_data.end_audio, confirmation
+        )
         # if USER started initial conversation do not add wakeword audio
         if self._listen_triggered:
             LOG.info("listen triggered by system")
@@ -805,11 +827,14 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
 
         return audio_data
 
-    def _adjust_threshold(self, energy, seconds_per_buffer):
-        if self.dynamic_energy_threshold and energy > 0:
-            # account for different chunk sizes and rates
-            damping = self.dynamic_energy_adjustment_damping**seconds_per_buffer
-            target_energy = energy * self.energy_ratio
-            self.energy_threshold = self.energy_threshold * damping + target_energy * (
-                1 - damping
-            )
+    def _update_noise(self, energy, seconds_per_buffer):
+        """Add the energy of a chunk to the background noise estimate.
+
+        Args:
+            energy: RMS energy of the chunk.
+            seconds_per_buffer: Duration of the chunk.
+        """
+        self.noise.update(energy, seconds_per_buffer)
+        self.energy_threshold = self.noise.threshold
+        self._noise_floor_metric.set(self.noise.floor)
+        self._energy_threshold_metric.set(self.energy_threshold)
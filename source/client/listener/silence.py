@@ -1,4 +1,3 @@
-import audioop
 import math
 import typing
 from collections import deque
@@ -11,6 +10,8 @@ import onnxruntime
 
 from source import LOG
 
+from . import dsp
+
 
 class SilenceResultType(str, Enum):
     SILENCE = "silence"
@@ -101,7 +102,9 @@ class SilenceDetector:
 
         # Voice detector
         try:
-            self.vad = SileroVAD(self.vad_config)
+            self.vad = SileroVAD(
+                self.vad_config, frame_samples=self.chunk_size // self.sample_width
+            )
         except Exception as e:
             LOG.error("Failed to load VAD: " + repr(e))
         self.seconds_per_buffer = (
@@ -124,15 +127,23 @@ class SilenceDetector:
         self.before_phrase_chunks: typing.Deque[bytes] = deque(
             maxlen=self.before_buffers
         )
-        self.phrase_buffer: bytes = bytes()
+        self.phrase_buffer = bytearray()
+        self.current_chunk = bytearray()
         self.max_buffers: typing.Optional[int] = None
 
-    def start(self):
-        """Begin new voice command."""
+    def start(self, energy_threshold: typing.Optional[float] = None):
+        """Begin new voice command.
+
+        Args:
+            energy_threshold: calibrated energy threshold from the listener's
+                noise estimate, replacing current_energy_threshold
+        """
+        if energy_threshold is not None:
+            self.current_energy_threshold = energy_threshold
 
         # State
         self.before_phrase_chunks.clear()
-        self.phrase_buffer = bytes()
+        self.phrase_buffer.clear()
 
         if self.max_seconds:
             self.max_buffers = int(
@@ -152,27 +163,25 @@ class SilenceDetector:
             math.ceil(self.silence_seconds / self.seconds_per_buffer)
         )
         self.current_seconds: float = 0
-        self.current_chunk: bytes = bytes()
+        self.current_chunk.clear()
 
     def stop(self, phrase_only=False) -> bytes:
         """Free resources and return recorded audio"""
-        before_buffer = bytes()
-        for before_chunk in self.before_phrase_chunks:
-            before_buffer += before_chunk
+        before_buffer = b"".join(self.before_phrase_chunks)
 
         if phrase_only:
             # NOTE: is 5 a good magic number ?
             # the aim is to include just a tiny bit of silence
             # and avoid super long recordings to account
             # for non streaming STT
-            before_buffer = before_chunk[-5:]
+            before_buffer = before_buffer[-5:]
 
         audio_data = before_buffer + self.phrase_buffer
 
         # Clear state
         self.before_phrase_chunks.clear()
-        self.phrase_buffer = bytes()
-        self.current_chunk = bytes()
+        self.phrase_buffer.clear()
+        self.current_chunk.clear()
 
         # Return leftover audio
         return audio_data
@@ -189,8 +198,8 @@ class SilenceDetector:
         # Process audio in exact chunk(s)
         while len(self.current_chunk) > self.chunk_size:
             # Extract chunk
-            chunk = self.current_chunk[: self.chunk_size]
-            self.current_chunk = self.current_chunk[self.chunk_size :]
+            chunk = bytes(self.current_chunk[: self.chunk_size])
+            del self.current_chunk[: self.chunk_size]
             if self.skip_buffers_left > 0:
                 # Skip audio at beginning
                 self.skip_buffers_left -= 1
@@ -243,14 +252,12 @@ class SilenceDetector:
                 elif self.after_phrase and (self.silence_buffers <= 0):
                     # Phrase complete
                     # Merge before/during command audio data
-                    before_buffer = bytes()
-                    for before_chunk in self.before_phrase_chunks:
-                        before_buffer += before_chunk
+                    before_buffer = b"".join(self.before_phrase_chunks)
 
                     result = SilenceResult(
                         type=SilenceResultType.PHRASE_END,
                         energy=energy,
-                        phrase_chunk=(before_buffer + self.phrase_buffer),
+                        phrase_chunk=before_buffer + self.phrase_buffer,
                     )
                     # self.phrase_buffer = bytes()
 
@@ -320,32 +327,42 @@ class SilenceDetector:
         """Compute RMS of debiased audio."""
         # Thanks to the speech_recognition library!
         # https://github.com/Uberi/speech_recognition/blob/master/speech_recognition/__init__.py
-        energy = -audioop.rms(audio_data, 2)
-        energy_bytes = bytes([energy & 0xFF, (energy >> 8) & 0xFF])
-        debiased_energy = audioop.rms(
-            audioop.add(audio_data, energy_bytes * (len(audio_data) // 2), 2), 2
-        )
-
         # Probably actually audio if > 30
-        return debiased_energy
+        return dsp.debiased_energy(audio_data)
+
+
+class VadState:
+    """Recurrent state of the Silero model for one audio stream."""
+
+    __slots__ = ("h", "c")
+
+    def __init__(self):
+        self.h = np.zeros((2, 1, 64), dtype=np.float32)
+        self.c = np.zeros((2, 1, 64), dtype=np.float32)
 
 
 class SileroVoiceActivityDetector:
     """Detects speech/silence using Silero VAD.
 
+    The model is recurrent, audio of a stream must be run through it in
+    order. The detector keeps the state of one stream, other streams can use
+    the same model with their own VadState.
+
     https://github.com/snakers4/silero-vad
     """
 
     def __init__(self, onnx_path):
-        self.session = onnxruntime.InferenceSession(onnx_path)
-        self.session.intra_op_num_threads = 1
-        self.session.inter_op_num_threads = 1
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            onnx_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
 
         self.reset()
 
     def reset(self):
-        self._h = np.zeros((2, 1, 64)).astype("float32")
-        self._c = np.zeros((2, 1, 64)).astype("float32")
+        self.state = VadState()
 
     def __call__(self, audio_array: np.ndarray, sample_rate: int = 16000):
         """Return probability of speech in audio [0-1].
@@ -358,37 +375,142 @@ class SileroVoiceActivityDetector:
 
         if len(audio_array.shape) > 2:
             raise ValueError(
-                f"Too many dimensions for input audio chunk {audio_array.dim()}"
+                f"Too many dimensions for input audio chunk {audio_array.ndim}"
             )
 
         if audio_array.shape[0] > 1:
-            raise ValueError("Onnx model does not support batching")
+            raise ValueError(
+                "Onnx model does not support batching, use process_frames()"
+            )
 
         if sample_rate != 16000:
             raise ValueError("Only 16Khz audio is supported")
 
         ort_inputs = {
             "input": audio_array.astype(np.float32),
-            "h0": self._h,
-            "c0": self._c,
+            "h0": self.state.h,
+            "c0": self.state.c,
         }
         ort_outs = self.session.run(None, ort_inputs)
-        out, self._h, self._c = ort_outs
+        out, self.state.h, self.state.c = ort_outs
 
         out = out.squeeze(2)[:, 1]  # make output type match JIT analog
 
         return out
 
+    def process_frames(
+        self, frames: np.ndarray, state: typing.Optional[VadState] = None
+    ) -> np.ndarray:
+        """Return the probability of speech [0-1] in consecutive windows.
+
+        The audio is converted once for all windows, each window continues
+        from the recurrent state left by the previous one, so the result is
+        the same as calling the detector once per window.
+
+        Args:
+            frames: 2D array with one window of 16Khz audio per row, as int16
+                samples
+            state: state of the audio stream, the state of the detector if
+                None
+
+        Returns:
+            np.ndarray: speech probability of each window
+        """
+        state = state or self.state
+        frames = np.asarray(frames, dtype=np.float32)
+        probabilities = np.empty(len(frames), dtype=np.float32)
+        ort_inputs = {"h0": state.h, "c0": state.c}
+        for i in range(len(frames)):
+            ort_inputs["input"] = frames[i : i + 1]
+            out, ort_inputs["h0"], ort_inputs["c0"] = self.session.run(
+                None, ort_inputs
+            )
+            probabilities[i] = out[0, 1, 0]
+        state.h, state.c = ort_inputs["h0"], ort_inputs["c0"]
+        return probabilities
+
 
 class SileroVAD:
-    def __init__(self, config=None, sample_rate=None):
+    """Silero VAD on a stream of fixed size audio frames.
+
+    Frames are accumulated into windows of `window_frames` frames and each
+    window is run through the model at once. Every frame of a window gets
+    the speech probability of the window. Most of the cost of running the
+    model is per run, larger windows reduce the CPU use at the price of
+    coarser and later decisions. One frame per window gives the same
+    results as running the model on each frame.
+
+    Args:
+        config (dict): VAD configuration
+        sample_rate (int): unused, audio must be 16Khz
+        frame_samples (int): samples per frame
+    """
+
+    def __init__(self, config=None, sample_rate=None, frame_samples=480):
+        config = config or {}
         model = join(dirname(__file__), "silero_vad.onnx")
         self.vad_threshold = config.get("threshold", 0.2)
+        self.window_frames = max(1, config.get("window_frames", 1))
+        self.frame_samples = frame_samples
+        self.window_bytes = frame_samples * self.window_frames * 2
         self.vad = SileroVoiceActivityDetector(model)
+        self._pending = bytearray()
+        # speech probability of the most recent frames
+        self.probabilities = deque(maxlen=100)
+
+    @property
+    def speech_probability(self) -> float:
+        """Speech probability of the last processed frame."""
+        return self.probabilities[-1] if self.probabilities else 0.0
 
     def reset(self):
         self.vad.reset()
+        self._pending.clear()
+        self.probabilities.clear()
+
+    def process(self, chunk: bytes) -> np.ndarray:
+        """Add audio to the stream.
+
+        Args:
+            chunk: 16-bit mono PCM audio of any length
+
+        Returns:
+            np.ndarray: speech probability of each frame completed by the
+                chunk, empty while a window is incomplete
+        """
+        self._pending += chunk
+        windows = len(self._pending) // self.window_bytes
+        if windows == 0:
+            return np.empty(0, dtype=np.float32)
+
+        size = windows * self.window_bytes
+        audio = np.frombuffer(self._pending[:size], dtype=np.int16)
+        del self._pending[:size]
+        probabilities = self.vad.process_frames(audio.reshape(windows, -1))
+        if self.window_frames > 1:
+            probabilities = np.repeat(probabilities, self.window_frames)
+        self.probabilities.extend(probabilities.tolist())
+        return probabilities
+
+    def speech_probabilities(self, audio: bytes) -> np.ndarray:
+        """Speech probability of each frame of a separate recording.
+
+        The recording is processed on its own, the state of the stream is
+        left untouched. Trailing samples not filling a frame are ignored.
+
+        Args:
+            audio: 16-bit mono PCM audio
+
+        Returns:
+            np.ndarray: speech probability of each frame
+        """
+        window_samples = self.window_bytes // 2
+        samples = np.frombuffer(audio, dtype=np.int16)
+        windows = len(samples) // window_samples
+        frames = samples[: windows * window_samples].reshape(windows, -1)
+        probabilities = self.vad.process_frames(frames, VadState())
+        return np.repeat(probabilities, self.window_frames)
 
     def is_silent(self, chunk):
-        audio_array = np.frombuffer(chunk, dtype=np.int16)
-        return self.vad(audio_array)[0] < self.vad_threshold
+        self.process(chunk)
+        return self.speech_probability < self.vad_threshold
@@ -0,0 +1,145 @@
+"""Microphone level telemetry shared with other local processes.
+
+The listener publishes the energy of the microphone audio, the energy
+threshold, the speech probability of the VAD and its state into a small
+memory mapped page in the IPC directory. Publishing and reading the level
+are plain memory accesses, so the listener can publish every chunk and
+consumers such as the CLI meter can poll it without touching the file
+system.
+
+The page is a seqlock: the single writer makes the sequence number odd
+while it updates the values and even again when it is done. Readers retry
+until they read the same even sequence number before and after copying
+the values.
+"""
+import math
+import mmap
+import os
+import os.path
+import struct
+import time
+from collections import namedtuple
+
+from source.util.file_utils import ensure_directory_exists
+from source.util.signal import get_ipc_directory
+
+MIC_LEVEL_PAGE_NAME = "mic_level.page"
+
+# Listener states
+IDLE = "idle"
+WAITING = "waiting"  # Listening for the wake word
+RECORDING = "recording"  # Recording an utterance
+LISTENER_STATES = (IDLE, WAITING, RECORDING)
+
+_HEADER = struct.Struct("=4sIQ")  # magic, version, sequence number
+_LEVEL = struct.Struct("=ddddBB6x")  # time, energy, threshold, vad, state, muted
+_MAGIC = b"MIC1"
+_VERSION = 1
+_PAGE_SIZE = _HEADER.size + _LEVEL.size
+_SEQUENCE_OFFSET = 8
+
+# Attempts to get a consistent copy before giving up on a read
+_READ_ATTEMPTS = 100
+
+MicLevel = namedtuple(
+    "MicLevel",
+    ["sequence", "timestamp", "energy", "threshold", "vad_probability",
+     "state", "muted"],
+)
+MicLevel.__doc__ = """Published microphone level.
+
+    sequence (int): increases with every publish, changes show new values
+    timestamp (float): time.time() of the publish
+    energy (float): RMS energy of the last chunk
+    threshold (float): energy threshold of the listener
+    vad_probability (float): speech probability, None if the VAD isn't run
+    state (str): one of LISTENER_STATES
+    muted (bool): True if the microphone is muted
+"""
+
+
+def get_mic_level_path():
+    """Get the path of the mic level page in the IPC directory."""
+    return os.path.join(get_ipc_directory(), MIC_LEVEL_PAGE_NAME)
+
+
+class MicLevelPage:
+    """Memory mapped mic level, published by the listener.
+
+    The page is created by whichever side opens it first, so consumers can
+    be started before the listener. Only one process may publish.
+
+    Args:
+        path (str): file backing the page, the IPC mic level page by default
+    """
+
+    def __init__(self, path=None):
+        self.path = path or get_mic_level_path()
+        ensure_directory_exists(os.path.dirname(self.path))
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            if os.fstat(fd).st_size < _PAGE_SIZE:
+                os.ftruncate(fd, _PAGE_SIZE)
+            self._map = mmap.mmap(fd, _PAGE_SIZE)
+        finally:
+            os.close(fd)
+        magic, version, _ = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self._map[:_PAGE_SIZE] = bytes(_PAGE_SIZE)
+            _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, 0)
+
+    def publish(self, energy, threshold, vad_probability=None, state=IDLE,
+                muted=False):
+        """Publish a new microphone level.
+
+        Args:
+            energy (float): RMS energy of the last chunk
+            threshold (float): energy threshold of the listener
+            vad_probability (float): speech probability of the VAD, None if
+                                     the VAD isn't run
+            state (str): one of LISTENER_STATES
+            muted (bool): True if the microphone is muted
+        """
+        if vad_probability is None:
+            vad_probability = math.nan
+        # Continue after a writer that stopped in the middle of an update
+        sequence = self.sequence
+        sequence += sequence % 2
+        struct.pack_into("=Q", self._map, _SEQUENCE_OFFSET, sequence + 1)
+        _LEVEL.pack_into(
+            self._map, _HEADER.size, time.time(), energy, threshold or 0.0,
+            vad_probability, LISTENER_STATES.index(state), bool(muted)
+        )
+        struct.pack_into("=Q", self._map, _SEQUENCE_OFFSET, sequence + 2)
+
+    @property
+    def sequence(self):
+        """Sequence number of the last publish, 0 if nothing was published."""
+        return struct.unpack_from("=Q", self._map, _SEQUENCE_OFFSET)[0]
+
+    def read(self):
+        """Read the last published microphone level.
+
+        Returns:
+            MicLevel: the level, None if nothing was published yet or the
+                      writer kept changing it while reading
+        """
+        for _ in range(_READ_ATTEMPTS):
+            sequence = self.sequence
+            if sequence % 2:
+                continue  # Update in progress
+            values = _LEVEL.unpack_from(self._map, _HEADER.size)
+            if self.sequence != sequence:
+                continue
+            if sequence == 0:
+                return None
+            timestamp, energy, threshold, vad, state, muted = values
+            return MicLevel(
+                sequence, timestamp, energy, threshold,
+                None if math.isnan(vad) else vad, LISTENER_STATES[state],
+                bool(muted)
+            )
+        return None
+
+    def close(self):
+        self._map.close()
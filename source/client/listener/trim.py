@@ -0,0 +1,170 @@
+"""Removal of non-speech audio before speech to text.
+
+A recorded utterance starts with the audio kept from before the speech and
+ends with the silence the SilenceDetector waits for before it ends the
+phrase. The STT decodes that silence at full cost, so the SpeechTrimmer cuts
+it off using the speech probabilities of the Silero VAD, keeping some
+padding around the speech. Optionally long pauses within the utterance are
+compacted as well.
+
+The TimingMap of a trimmed utterance maps times in the trimmed audio back to
+the recording, so word timestamps can be reported against the original
+audio.
+"""
+import bisect
+from collections import namedtuple
+
+import numpy as np
+from speech_recognition import AudioData
+
+from source.util.log import LOG
+from source.util.metrics import histogram
+
+from .silence import SileroVAD
+
+Segment = namedtuple("Segment", ["original", "trimmed", "duration"])
+Segment.__doc__ = """Audio kept from the recording.
+
+    original (float): start in the recording in seconds
+    trimmed (float): start in the trimmed audio in seconds
+    duration (float): length in seconds
+"""
+
+
+class TimingMap:
+    """Maps times in trimmed audio to times in the original recording.
+
+    Args:
+        segments (list): Segments kept from the recording, in order
+        original_duration (float): length of the recording in seconds
+    """
+
+    def __init__(self, segments, original_duration):
+        self.segments = segments
+        self.original_duration = original_duration
+        self._starts = [segment.trimmed for segment in segments]
+
+    @classmethod
+    def identity(cls, duration):
+        """Map of audio that wasn't trimmed."""
+        return cls([Segment(0.0, 0.0, duration)], duration)
+
+    @property
+    def duration(self):
+        """Length of the trimmed audio in seconds."""
+        return sum(segment.duration for segment in self.segments)
+
+    @property
+    def removed(self):
+        """Seconds of the recording that were removed."""
+        return self.original_duration - self.duration
+
+    def to_original(self, time):
+        """Get the time in the recording of a time in the trimmed audio.
+
+        Args:
+            time (float): seconds from the start of the trimmed audio
+
+        Returns:
+            float: seconds from the start of the recording
+        """
+        if not self.segments:
+            return time
+        index = max(0, bisect.bisect_right(self._starts, time) - 1)
+        segment = self.segments[index]
+        offset = min(max(time - segment.trimmed, 0.0), segment.duration)
+        return segment.original + offset
+
+
+class SpeechTrimmer:
+    """Removes non-speech audio from recorded utterances.
+
+    The VAD model is run separately from the one of the listener, trimming
+    is done by the STT workers.
+
+    Args:
+        vad_config (dict): listener VAD configuration, for the threshold and
+                           window size of the Silero VAD
+        padding (float): seconds of audio to keep around speech
+        compact (bool): also shorten pauses within the utterance to twice
+                        the padding
+    """
+
+    def __init__(self, vad_config=None, padding=0.25, compact=False):
+        vad_config = vad_config or {}
+        self.vad = SileroVAD(vad_config)
+        self.threshold = self.vad.vad_threshold
+        self.padding = padding
+        self.compact = compact
+        self._removed = histogram("stt.trim.removed_seconds")
+
+    def trim(self, audio):
+        """Remove the non-speech audio of an utterance.
+
+        Audio without any detected speech is returned as is, so the STT
+        still gets the chance to transcribe it.
+
+        Args:
+            audio (AudioData): 16 kHz 16-bit mono recording
+
+        Returns:
+            tuple: the trimmed AudioData and its TimingMap
+        """
+        data = audio.get_raw_data()
+        rate = audio.sample_rate
+        width = audio.sample_width
+        duration = len(data) / (rate * width)
+        if rate != 16000 or width != 2:
+            LOG.warning("Not trimming {} Hz audio".format(rate))
+            return audio, TimingMap.identity(duration)
+
+        speech = self.vad.speech_probabilities(data) >= self.threshold
+        if not speech.any():
+            return audio, TimingMap.identity(duration)
+
+        frame_samples = self.vad.frame_samples
+        total_samples = len(data) // width
+        segments = []
+        trimmed_samples = 0
+        chunks = []
+        for start, end in self._kept_frames(speech, frame_samples, rate):
+            start *= frame_samples
+            # The last frame keeps the samples too few for another frame
+            end = total_samples if end == len(speech) else end * frame_samples
+            segments.append(
+                Segment(start / rate, trimmed_samples / rate, (end - start) / rate)
+            )
+            chunks.append(data[start * width:end * width])
+            trimmed_samples += end - start
+
+        timing = TimingMap(segments, duration)
+        self._removed.observe(timing.removed)
+        return AudioData(b"".join(chunks), rate, width), timing
+
+    def _kept_frames(self, speech, frame_samples, rate):
+        """Get the frame ranges to keep.
+
+        Args:
+            speech (np.ndarray): True for the frames with speech
+            frame_samples (int): samples per frame
+            rate (int): sample rate
+
+        Returns:
+            list: (start, end) frame index ranges, end exclusive
+        """
+        pad = int(np.ceil(self.padding * rate / frame_samples))
+        # Keep the frames within the padding of a speech frame
+        window = np.ones(2 * pad + 1, dtype=np.int32)
+        keep = np.convolve(speech.astype(np.int32), window)[pad:pad + len(speech)] > 0
+
+        if not self.compact:
+            indices = np.flatnonzero(keep)
+            return [(int(indices[0]), int(indices[-1]) + 1)]
+
+        changes = np.flatnonzero(np.diff(keep.astype(np.int8)))
+        edges = np.concatenate(([0], changes + 1, [len(keep)]))
+        return [
+            (int(start), int(end))
+            for start, end in zip(edges[:-1], edges[1:])
+            if keep[start]
+        ]
@@ -15,7 +15,6 @@ from source.client.text.text_client import (
     start_mic_monitor,
 )
 from source.configuration import Configuration
-from source.util import get_ipc_directory
 
 sys.stdout = io.StringIO()
 sys.stderr = io.StringIO()
@@ -45,8 +44,8 @@ def main():
         start_log_monitor("/var/log/core/web.log")
         # start_log_monitor("/var/log/core/audio.log")
 
-    # Monitor IPC file containing microphone level info
-    start_mic_monitor(os.path.join(get_ipc_directory(), "mic_level"))
+    # Monitor the microphone level published by the listener
+    start_mic_monitor()
 
     connect_to_core()
     if "--simple" in sys.argv:
@@ -13,6 +13,7 @@ from threading import Lock, Thread
 import xdg.BaseDirectory
 
 import source.version
+from source.client.listener.telemetry import MicLevelPage
 from source.configuration import Configuration
 from source.messagebus.client import MessageBusClient
 from source.messagebus.message import Message
@@ -305,40 +306,27 @@ def start_log_monitor(filename):
 
 
 class MicMonitorThread(Thread):
-    def __init__(self, filename):
+    def __init__(self, page):
         Thread.__init__(self)
-        self.filename = filename
-        self.st_results = None
+        self.page = page
+        self.sequence = None
 
     def run(self):
         while True:
-            try:
-                st_results = os.stat(self.filename)
-
-                if (
-                    not self.st_results
-                    or not st_results.st_ctime == self.st_results.st_ctime
-                    or not st_results.st_mtime == self.st_results.st_mtime
-                ):
-                    self.read_mic_level()
-                    self.st_results = st_results
-                    set_screen_dirty()
-            except Exception:
-                # Ignore whatever failure happened and just try again later
-                pass
+            level = self.page.read()
+            if level and level.sequence != self.sequence:
+                self.sequence = level.sequence
+                self.show_mic_level(level)
+                set_screen_dirty()
             time.sleep(0.2)
 
-    def read_mic_level(self):
+    def show_mic_level(self, level):
         global meter_cur
         global meter_thresh
 
-        with io.open(self.filename, "r") as fh:
-            line = fh.readline()
-            # Just adjust meter settings
-            # Ex:Energy:  cur=4 thresh=1.5 muted=0
-            cur_text, thresh_text, _ = line.split(" ")[-3:]
-            meter_thresh = float(thresh_text.split("=")[-1])
-            meter_cur = float(cur_text.split("=")[-1])
+        # Just adjust meter settings
+        meter_thresh = level.threshold
+        meter_cur = level.energy
 
 
 class ScreenDrawThread(Thread):
@@ -369,11 +357,10 @@ class ScreenDrawThread(Thread):
                 time.sleep(0.01)
 
 
-def start_mic_monitor(filename):
-    if os.path.isfile(filename):
-        thread = MicMonitorThread(filename)
-        thread.setDaemon(True)  # this thread won't prevent prog from exiting
-        thread.start()
+def start_mic_monitor(path=None):
+    thread = MicMonitorThread(MicLevelPage(path))
+    thread.setDaemon(True)  # this thread won't prevent prog from exiting
+    thread.start()
 
 
 def add_log_message(message):
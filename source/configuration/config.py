@@ -1,11 +1,14 @@
 import json
 import os
+from collections import namedtuple
+from copy import deepcopy
 from os.path import dirname, exists, isfile, join
+from threading import RLock
 
 import xdg.BaseDirectory
 
 from source.util.combo_lock import ComboLock
-from source.util.file_utils import get_temp_path
+from source.util.file_utils import FileWatcher, get_temp_path
 from source.util.json_helper import load_commented_json, merge_dict
 from source.util.log import LOG
 
@@ -117,11 +120,30 @@ class LocalConf(dict):
 #             self.load_local(self.path)
 
 
+ConfigSnapshot = namedtuple("ConfigSnapshot", ["generation", "config"])
+
+
+def _config_file_paths():
+    """List the configuration files making up the default config stack."""
+    paths = [join(d, "core.conf") for d in xdg.BaseDirectory.load_config_paths("core")]
+    return paths + [SYSTEM_CONFIG, DEFAULT_CONFIG]
+
+
 class Configuration:
-    """Namespace for operations on the configuration singleton."""
+    """Namespace for operations on the configuration singleton.
+
+    The merged configuration is kept as a snapshot tagged with a generation
+    number. A snapshot is never modified once published, a reload builds a
+    new dict and swaps it in, bumping the generation. Readers can hold on to
+    the generation and compare it with Configuration.generation() to cheaply
+    detect that the configuration has changed.
+    """
 
     __config = {}  # Cached config
+    __generation = 0  # Incremented every time a new snapshot is published
     __patch = {}  # Patch config that skills can update to override config
+    __lock = RLock()
+    __watcher = None  # FileWatcher invalidating the cache on file changes
 
     @staticmethod
     def get(configs=None, cache=True, remote=True):
@@ -130,6 +152,9 @@ class Configuration:
         Returns cached instance if available otherwise builds a new
         configuration dict.
 
+        The returned dict is shared between all callers and must be treated
+        as read-only.
+
         Args:
             configs (list): List of configuration dicts
             cache (boolean): True if the result should be cached
@@ -143,6 +168,29 @@ class Configuration:
         else:
             return Configuration.load_config_stack(configs, cache, remote)
 
+    @staticmethod
+    def generation():
+        """Get the generation of the current configuration snapshot.
+
+        The number increases monotonically every time the cached configuration
+        is replaced, it is 0 if nothing has been cached yet.
+
+        Returns:
+            (int) generation number
+        """
+        return Configuration.__generation
+
+    @staticmethod
+    def snapshot():
+        """Get the current configuration together with its generation.
+
+        Returns:
+            (ConfigSnapshot) tuple of generation number and config dict
+        """
+        with Configuration.__lock:
+            config = Configuration.get()
+            return ConfigSnapshot(Configuration.__generation, config)
+
     @staticmethod
     def load_config_stack(configs=None, cache=False, remote=True):
         """Load a stack of config dicts into a single dict
@@ -155,50 +203,90 @@ class Configuration:
         Returns:
             (dict) merged dict of all configuration files
         """
-        if not configs:
-            configs = []
-
-            # First use the patched config
-            configs.append(Configuration.__patch)
+        # The stack is read, merged and published under the lock, so a
+        # concurrent patch can't change it meanwhile and reloads publish in
+        # the order of their generations
+        with Configuration.__lock:
+            if not configs:
+                configs = []
+
+                # First use the patched config, copied so that later patches
+                # don't leak into an already published snapshot
+                configs.append(deepcopy(Configuration.__patch))
+
+                # Then use XDG config
+                # This includes both the user config and
+                # /etc/xdg/core/core.conf
+                for conf_dir in xdg.BaseDirectory.load_config_paths("core"):
+                    configs.append(LocalConf(join(conf_dir, "core.conf")))
+
+                # Then use the system config (/etc/core/core.conf)
+                configs.append(LocalConf(SYSTEM_CONFIG))
+
+                # Then use remote config
+                # if remote:
+                #     configs.append(RemoteConf())
+
+                # Then use the config that comes with the package
+                configs.append(LocalConf(DEFAULT_CONFIG))
+
+                # Make sure we reverse the array, as merge_dict will put every
+                # new file on top of the previous one
+                configs = reversed(configs)
+            else:
+                # Handle strings in stack
+                for index, item in enumerate(configs):
+                    if isinstance(item, str):
+                        configs[index] = LocalConf(item)
+
+            # Merge all configs into one
+            base = {}
+            for c in configs:
+                merge_dict(base, c)
+
+            if cache:
+                Configuration._publish(base)
+        if cache:
+            Configuration._watch_config_files()
+        return base
 
-            # Then use XDG config
-            # This includes both the user config and
-            # /etc/xdg/core/core.conf
-            for conf_dir in xdg.BaseDirectory.load_config_paths("core"):
-                configs.append(LocalConf(join(conf_dir, "core.conf")))
+    @staticmethod
+    def _publish(config):
+        """Replace the cached snapshot and bump the generation.
 
-            # Then use the system config (/etc/core/core.conf)
-            configs.append(LocalConf(SYSTEM_CONFIG))
+        Args:
+            config (dict): newly merged configuration
+        """
+        with Configuration.__lock:
+            Configuration.__config = config
+            Configuration.__generation += 1
 
-            # Then use remote config
-            # if remote:
-            #     configs.append(RemoteConf())
+    @staticmethod
+    def _watch_config_files():
+        """Start monitoring the config files, invalidating cache on change."""
+        with Configuration.__lock:
+            if Configuration.__watcher is not None:
+                return
+            paths = [p for p in _config_file_paths() if isfile(p)]
+            if not paths:
+                return
+            try:
+                Configuration.__watcher = FileWatcher(
+                    paths, callback=Configuration._on_file_change
+                )
+            except Exception as e:
+                LOG.warning("Could not watch configuration files: " + repr(e))
 
-            # Then use the config that comes with the package
-            configs.append(LocalConf(DEFAULT_CONFIG))
+    @staticmethod
+    def _on_file_change(path):
+        """FileWatcher callback reloading the config if a config file changed.
 
-            # Make sure we reverse the array, as merge_dict will put every new
-            # file on top of the previous one
-            configs = reversed(configs)
-        else:
-            # Handle strings in stack
-            for index, item in enumerate(configs):
-                if isinstance(item, str):
-                    configs[index] = LocalConf(item)
-
-        # Merge all configs into one
-        base = {}
-        for c in configs:
-            merge_dict(base, c)
-
-        # copy into cache
-        # if cache:
-        #     Configuration.__config.clear()
-        #     for key in base:
-        #         Configuration.__config[key] = base[key]
-        #     return Configuration.__config
-        # else:
-        return base
+        Args:
+            path (str): path of the modified file
+        """
+        if path in _config_file_paths():
+            LOG.info("Configuration file {} changed, reloading".format(path))
+            Configuration.load_config_stack(cache=True)
 
     @staticmethod
     def set_config_update_handlers(bus):
@@ -228,7 +316,8 @@ class Configuration:
                      in the data payload.
         """
         config = message.data.get("config", {})
-        merge_dict(Configuration.__patch, config)
+        with Configuration.__lock:
+            merge_dict(Configuration.__patch, config)
         Configuration.load_config_stack(cache=True)
 
     @staticmethod
@@ -239,5 +328,6 @@ class Configuration:
             message: Messagebus message should contain a config
                      in the data payload.
         """
-        Configuration.__patch = {}
+        with Configuration.__lock:
+            Configuration.__patch = {}
         Configuration.load_config_stack(cache=True)
@@ -1,12 +1,16 @@
 """Event scheduler system for calling skill (and other) methods at a specific
 times.
 """
+import heapq
 import json
+import os
 import shutil
 import time
 from datetime import datetime, timedelta
+from itertools import count
 from os.path import expanduser, isfile, join
-from threading import Lock, Thread
+from threading import Condition, Lock, Thread
+from uuid import uuid4
 
 import xdg.BaseDirectory
 
@@ -16,6 +20,11 @@ from source.util.log import LOG
 
 from .skill.event_container import EventContainer, create_basic_wrapper
 
+# Number of journaled changes before the journal is merged into the schedule
+JOURNAL_COMPACT_SIZE = 1000
+# Longest time to wait without checking the schedule, in seconds
+MAX_WAIT = 60
+
 
 def repeat_time(sched_time, repeat):
     """Next scheduled time for repeating event. Guarantees that the
@@ -34,20 +43,65 @@ def repeat_time(sched_time, repeat):
     return next_time
 
 
+class _ScheduledEvent:
+    """A pending trigger of an event, ordered by time in the schedule queue.
+
+    Removed events stay in the queue until they reach the front or the
+    queue is compacted, only their removed flag is set. The id identifies
+    the event in the schedule file and the journal.
+    """
+
+    __slots__ = ('time', 'seq', 'name', 'repeat', 'data', 'context', 'id',
+                 'removed')
+
+    def __init__(self, sched_time, seq, name, repeat, data, context,
+                 event_id):
+        self.time = sched_time
+        self.seq = seq
+        self.name = name
+        self.repeat = repeat
+        self.data = data
+        self.context = context
+        self.id = event_id
+        self.removed = False
+
+    def __lt__(self, other):
+        return (self.time, self.seq) < (other.time, other.seq)
+
+    def as_tuple(self):
+        return (self.time, self.repeat, self.data, self.context)
+
+    def as_record(self):
+        """Entry of the event in the schedule file."""
+        return self.as_tuple() + (self.id,)
+
+
 class EventScheduler(Thread):
     """Create an event scheduler thread. Will send messages at a
      predetermined time to the registered targets.
 
+    Pending events are kept in a priority queue ordered by time. The thread
+    sleeps until the first event is due and is woken up when an earlier
+    event is scheduled. Changes to the schedule are appended to a journal
+    next to the schedule file, which is compacted into the schedule file
+    periodically and on shutdown, so pending events survive a crash.
+
     Args:
         bus:            messagebus (core.messagebus)
-        schedule_file:  File to store pending events to on shutdown
+        schedule_file:  File to store pending events to
     """
 
     def __init__(self, bus, schedule_file='schedule.json'):
         super().__init__()
 
-        self.events = {}
+        self._queue = []  # heap of _ScheduledEvent
+        self._events = {}  # event name -> list of _ScheduledEvent
+        self._removed = 0  # removed events still in the queue
+        self._seq = count()
         self.event_lock = Lock()
+        self._wakeup = Condition(self.event_lock)
+        self._journal = None
+        self._journal_entries = 0
 
         self.bus = bus
         self.is_running = True
@@ -59,6 +113,7 @@ class EventScheduler(Thread):
         if isfile(old_schedule_path):
             shutil.move(old_schedule_path, new_schedule_path)
         self.schedule_file = new_schedule_path
+        self.journal_file = self.schedule_file + '.journal'
         if self.schedule_file:
             self.load()
 
@@ -72,54 +127,199 @@ class EventScheduler(Thread):
                     self.get_event_handler)
         self.start()
 
+    @property
+    def events(self):
+        """dict: event names mapped to lists of pending
+        (time, repeat, data, context) tuples."""
+        with self.event_lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        return {name: [e.as_tuple() for e in entries]
+                for name, entries in self._events.items()}
+
     def load(self):
-        """Load json data with active events from json file."""
+        """Load active events from the schedule file and the journal."""
+        json_data = {}
         if isfile(self.schedule_file):
-            json_data = {}
             with open(self.schedule_file) as f:
                 try:
                     json_data = json.load(f)
                 except Exception as e:
                     LOG.error(e)
+
+        with self.event_lock:
+            self._events = {}
+            for key in json_data:
+                for e in json_data[key]:
+                    self._add_entry(key, *e)
+            journaled = isfile(self.journal_file)
+            if journaled:
+                self._replay_journal()
+
+            # discard events that has already happened. Repeating events
+            # are dropped on shutdown, the schedule only holds them if it
+            # was compacted while running, so drop them here as well.
             current_time = time.time()
-            with self.event_lock:
-                for key in json_data:
-                    event_list = json_data[key]
-                    # discard non repeating events that has already happened
-                    self.events[key] = [tuple(e) for e in event_list
-                                        if e[0] > current_time or e[1]]
+            for key in list(self._events):
+                entries = [e for e in self._events[key]
+                           if e.time > current_time and not e.repeat]
+                if entries:
+                    self._events[key] = entries
+                else:
+                    del self._events[key]
+            self._rebuild_queue()
+
+            if journaled:
+                # Start over with the recovered schedule
+                self._write_schedule()
+
+    def _replay_journal(self):
+        """Apply the changes recorded in the journal to the events."""
+        with open(self.journal_file) as f:
+            for line in f:
+                try:
+                    change = json.loads(line)
+                    name = change['event']
+                    entries = self._events.get(name, [])
+                    if change['op'] == 'add':
+                        # The journal may outlive an interrupted compaction,
+                        # don't add the same event twice
+                        if not any(e.id == change['id'] for e in entries):
+                            self._add_entry(name, change['time'],
+                                            change['repeat'], change['data'],
+                                            change['context'], change['id'])
+                    elif change['op'] == 'remove':
+                        self._events.pop(name, None)
+                    elif change['op'] == 'update' and entries:
+                        entries[0].data = change['data']
+                    elif change['op'] == 'fire':
+                        for entry in entries:
+                            if entry.id == change['id']:
+                                self._fired(entry, change['next'])
+                                break
+                except (ValueError, KeyError, TypeError):
+                    # Partially written line from a crash
+                    LOG.warning('Skipping invalid schedule journal entry')
+
+    def _add_entry(self, name, sched_time, repeat, data, context,
+                   event_id=None):
+        """Add an event to the events without touching the queue."""
+        entry = _ScheduledEvent(sched_time, next(self._seq), name, repeat,
+                                data, context, event_id or uuid4().hex)
+        self._events.setdefault(name, []).append(entry)
+        return entry
+
+    def _rebuild_queue(self):
+        """Rebuild the queue from the events, dropping removed entries."""
+        self._queue = [e for entries in self._events.values()
+                       for e in entries]
+        heapq.heapify(self._queue)
+        self._removed = 0
+
+    def _remove_entries(self, entries):
+        for entry in entries:
+            entry.removed = True
+        self._removed += len(entries)
+        # Compact the queue once removed events make up most of it
+        if self._removed > len(self._queue) // 2:
+            self._rebuild_queue()
+
+    def _fired(self, entry, next_time):
+        """Reschedule a repeating event or drop it after it triggered.
+
+        The entry must not be in the queue, or be at its front.
+        """
+        if next_time is None:
+            entries = self._events[entry.name]
+            entries.remove(entry)
+            if not entries:
+                del self._events[entry.name]
+        else:
+            entry.time = next_time
+            entry.seq = next(self._seq)
+
+    def _journal_change(self, op, event, **change):
+        """Append a change of the schedule to the journal.
+
+        Must be called with the event lock held.
+        """
+        if not self.schedule_file:
+            return
+        change.update(op=op, event=event)
+        try:
+            if self._journal is None:
+                self._journal = open(self.journal_file, 'a')
+            self._journal.write(json.dumps(change) + '\n')
+            self._journal.flush()
+        except (OSError, TypeError, ValueError):
+            LOG.exception('Failed to journal scheduled event change')
+            return
+
+        self._journal_entries += 1
+        if self._journal_entries >= JOURNAL_COMPACT_SIZE:
+            self._write_schedule()
+
+    def _write_schedule(self):
+        """Replace the schedule file with the current events and start a
+        new journal.
+
+        Must be called with the event lock held.
+        """
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        try:
+            tmp_file = self.schedule_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump({name: [e.as_record() for e in entries]
+                           for name, entries in self._events.items()}, f)
+            os.replace(tmp_file, self.schedule_file)
+            if isfile(self.journal_file):
+                os.remove(self.journal_file)
+            self._journal_entries = 0
+        except OSError:
+            LOG.exception('Failed to store the event schedule')
 
     def run(self):
         while self.is_running:
             self.check_state()
-            time.sleep(0.5)
+            with self._wakeup:
+                if not self.is_running:
+                    break
+                # Recheck regularly to follow changes of the system clock
+                timeout = MAX_WAIT
+                if self._queue:
+                    timeout = min(self._queue[0].time - time.time(), MAX_WAIT)
+                if timeout > 0:
+                    self._wakeup.wait(timeout)
 
     def check_state(self):
-        """Check if an event should be triggered."""
+        """Trigger the events that are due."""
+        pending_messages = []
         with self.event_lock:
-            # Check all events
-            pending_messages = []
-            for event in self.events:
-                current_time = time.time()
-                e = self.events[event]
-                # Get scheduled times that has passed
-                passed = [(t, r, d, c) for
-                          (t, r, d, c) in e if t <= current_time]
-                # and remaining times that we're still waiting for
-                remaining = [(t, r, d, c) for
-                             t, r, d, c in e if t > current_time]
-                # Trigger registered methods
-                for sched_time, repeat, data, context in passed:
-                    pending_messages.append(Message(event, data, context))
-                    # if this is a repeated event add a new trigger time
-                    if repeat:
-                        next_time = repeat_time(sched_time, repeat)
-                        remaining.append((next_time, repeat, data, context))
-                # update list of events
-                self.events[event] = remaining
-
-        # Remove events have are now completed
-        self.clear_empty()
+            current_time = time.time()
+            while self._queue and self._queue[0].time <= current_time:
+                entry = self._queue[0]
+                if entry.removed:
+                    heapq.heappop(self._queue)
+                    self._removed -= 1
+                    continue
+
+                pending_messages.append(
+                    Message(entry.name, entry.data, entry.context))
+                sched_time = entry.time
+                # if this is a repeated event add a new trigger time
+                next_time = None
+                if entry.repeat:
+                    next_time = repeat_time(sched_time, entry.repeat)
+                self._fired(entry, next_time)
+                if next_time is None:
+                    heapq.heappop(self._queue)
+                else:
+                    heapq.heapreplace(self._queue, entry)
+                self._journal_change('fire', entry.name, id=entry.id,
+                                     next=next_time)
 
         # Finally, emit the queued up events that triggered
         for msg in pending_messages:
@@ -140,17 +340,22 @@ class EventScheduler(Thread):
         """
         data = data or {}
         with self.event_lock:
-            # get current list of scheduled times for event, [] if missing
-            event_list = self.events.get(event, [])
-
             # Don't schedule if the event is repeating and already scheduled
-            if repeat and event in self.events:
+            if repeat and event in self._events:
                 LOG.debug('Repeating event {} is already scheduled, discarding'
                           .format(event))
             else:
                 # add received event and time
-                event_list.append((sched_time, repeat, data, context))
-                self.events[event] = event_list
+                entry = self._add_entry(event, sched_time, repeat, data,
+                                        context)
+                heapq.heappush(self._queue, entry)
+                self._journal_change('add', event, id=entry.id,
+                                     time=sched_time,
+                                     repeat=repeat, data=data,
+                                     context=context)
+                if self._queue[0] is entry:
+                    # Due before everything else, adjust the wakeup time
+                    self._wakeup.notify()
 
     def schedule_event_handler(self, message):
         """Messagebus interface to the schedule_event method.
@@ -181,8 +386,9 @@ class EventScheduler(Thread):
             event (str): event identifier
         """
         with self.event_lock:
-            if event in self.events:
-                self.events.pop(event)
+            if event in self._events:
+                self._remove_entries(self._events.pop(event))
+                self._journal_change('remove', event)
 
     def remove_event_handler(self, message):
         """Messagebus interface to the remove_event method."""
@@ -201,9 +407,9 @@ class EventScheduler(Thread):
         """
         with self.event_lock:
             # if there is an active event with this name
-            if len(self.events.get(event, [])) > 0:
-                time, repeat, _, context = self.events[event][0]
-                self.events[event][0] = (time, repeat, data, context)
+            if self._events.get(event):
+                self._events[event][0].data = data
+                self._journal_change('update', event, data=data)
 
     def update_event_handler(self, message):
         """Messagebus interface to the update_event method."""
@@ -219,32 +425,37 @@ class EventScheduler(Thread):
         event_name = message.data.get("name")
         event = None
         with self.event_lock:
-            if event_name in self.events:
-                event = self.events[event_name]
+            if event_name in self._events:
+                event = [e.as_tuple() for e in self._events[event_name]]
         emitter_name = 'core.event_status.callback.{}'.format(event_name)
         self.bus.emit(message.reply(emitter_name, data=event))
 
     def store(self):
         """Write current schedule to disk."""
         with self.event_lock:
-            with open(self.schedule_file, 'w') as f:
-                json.dump(self.events, f)
+            self._write_schedule()
 
     def clear_repeating(self):
         """Remove repeating events from events dict."""
         with self.event_lock:
-            for e in self.events:
-                self.events[e] = [i for i in self.events[e] if i[1] is None]
+            for e in self._events:
+                repeating = [i for i in self._events[e] if i.repeat]
+                if repeating:
+                    self._events[e] = [i for i in self._events[e]
+                                       if not i.repeat]
+                    self._remove_entries(repeating)
 
     def clear_empty(self):
         """Remove empty event entries from events dict."""
         with self.event_lock:
-            self.events = {k: self.events[k] for k in self.events
-                           if self.events[k] != []}
+            self._events = {k: self._events[k] for k in self._events
+                            if self._events[k] != []}
 
     def shutdown(self):
         """Stop the running thread."""
-        self.is_running = False
+        with self._wakeup:
+            self.is_running = False
+            self._wakeup.notify()
         # Remove listeners
         self.bus.remove_all_listeners('core.scheduler.schedule_event')
         self.bus.remove_all_listeners('core.scheduler.remove_event')
@@ -69,6 +69,23 @@ def _bad_mod_times(mod_times):
     return [path for path in mod_times if mod_times[path] > current_time]
 
 
+def is_ignored_file(file_name):
+    """Check if changes to a file don't require reloading the skill.
+
+    Args:
+        file_name (str): name of the file, without directory
+
+    Returns:
+        bool: True for compiled files, hidden files and the settings
+    """
+    return (
+        file_name.endswith(".pyc")
+        or file_name == "settings.json"
+        or file_name.startswith(".")
+        or file_name.endswith(".qmlc")
+    )
+
+
 def _get_last_modified_time(path):
     """Get the last modified date of the most recently updated file in a path.
 
@@ -85,13 +102,7 @@ def _get_last_modified_time(path):
     for root_dir, dirs, files in os.walk(path):
         dirs[:] = [d for d in dirs if not d.startswith(".")]
         for f in files:
-            ignore_file = (
-                f.endswith(".pyc")
-                or f == "settings.json"
-                or f.startswith(".")
-                or f.endswith(".qmlc")
-            )
-            if not ignore_file:
+            if not is_ignored_file(f):
                 all_files.append(os.path.join(root_dir, f))
 
     # check files of interest in the skill root directory
@@ -130,14 +141,22 @@ class SkillLoader:
         else:
             return False
 
-    def reload_needed(self):
+    def reload_needed(self, last_modified=None):
         """Load an unloaded skill or reload unloaded/changed skill.
 
+        Args:
+            last_modified (float): time of the latest change when already
+                known, e.g. from a file system event. If None the skill
+                directory is scanned.
+
         Returns:
              bool: if the skill was loaded/reloaded
         """
         try:
-            self.last_modified = _get_last_modified_time(self.skill_directory)
+            if last_modified is not None:
+                self.last_modified = last_modified
+            else:
+                self.last_modified = _get_last_modified_time(self.skill_directory)
         except OSError as err:
             self.last_modified = self.last_loaded
             if not self.modtime_error_log_written:
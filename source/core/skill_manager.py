@@ -17,7 +17,7 @@ import os
 from glob import glob
 from inspect import signature
 from threading import Event, Lock, Thread
-from time import monotonic, sleep
+from time import monotonic, sleep, time
 
 from source import Message
 from source.configuration import Configuration
@@ -26,9 +26,11 @@ from source.messagebus.client import MessageBusClient
 from source.util.file_utils import FileWatcher
 from source.util.log import LOG
 
-from .skill_loader import SkillLoader
+from .skill_loader import SkillLoader, is_ignored_file
 
 SKILL_MAIN_MODULE = "__init__.py"
+# Seconds between skill directory scans when changes can't be watched
+SKILL_SCAN_INTERVAL = 2
 
 
 class UploadQueue:
@@ -123,6 +125,7 @@ class SkillManager(Thread):
         super(SkillManager, self).__init__()
         self.bus = bus
         self._settings_watchdog = None
+        self._skill_watchdog = None
         # Set watchdog to argument or function returning None
         self._watchdog = watchdog or (lambda: None)
 
@@ -146,6 +149,13 @@ class SkillManager(Thread):
         self.num_install_retries = 0
         self.empty_skill_dirs = set()  # Save a record of empty skill dirs.
 
+        # Skill directories with changes on disk, mapped to the monotonic
+        # time of the last change event and the time of the last change
+        self._changed_skills = {}
+        self._changed_skills_lock = Lock()
+        self._skills_changed = Event()
+        self._reload_debounce = self.config["skills"].get("reload_debounce", 0.05)
+
         self._define_message_bus_events()
         self.daemon = True
 
@@ -171,6 +181,56 @@ class SkillManager(Thread):
                 Message("core.skills.settings_changed", {"skill_id": skill_id})
             )
 
+    def _init_skill_watcher(self):
+        """Watch the skills directory for installed, changed or removed skills.
+
+        Falls back to periodically scanning the directory if it can't be
+        watched.
+        """
+        try:
+            os.makedirs(self.skills_dir_path, exist_ok=True)
+            self._skill_watchdog = FileWatcher(
+                [self.skills_dir_path],
+                callback=self._handle_skill_file_change,
+                recursive=True,
+                track_tree=True,
+            )
+        except Exception:
+            LOG.exception(
+                f"Can't watch {self.skills_dir_path}, scanning for changes "
+                f"every {SKILL_SCAN_INTERVAL} seconds"
+            )
+            self._skill_watchdog = None
+
+    def _handle_skill_file_change(self, path: str):
+        """Record a change in a skill directory for a later update.
+
+        Changes usually come in bursts (git pull, copying a skill, an editor
+        saving a file), the skill is updated once no change was seen for the
+        debounce time.
+        """
+        relative = os.path.relpath(path, self.skills_dir_path)
+        parts = relative.split(os.sep)
+        if parts[0] in (os.curdir, os.pardir) or is_ignored_file(parts[-1]):
+            return
+        if any(p.startswith(".") or p == "__pycache__" for p in parts[:-1]):
+            return
+
+        try:
+            # like the skill directory scan, use the time of the change
+            # itself so files written by the skill while loading are ignored
+            modified = min(os.path.getmtime(path), time())
+        except OSError:
+            modified = time()  # removed
+        skill_dir = os.path.join(self.skills_dir_path, parts[0])
+        with self._changed_skills_lock:
+            _, last_modified = self._changed_skills.get(skill_dir, (0, 0))
+            self._changed_skills[skill_dir] = (
+                monotonic(),
+                max(modified, last_modified),
+            )
+        self._skills_changed.set()
+
     def _define_message_bus_events(self):
         """Define message bus events with handlers defined in this class."""
         # Update upon request
@@ -251,6 +311,8 @@ class SkillManager(Thread):
         """Load skills and update periodically from disk and internet."""
         self._remove_git_locks()
         LOG.debug("removed git locks")
+        # start watching before loading to not miss changes made meanwhile
+        self._init_skill_watcher()
         # self.load_priority()
         self._load_on_startup()
 
@@ -262,15 +324,20 @@ class SkillManager(Thread):
         if not self._connected_event.is_set():
             LOG.info("Offline Skills loaded, waiting for Internet to load more!")
 
-        # Scan the file folder that contains Skills.  If a Skill is updated,
-        # unload the existing version from memory and reload from the disk.
+        # Wait for changes in the folder that contains Skills.  If a Skill is
+        # updated, unload the existing version from memory and reload from
+        # the disk.
         while not self._stop_event.is_set():
             try:
-                self._unload_removed_skills()
-                self._reload_modified_skills()
-                self._load_new_skills()
+                if self._skill_watchdog is None:
+                    self._unload_removed_skills()
+                    self._reload_modified_skills()
+                    self._load_new_skills()
+                    timeout = SKILL_SCAN_INTERVAL
+                else:
+                    timeout = self._update_changed_skills()
                 self._watchdog()
-                sleep(2)  # Pause briefly before beginning next scan
+                self._skills_changed.wait(timeout or SKILL_SCAN_INTERVAL)
             except Exception:
                 LOG.exception(
                     "Something really unexpected has occurred "
@@ -308,6 +375,55 @@ class SkillManager(Thread):
                     "reloading {}".format(skill_dir)
                 )
 
+    def _update_changed_skills(self):
+        """Update skills whose changes settled for the debounce time.
+
+        Returns:
+            float: seconds until the next pending skill is due, None if no
+                   skill changes are pending
+        """
+        now = monotonic()
+        due = {}
+        next_due = None
+        with self._changed_skills_lock:
+            self._skills_changed.clear()
+            for skill_dir, (changed, modified) in list(self._changed_skills.items()):
+                remaining = changed + self._reload_debounce - now
+                if remaining <= 0:
+                    due[skill_dir] = modified
+                    del self._changed_skills[skill_dir]
+                elif next_due is None or remaining < next_due:
+                    next_due = remaining
+
+        for skill_dir, modified in due.items():
+            try:
+                self._update_skill(skill_dir, modified)
+            except Exception:
+                LOG.exception(
+                    "Unhandled exception occured while "
+                    "updating {}".format(skill_dir)
+                )
+        return next_due
+
+    def _update_skill(self, skill_dir, last_modified):
+        """Load, reload or unload a single skill after changes on disk.
+
+        Args:
+            skill_dir (str): skill directory
+            last_modified (float): time of the latest change
+        """
+        skill_loader = self.skill_loaders.get(skill_dir)
+        if not os.path.isfile(os.path.join(skill_dir, SKILL_MAIN_MODULE)):
+            self._unload_skill(skill_dir)
+        elif skill_loader is None:
+            loader = self._load_skill(skill_dir)
+            if loader:
+                self.upload_queue.put(loader)
+        elif skill_loader.reload_needed(last_modified):
+            # If reload succeed add settingsmeta to upload queue
+            if skill_loader.reload():
+                self.upload_queue.put(skill_loader)
+
     def _load_new_skills(self):
         """Handle load of skills installed since startup."""
         for skill_dir in self._get_skill_directories():
@@ -442,6 +558,7 @@ class SkillManager(Thread):
         """Tell the manager to shutdown."""
         # self.status.set_stopping()
         self._stop_event.set()
+        self._skills_changed.set()
 
         # Do a clean shutdown of all skills
         for skill_loader in self.skill_loaders.values():
@@ -450,6 +567,8 @@ class SkillManager(Thread):
 
         if self._settings_watchdog:
             self._settings_watchdog.shutdown()
+        if self._skill_watchdog:
+            self._skill_watchdog.shutdown()
 
     def handle_converse_request(self, message):
         """Check if the targeted skill id can handle conversation
@@ -2,7 +2,8 @@
 
 import time
 from collections import namedtuple
-from copy import copy
+from threading import Condition
+from uuid import uuid4
 
 from langchain.memory import ChatMessageHistory
 
@@ -15,7 +16,7 @@ from source.messagebus.message import Message
 from source.util.intent_service_interface import (IntentQueryApi,
                                                   open_intent_envelope)
 from source.util.log import LOG
-from source.util.metrics import Stopwatch
+from source.util.metrics import Stopwatch, get_metrics, histogram
 
 from .adapt_service import AdaptIntent, AdaptService  # noqa: F401
 from .fallback_service import FallbackService
@@ -116,12 +117,14 @@ class IntentService:
         # HACK: set to 0.5 for qa to not loop for a long time and let padatious handle
         # intent
         self.converse_timeout = 10  # minutes to prune active_skills
+        self.converse_deadline = 3  # seconds to wait for converse responses
 
         # Intents API
         self.registered_vocab = []
         self.bus.on("intent.service.intent.get", self.handle_get_intent)
         self.bus.on("intent.service.skills.get", self.handle_get_skills)
         self.bus.on("intent.service.active_skills.get", self.handle_get_active_skills)
+        self.bus.on("intent.service.metrics.get", self.handle_get_metrics)
         self.bus.on("intent.service.adapt.get", self.handle_get_adapt)
         self.bus.on("intent.service.adapt.manifest.get", self.handle_adapt_manifest)
         self.bus.on(
@@ -172,32 +175,91 @@ class IntentService:
         """Let skills know there was a problem with speech recognition"""
         lang = _get_message_lang(message)
         set_default_lf_lang(lang)
-        for skill in copy(self.active_skills):
-            self.do_converse(None, skill[0], lang, message)
+        skill_ids = [skill[0] for skill in self.active_skills]
+        self.converse_all(None, skill_ids, lang, message)
 
-    def do_converse(self, utterances, skill_id, lang, message):
-        """Call skill and ask if they want to process the utterance.
+    def converse_all(self, utterances, skill_ids, lang, message):
+        """Ask several skills at once if they want to process the utterance.
+
+        The converse requests are sent to all skills without waiting for
+        replies in between, the responses are then collected until the
+        converse_deadline. The first skill in skill_ids that accepted the
+        utterance wins, the decision is made as soon as all skills before it
+        have answered. Skills not answering before the deadline are skipped.
 
         Args:
             utterances (list of tuples): utterances paired with normalized
                                          versions.
-            skill_id: skill to query.
+            skill_ids (list): skills to query in order of priority
             lang (str): current language
             message (Message): message containing interaction info.
+
+        Returns:
+            str: id of the skill handling the utterance or None
         """
-        converse_msg = message.reply(
-            "skill.converse.request",
-            {"skill_id": skill_id, "utterances": utterances, "lang": lang},
-        )
-        result = self.bus.wait_for_response(converse_msg, "skill.converse.response")
-        if result and "error" in result.data:
-            self.handle_converse_error(result)
-            ret = False
-        elif result is not None:
-            ret = result.data.get("result", False)
-        else:
-            ret = False
-        return ret
+        if not skill_ids:
+            return None
+
+        converse_id = str(uuid4())
+        responses = {}
+        received = Condition()
+
+        def handle_response(response):
+            if response.context.get("converse_id") == converse_id:
+                with received:
+                    responses[response.data.get("skill_id")] = response
+                    received.notify()
+
+        self.bus.on("skill.converse.response", handle_response)
+        try:
+            for skill_id in skill_ids:
+                converse_msg = message.reply(
+                    "skill.converse.request",
+                    {"skill_id": skill_id, "utterances": utterances, "lang": lang},
+                )
+                converse_msg.context["converse_id"] = converse_id
+                self.bus.emit(converse_msg)
+
+            deadline = time.monotonic() + self.converse_deadline
+            with received:
+                while True:
+                    winner, pending = self._converse_winner(skill_ids, responses)
+                    remaining = deadline - time.monotonic()
+                    if winner or not pending or remaining <= 0:
+                        break
+                    received.wait(remaining)
+                responses = dict(responses)
+        finally:
+            self.bus.remove("skill.converse.response", handle_response)
+
+        if not winner:
+            # Deadline passed, skip the skills that didn't answer in time
+            answered = [s for s in skill_ids if s in responses]
+            winner, _ = self._converse_winner(answered, responses)
+        for response in responses.values():
+            if "error" in response.data:
+                self.handle_converse_error(response)
+        return winner
+
+    @staticmethod
+    def _converse_winner(skill_ids, responses):
+        """Pick the skill handling the utterance from converse responses.
+
+        Args:
+            skill_ids (list): skills in order of priority
+            responses (dict): converse responses received so far by skill id
+
+        Returns:
+            tuple: (id of the winning skill or None,
+                    True if the result depends on missing responses)
+        """
+        for skill_id in skill_ids:
+            response = responses.get(skill_id)
+            if response is None:
+                return None, True
+            if "error" not in response.data and response.data.get("result"):
+                return skill_id, False
+        return None, False
 
     def handle_converse_error(self, message):
         """Handle error in converse system.
@@ -361,16 +423,21 @@ class IntentService:
             for skill in self.active_skills
             if time.time() - skill[1] <= self.converse_timeout * 60
         ]
-        LOG.debug(
-            f"skills to handle conversation: {self.intent_api.get_active_skills()}"
-        )
+        LOG.debug("skills to handle conversation: %s", self.active_skills)
 
         # check if any skill wants to handle utterance
-        for skill in copy(self.active_skills):
-            if self.do_converse(utterance, skill[0], lang, message):
-                # update timestamp, or there will be a timeout where
-                # intent stops conversing whether its being used or not
-                return IntentMatch("Converse", None, None, skill[0])
+        stopwatch = Stopwatch()
+        with stopwatch:
+            skill_ids = [skill[0] for skill in self.active_skills]
+            skill_id = self.converse_all(utterance, skill_ids, lang, message)
+        if skill_ids:
+            histogram("intent.converse_latency").observe(stopwatch.time)
+            LOG.debug("Converse with %d skills took %.3f s",
+                      len(skill_ids), stopwatch.time)
+        if skill_id:
+            # update timestamp, or there will be a timeout where
+            # intent stops conversing whether its being used or not
+            return IntentMatch("Converse", None, None, skill_id)
         return None
 
     def send_complete_intent_failure(self, message):
@@ -526,6 +593,16 @@ class IntentService:
             )
         )
 
+    def handle_get_metrics(self, message):
+        """Send the metrics of the intent service, such as converse latency.
+
+        Argument:
+            message: query message to reply to.
+        """
+        self.bus.emit(
+            message.reply("intent.service.metrics.reply", {"metrics": get_metrics()})
+        )
+
     def handle_get_adapt(self, message):
         """handler getting the adapt response for an utterance.
 
@@ -2,6 +2,7 @@ from mycroft_bus_client import MessageBusClient as _MessageBusClient
 from mycroft_bus_client.client import MessageWaiter
 
 from source.messagebus.load_config import load_message_bus_config
+from source.messagebus.message import SUBSCRIBE, UNSUBSCRIBE, Message
 from source.util.process_utils import create_echo_function
 
 
@@ -10,6 +11,47 @@ class MessageBusClient(_MessageBusClient):
         config_overrides = dict(host=host, port=port, route=route, ssl=ssl)
         config = load_message_bus_config(**config_overrides)
         super().__init__(config.host, config.port, config.route, config.ssl)
+        self.subscriptions = set()
+
+    def on_open(self, *args):
+        """Restore subscriptions before reporting the connection as open."""
+        if self.subscriptions:
+            self.client.send(self._subscription_message(SUBSCRIBE,
+                                                        self.subscriptions))
+        super().on_open(*args)
+
+    @staticmethod
+    def _subscription_message(msg_type, types):
+        return Message(msg_type, {"types": sorted(types)}).serialize()
+
+    def subscribe(self, *msg_types):
+        """Only receive messages of the given types from the bus.
+
+        Without subscriptions the client receives all messages. Glob patterns
+        such as "recognizer_loop:*" are supported, subscribing to "*"
+        restores receiving everything. Subscriptions are kept and sent again
+        when reconnecting.
+
+        Args:
+            msg_types (str): message types or patterns to subscribe to
+        """
+        self.subscriptions.update(msg_types)
+        if self.connected_event.is_set():
+            self.client.send(self._subscription_message(SUBSCRIBE, msg_types))
+
+    def unsubscribe(self, *msg_types):
+        """Stop receiving messages of the given types.
+
+        Unsubscribing from every subscribed type restores receiving all
+        messages, the messagebus treats the client as never subscribed.
+
+        Args:
+            msg_types (str): previously subscribed message types or patterns
+        """
+        self.subscriptions.difference_update(msg_types)
+        if self.connected_event.is_set():
+            self.client.send(self._subscription_message(UNSUBSCRIBE,
+                                                        msg_types))
 
 
 def echo():
@@ -2,6 +2,10 @@
 import mycroft_bus_client
 from mycroft_bus_client.message import dig_for_message
 
+# Messages of bus clients telling the messagebus which types to route to them
+SUBSCRIBE = "message_bus.subscribe"
+UNSUBSCRIBE = "message_bus.unsubscribe"
+
 
 class Message(mycroft_bus_client.Message):
     """Mycroft specific Message class."""
@@ -1,21 +1,116 @@
-"""Define the web socket event handler for the message bus."""
+"""Define the web socket event handler for the message bus.
+
+Clients receive every message on the bus unless they subscribe to specific
+message types. A client subscribes by sending a "message_bus.subscribe"
+message with a list of message types in the "types" field, glob patterns
+like "recognizer_loop:*" are supported. From then on only messages matching
+one of its subscriptions are routed to it, subscribing to "*" restores
+receiving everything. "message_bus.unsubscribe" removes subscriptions,
+removing the last one makes the client receive everything again.
+"""
 import json
+import re
 import sys
 import traceback
+from fnmatch import translate
 
 from pyee import EventEmitter
 from tornado.websocket import WebSocketHandler
 
-from source.messagebus.message import Message
+from source.messagebus.message import SUBSCRIBE, UNSUBSCRIBE, Message
 from source.util.log import LOG
 
 client_connections = []
 
 
+class Subscriptions:
+    """Message types a bus client wants to receive.
+
+    A client without subscriptions receives all messages, this keeps clients
+    unaware of the subscription protocol working as before. Unsubscribing
+    from every type returns to that state, the same as a reconnecting
+    MessageBusClient without subscriptions.
+
+    Match results are cached per message type since the number of message
+    types on the bus is limited while the number of messages isn't.
+    """
+
+    MAX_CACHED_TYPES = 4096
+
+    def __init__(self):
+        self.patterns = None
+        self._exact = set()
+        self._globs = None
+        self._cache = {}
+
+    def add(self, patterns):
+        """Subscribe to message types.
+
+        An empty list changes nothing, the client keeps receiving what it
+        received before.
+
+        Args:
+            patterns (list): message types or glob patterns
+        """
+        if not patterns:
+            return
+        if self.patterns is None:
+            self.patterns = set()
+        self.patterns.update(patterns)
+        self._compile()
+
+    def remove(self, patterns):
+        """Unsubscribe from message types.
+
+        Args:
+            patterns (list): previously subscribed types or patterns
+        """
+        if self.patterns is None:
+            return
+        self.patterns.difference_update(patterns)
+        if self.patterns:
+            self._compile()
+        else:
+            self.patterns = None
+            self._cache = {}
+
+    def _compile(self):
+        globs = [p for p in self.patterns if any(c in p for c in "*?[")]
+        self._exact = self.patterns.difference(globs)
+        if globs:
+            self._globs = re.compile("|".join(translate(g) for g in globs))
+        else:
+            self._globs = None
+        self._cache = {}
+
+    def matches(self, msg_type):
+        """Check if messages of a type should be routed to the client.
+
+        Args:
+            msg_type (str): type of the message
+
+        Returns:
+            bool: True if the client is subscribed to the message type
+        """
+        if self.patterns is None:
+            return True
+
+        match = self._cache.get(msg_type)
+        if match is None:
+            match = msg_type in self._exact or bool(
+                self._globs and self._globs.match(msg_type)
+            )
+            if len(self._cache) >= self.MAX_CACHED_TYPES:
+                self._cache = {}
+            self._cache[msg_type] = match
+        return match
+
+
 class MessageBusEventHandler(WebSocketHandler):
     def __init__(self, application, request, **kwargs):
         super().__init__(application, request, **kwargs)
         self.emitter = EventEmitter()
+        self.subscriptions = Subscriptions()
 
     def on(self, event_name, handler):
         self.emitter.on(event_name, handler)
@@ -27,16 +122,36 @@ class MessageBusEventHandler(WebSocketHandler):
         except Exception:
             return
 
+        msg_type = deserialized_message.msg_type
+        if msg_type in (SUBSCRIBE, UNSUBSCRIBE):
+            self.handle_subscription(deserialized_message)
+            return
+
         try:
-            self.emitter.emit(deserialized_message.msg_type,
-                              deserialized_message)
+            self.emitter.emit(msg_type, deserialized_message)
         except Exception as e:
             LOG.exception(e)
             traceback.print_exc(file=sys.stdout)
             pass
 
         for client in client_connections:
-            client.write_message(message)
+            if client.subscriptions.matches(msg_type):
+                client.write_message(message)
+
+    def handle_subscription(self, message):
+        """Update the subscriptions of this client.
+
+        Args:
+            message (Message): subscribe or unsubscribe message
+        """
+        types = message.data.get("types") or []
+        if isinstance(types, str):
+            types = [types]
+        if message.msg_type == SUBSCRIBE:
+            self.subscriptions.add(types)
+        else:
+            self.subscriptions.remove(types)
+        LOG.debug("Client subscriptions: {}".format(self.subscriptions.patterns))
 
     def open(self):
         self.write_message(Message("connected").serialize())
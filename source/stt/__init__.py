@@ -7,6 +7,7 @@ from source.util.log import LOG
 from source.util.plugins import load_plugin
 
 from .base import STT
+from .service import STTRequest, STTService
 from .whisper import WhisperSTT
 
 
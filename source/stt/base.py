@@ -1,8 +1,11 @@
 from abc import ABCMeta, abstractmethod
+from queue import Queue
+from threading import Thread
 
 from speech_recognition import Recognizer
 
 from source.configuration import Configuration
+from source.util.log import LOG
 
 
 class STT(metaclass=ABCMeta):
@@ -37,6 +40,22 @@ class STT(metaclass=ABCMeta):
             return langs[0].lower() + "-" + langs[1].upper()
         return lang
 
+    def warmup(self):
+        """Prepare the engine for the first transcription.
+
+        Called by the STTService before it serves requests. Engines doing
+        expensive work on their first transcription, such as loading
+        weights lazily, can transcribe a short piece of silence here so the
+        user doesn't wait for it. Does nothing by default.
+        """
+
+    def shutdown(self):
+        """Release the resources of the engine.
+
+        Called by the STTService when the listener stops using the engine.
+        Does nothing by default.
+        """
+
     @abstractmethod
     def execute(self, audio, language=None):
         """Implementation of STT functionallity.
@@ -54,3 +73,152 @@ class STT(metaclass=ABCMeta):
         Returns:
             str: parsed text
         """
+
+
+class StreamThread(Thread, metaclass=ABCMeta):
+    """ABC class to be used with StreamingSTT class implementations.
+
+    The thread consumes audio chunks from a queue until None is received.
+
+    Args:
+        queue (Queue): Input Queue
+        language (str): language code for the current language.
+        on_partial (callable): Called with the stable text recognized so
+                               far while the stream is running.
+    """
+
+    def __init__(self, queue, language, on_partial=None):
+        super().__init__()
+        self.daemon = True
+        self.language = language
+        self.queue = queue
+        self.on_partial = on_partial
+        self.text = None
+
+    def _get_data(self):
+        """Generator reading audio data from queue."""
+        while True:
+            d = self.queue.get()
+            if d is None:
+                break
+            yield d
+
+    def run(self):
+        """Thread entry point."""
+        try:
+            self.text = self.handle_audio_stream(self._get_data(), self.language)
+        except Exception:
+            LOG.exception("Error in STT stream")
+
+    def report_partial(self, text):
+        """Forward stable partial text to the partial callback."""
+        if self.on_partial and text:
+            try:
+                self.on_partial(text)
+            except Exception:
+                LOG.exception("Error in partial transcription callback")
+
+    @abstractmethod
+    def handle_audio_stream(self, audio, language):
+        """Handling of audio stream.
+
+        Needs to be implemented by derived class to process audio data and
+        return the final transcription.
+
+        Args:
+            audio (generator): generator yielding chunks of audio bytes
+            language (str): language code
+
+        Returns:
+            str: transcribed text
+        """
+
+
+class StreamingSTT(STT, metaclass=ABCMeta):
+    """ABC class for threaded streaming STT implemenations.
+
+    Audio is fed to a StreamThread while it is recorded, the stream is
+    finished by stream_stop() which returns the final transcription.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.stream = None
+        self.queue = None
+        self.can_stream = True
+        # Callback receiving partial transcriptions while streaming
+        self.on_partial = None
+
+    def stream_start(self, language=None):
+        """Indicate start of new audio stream.
+
+        This creates a new thread for handling the incomming audio stream as
+        it's collected by the listener.
+
+        Args:
+            language (str): optional language code for the new stream.
+        """
+        self.stream_stop()
+        language = language or self.lang
+        self.queue = Queue()
+        self.stream = self.create_streaming_thread(language)
+        self.stream.start()
+
+    def stream_data(self, data):
+        """Receiver of audio data.
+
+        Args:
+            data (bytes): raw audio data.
+        """
+        if self.queue is not None:
+            self.queue.put(data)
+
+    def stream_stop(self):
+        """Indicate that the audio stream has ended.
+
+        This will tear down the processing thread and collect the result
+
+        Returns:
+            str: parsed text, None if no stream was running
+        """
+        stream = self.detach_stream()
+        if stream is not None:
+            stream.join()
+            return stream.text
+        return None
+
+    def detach_stream(self):
+        """End the audio stream without waiting for its transcription.
+
+        A new stream can be started while the detached one finishes.
+
+        Returns:
+            StreamThread: thread finishing the stream, its text is the
+                          transcription once joined. None if no stream was
+                          running.
+        """
+        stream = self.stream
+        if stream is not None:
+            self.queue.put(None)
+            self.stream = None
+            self.queue = None
+        return stream
+
+    def execute(self, audio, language=None):
+        """End the parsing thread and collect data."""
+        return self.stream_stop()
+
+    @abstractmethod
+    def create_streaming_thread(self, language):
+        """Create thread for parsing audio chunks.
+
+        This method should be implemented by the derived class to return an
+        instance derived from StreamThread to handle the audio stream and
+        send it to the STT engine.
+
+        Args:
+            language (str): language code for the stream
+
+        Returns:
+            StreamThread: Thread to handle audio data.
+        """
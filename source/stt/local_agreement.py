@@ -0,0 +1,99 @@
+"""Local agreement policy for streaming speech recognition.
+
+A streaming recognizer repeatedly transcribes a growing window of audio.
+Words at the end of the window change between iterations as more context
+arrives, so they can't be reported right away. With the local agreement
+policy a word is only considered stable once two consecutive transcriptions
+agree on it, the agreed prefix is committed and never revised.
+
+Words are handled as (start, end, text) tuples with times in seconds from
+the beginning of the stream.
+"""
+
+
+def _normalize(text):
+    return text.strip().lower()
+
+
+class HypothesisBuffer:
+    """Tracks transcription hypotheses and commits the words they agree on.
+
+    Args:
+        max_ngram (int): longest sequence of words checked when removing words
+                         that are repeated from the committed text at the
+                         start of a new hypothesis.
+    """
+
+    def __init__(self, max_ngram=5):
+        self.max_ngram = max_ngram
+        self.committed = []  # Committed words still inside the audio window
+        self.buffer = []  # Uncommitted words of the previous hypothesis
+        self.new = []  # Words of the latest hypothesis
+        self.last_committed_time = 0.0
+        self.last_committed_word = None
+
+    def insert(self, words, offset=0.0):
+        """Add a new hypothesis.
+
+        Words ending before the last committed word are dropped, as well as
+        words at the start of the hypothesis repeating the committed text.
+
+        Args:
+            words (list): (start, end, text) tuples relative to offset
+            offset (float): time of the start of the transcribed window
+        """
+        words = [(start + offset, end + offset, text) for start, end, text in words]
+        self.new = [w for w in words if w[0] > self.last_committed_time - 0.1]
+
+        if self.new and self.committed:
+            start = self.new[0][0]
+            if abs(start - self.last_committed_time) < 1:
+                # Remove the longest n-gram shared by the end of the committed
+                # words and the start of the new hypothesis
+                max_n = min(len(self.committed), len(self.new), self.max_ngram)
+                for n in range(max_n, 0, -1):
+                    tail = [_normalize(w[2]) for w in self.committed[-n:]]
+                    head = [_normalize(w[2]) for w in self.new[:n]]
+                    if tail == head:
+                        self.new = self.new[n:]
+                        break
+
+    def flush(self):
+        """Commit the longest common prefix of the last two hypotheses.
+
+        Returns:
+            (list) newly committed words
+        """
+        commit = []
+        while self.new and self.buffer:
+            if _normalize(self.new[0][2]) != _normalize(self.buffer[0][2]):
+                break
+            word = self.new.pop(0)
+            self.buffer.pop(0)
+            commit.append(word)
+            self.last_committed_time = word[1]
+            self.last_committed_word = word[2]
+        self.buffer = self.new
+        self.new = []
+        self.committed.extend(commit)
+        return commit
+
+    def pop_committed(self, time):
+        """Forget committed words ending before time.
+
+        Called when the audio window is trimmed.
+
+        Args:
+            time (float): new start of the audio window
+        """
+        while self.committed and self.committed[0][1] <= time:
+            self.committed.pop(0)
+
+    def complete(self):
+        """Get the uncommitted words of the latest hypothesis."""
+        return self.buffer
+
+
+def words_to_text(words):
+    """Join (start, end, text) word tuples into a string."""
+    return "".join(w[2] for w in words).strip()
@@ -0,0 +1,241 @@
+"""Whisper models kept loaded between STT engines.
+
+Loading a Whisper model takes seconds, so loaded models stay resident in
+the process and are handed to new engines, e.g. after the listener
+reloaded its configuration. Models are keyed by name, precision and
+device:
+
+    fp32:  the weights as published
+    fp16:  half precision weights, CUDA only
+    int8:  dynamically quantized linear layers, CPU only
+
+Every loaded copy of a model (a replica) is leased by one engine at a
+time, so STT workers using the same model decode in parallel. Released
+replicas stay loaded for the next engine asking for the model.
+
+The load time, memory footprint and real-time factor of every model are
+recorded as stt.model.<name>.<precision>.<device> metrics.
+"""
+import os.path
+import time
+from collections import namedtuple
+from threading import Lock
+
+import numpy as np
+import torch
+import whisper
+
+from source.util.log import LOG
+from source.util.metrics import Stopwatch, gauge, histogram
+
+PRECISIONS = ("fp32", "fp16", "int8")
+SAMPLE_RATE = 16000  # Whisper only accepts 16 kHz audio
+
+ModelKey = namedtuple("ModelKey", ["name", "precision", "device"])
+
+
+def model_key(name, precision="fp32", device=None):
+    """Validate a model selection.
+
+    Args:
+        name (str): name of a Whisper model or path of a checkpoint
+        precision (str): one of PRECISIONS
+        device (str): torch device, CUDA if available by default
+
+    Returns:
+        ModelKey: key of the model
+
+    Raises:
+        ValueError: if the model or precision isn't available
+    """
+    if name not in whisper.available_models() and not os.path.isfile(name):
+        raise ValueError("Unknown Whisper model {}".format(name))
+    if precision not in PRECISIONS:
+        raise ValueError("Unknown precision {}".format(precision))
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    if precision == "int8" and device != "cpu":
+        raise ValueError("int8 models can only run on the CPU")
+    if precision == "fp16" and device == "cpu":
+        raise ValueError("fp16 models can't run on the CPU")
+    return ModelKey(name, precision, device)
+
+
+def quantize(model):
+    """Quantize the linear layers of a model to int8 for the CPU.
+
+    Whisper subclasses the linear layer, the layers are turned back into
+    plain torch layers first so torch recognizes them.
+
+    Args:
+        model (whisper.model.Whisper): model on the CPU
+
+    Returns:
+        whisper.model.Whisper: the quantized model
+    """
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def model_memory(model):
+    """Bytes used by the weights and buffers of a model."""
+    total = 0
+    for value in model.state_dict().values():
+        # Quantized layers store their packed weights as tuples
+        tensors = value if isinstance(value, tuple) else (value,)
+        for tensor in tensors:
+            if isinstance(tensor, torch.Tensor):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class ResidentModel:
+    """A loaded replica of a Whisper model.
+
+    Transcribing with a replica is serialized by its lock, Whisper models
+    can't decode two utterances at once.
+
+    Args:
+        key (ModelKey): the model
+        model (whisper.model.Whisper): the loaded model
+    """
+
+    def __init__(self, key, model):
+        self.key = key
+        self.model = model
+        self.lock = Lock()
+        self.leased = False
+        self.warmed_up = False
+        self.last_used = time.monotonic()
+        label = ".".join(key)
+        self._rtf = histogram("stt.model.{}.rtf".format(label))
+
+    def transcribe(self, audio, **kwargs):
+        """Transcribe audio, see whisper.transcribe().
+
+        Args:
+            audio (np.ndarray): float32 16 kHz audio
+
+        Returns:
+            dict: the whisper transcription result
+        """
+        if self.key.device == "cpu":
+            kwargs["fp16"] = False
+        stopwatch = Stopwatch()
+        with self.lock:
+            with stopwatch:
+                result = self.model.transcribe(audio, **kwargs)
+        if len(audio):
+            self._rtf.observe(stopwatch.time / (len(audio) / SAMPLE_RATE))
+        return result
+
+    def warmup(self):
+        """Transcribe a second of silence, once, to initialize the decoder."""
+        if not self.warmed_up:
+            self.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32))
+            self.warmed_up = True
+
+
+class ModelResidency:
+    """Loaded Whisper models shared by the STT engines of the process.
+
+    Args:
+        max_idle (int): replicas without an engine kept loaded at most, the
+                        least recently used are unloaded first
+    """
+
+    def __init__(self, max_idle=2):
+        self.max_idle = max_idle
+        self._replicas = []
+        self._lock = Lock()
+        self._load_lock = Lock()
+
+    def acquire(self, name, precision="fp32", device=None):
+        """Lease a replica of a model, loading one if none is free.
+
+        Args:
+            name (str): name of a Whisper model or path of a checkpoint
+            precision (str): one of PRECISIONS
+            device (str): torch device, CUDA if available by default
+
+        Returns:
+            ResidentModel: the replica, to be released when unused
+
+        Raises:
+            ValueError: if the model or precision isn't available
+        """
+        key = model_key(name, precision, device)
+        replica = self._lease(key)
+        if replica is None:
+            # Load one model at a time, loading is memory intensive
+            with self._load_lock:
+                replica = self._lease(key)
+                if replica is None:
+                    replica = ResidentModel(key, self._load(key))
+                    replica.leased = True
+                    with self._lock:
+                        self._replicas.append(replica)
+        return replica
+
+    def release(self, replica):
+        """Return a leased replica, it stays loaded for the next engine."""
+        with self._lock:
+            replica.leased = False
+            replica.last_used = time.monotonic()
+            idle = sorted(
+                (r for r in self._replicas if not r.leased),
+                key=lambda r: r.last_used,
+            )
+            for unused in idle[: max(0, len(idle) - self.max_idle)]:
+                LOG.info("Unloading Whisper model {}".format(unused.key))
+                self._replicas.remove(unused)
+
+    def resident(self):
+        """Get the keys of the loaded replicas."""
+        with self._lock:
+            return [replica.key for replica in self._replicas]
+
+    def _lease(self, key):
+        with self._lock:
+            for replica in self._replicas:
+                if replica.key == key and not replica.leased:
+                    replica.leased = True
+                    return replica
+        return None
+
+    @staticmethod
+    def _load(key):
+        stopwatch = Stopwatch()
+        with stopwatch:
+            model = whisper.load_model(key.name, device=key.device)
+            if key.precision == "fp16":
+                model = model.half()
+            elif key.precision == "int8":
+                model = quantize(model)
+        memory = model_memory(model)
+        label = ".".join(key)
+        gauge("stt.model.{}.load_seconds".format(label)).set(stopwatch.time)
+        gauge("stt.model.{}.memory_bytes".format(label)).set(memory)
+        LOG.info(
+            "Loaded Whisper model {} in {:.2f} s, {:.0f} MB".format(
+                key, stopwatch.time, memory / 2**20
+            )
+        )
+        return model
+
+
+_residency = None
+_residency_lock = Lock()
+
+
+def get_residency():
+    """Get the model residency of this process."""
+    global _residency
+    with _residency_lock:
+        if _residency is None:
+            _residency = ModelResidency()
+        return _residency
@@ -0,0 +1,307 @@
+"""Speech to text execution off the listener threads.
+
+The STTService runs transcriptions on a bounded pool of worker threads, so
+the audio consumer keeps handling audio, stop requests and further
+utterances while an utterance is decoded. Requests wait in a bounded queue,
+can be cancelled and have a deadline after which their result is dropped.
+Results are delivered through the callback of the request, which the
+listener uses to emit them as events.
+
+The time requests spend queued and decoding is recorded in the
+stt.queue_wait and stt.decode_time histograms.
+"""
+import time
+from queue import Full, Queue
+from threading import Event, Lock, Thread
+
+from source.util.log import LOG
+from source.util.metrics import Stopwatch, histogram
+
+
+class STTRequest:
+    """Transcription of an utterance queued in an STTService.
+
+    Args:
+        audio (AudioData): recorded utterance
+        callback (callable): called with the request once it's done, unless
+                             it was cancelled
+        language (str): language code, the STT default if None
+        timeout (float): seconds from submitting until the result is due,
+                         None for no deadline
+        stream (StreamThread): detached stream already transcribing the
+                               utterance, its result is used if given
+    """
+
+    def __init__(self, audio=None, callback=None, language=None, timeout=None,
+                 stream=None):
+        self.audio = audio
+        self.callback = callback
+        self.language = language
+        self.stream = stream
+        self.submitted = time.monotonic()
+        self.deadline = None if timeout is None else self.submitted + timeout
+        self.text = None
+        self.error = None
+        # Maps times in the transcribed audio to the recording if the audio
+        # was trimmed before transcribing
+        self.timing = None
+        self.cancelled = False
+        self.done = Event()
+
+    def cancel(self):
+        """Cancel the request.
+
+        A decode in progress isn't interrupted, but its result is dropped
+        and the callback isn't called.
+        """
+        self.cancelled = True
+
+    @property
+    def expired(self):
+        """True if the deadline of the request has passed."""
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def remaining(self):
+        """Seconds left until the deadline, None if there is none."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def wait(self, timeout=None):
+        """Wait until the request is done.
+
+        Returns:
+            bool: True if the request is done
+        """
+        return self.done.wait(timeout)
+
+
+class STTService:
+    """Bounded pool of threads transcribing STTRequests.
+
+    Each worker uses its own STT engine, the first worker the given one and
+    further workers engines created by create_stt. The engines are loaded
+    and warmed up by the workers when the service starts, requests
+    submitted meanwhile wait in the queue.
+
+    Args:
+        stt (STT): engine of the first worker
+        workers (int): number of worker threads
+        queue_size (int): number of requests waiting at most
+        timeout (float): default deadline of requests in seconds, None for
+                         no deadline
+        create_stt (callable): creates the engines of additional workers,
+                               without it a single worker is used
+        warmup (bool): warm up the engines before serving requests
+        preprocess (callable): run by the workers on the audio of requests
+                               before transcribing it, returns the audio
+                               to transcribe and its timing map
+    """
+
+    def __init__(self, stt, workers=1, queue_size=4, timeout=None,
+                 create_stt=None, warmup=True, preprocess=None):
+        self.stt = stt
+        if workers > 1 and create_stt is None:
+            LOG.warning("No STT engines for more workers, using one worker")
+            workers = 1
+        self.workers = workers
+        self.timeout = timeout
+        self.create_stt = create_stt
+        self.warmup = warmup
+        self.preprocess = preprocess
+        self.queue = Queue(maxsize=queue_size)
+        # Set once all workers have loaded their engines
+        self.ready = Event()
+        self._loading = workers
+        self._pending = set()
+        self._lock = Lock()
+        self._threads = []
+        # Engines of the workers, once loaded
+        self.engines = []
+        self._queue_wait = histogram("stt.queue_wait")
+        self._decode_time = histogram("stt.decode_time")
+
+    def start(self):
+        """Start the workers."""
+        for index in range(self.workers):
+            thread = Thread(target=self._run, args=(index,), daemon=True,
+                            name="STTWorker-{}".format(index))
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Cancel all requests and end the workers.
+
+        Decodes in progress are finished in the background, their results
+        are dropped. The engines are shut down.
+        """
+        self.cancel_all()
+        for _ in self._threads:
+            self.queue.put(None)
+        self._threads = []
+        with self._lock:
+            engines, self.engines = self.engines, []
+        for stt in engines:
+            try:
+                stt.shutdown()
+            except Exception:
+                LOG.exception("Failed to shut down STT engine")
+
+    def submit(self, audio=None, callback=None, language=None, timeout=None,
+               stream=None):
+        """Queue the transcription of an utterance.
+
+        Args:
+            audio (AudioData): recorded utterance
+            callback (callable): called with the request once it's done
+            language (str): language code, the STT default if None
+            timeout (float): deadline in seconds, the service default if None
+            stream (StreamThread): detached stream transcribing the utterance
+
+        Returns:
+            STTRequest: the queued request
+
+        Raises:
+            queue.Full: if too many requests are waiting
+        """
+        if timeout is None:
+            timeout = self.timeout
+        request = STTRequest(audio, callback, language, timeout, stream)
+        with self._lock:
+            self._pending.add(request)
+        try:
+            self.queue.put_nowait(request)
+        except Full:
+            with self._lock:
+                self._pending.discard(request)
+            raise
+        return request
+
+    def cancel_all(self):
+        """Cancel all queued and running requests.
+
+        Returns:
+            int: number of cancelled requests
+        """
+        with self._lock:
+            pending = list(self._pending)
+        for request in pending:
+            request.cancel()
+        return len(pending)
+
+    def swap_model(self, **settings):
+        """Switch the model of the engines without restarting the workers.
+
+        Args:
+            settings: model settings passed to the swap_model() method of
+                      the engines
+
+        Returns:
+            bool: True if all engines switched, False if an engine can't
+                  swap its model and has to be recreated
+        """
+        with self._lock:
+            engines = list(self.engines)
+        if not engines or not all(hasattr(stt, "swap_model") for stt in engines):
+            return False
+        try:
+            for stt in engines:
+                stt.swap_model(**settings)
+        except Exception:
+            LOG.exception("Failed to swap the STT model")
+            return False
+        return True
+
+    def _load(self, index):
+        """Get the engine of a worker, warmed up if configured."""
+        stt = self.stt if index == 0 else self.create_stt()
+        if self.warmup:
+            stopwatch = Stopwatch()
+            try:
+                with stopwatch:
+                    stt.warmup()
+                LOG.info("STT worker {} warmed up in {:.2f} s".format(
+                    index, stopwatch.time))
+            except Exception:
+                LOG.exception("STT warm up failed")
+        return stt
+
+    def _loaded(self, stt):
+        with self._lock:
+            if stt is not None:
+                self.engines.append(stt)
+            self._loading -= 1
+            if self._loading == 0:
+                self.ready.set()
+
+    def _run(self, index):
+        stt = None
+        try:
+            stt = self._load(index)
+        except Exception:
+            LOG.exception("Failed to create the engine of STT worker {}"
+                          .format(index))
+            return
+        finally:
+            self._loaded(stt)
+
+        while True:
+            request = self.queue.get()
+            if request is None:
+                break
+            self._execute(stt, request)
+
+    def _execute(self, stt, request):
+        self._queue_wait.observe(time.monotonic() - request.submitted)
+        if request.cancelled:
+            self._finish(request)
+            return
+        if request.expired:
+            request.error = TimeoutError("STT request expired in the queue")
+            self._finish(request)
+            return
+
+        stopwatch = Stopwatch()
+        try:
+            with stopwatch:
+                if request.stream is not None:
+                    request.stream.join(request.remaining())
+                    if request.stream.is_alive():
+                        raise TimeoutError("STT stream didn't finish in time")
+                    request.text = request.stream.text
+                else:
+                    request.text = stt.execute(self._preprocess(request),
+                                               request.language)
+        except Exception as e:
+            request.error = e
+        self._decode_time.observe(stopwatch.time)
+
+        if request.error is None and request.expired:
+            request.text = None
+            request.error = TimeoutError(
+                "STT took {:.2f} s, the result is too late".format(
+                    stopwatch.time))
+        self._finish(request)
+
+    def _preprocess(self, request):
+        """Get the audio of a request to transcribe."""
+        if self.preprocess is None:
+            return request.audio
+        try:
+            audio, request.timing = self.preprocess(request.audio)
+            return audio
+        except Exception:
+            # Transcribe the recording as is rather than losing it
+            LOG.exception("STT preprocessing failed")
+            return request.audio
+
+    def _finish(self, request):
+        with self._lock:
+            self._pending.discard(request)
+        request.done.set()
+        if request.cancelled or request.callback is None:
+            return
+        try:
+            request.callback(request)
+        except Exception:
+            LOG.exception("Error in STT result callback")
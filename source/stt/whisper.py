@@ -1,39 +1,44 @@
+from queue import Empty
+
 import numpy as np
 import torch
-import whisper
 from speech_recognition import AudioData
 
 from source.util.log import LOG
 
-from .base import STT
+from .base import StreamingSTT, StreamThread
+from .local_agreement import HypothesisBuffer, words_to_text
+from .models import get_residency
+
+SAMPLE_RATE = 16000  # Whisper only accepts 16 kHz audio
+
 
+class WhisperSTT(StreamingSTT):
+    """Speech recognition with OpenAI's Whisper.
 
-class WhisperSTT(STT):
-    MODELS = (
-        "tiny.en",
-        "tiny",
-        "base.en",
-        "base",
-        "small.en",
-        "small",
-        "medium.en",
-        "medium",
-        "large",
-        "large-v2",
-    )
+    Transcribes complete utterances by default. With "stream" enabled in the
+    whisper config the utterance is transcribed incrementally while it's
+    recorded, see WhisperStreamThread.
+    """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        model = self.config.get("model")
+        self.model_name = self.config.get("model") or "base.en"
+        self.precision = self.config.get("precision", "fp32")
+        self.device = self.config.get("device")
 
-        LOG.info(f"whisper model: {model}")
+        LOG.info(f"whisper model: {self.model_name} ({self.precision})")
 
-        if not model:
-            model = "base.en"
-        assert model in self.MODELS  # TODO - better error handling
-
-        self.engine = whisper.load_model(model)
-        self.transcription = ""
+        residency = get_residency()
+        residency.max_idle = self.config.get("resident_models", residency.max_idle)
+        # Loaded models are kept by the residency, so creating the engine
+        # again, e.g. after a configuration reload, doesn't load the model
+        self.engine = residency.acquire(self.model_name, self.precision, self.device)
+        self.can_stream = self.config.get("stream", False)
+        # Seconds of new audio to collect before transcribing the window
+        self.stream_min_chunk = self.config.get("stream_min_chunk_seconds", 1.0)
+        # Seconds of audio kept in the window before committed audio is cut
+        self.stream_window = self.config.get("stream_window_seconds", 15.0)
 
     @staticmethod
     def audiodata2array(audio_data):
@@ -47,30 +52,171 @@ class WhisperSTT(STT):
         return data
 
     def execute(self, audio: AudioData, language=None):
+        if self.stream is not None:
+            # The utterance has already been transcribed while recording
+            return self.stream_stop()
         result = self.engine.transcribe(
             self.audiodata2array(audio.get_raw_data()),
         )
         text = result["text"].strip()
         return text
 
-    def stream_start(self):
-        self.streaming = True
-        LOG.info("TRANSCRIPTION STARTED")
+    def warmup(self):
+        """Transcribe a second of silence to initialize the decoder."""
+        self.engine.warmup()
+
+    def swap_model(self, model=None, precision=None):
+        """Switch to another model without interrupting transcriptions.
+
+        The new model is loaded and warmed up before it replaces the current
+        one. Transcriptions in progress, and streams started before, finish
+        with the previous model.
+
+        Args:
+            model (str): name of the Whisper model, the current by default
+            precision (str): precision of the model, the current by default
+        """
+        model = model or self.model_name
+        precision = precision or self.precision
+        if (model, precision) == (self.model_name, self.precision):
+            return
+        residency = get_residency()
+        engine = residency.acquire(model, precision, self.device)
+        try:
+            engine.warmup()
+        except Exception:
+            LOG.exception("Whisper warm up failed")
+        previous, self.engine = self.engine, engine
+        self.model_name, self.precision = model, precision
+        residency.release(previous)
+        LOG.info(f"whisper model swapped to {model} ({precision})")
+
+    def shutdown(self):
+        """Return the model to the residency for the next engine."""
+        get_residency().release(self.engine)
+
+    def create_streaming_thread(self, language):
+        return WhisperStreamThread(
+            self.queue,
+            language,
+            self.engine,
+            min_chunk=self.stream_min_chunk,
+            window=self.stream_window,
+            on_partial=self.on_partial,
+        )
+
 
-    def stream_stop(self):
-        self.streaming = False
-        LOG.info("FINISHED TRANSCRIPTION")
-        return self.transcription
+class WhisperStreamThread(StreamThread):
+    """Incremental Whisper transcription of an audio stream.
 
-    def stream_data(self, audio_chunk: bytes):
+    The received audio is collected in a window which is re-transcribed each
+    time min_chunk seconds of new audio have arrived. Words that two
+    consecutive transcriptions agree on are committed and reported as a
+    partial result. Once the window is longer than window seconds the audio
+    of committed words is cut from its start, so when the stream ends at most
+    one window of audio is left to decode.
+
+    Args:
+        queue (Queue): queue of raw 16 kHz 16-bit audio chunks
+        language (str): language code
+        engine: loaded whisper model
+        min_chunk (float): seconds of new audio triggering a transcription
+        window (float): seconds of audio to keep in the window
+        on_partial (callable): called with the committed text so far
+    """
+
+    # Characters of committed text passed as prompt for the next window
+    PROMPT_LENGTH = 200
+
+    def __init__(
+        self, queue, language, engine, min_chunk=1.0, window=15.0, on_partial=None
+    ):
+        super().__init__(queue, language, on_partial)
+        self.engine = engine
+        self.min_chunk_bytes = int(min_chunk * SAMPLE_RATE) * 2
+        self.window = window
+        self.hypothesis = HypothesisBuffer()
+        self.committed = []
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.offset = 0.0  # Stream time of the start of the window
+
+    def handle_audio_stream(self, audio, language):
+        pending = []
+        pending_bytes = 0
+        ended = False
+        for chunk in audio:
+            pending.append(chunk)
+            pending_bytes += len(chunk)
+            if pending_bytes >= self.min_chunk_bytes:
+                # Catch up with anything queued during the last transcription
+                ended = self._drain(pending)
+                self._add_audio(b"".join(pending))
+                pending = []
+                pending_bytes = 0
+                self.process_iter()
+                if ended:
+                    break
+
+        if pending:
+            self._add_audio(b"".join(pending))
+            self.process_iter()
+        return words_to_text(self.committed + self.hypothesis.complete())
+
+    def _drain(self, pending):
+        """Move all queued audio to pending.
+
+        Returns:
+            bool: True if the end of stream was reached
+        """
+        while True:
+            try:
+                data = self.queue.get_nowait()
+            except Empty:
+                return False
+            if data is None:
+                return True
+            pending.append(data)
+
+    def _add_audio(self, data):
+        self.audio = np.concatenate((self.audio, WhisperSTT.audiodata2array(data)))
+
+    def process_iter(self):
+        """Transcribe the window and commit the words agreed on."""
+        prompt = words_to_text(
+            [w for w in self.committed if w[1] <= self.offset]
+        )[-self.PROMPT_LENGTH:]
         try:
-            # LOG.info("transcribing.....")
             result = self.engine.transcribe(
-                self.audiodata2array(audio_chunk),
+                self.audio,
+                initial_prompt=prompt or None,
+                word_timestamps=True,
                 fp16=torch.cuda.is_available(),
             )
-            text = result["text"].strip()
-            LOG.info("results from whisper: %s", text)
-            self.transcription.append(text)
         except Exception as e:
             LOG.error(f"error in realtime transcription: {e}")
+            return
+
+        words = [
+            (word["start"], word["end"], word["word"])
+            for segment in result.get("segments", [])
+            for word in segment.get("words", [])
+        ]
+        self.hypothesis.insert(words, self.offset)
+        committed = self.hypothesis.flush()
+        if committed:
+            self.committed.extend(committed)
+            self.report_partial(words_to_text(self.committed))
+
+        if len(self.audio) / SAMPLE_RATE > self.window:
+            self._trim()
+
+    def _trim(self):
+        """Cut the audio of committed words from the start of the window."""
+        if not self.hypothesis.committed:
+            return
+        cut = self.hypothesis.committed[-1][1]
+        if cut <= self.offset:
+            return
+        self.audio = self.audio[int((cut - self.offset) * SAMPLE_RATE):]
+        self.offset = cut
+        self.hypothesis.pop_committed(cut)
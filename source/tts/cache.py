@@ -9,24 +9,43 @@ persistent because the files are stored in a location that is not cleared on
 reboot.  TTS inference on these sentences should only need to occur once.  The
 persistent cache contains commonly spoken sentences.
 
-The second cache type is a temporary cache stored in the /tmp directory,
-which is cleared when a device is rebooted.  Sentences are added to this cache
-on the fly every time a TTS engine returns audio for a sentence that is not
-already cached.
+The second cache type holds the audio synthesized on the fly, every time a
+TTS engine returns audio for a sentence that is not already cached.  By
+default it is a temporary cache stored in the /tmp directory, which is
+cleared when a device is rebooted and every time the TTS starts.
+
+With the "persistent" cache option it is kept in the XDG cache directory
+instead, so common replies survive restarts.  Its entries are content
+addressed: keyed by a hash of the engine, voice, language, normalized text
+and synthesis parameters (see cache_key()), and listed in a small sqlite
+index loaded once at startup.  The least recently used entries are evicted
+by a background thread once the cache grows beyond its size budget.
+
+Cache hits and the bytes of audio they saved from being synthesized are
+exported as tts.cache.* metrics.
 """
 import base64
 import hashlib
 import json
 import re
+import sqlite3
+import time
+from os.path import join
 from pathlib import Path
+from threading import Event, Lock, Thread
 from typing import List, Set, Tuple
 from urllib import parse
 
 import requests
+from xdg.BaseDirectory import xdg_cache_home
 
 from source.util.file_utils import (curate_cache, ensure_directory_exists,
-                                    get_cache_directory)
+                                    get_cache_directory, mb_to_bytes)
 from source.util.log import LOG
+from source.util.metrics import gauge
+
+DIALOG_SPLIT_REGEX = re.compile(r"(?<=\.|\;|\?)\s")
+SPECIAL_CHARACTERS_REGEX = re.compile(r"[@#$%^*()<>/|}{~:]")
 
 
 def _get_mimic2_audio(sentence: str, url: str) -> Tuple[bytes, str]:
@@ -57,6 +76,47 @@ def hash_sentence(sentence: str):
     return sentence_hash
 
 
+def normalize_sentence(sentence: str) -> str:
+    """Normalize the whitespace of a sentence, it isn't spoken."""
+    return " ".join(sentence.split())
+
+
+def cache_key(engine: str, voice, lang: str, sentence: str,
+              params: dict = None) -> str:
+    """Content address of the synthesized audio of a sentence.
+
+    Everything changing the audio is part of the key, so changing e.g. the
+    voice doesn't return audio synthesized with the previous one.
+
+    Args:
+        engine: name of the TTS engine
+        voice: voice of the engine
+        lang: language of the sentence
+        sentence: the sentence to be spoken
+        params: other synthesis parameters of the engine
+
+    Returns:
+        Hash used as file name of the cached audio.
+    """
+    key = json.dumps(
+        [engine, voice, lang, normalize_sentence(sentence), params or {}],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def split_dialog(dialog: str) -> List[str]:
+    """Split a line of a dialog file into the sentences worth caching.
+
+    Sentences with special characters other than punctuation, like
+    templates or "<<< LOADING <<<", are left out.
+    """
+    return [
+        sentence for sentence in DIALOG_SPLIT_REGEX.split(dialog)
+        if SPECIAL_CHARACTERS_REGEX.search(sentence) is None
+    ]
+
+
 def hash_from_path(path: Path) -> str:
     """Returns hash from a given path.
 
@@ -126,10 +186,120 @@ class PhonemeFile:
         return self.path.exists()
 
 
+class IndexEntry:
+    """Cached sentence listed in a CacheIndex."""
+    __slots__ = ("audio", "phonemes", "size", "last_used")
+
+    def __init__(self, audio: str, phonemes, size: int, last_used: float):
+        self.audio = audio  # File name of the audio
+        self.phonemes = phonemes  # File name of the phonemes, if any
+        self.size = size  # Bytes of both files
+        self.last_used = last_used
+
+
+class CacheIndex:
+    """On-disk index of a persistent TTS cache.
+
+    The entries are kept in a sqlite database and loaded into memory once.
+    Uses of entries only update the memory copy until flush() writes them,
+    so looking up sentences doesn't write to the disk.
+
+    Args:
+        path: file of the database
+    """
+    def __init__(self, path: Path):
+        self._lock = Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, "
+            "audio TEXT NOT NULL, phonemes TEXT, size INTEGER NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        self._db.commit()
+        self.entries = {
+            key: IndexEntry(audio, phonemes, size, last_used)
+            for key, audio, phonemes, size, last_used in self._db.execute(
+                "SELECT key, audio, phonemes, size, last_used FROM entries"
+            )
+        }
+        self._touched = set()
+
+    @property
+    def size(self) -> int:
+        """Bytes of all cached files."""
+        with self._lock:
+            return sum(entry.size for entry in self.entries.values())
+
+    def add(self, key: str, audio: str, phonemes, size: int):
+        """Add or replace an entry."""
+        entry = IndexEntry(audio, phonemes, size, time.time())
+        with self._lock:
+            self.entries[key] = entry
+            self._touched.discard(key)
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, audio, phonemes, size, entry.last_used)
+            )
+            self._db.commit()
+
+    def touch(self, key: str):
+        """Mark an entry as used now."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry.last_used = time.time()
+                self._touched.add(key)
+
+    def remove(self, keys):
+        """Remove entries."""
+        with self._lock:
+            for key in keys:
+                self.entries.pop(key, None)
+                self._touched.discard(key)
+            self._db.executemany("DELETE FROM entries WHERE key = ?",
+                                 [(key,) for key in keys])
+            self._db.commit()
+
+    def least_recently_used(self) -> List[Tuple[str, IndexEntry]]:
+        """Get the entries, least recently used first."""
+        with self._lock:
+            entries = list(self.entries.items())
+        return sorted(entries, key=lambda item: item[1].last_used)
+
+    def flush(self):
+        """Write the uses of entries to the disk."""
+        with self._lock:
+            updates = [(self.entries[key].last_used, key)
+                       for key in self._touched]
+            self._touched.clear()
+            if updates:
+                self._db.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?", updates
+                )
+                self._db.commit()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+
 class TextToSpeechCache:
-    """Class for all persistent and temporary caching operations."""
-    def __init__(self, tts_config, tts_name, audio_file_type):
+    """Class for all persistent and temporary caching operations.
+
+    Args:
+        tts_config: configuration of the TTS engine
+        tts_name: name of the TTS engine
+        audio_file_type: extension of the audio files of the engine
+        cache_config: audio.tts.cache configuration, a temporary cache is
+                      used by default
+    """
+    def __init__(self, tts_config, tts_name, audio_file_type,
+                 cache_config=None):
         self.config = tts_config
+        cache_config = cache_config or {}
         self.tts_name = tts_name
         if "preloaded_cache" in self.config:
             self.persistent_cache_dir = Path(self.config["preloaded_cache"])
@@ -138,15 +308,33 @@ class TextToSpeechCache:
             )
         else:
             self.persistent_cache_dir = None
-        self.temporary_cache_dir = Path(
-            get_cache_directory("tts/" + tts_name)
-        )
+        # Directory the synthesized audio is cached in
+        self.persistent = cache_config.get("persistent", False)
+        if self.persistent:
+            self.temporary_cache_dir = Path(
+                cache_config.get("path") or
+                join(xdg_cache_home, "core", "tts", tts_name)
+            )
+        else:
+            self.temporary_cache_dir = Path(
+                get_cache_directory("tts/" + tts_name)
+            )
         ensure_directory_exists(
             str(self.temporary_cache_dir), permissions=0o755
         )
         self.audio_file_type = audio_file_type
         self.resource_dir = Path(__file__).parent.parent.joinpath("res")
         self.cached_sentences = dict()
+        self.max_bytes = mb_to_bytes(cache_config.get("max_mb", 200))
+        self.curate_interval = cache_config.get("curate_interval", 300)
+        self.index = None
+        self._lock = Lock()
+        self._curate_event = Event()
+        self._stop_event = Event()
+        self._evictor = None
+        self._hits = 0
+        self._misses = 0
+        self._bytes_saved = 0
 
     def __contains__(self, sha):
         """The cache contains a SHA if it knows of it and it exists on disk."""
@@ -234,14 +422,8 @@ class TextToSpeechCache:
             dialogs: a list of the records in the dialog resource files
         """
         sentences = set()
-        dialog_split_regex = r"(?<=\.|\;|\?)\s"
-        special_characters_regex = re.compile(r"[@#$%^*()<>/|}{~:]")
         for dialog in dialogs:
-            dialog_sentences = re.split(dialog_split_regex, dialog)
-            for sentence in dialog_sentences:
-                match = special_characters_regex.search(sentence)
-                if match is None:
-                    sentences.add(sentence)
+            sentences.update(split_dialog(dialog))
 
         return sentences
 
@@ -285,6 +467,150 @@ class TextToSpeechCache:
             phoneme_file.save(phonemes)
         self.cached_sentences[sentence_hash] = audio_file, phoneme_file
 
+    def load(self):
+        """Prepare the cache for the synthesized audio.
+
+        A persistent cache loads its index and starts evicting entries in
+        the background, a temporary cache is cleared.
+        """
+        if not self.persistent:
+            self.clear()
+            return
+        self.index = CacheIndex(self.temporary_cache_dir / "index.sqlite")
+        with self._lock:
+            for key, entry in self.index.entries.items():
+                self.cached_sentences[key] = self._entry_files(key, entry)
+        LOG.info("Loaded {} sentences from the TTS cache".format(
+            len(self.index.entries)))
+        self._report_size(self.index)
+        self._evictor = Thread(target=self._run_evictor, daemon=True,
+                               name="TTSCacheEvictor")
+        self._evictor.start()
+
+    def _entry_files(self, key, entry):
+        audio_file = AudioFile(self.temporary_cache_dir, key,
+                               self.audio_file_type)
+        audio_file.name = entry.audio
+        audio_file.path = self.temporary_cache_dir.joinpath(entry.audio)
+        phoneme_file = None
+        if entry.phonemes is not None:
+            phoneme_file = PhonemeFile(self.temporary_cache_dir, key)
+        return audio_file, phoneme_file
+
+    def lookup(self, *sentence_hashes):
+        """Get the cached files of a sentence.
+
+        Args:
+            sentence_hashes: hashes the sentence may be cached under, in
+                             order of preference
+
+        Returns:
+            tuple: audio file and phoneme file (None if there are no
+                   phonemes), None if the sentence isn't cached
+        """
+        for sentence_hash in sentence_hashes:
+            with self._lock:
+                cached = self.cached_sentences.get(sentence_hash)
+            if cached is not None and sentence_hash in self:
+                break
+        else:
+            with self._lock:
+                self._misses += 1
+                self._report_hits()
+            return None
+
+        index = self.index
+        entry = None
+        if index is not None:
+            index.touch(sentence_hash)
+            entry = index.entries.get(sentence_hash)
+        with self._lock:
+            self._hits += 1
+            if entry is not None:
+                self._bytes_saved += entry.size
+            self._report_hits()
+        return cached
+
+    def add(self, sentence_hash, audio_file, phoneme_file=None):
+        """Add synthesized files of a sentence to the cache.
+
+        Args:
+            sentence_hash: hash of the sentence
+            audio_file (AudioFile): file of the audio
+            phoneme_file (PhonemeFile): file of the phonemes, if any
+        """
+        with self._lock:
+            self.cached_sentences[sentence_hash] = audio_file, phoneme_file
+            index = self.index
+        if index is None:
+            return
+        files = [audio_file] + ([phoneme_file] if phoneme_file else [])
+        try:
+            size = sum(f.path.stat().st_size for f in files)
+        except OSError:
+            LOG.exception("Failed to add {} to the cache index".format(
+                audio_file.name))
+            return
+        index.add(sentence_hash, audio_file.path.name,
+                  phoneme_file.path.name if phoneme_file else None, size)
+        self._report_size(index)
+        if index.size > self.max_bytes:
+            self._curate_event.set()
+
+    def _report_hits(self):
+        """Report the lookup counters, called holding the lock."""
+        lookups = self._hits + self._misses
+        gauge("tts.cache.hits").set(self._hits)
+        gauge("tts.cache.misses").set(self._misses)
+        gauge("tts.cache.hit_rate").set(self._hits / lookups)
+        gauge("tts.cache.bytes_saved").set(self._bytes_saved)
+
+    @staticmethod
+    def _report_size(index):
+        gauge("tts.cache.entries").set(len(index.entries))
+        gauge("tts.cache.bytes").set(index.size)
+
+    def _run_evictor(self):
+        while not self._stop_event.is_set():
+            self._curate_event.wait(self.curate_interval)
+            self._curate_event.clear()
+            if self._stop_event.is_set():
+                break
+            try:
+                self.evict()
+            except Exception:
+                LOG.exception("TTS cache eviction failed")
+
+    def evict(self):
+        """Remove the least recently used entries beyond the size budget.
+
+        Entries whose audio file has been deleted are removed as well.
+
+        Returns:
+            list: hashes of the removed entries
+        """
+        self.index.flush()
+        total = self.index.size
+        removed = []
+        for key, entry in self.index.least_recently_used():
+            audio = self.temporary_cache_dir.joinpath(entry.audio)
+            if total <= self.max_bytes and audio.exists():
+                continue
+            total -= entry.size
+            removed.append(key)
+            with self._lock:
+                self.cached_sentences.pop(key, None)
+            for name in (entry.audio, entry.phonemes):
+                if name is not None:
+                    self.temporary_cache_dir.joinpath(name).unlink(
+                        missing_ok=True)
+        if removed:
+            self.index.remove(removed)
+            LOG.info("Removed {} sentences from the TTS cache".format(
+                len(removed)))
+        self._report_size(self.index)
+        return removed
+
     def clear(self):
         """Remove all files from the temporary cache."""
         for cache_file_path in self.temporary_cache_dir.iterdir():
@@ -295,8 +621,29 @@ class TextToSpeechCache:
             elif cache_file_path.is_file():
                 cache_file_path.unlink()
 
+    def shutdown(self):
+        """Stop evicting entries and close the index of a persistent cache.
+
+        The cache keeps working without its index, as a temporary cache.
+        """
+        self._stop_event.set()
+        self._curate_event.set()
+        if self._evictor is not None:
+            self._evictor.join()
+            self._evictor = None
+        with self._lock:
+            index, self.index = self.index, None
+        if index is not None:
+            index.close()
+
     def curate(self):
-        """Remove cache data if disk space is running low."""
+        """Remove cache data if disk space is running low.
+
+        A persistent cache is curated when entries are added and by its
+        background thread every curate_interval seconds instead.
+        """
+        if self.persistent:
+            return
         files_removed = curate_cache(self.temporary_cache_dir,
                                      min_free_percent=100)
 
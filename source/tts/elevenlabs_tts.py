@@ -10,6 +10,8 @@ from .tts import TTS, TTSValidator
 
 
 class ElevenLabsTTS(TTS):
+    thread_safe = True
+
     def __init__(self, lang, config):
         super(ElevenLabsTTS, self).__init__(lang, config, ElevenLabsTTSValidator(self))
         self.config = Configuration.get().get("audio").get("tts", {}).get("elevenlabs", {})
@@ -36,6 +38,9 @@ class ElevenLabsTTS(TTS):
         # self.voice.settings.similarity_boost = self.similarity_boost
         # self.type = 'mp3'
 
+    def synthesis_params(self):
+        return {"voice_name": self.voice_name, "model": "eleven_multilingual_v2"}
+
     def get_tts(self, sentence, wav_file):
         audio = generate(
             model="eleven_multilingual_v2", text=sentence, voice=self.voice
@@ -9,12 +9,17 @@ from .tts import TTS, TTSValidator
 
 
 class OpenAITTS(TTS):
+    thread_safe = True
+
     def __init__(self, lang, config):
         super(OpenAITTS, self).__init__(lang, config, OpenAITTSValidator(self))
         self.config = Configuration.get().get("audio").get("tts").get("openai")
         self.api_key = Configuration.get().get("microservices").get("openai_key")
         self.client = OpenAI(api_key=self.api_key)
 
+    def synthesis_params(self):
+        return {"model": self.config.get("model")}
+
     def get_tts(self, sentence, wav_file):
         response = self.client.audio.speech.create(
             model=self.config.get("model", {}),
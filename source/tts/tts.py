@@ -6,8 +6,9 @@ from abc import ABCMeta, abstractmethod
 from copy import deepcopy
 from os.path import dirname, exists, isdir, join
 from pathlib import Path
-from queue import Empty, Queue
-from threading import Thread
+from queue import Empty, Full, Queue
+from threading import Condition, Event, Lock, Thread
+from time import monotonic
 from warnings import warn
 
 # from core.enclosure.api import EnclosureAPI
@@ -16,12 +17,13 @@ from source.configuration import Configuration
 from source.messagebus.message import Message
 from source.util import (check_for_signal, create_signal, play_mp3, play_wav,
                          resolve_resource_file)
+from source.util.audio_utils import AudioOutputSink
 from source.util.file_utils import get_temp_path
 from source.util.log import LOG
 from source.util.metrics import Stopwatch
 from source.util.plugins import load_plugin
 
-from .cache import TextToSpeechCache, hash_sentence
+from .cache import TextToSpeechCache, cache_key, hash_sentence
 
 _TTS_ENV = deepcopy(os.environ)
 _TTS_ENV["PULSE_PROP"] = "media.role=phone"
@@ -51,6 +53,15 @@ def default_preprocess_utterance(utterance):
 class PlaybackThread(Thread):
     """Thread class for playing back tts audio and sending
     viseme data to enclosure.
+
+    Wav files are written to a long lived audio output stream if the
+    "persistent_sink" audio option is enabled, other formats (and wav files
+    if the sink fails) are played using the configured play commands.
+
+    Clearing the queue bumps the playback generation, producers holding the
+    queue_lock can check it to avoid queueing audio from a stopped utterance.
+    Producers waiting for room in the queue wait on queue_changed, which is
+    notified when an item is taken from the queue or the queue is cleared.
     """
 
     def __init__(self, queue):
@@ -65,13 +76,21 @@ class PlaybackThread(Thread):
         self.interrupted_utterance = None
         # self.enclosure = None
         self.p = None
+        self.generation = 0
+        self.queue_lock = Lock()
+        self.queue_changed = Condition(self.queue_lock)
+
+        audio_config = Configuration.get().get("audio", {})
+        if audio_config.get("persistent_sink", False):
+            self.sink = AudioOutputSink()
+        else:
+            self.sink = None
         # Check if the tts shall have a ducking role set
         if Configuration.get().get("tts", {}).get("pulse_duck"):
             self.pulse_env = _TTS_ENV
         else:
             self.pulse_env = None
 
-
     def set_bus(self, bus):
         """Provide bus instance to the TTS Playback thread.
 
@@ -90,8 +109,11 @@ class PlaybackThread(Thread):
 
     def clear_queue(self):
         """Remove all pending playbacks."""
-        while not self.queue.empty():
-            self.queue.get()
+        with self.queue_changed:
+            self.generation += 1
+            while not self.queue.empty():
+                self.queue.get()
+            self.queue_changed.notify_all()
         try:
             self.p.terminate()
         except Exception:
@@ -116,19 +138,16 @@ class PlaybackThread(Thread):
         while not self._terminated:
             try:
                 (snd_type, data, visemes, ident, listen) = self.queue.get(timeout=2)
+                with self.queue_changed:
+                    generation = self.generation
+                    self.queue_changed.notify_all()
                 if not self._processing_queue:
                     self._processing_queue = True
                     self.begin_audio()
 
                 stopwatch = Stopwatch()
                 with stopwatch:
-                    if snd_type == "wav":
-                        self.p = play_wav(data, environment=self.pulse_env)
-                    elif snd_type == "mp3":
-                        self.p = play_mp3(data, environment=self.pulse_env)
-                    if self.p:
-                        self.p.communicate()
-                        self.p.wait()
+                    self._play(snd_type, data, generation)
 
                 if self.queue.empty():
                     self.end_audio(listen)
@@ -142,6 +161,35 @@ class PlaybackThread(Thread):
                     self.end_audio(listen)
                     self._processing_queue = False
 
+    def _play(self, snd_type, data, generation):
+        """Play a queued audio file, blocking until done.
+
+        Args:
+            snd_type (str): 'mp3' or 'wav'
+            data (str): path to the audio file
+            generation (int): playback generation the file was queued in,
+                              playback is interrupted if the queue is cleared
+        """
+        if snd_type == "wav" and self.sink is not None:
+            try:
+                self.sink.play_wav(
+                    data,
+                    lambda: self._terminated or self.generation != generation,
+                )
+                return
+            except Exception:
+                LOG.exception("Audio sink failed, falling back to play_wav")
+                self.sink = None
+
+        self.p = None
+        if snd_type == "wav":
+            self.p = play_wav(data, environment=self.pulse_env)
+        elif snd_type == "mp3":
+            self.p = play_mp3(data, environment=self.pulse_env)
+        if self.p:
+            self.p.communicate()
+            self.p.wait()
+
     # TODO: add dynamic source variable
     def begin_audio(self):
         """Perform befining of speech actions."""
@@ -167,6 +215,9 @@ class PlaybackThread(Thread):
         Args:
             listen (bool): True if listening event should be emitted
         """
+        if self.sink is not None:
+            self.sink.pause()
+
         if self.bus:
             # Send end of speech signals to the system
             context = {
@@ -198,6 +249,8 @@ class PlaybackThread(Thread):
         """Stop thread"""
         self._terminated = True
         self.clear_queue()
+        if self.sink is not None:
+            self.sink.close()
 
 
 class TTS(metaclass=ABCMeta):
@@ -216,6 +269,9 @@ class TTS(metaclass=ABCMeta):
 
     queue = None
     playback = None
+    # Whether get_tts() may synthesize several sentences at once, engines
+    # calling a remote service usually can
+    thread_safe = False
 
     def __init__(
         self,
@@ -241,15 +297,27 @@ class TTS(metaclass=ABCMeta):
         self.interrupted_utterance = None
         random.seed()
 
+        # Live utterances being synthesized, the cache warmup waits for idle
+        self.idle = Event()
+        self.idle.set()
+        self.last_active = 0.0
+        self._live = 0
+        self._live_lock = Lock()
+        self._synthesis_lock = Lock()
+
         if TTS.queue is None:
-            TTS.queue = Queue()
+            audio_config = Configuration.get().get("audio", {})
+            TTS.queue = Queue(maxsize=audio_config.get("tts_lookahead", 2))
             TTS.playback = PlaybackThread(TTS.queue)
             TTS.playback.start()
 
         self.spellings = self.load_spellings()
         self.tts_name = type(self).__name__
-        self.cache = TextToSpeechCache(self.config, self.tts_name, self.audio_ext)
-        self.cache.clear()
+        cache_config = Configuration.get().get("audio", {}).get("tts", {})
+        self.cache = TextToSpeechCache(
+            self.config, self.tts_name, self.audio_ext, cache_config.get("cache")
+        )
+        self.cache.load()
 
     @property
     def available_languages(self) -> set:
@@ -316,6 +384,13 @@ class TTS(metaclass=ABCMeta):
         # self.enclosure = EnclosureAPI(self.bus)
         # TTS.playback.enclosure = self.enclosure
 
+    def shutdown(self):
+        """Release the resources of the engine, e.g. when it's replaced.
+
+        Stops the background eviction of the cache and closes its index.
+        """
+        self.cache.shutdown()
+
     def get_tts(self, sentence, wav_file):
         """Abstract method that a tts implementation needs to implement.
 
@@ -432,64 +507,162 @@ class TTS(metaclass=ABCMeta):
         sentence = self.validate_ssml(sentence)
 
         create_signal("isSpeaking")
-        self._execute(sentence, ident, listen)
+        with self._live_lock:
+            self._live += 1
+            self.idle.clear()
+        try:
+            self._execute(sentence, ident, listen)
+        finally:
+            with self._live_lock:
+                self._live -= 1
+                self.last_active = monotonic()
+                if self._live == 0:
+                    self.idle.set()
 
-    def _execute(self, sentence, ident, listen):
+    def prepare_sentences(self, utterance):
+        """Get the sentences of an utterance as they are synthesized.
+
+        Applies the phonetic spellings and splits the utterance, so the
+        sentences match the keys of the cache.
+
+        Args:
+            utterance (str): utterance to be spoken
+
+        Returns:
+            list: the non-empty sentences
+        """
         if self.phonetic_spelling:
-            for word in re.findall(r"[\w']+", sentence):
+            for word in re.findall(r"[\w']+", utterance):
                 if word.lower() in self.spellings:
-                    sentence = sentence.replace(word, self.spellings[word.lower()])
+                    utterance = utterance.replace(word, self.spellings[word.lower()])
+
+        return [c for c in self.preprocess_utterance(utterance) if c.strip()]
 
-        # TODO: 22.02 This is no longer needed and can be removed
-        # Just kept for compatibility for now
-        chunks = self._preprocess_sentence(sentence)
+    def _execute(self, sentence, ident, listen):
+        # Split into sentences so playback of the first sentence can start
+        # while the following ones are synthesized
+        chunks = self.prepare_sentences(sentence)
         # Apply the listen flag to the last chunk, set the rest to False
         chunks = [
             (chunks[i], listen if i == len(chunks) - 1 else False)
             for i in range(len(chunks))
         ]
 
+        generation = TTS.playback.generation
         for sentence, l in chunks:
-            sentence_hash = hash_sentence(sentence)
-            if sentence_hash in self.cache:
-                audio_file, phoneme_file = self._get_sentence_from_cache(sentence_hash)
+            if TTS.playback.generation != generation:
+                LOG.debug("Playback cleared, skipping remaining sentences")
+                return
+            sentence_hash = self.cache_key(sentence)
+            # Preloaded sentences are cached under the plain hash
+            cached = self.cache.lookup(sentence_hash, hash_sentence(sentence))
+            if cached is not None:
+                audio_file, phoneme_file = cached
+                LOG.info("Found {} in TTS cache".format(audio_file.name))
                 if phoneme_file is None:
                     phonemes = None
                 else:
                     phonemes = phoneme_file.load()
 
             else:
-                audio_file = self.cache.define_audio_file(sentence_hash)
-                # TODO 21.08: remove mutation of audio_file.path.
-                returned_file, phonemes = self.get_tts(sentence, str(audio_file.path))
-                # Convert to Path as needed
-                returned_file = Path(returned_file)
-                if returned_file != audio_file.path:
-                    warn(
-                        DeprecationWarning(
-                            f"{self.tts_name} is saving files "
-                            "to a different path than requested. If you are "
-                            "the maintainer of this plugin, please adhere to "
-                            "the file path argument provided. Modified paths "
-                            "will be ignored in a future release."
-                        )
-                    )
-                    audio_file.path = returned_file
-                if phonemes:
-                    phoneme_file = self.cache.define_phoneme_file(sentence_hash)
-                    phoneme_file.save(phonemes)
-                else:
-                    phoneme_file = None
-                self.cache.cached_sentences[sentence_hash] = (audio_file, phoneme_file)
+                audio_file, phonemes = self.synthesize(sentence, sentence_hash)
             viseme = self.viseme(phonemes) if phonemes else None
-            TTS.queue.put((self.audio_ext, str(audio_file.path), viseme, ident, l))
+            item = (self.audio_ext, str(audio_file.path), viseme, ident, l)
+            if not self._queue_audio(item, generation):
+                LOG.debug("Playback cleared, skipping remaining sentences")
+                return
+
+    def synthesize(self, sentence, sentence_hash=None):
+        """Synthesize a sentence and add it to the cache.
+
+        Engines which aren't thread safe synthesize one sentence at a time.
+
+        Args:
+            sentence (str): sentence as returned by prepare_sentences()
+            sentence_hash (str): key of the sentence in the cache, computed
+                                 if not given
+
+        Returns:
+            tuple: the AudioFile and the phonemes, None if there are none
+        """
+        sentence_hash = sentence_hash or self.cache_key(sentence)
+        audio_file = self.cache.define_audio_file(sentence_hash)
+        # TODO 21.08: remove mutation of audio_file.path.
+        if self.thread_safe:
+            returned_file, phonemes = self.get_tts(sentence, str(audio_file.path))
+        else:
+            with self._synthesis_lock:
+                returned_file, phonemes = self.get_tts(
+                    sentence, str(audio_file.path)
+                )
+        # Convert to Path as needed
+        returned_file = Path(returned_file)
+        if returned_file != audio_file.path:
+            warn(
+                DeprecationWarning(
+                    f"{self.tts_name} is saving files "
+                    "to a different path than requested. If you are "
+                    "the maintainer of this plugin, please adhere to "
+                    "the file path argument provided. Modified paths "
+                    "will be ignored in a future release."
+                )
+            )
+            audio_file.path = returned_file
+        if phonemes:
+            phoneme_file = self.cache.define_phoneme_file(sentence_hash)
+            phoneme_file.save(phonemes)
+        else:
+            phoneme_file = None
+        self.cache.add(sentence_hash, audio_file, phoneme_file)
+        return audio_file, phonemes
+
+    @staticmethod
+    def _queue_audio(item, generation):
+        """Add synthesized audio to the playback queue.
+
+        The playback queue is bounded by the look-ahead, so this blocks while
+        the queue is full to avoid synthesizing too far ahead of playback.
+
+        Args:
+            item (tuple): playback queue entry
+            generation (int): playback generation the utterance started in
+
+        Returns:
+            bool: True if queued, False if playback was cleared meanwhile
+        """
+        with TTS.playback.queue_changed:
+            while True:
+                if TTS.playback.generation != generation:
+                    return False
+                try:
+                    TTS.queue.put_nowait(item)
+                    return True
+                except Full:
+                    TTS.playback.queue_changed.wait()
+
+    def synthesis_params(self):
+        """Parameters of the engine changing the synthesized audio.
+
+        Implementations with settings beyond the voice and language, e.g.
+        the model or speaking rate, should return them so audio synthesized
+        with other settings isn't taken from the cache.
 
-    def _get_sentence_from_cache(self, sentence_hash):
-        cached_sentence = self.cache.cached_sentences[sentence_hash]
-        audio_file, phoneme_file = cached_sentence
-        LOG.info("Found {} in TTS cache".format(audio_file.name))
+        Returns:
+            dict: the parameters, must be JSON serializable
+        """
+        return {}
 
-        return audio_file, phoneme_file
+    def cache_key(self, sentence):
+        """Get the key of the synthesized audio of a sentence in the cache.
+
+        Args:
+            sentence (str): sentence to be spoken
+
+        Returns:
+            str: content hash of the sentence and the synthesis settings
+        """
+        return cache_key(self.tts_name, self.config.get("voice"), self.lang,
+                         sentence, self.synthesis_params())
 
     def viseme(self, phonemes):
         """Create visemes from phonemes.
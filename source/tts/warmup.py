@@ -0,0 +1,156 @@
+"""Warmup of the persistent TTS cache.
+
+Pre-renders the sentences of the dialog files with the active TTS engine, so
+common replies are played from the cache the first time they are spoken.
+
+Sentences are rendered in priority order by a bounded pool of worker
+threads, which only synthesize while the engine is idle: a worker waits
+until no utterance has been spoken for a while before every sentence, so
+the warmup doesn't delay live speech by more than the sentence being
+rendered.  Rendered sentences are added to the cache index right away and
+cached sentences are skipped, so an interrupted warmup continues where it
+stopped on the next start.
+"""
+from collections import Counter
+from pathlib import Path
+from queue import Empty, PriorityQueue
+from threading import Event, Lock, Thread
+from time import monotonic
+
+from source.util.log import LOG
+from source.util.metrics import gauge
+
+from .cache import split_dialog
+
+
+def dialog_sentences(directory):
+    """Count the sentences of the dialog files in a directory.
+
+    A sentence used in many dialogs is more likely to be spoken, so the
+    count is used as its warmup priority.
+
+    Args:
+        directory (str): directory of *.dialog files
+
+    Returns:
+        Counter: occurrences of every sentence
+    """
+    sentences = Counter()
+    for dialog_file_path in sorted(Path(directory).glob("*.dialog")):
+        with open(dialog_file_path) as dialog_file:
+            for dialog in dialog_file:
+                sentences.update(
+                    sentence.strip()
+                    for sentence in split_dialog(dialog.strip())
+                    if sentence.strip()
+                )
+    return sentences
+
+
+class CacheWarmup:
+    """Pre-renders sentences into the cache of a TTS engine.
+
+    Args:
+        tts (TTS): engine to render the sentences with
+        sentences (dict): priority of every sentence to render, higher
+                          priorities are rendered first
+        workers (int): maximum number of sentences rendered at once,
+                       engines which aren't thread safe use one
+        idle_seconds (float): time without live speech before rendering
+        max_sentences (int): render at most this many sentences of the
+                             highest priority
+    """
+
+    def __init__(self, tts, sentences, workers=2, idle_seconds=5.0,
+                 max_sentences=None):
+        self.tts = tts
+        self.workers = workers if tts.thread_safe else 1
+        self.idle_seconds = idle_seconds
+        self.rendered = 0
+        self.failed = 0
+        self._queue = PriorityQueue()
+        self._stop = Event()
+        self._lock = Lock()
+        self._threads = []
+        self._running = 0
+
+        ranked = sorted(sentences.items(), key=lambda item: -item[1])
+        for order, (sentence, priority) in enumerate(
+                ranked[:max_sentences]):
+            # Ties are rendered in the order of the dialog files
+            self._queue.put((-priority, order, sentence))
+        self._pending = gauge("tts.warmup.pending")
+        self._pending.set(self._queue.qsize())
+
+    def start(self):
+        """Start rendering in background threads."""
+        LOG.info("Warming up the TTS cache with {} sentences".format(
+            self._queue.qsize()))
+        self._running = self.workers
+        for i in range(self.workers):
+            thread = Thread(target=self._run, daemon=True,
+                            name="TTSCacheWarmup-{}".format(i))
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop rendering, after the sentences being rendered."""
+        self._stop.set()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                _, _, sentence = self._queue.get_nowait()
+            except Empty:
+                break
+            self._pending.set(self._queue.qsize())
+            if not self._wait_idle():
+                break
+            if self._cache_full():
+                LOG.info("TTS cache is full, stopping the warmup")
+                break
+            self._render(sentence)
+
+        with self._lock:
+            self._running -= 1
+            if self._running == 0:
+                LOG.info("TTS cache warmup ended, {} sentences rendered, "
+                         "{} failed".format(self.rendered, self.failed))
+
+    def _wait_idle(self):
+        """Wait until the engine hasn't spoken for idle_seconds.
+
+        Returns:
+            bool: False if the warmup was stopped meanwhile
+        """
+        while not self._stop.is_set():
+            if not self.tts.idle.wait(timeout=1.0):
+                continue
+            remaining = self.tts.last_active + self.idle_seconds - monotonic()
+            if remaining <= 0:
+                return True
+            self._stop.wait(remaining)
+        return False
+
+    def _cache_full(self):
+        cache = self.tts.cache
+        return cache.index is not None and cache.index.size >= cache.max_bytes
+
+    def _render(self, sentence):
+        for chunk in self.tts.prepare_sentences(sentence):
+            sentence_hash = self.tts.cache_key(chunk)
+            if sentence_hash in self.tts.cache:
+                continue
+            try:
+                self.tts.synthesize(chunk, sentence_hash)
+            except Exception:
+                LOG.exception("Failed to render \"{}\"".format(chunk))
+                with self._lock:
+                    self.failed += 1
+            else:
+                with self._lock:
+                    self.rendered += 1
@@ -23,7 +23,9 @@ from .platform import get_arch, get_enclosure
 from .process_utils import (create_daemon, create_echo_function,
                             reset_sigint_handler, start_message_bus_client,
                             wait_for_exit_signal)
-from .signal import check_for_signal, create_signal, get_ipc_directory
+from .signal import (check_for_signal, clear_signal, create_signal,
+                     get_ipc_directory, wait_for_signal,
+                     wait_for_signal_clear)
 from .string_utils import camel_case_split
 
 # from core.util.format import nice_number
@@ -4,7 +4,9 @@ of audio, recording and listing devices.
 import os
 import re
 import subprocess
+import wave
 from copy import deepcopy
+from threading import Lock
 
 import pyaudio
 
@@ -77,6 +79,94 @@ def _play_cmd(cmd, uri, config, environment):
     return subprocess.Popen(cmdline, env=environment)
 
 
+class AudioOutputSink:
+    """Long lived audio output stream for playing back wav files.
+
+    Starting a player process for every file adds latency and gaps between
+    consecutive files. The sink instead keeps a single pyaudio output stream
+    open and writes the audio to it, the stream is only reopened when the
+    format of the audio changes.
+
+    Args:
+        device_index (int): output device to use, None for the default device
+        block_frames (int): number of frames written at a time, playback can
+                            be interrupted between blocks
+    """
+
+    def __init__(self, device_index=None, block_frames=1024):
+        self.device_index = device_index
+        self.block_frames = block_frames
+        self._audio = None
+        self._stream = None
+        self._format = None
+        self._lock = Lock()
+
+    def _open(self, sample_width, channels, rate):
+        """Make sure the output stream is open with the requested format."""
+        audio_format = (sample_width, channels, rate)
+        if self._stream is not None and audio_format == self._format:
+            if self._stream.is_stopped():
+                self._stream.start_stream()
+            return
+
+        self._close_stream()
+        if self._audio is None:
+            self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(
+            format=self._audio.get_format_from_width(sample_width),
+            channels=channels,
+            rate=rate,
+            output=True,
+            output_device_index=self.device_index,
+        )
+        self._format = audio_format
+
+    def _close_stream(self):
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception:
+                LOG.exception("Failed to close audio output stream")
+        self._stream = None
+        self._format = None
+
+    def play_wav(self, uri, interrupted=None):
+        """Play a wav-file, blocking until it's done.
+
+        Args:
+            uri (str): path of the file to play
+            interrupted (callable): polled between blocks, playback is
+                                    aborted when it returns True
+
+        Returns:
+            bool: True if the file was played completely, False if interrupted
+        """
+        with self._lock, wave.open(str(uri), "rb") as wav:
+            self._open(wav.getsampwidth(), wav.getnchannels(), wav.getframerate())
+            while True:
+                if interrupted and interrupted():
+                    return False
+                frames = wav.readframes(self.block_frames)
+                if not frames:
+                    return True
+                self._stream.write(frames)
+
+    def pause(self):
+        """Stop the output stream while idle, it's restarted on next play."""
+        with self._lock:
+            if self._stream is not None and not self._stream.is_stopped():
+                self._stream.stop_stream()
+
+    def close(self):
+        """Close the output stream and release the audio device."""
+        with self._lock:
+            self._close_stream()
+            if self._audio is not None:
+                self._audio.terminate()
+                self._audio = None
+
+
 def play_wav(uri, environment=None):
     """Play a wav-file.
 
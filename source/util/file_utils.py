@@ -28,6 +28,7 @@ class FileWatcher:
         callback: callable,
         recursive: bool = False,
         ignore_creation: bool = False,
+        track_tree: bool = False,
     ):
         """
         Initialize a FileWatcher to monitor the specified files for changes
@@ -35,16 +36,22 @@ class FileWatcher:
         @param callback: function to call on file change with modified file path
         @param recursive: If true, recursively include directory contents
         @param ignore_creation: If true, ignore file creation events
+        @param track_tree: If true, also call back with created directories
+                           and deleted or moved paths
         """
         self.observer = Observer()
         self.handlers = []
+        report_modified = not _emits_closed_events(self.observer)
         for file_path in files:
             if os.path.isfile(file_path):
                 watch_dir = dirname(file_path)
             else:
                 watch_dir = file_path
             self.observer.schedule(
-                FileEventHandler(file_path, callback, ignore_creation),
+                FileEventHandler(
+                    file_path, callback, ignore_creation, track_tree,
+                    report_modified
+                ),
                 watch_dir,
                 recursive=recursive,
             )
@@ -60,13 +67,27 @@ class FileWatcher:
 
 class FileEventHandler(FileSystemEventHandler):
     def __init__(
-        self, file_path: str, callback: callable, ignore_creation: bool = False
+        self,
+        file_path: str,
+        callback: callable,
+        ignore_creation: bool = False,
+        track_tree: bool = False,
+        report_modified: bool = False,
     ):
         """
         Create a handler for file change events
         @param file_path: file_path being watched Unused(?)
         @param callback: function to call on file change with modified file path
         @param ignore_creation: if True, only track file modification events
+        @param track_tree: if True, call back immediately for created
+                           directories and deleted or moved files and
+                           directories, for moves with both the source and
+                           the destination path. Files created with a new
+                           directory may be written before it's watched.
+        @param report_modified: if True, call back on every creation or
+                                modification instead of waiting for the file
+                                to be closed, for observers which don't
+                                report closed files
         """
         super().__init__()
         self._callback = callback
@@ -75,10 +96,32 @@ class FileEventHandler(FileSystemEventHandler):
             self._events = "modified"
         else:
             self._events = ("created", "modified")
+        self._track_tree = track_tree
+        self._report_modified = report_modified
         self._changed_files = []
         self._lock = RLock()
 
+    def _notify(self, path):
+        try:
+            self._callback(path)
+        except:
+            LOG.exception("An error occurred handling file change event callback")
+
+    def _is_tree_event(self, event):
+        if event.event_type in ("deleted", "moved"):
+            return True
+        return event.is_directory and event.event_type == "created"
+
     def on_any_event(self, event):
+        if self._track_tree and self._is_tree_event(event):
+            # nothing left to be written, report right away
+            with self._lock:
+                if event.src_path in self._changed_files:
+                    self._changed_files.remove(event.src_path)
+                self._notify(event.src_path)
+                if event.event_type == "moved":
+                    self._notify(event.dest_path)
+            return
         if event.is_directory:
             return
         with self._lock:
@@ -86,18 +129,28 @@ class FileEventHandler(FileSystemEventHandler):
                 if event.src_path in self._changed_files:
                     self._changed_files.remove(event.src_path)
                     # fire event, it is now safe
-                    try:
-                        self._callback(event.src_path)
-                    except:
-                        LOG.exception(
-                            "An error occurred handling file " "change event callback"
-                        )
+                    self._notify(event.src_path)
 
             elif event.event_type in self._events:
-                if event.src_path not in self._changed_files:
+                if self._report_modified:
+                    # no closed event will follow
+                    self._notify(event.src_path)
+                elif event.src_path not in self._changed_files:
                     self._changed_files.append(event.src_path)
 
 
+def _emits_closed_events(observer):
+    """Check if an observer reports files being closed after writing.
+
+    Only the inotify observer does, the others report modifications only.
+    """
+    try:
+        from watchdog.observers.inotify import InotifyObserver
+    except ImportError:
+        return False
+    return isinstance(observer, InotifyObserver)
+
+
 # def find_resource(self, res_name, res_dirname=None):
 #         """Find a resource file.
 
@@ -9,24 +9,68 @@ The default log level of the logger created here can ONLY be set in
 
 The default log level can also be programatically be changed by setting the
 LOG.level parameter.
+
+Log calls are cheap when the level is disabled: the caller is found with
+sys._getframe, one logger is kept per module and messages are only formatted
+when written. By default records are handed to a queue and written by a
+background thread, so logging never blocks on the output stream. Pass
+arguments separately (LOG.debug("value: %s", value)) to defer formatting.
 """
 
-import inspect
+import atexit
+import json
 import logging
 import sys
+import traceback
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
 
 import source
 
 
-def _make_log_method(fn):
+def _make_log_method(fn, level, exc_info=None):
     @classmethod
-    def method(cls, *args, **kwargs):
-        cls._log(fn, *args, **kwargs)
+    def method(cls, msg, *args, **kwargs):
+        if exc_info is not None:
+            kwargs.setdefault("exc_info", exc_info)
+        cls._log(level, msg, args, **kwargs)
 
     method.__func__.__doc__ = fn.__doc__
     return method
 
 
+class JsonFormatter(logging.Formatter):
+    """Format log records as JSON lines."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "name": record.name,
+            "function": record.funcName,
+            "line": record.lineno,
+            "process": record.process,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class _LazyQueueHandler(QueueHandler):
+    """Queue handler leaving the formatting to the writer thread.
+
+    The records never leave the process, so unlike the standard QueueHandler
+    the message doesn't need to be formatted before it's queued.
+    """
+
+    def prepare(self, record):
+        return record
+
+
 class LOG:
     """
     Custom logger class that acts like logging.Logger
@@ -40,16 +84,19 @@ class LOG:
     """
 
     _custom_name = None
+    _loggers = {}
+    _module_names = {}
+    _listener = None
     handler = None
     level = logging.getLevelName("INFO")
 
     # Copy actual logging methods from logging.Logger
     # Usage: LOG.debug(message)
-    debug = _make_log_method(logging.Logger.debug)
-    info = _make_log_method(logging.Logger.info)
-    warning = _make_log_method(logging.Logger.warning)
-    error = _make_log_method(logging.Logger.error)
-    exception = _make_log_method(logging.Logger.exception)
+    debug = _make_log_method(logging.Logger.debug, logging.DEBUG)
+    info = _make_log_method(logging.Logger.info, logging.INFO)
+    warning = _make_log_method(logging.Logger.warning, logging.WARNING)
+    error = _make_log_method(logging.Logger.error, logging.ERROR)
+    exception = _make_log_method(logging.Logger.exception, logging.ERROR, True)
 
     @classmethod
     def init(cls):
@@ -57,59 +104,121 @@ class LOG:
         the required handlers.
         """
         log_message_format = (
-            "{asctime} | {levelname:8} | {name} | {message} | {process:5} |"
+            "{asctime} | {levelname:8} | {name}:{funcName}:{lineno} | "
+            "{message} | {process:5} |"
         )
 
-        formatter = logging.Formatter(log_message_format, style="{")
-        formatter.default_msec_format = "%s.%03d"
-        cls.handler = logging.StreamHandler(sys.stdout)
-        cls.handler.setFormatter(formatter)
-
         config = source.configuration.Configuration.get()
-        if config.get("log_format"):
-            formatter = logging.Formatter(config.get("log_format"), style="{")
-            cls.handler.setFormatter(formatter)
+        if config.get("log_json"):
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(
+                config.get("log_format") or log_message_format, style="{"
+            )
+        formatter.default_msec_format = "%s.%03d"
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(formatter)
+
+        cls._stop_listener()
+        if config.get("log_async", True):
+            queue = SimpleQueue()
+            cls._listener = QueueListener(queue, stream_handler)
+            cls._listener.start()
+            cls._set_handler(_LazyQueueHandler(queue))
+        else:
+            cls._set_handler(stream_handler)
 
         cls.level = logging.getLevelName(config.get("log_level", "INFO"))
 
         # Enable logging in external modules
         cls.create_logger("").setLevel(cls.level)
 
+    @classmethod
+    def flush(cls):
+        """Wait until all queued records are written."""
+        if cls._listener is not None:
+            cls._listener.stop()
+            cls._listener.start()
+
+    @classmethod
+    def _stop_listener(cls):
+        """Write out all queued records and stop the writer thread."""
+        if cls._listener is not None:
+            cls._listener.stop()
+            cls._listener = None
+
+    @classmethod
+    def _set_handler(cls, handler):
+        """Replace the handler of all loggers created so far."""
+        previous = cls.handler
+        cls.handler = handler
+        for logger in list(cls._loggers.values()):
+            if previous is not None:
+                logger.removeHandler(previous)
+            logger.addHandler(handler)
+
     @classmethod
     def create_logger(cls, name):
-        logger = logging.getLogger(name)
-        logger.propagate = False
-        logger.addHandler(cls.handler)
+        logger = cls._loggers.get(name)
+        if logger is None:
+            logger = logging.getLogger(name)
+            logger.propagate = False
+            if cls.handler is not None:
+                logger.addHandler(cls.handler)
+            cls._loggers[name] = logger
         return logger
 
     def __init__(self, name):
         LOG._custom_name = name
 
     @classmethod
-    def _log(cls, func, *args, **kwargs):
+    def _log(cls, level, msg, args, exc_info=None, extra=None,
+             stack_info=False, stacklevel=1):
+        # Stack:
+        # [0] - _log()
+        # [1] - debug(), info(), warning(), or error()
+        # [2] - caller
+        try:
+            frame = sys._getframe(1 + stacklevel)
+            code = frame.f_code
+        except ValueError:
+            frame = code = None
+
         if cls._custom_name is not None:
             name = cls._custom_name
             cls._custom_name = None
+        elif code is not None:
+            name = cls._module_names.get(code)
+            if name is None:
+                name = frame.f_globals.get("__name__", "")
+                cls._module_names[code] = name
         else:
-            # Stack:
-            # [0] - _log()
-            # [1] - debug(), info(), warning(), or error()
-            # [2] - caller
-            try:
-                stack = inspect.stack()
-
-                # Record:
-                # [0] - frame object
-                # [1] - filename
-                # [2] - line number
-                # [3] - function
-                # ...
-                record = stack[2]
-                mod = inspect.getmodule(record[0])
-                module_name = mod.__name__ if mod else ""
-                name = module_name + ":" + record[3] + ":" + str(record[2])
-            except Exception:
-                # The location couldn't be determined
-                name = "core"
-
-        func(cls.create_logger(name), *args, **kwargs)
+            # The location couldn't be determined
+            name = "core"
+
+        logger = cls._loggers.get(name) or cls.create_logger(name)
+        if not logger.isEnabledFor(level):
+            return
+
+        if code is not None:
+            filename, lineno, func = code.co_filename, frame.f_lineno, code.co_name
+        else:
+            filename, lineno, func = "(unknown file)", 0, "(unknown function)"
+        if exc_info:
+            if isinstance(exc_info, BaseException):
+                exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
+            elif not isinstance(exc_info, tuple):
+                exc_info = sys.exc_info()
+        sinfo = None
+        if stack_info and frame is not None:
+            sinfo = "Stack (most recent call last):\n" + "".join(
+                traceback.format_stack(frame)
+            ).rstrip("\n")
+
+        record = logger.makeRecord(
+            name, level, filename, lineno, msg, args, exc_info, func, extra, sinfo
+        )
+        logger.handle(record)
+
+
+atexit.register(LOG._stop_listener)
@@ -1,4 +1,6 @@
 import time
+from collections import deque
+from threading import Lock
 
 
 class Stopwatch:
@@ -49,3 +51,111 @@ class Stopwatch:
             return str(self.time or cur_time - self.timestamp)
         else:
             return "Not started"
+
+
+class Histogram:
+    """Distribution of measured values, such as latencies.
+
+    Keeps a count and sum of all values and a window of the most recent
+    values to compute percentiles from.
+
+    Args:
+        name (str): name of the metric
+        window (int): number of recent values kept for percentiles
+    """
+
+    def __init__(self, name, window=1000):
+        self.name = name
+        self.count = 0
+        self.sum = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = Lock()
+
+    def observe(self, value):
+        """Add a measured value."""
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self._recent.append(value)
+
+    def percentile(self, percent):
+        """Get a percentile of the recent values, None if there are none."""
+        with self._lock:
+            values = sorted(self._recent)
+        if not values:
+            return None
+        index = min(len(values) - 1, int(len(values) * percent / 100))
+        return values[index]
+
+    def snapshot(self):
+        """Get a dict summarizing the metric."""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+        }
+
+
+class Gauge:
+    """Current value of a measurement, such as an estimated noise level.
+
+    Args:
+        name (str): name of the metric
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.value = None
+
+    def set(self, value):
+        """Replace the current value."""
+        self.value = value
+
+    def snapshot(self):
+        """Get a dict summarizing the metric."""
+        return {"value": self.value}
+
+
+_metrics = {}
+_metrics_lock = Lock()
+
+
+def histogram(name, window=1000):
+    """Get the histogram with the given name, creating it if needed.
+
+    Args:
+        name (str): name of the metric, e.g. "intent.converse_latency"
+        window (int): number of recent values kept for percentiles
+
+    Returns:
+        Histogram: the metric
+    """
+    with _metrics_lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = Histogram(name, window)
+        return metric
+
+
+def gauge(name):
+    """Get the gauge with the given name, creating it if needed.
+
+    Args:
+        name (str): name of the metric, e.g. "listener.noise_floor"
+
+    Returns:
+        Gauge: the metric
+    """
+    with _metrics_lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = Gauge(name)
+        return metric
+
+
+def get_metrics():
+    """Get snapshots of all metrics of this process keyed by name."""
+    with _metrics_lock:
+        metrics = list(_metrics.values())
+    return {metric.name: metric.snapshot() for metric in metrics}
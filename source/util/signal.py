@@ -1,11 +1,48 @@
+"""Named signals shared between the core processes.
+
+Signals live in a small memory mapped page in the IPC directory. Setting,
+checking and clearing a signal is a memory access guarded by a file lock,
+no files are created or removed, so signals can be checked in tight loops
+such as the audio recording loop.
+
+Processes can block until a signal is set or cleared. Every waiting thread
+reads from its own named pipe in the "signals.waiters" directory next to the
+page, and every change of a signal writes a byte to each of these pipes, so
+waiters are woken up by changes made in any process without polling.
+"""
+import errno
+import fcntl
+import itertools
+import mmap
 import os
 import os.path
+import select
+import struct
 import tempfile
+import threading
 import time
+from threading import Condition, Lock, RLock
 
 import source
 
-from .file_utils import create_file, ensure_directory_exists
+from .file_utils import ensure_directory_exists
+from .log import LOG
+
+SIGNAL_PAGE_NAME = "signals"
+MAX_SIGNALS = 64
+MAX_NAME_LENGTH = 48
+
+_HEADER = struct.Struct("=4sIQ")  # magic, version, change counter
+_SLOT = struct.Struct("=48sd8x")  # name, time the signal was set
+_MAGIC = b"SIG1"
+_VERSION = 1
+_PAGE_SIZE = _HEADER.size + MAX_SIGNALS * _SLOT.size
+
+# Waiters are woken up through their pipe, they only recheck the signal this
+# often in case a wakeup is lost, e.g. when a writer dies mid change
+_WAIT_INTERVAL = 1.0
+
+_ipc_directory = None
 
 
 def get_ipc_directory(domain=None):
@@ -14,6 +51,8 @@ def get_ipc_directory(domain=None):
     Files in this folder can be accessed by different processes on the
     machine.  Useful for communication.  This is often a small RAM disk.
 
+    The location is read from the configuration once and then reused.
+
     Args:
         domain (str): The IPC domain.  Basically a subdirectory to prevent
             overlapping signal filenames.
@@ -21,35 +60,334 @@ def get_ipc_directory(domain=None):
     Returns:
         str: a path to the IPC directory
     """
-    config = source.configuration.Configuration.get()
-    dir = config.get("ipc_path")
-    if not dir:
-        # If not defined, use /tmp/core/ipc
-        dir = os.path.join(tempfile.gettempdir(), "core", "ipc")
-    return ensure_directory_exists(dir, domain)
+    global _ipc_directory
+    if _ipc_directory is None:
+        config = source.configuration.Configuration.get()
+        dir = config.get("ipc_path")
+        if not dir:
+            # If not defined, use /tmp/core/ipc
+            dir = os.path.join(tempfile.gettempdir(), "core", "ipc")
+        _ipc_directory = dir
+    return ensure_directory_exists(_ipc_directory, domain)
+
+
+class SignalPage:
+    """Memory mapped table of named signals.
+
+    The page starts with a header holding a counter incremented on every
+    change, followed by fixed size slots storing the name of a signal and
+    the time it was set. Modifications are serialized between processes with
+    flock and between threads with a lock. Each process keeps an index of
+    the slots which is only rebuilt when the change counter moved. Waiters
+    are woken up through the pipes in the waiters directory.
+
+    Args:
+        path (str): file backing the page
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self.condition = Condition(RLock())
+        self.waiters_dir = path + ".waiters"
+        self._index = {}
+        self._index_changes = None
+        ensure_directory_exists(os.path.dirname(path))
+        ensure_directory_exists(self.waiters_dir)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        with self._locked():
+            if os.fstat(self._fd).st_size < _PAGE_SIZE:
+                os.ftruncate(self._fd, _PAGE_SIZE)
+            self._map = mmap.mmap(self._fd, _PAGE_SIZE)
+            magic, version, _ = _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC or version != _VERSION:
+                self._map[:_PAGE_SIZE] = bytes(_PAGE_SIZE)
+                _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, 0)
+
+    def __del__(self):
+        if getattr(self, "_fd", None) is not None:
+            os.close(self._fd)
+
+    def _locked(self):
+        return _FileLock(self._fd)
+
+    @property
+    def removed(self):
+        """True if the file of the page was deleted, e.g. by a cleanup of the
+        temporary directory, other processes use a new page then."""
+        return os.fstat(self._fd).st_nlink == 0
+
+    @property
+    def changes(self):
+        """Number of modifications made to the page by any process."""
+        return _HEADER.unpack_from(self._map, 0)[2]
+
+    def _find(self, name):
+        changes = self.changes
+        if changes != self._index_changes:
+            # Rebuild the local index of set signals after any modification
+            self._index = {}
+            for i in range(MAX_SIGNALS):
+                offset = _HEADER.size + i * _SLOT.size
+                slot_name, created = _SLOT.unpack_from(self._map, offset)
+                if created:
+                    self._index[slot_name] = (offset, created)
+            self._index_changes = changes
+        return self._index.get(name, (None, 0.0))
+
+    def _changed(self):
+        magic, version, changes = _HEADER.unpack_from(self._map, 0)
+        _HEADER.pack_into(self._map, 0, magic, version, changes + 1)
+        self.condition.notify_all()
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        """Write a wakeup to the pipe of every waiter, in any process."""
+        try:
+            names = os.listdir(self.waiters_dir)
+        except OSError:
+            return
+        for name in names:
+            fifo = os.path.join(self.waiters_dir, name)
+            try:
+                fd = os.open(fifo, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as e:
+                # Nobody reads the pipe, remove it if its waiter died
+                if e.errno == errno.ENXIO and not _process_exists(name):
+                    _unlink(fifo)
+                continue
+            try:
+                os.write(fd, b"\0")
+            except OSError:
+                pass  # The pipe is full of wakeups already
+            finally:
+                os.close(fd)
+
+    def set(self, name):
+        """Set a signal, refreshing its creation time if already set.
+
+        Returns:
+            bool: False if there's no free slot for the signal
+        """
+        with self.condition, self._locked():
+            offset, _ = self._find(name)
+            if offset is None:
+                for i in range(MAX_SIGNALS):
+                    free = _HEADER.size + i * _SLOT.size
+                    if not _SLOT.unpack_from(self._map, free)[1]:
+                        offset = free
+                        break
+                else:
+                    return False
+            _SLOT.pack_into(self._map, offset, name, time.time())
+            self._changed()
+            return True
+
+    def clear(self, name):
+        """Clear a signal.
+
+        Returns:
+            bool: True if the signal was set
+        """
+        with self.condition, self._locked():
+            return self._clear(name)
+
+    def _clear(self, name):
+        offset, _ = self._find(name)
+        if offset is None:
+            return False
+        _SLOT.pack_into(self._map, offset, b"", 0.0)
+        self._changed()
+        return True
+
+    def check(self, name, sec_lifetime):
+        """Check a signal, consuming or expiring it as requested.
+
+        See check_for_signal() for the meaning of sec_lifetime.
+        """
+        with self.condition, self._locked():
+            offset, created = self._find(name)
+            if offset is None:
+                return False
+            if sec_lifetime == 0:
+                self._clear(name)
+            elif sec_lifetime == -1:
+                return True
+            elif int(created + sec_lifetime) < int(time.time()):
+                self._clear(name)
+                return False
+            return True
+
+    def wait(self, name, is_set, sec_lifetime=-1, timeout=None):
+        """Wait until a signal is set or cleared.
+
+        Blocks on a pipe written to on every change of a signal, in this or
+        another process.
+
+        Args:
+            name (bytes): encoded signal name
+            is_set (bool): True to wait for the signal to be set, False to
+                           wait for it to be cleared
+            sec_lifetime (int): lifetime of the signal, see check_for_signal()
+            timeout (float): seconds to wait at most, None to wait forever
+
+        Returns:
+            bool: True if the signal reached the requested state
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # The pipe exists before checking, so no change is missed in between
+        with _WaitPipe(self.waiters_dir) as pipe:
+            while True:
+                if self.check(name, sec_lifetime) == is_set:
+                    return True
+                interval = _WAIT_INTERVAL
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    interval = min(interval, remaining)
+                pipe.wait(interval)
+
+
+class _WaitPipe:
+    """Named pipe a waiting thread is woken up through.
+
+    The pipe is named after the process id, so pipes left behind by a
+    process which died are removed by the next writer.
+    """
+
+    _ids = itertools.count()
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, "{}.{}.{}".format(
+            os.getpid(), threading.get_ident(), next(self._ids)))
+        self._read_fd = None
+        self._write_fd = None
+
+    def __enter__(self):
+        os.mkfifo(self.path, 0o666)
+        self._read_fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        # Keep a writer open, without one the pipe reads as end of file
+        # and select() returns immediately once a writer closed it
+        self._write_fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+        return self
+
+    def wait(self, timeout):
+        """Wait for a wakeup, at most timeout seconds."""
+        readable, _, _ = select.select([self._read_fd], [], [], timeout)
+        if readable:
+            try:
+                os.read(self._read_fd, 4096)
+            except BlockingIOError:
+                pass
+
+    def __exit__(self, *args):
+        _unlink(self.path)
+        os.close(self._write_fd)
+        os.close(self._read_fd)
+
+
+def _process_exists(pipe_name):
+    try:
+        os.kill(int(pipe_name.split(".")[0]), 0)
+    except ProcessLookupError:
+        return False
+    except (ValueError, PermissionError):
+        pass
+    return True
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class _FileLock:
+    def __init__(self, fd):
+        self.fd = fd
+
+    def __enter__(self):
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *args):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+
+_page = None
+_page_lock = Lock()
+
+
+def _get_page():
+    """Get the signal page of this process.
+
+    The page is reopened after a fork and after its file was deleted.
+    """
+    global _page
+    page = _page
+    if page is None or page.pid != os.getpid() or page.removed:
+        with _page_lock:
+            if (_page is None or _page.pid != os.getpid()
+                    or _page.removed):
+                path = os.path.join(get_ipc_directory(), SIGNAL_PAGE_NAME)
+                _page = SignalPage(path)
+            page = _page
+    return page
+
+
+def _encode(signal_name):
+    """Encode a signal name for the signal page.
+
+    Returns:
+        bytes: padded name, None if the name doesn't fit in a slot
+    """
+    name = signal_name.encode("utf-8")
+    if len(name) > MAX_NAME_LENGTH:
+        LOG.error("Signal name {} longer than {} bytes".format(
+            signal_name, MAX_NAME_LENGTH))
+        return None
+    return name.ljust(MAX_NAME_LENGTH, b"\0")
 
 
 def create_signal(signal_name):
     """Create a named signal
 
     Args:
-        signal_name (str): The signal's name.  Must only contain characters
-            valid in filenames.
+        signal_name (str): The signal's name, at most 48 bytes.
+
+    Returns:
+        bool: True if the signal was set
     """
+    name = _encode(signal_name)
+    if name is None:
+        return False
     try:
-        path = os.path.join(get_ipc_directory(), "signal", signal_name)
-        create_file(path)
-        return os.path.isfile(path)
+        return _get_page().set(name)
     except IOError:
         return False
 
 
+def clear_signal(signal_name):
+    """Clear a named signal
+
+    Args:
+        signal_name (str): The signal's name.
+
+    Returns:
+        bool: True if the signal was set before clearing it
+    """
+    name = _encode(signal_name)
+    if name is None:
+        return False
+    return _get_page().clear(name)
+
+
 def check_for_signal(signal_name, sec_lifetime=0):
     """See if a named signal exists
 
     Args:
-        signal_name (str): The signal's name.  Must only contain characters
-            valid in filenames.
+        signal_name (str): The signal's name.
         sec_lifetime (int, optional): How many seconds the signal should
             remain valid.  If 0 or not specified, it is a single-use signal.
             If -1, it never expires.
@@ -57,18 +395,43 @@ def check_for_signal(signal_name, sec_lifetime=0):
     Returns:
         bool: True if the signal is defined, False otherwise
     """
-    path = os.path.join(get_ipc_directory(), "signal", signal_name)
-    if os.path.isfile(path):
-        if sec_lifetime == 0:
-            # consume this single-use signal
-            os.remove(path)
-        elif sec_lifetime == -1:
-            return True
-        elif int(os.path.getctime(path) + sec_lifetime) < int(time.time()):
-            # remove once expired
-            os.remove(path)
-            return False
-        return True
+    name = _encode(signal_name)
+    if name is None:
+        return False
+    return _get_page().check(name, sec_lifetime)
+
+
+def wait_for_signal(signal_name, timeout=None, sec_lifetime=-1):
+    """Block until a named signal is set
+
+    The signal isn't consumed unless sec_lifetime is 0.
 
-    # No such signal exists
-    return False
+    Args:
+        signal_name (str): The signal's name.
+        timeout (float, optional): Seconds to wait, None waits forever.
+        sec_lifetime (int, optional): Lifetime as in check_for_signal().
+
+    Returns:
+        bool: True if the signal was set, False on timeout
+    """
+    name = _encode(signal_name)
+    if name is None:
+        return False
+    return _get_page().wait(name, True, sec_lifetime, timeout)
+
+
+def wait_for_signal_clear(signal_name, timeout=None, sec_lifetime=-1):
+    """Block until a named signal is cleared (or expired)
+
+    Args:
+        signal_name (str): The signal's name.
+        timeout (float, optional): Seconds to wait, None waits forever.
+        sec_lifetime (int, optional): Lifetime as in check_for_signal().
+
+    Returns:
+        bool: True if the signal is clear, False on timeout
+    """
+    name = _encode(signal_name)
+    if name is None:
+        return True  # Such a signal can't be set
+    return _get_page().wait(name, False, sec_lifetime, timeout)
@@ -0,0 +1,123 @@
+"""Microbenchmark of the listener audio buffers.
+
+Compares the preallocated CyclicAudioBuffer against the previous
+implementation concatenating and re-slicing bytes on every append, for the
+two ways the listener uses it:
+
+    wakeword: a sliding window of the last 3 seconds of audio, with the
+              window read every 0.2 seconds.
+    phrase:   recording a complete phrase and exporting it for STT.
+
+Usage:
+    python -m test.benchmarks.audio_buffer [--seconds 10 30 60]
+"""
+import argparse
+import time
+
+from source.client.listener.data_structures import CyclicAudioBuffer
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+CHUNK_FRAMES = 160  # MutableMicrophone default, 10 ms of audio
+CHUNK = b'\x01\x02' * CHUNK_FRAMES
+WW_SECONDS = 3
+SEC_BETWEEN_WW_CHECKS = 0.2
+
+
+class LegacyCyclicAudioBuffer:
+    """The bytes based buffer used before the preallocated ring buffer."""
+    def __init__(self, size, initial_data):
+        self.size = size
+        self._buffer = initial_data[-size:]
+
+    def append(self, data):
+        buff = self._buffer + data
+        if len(buff) > self.size:
+            buff = buff[-self.size:]
+        self._buffer = buff
+
+    def get_last(self, size):
+        return self._buffer[-size:]
+
+
+def seconds_to_bytes(seconds):
+    return int(seconds * SAMPLE_RATE) * SAMPLE_WIDTH
+
+
+def num_chunks(seconds):
+    return int(seconds * SAMPLE_RATE / CHUNK_FRAMES)
+
+
+def bench_wakeword_legacy(seconds):
+    size = seconds_to_bytes(WW_SECONDS)
+    buff = LegacyCyclicAudioBuffer(size, b'\0' * 320)
+    check_every = int(SEC_BETWEEN_WW_CHECKS * SAMPLE_RATE / CHUNK_FRAMES)
+    for i in range(num_chunks(seconds)):
+        buff.append(CHUNK)
+        if i % check_every == 0:
+            buff.get_last(size)
+
+
+def bench_wakeword_ring(seconds):
+    size = seconds_to_bytes(WW_SECONDS)
+    buff = CyclicAudioBuffer(size, b'\0' * 320)
+    check_every = int(SEC_BETWEEN_WW_CHECKS * SAMPLE_RATE / CHUNK_FRAMES)
+    for i in range(num_chunks(seconds)):
+        buff.append(CHUNK)
+        if i % check_every == 0:
+            buff.view_last(size)
+
+
+def bench_phrase_legacy(seconds):
+    byte_data = b'\0' * SAMPLE_WIDTH
+    for _ in range(num_chunks(seconds)):
+        byte_data += CHUNK
+    return byte_data
+
+
+def bench_phrase_ring(seconds):
+    chunks = num_chunks(seconds)
+    byte_data = CyclicAudioBuffer(
+        SAMPLE_WIDTH * (1 + chunks * CHUNK_FRAMES), b'\0' * SAMPLE_WIDTH
+    )
+    for _ in range(chunks):
+        byte_data.append(CHUNK)
+    return byte_data.get()
+
+
+def timeit(func, seconds, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(seconds)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--seconds', type=float, nargs='+',
+                        default=[10, 20, 30, 60],
+                        help='Lengths of audio to process')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of runs, the best one is reported')
+    args = parser.parse_args()
+
+    print('{:10} {:>8} {:>12} {:>12} {:>8}'.format(
+        'case', 'seconds', 'legacy (ms)', 'ring (ms)', 'speedup'))
+    cases = [
+        ('wakeword', bench_wakeword_legacy, bench_wakeword_ring),
+        ('phrase', bench_phrase_legacy, bench_phrase_ring),
+    ]
+    for name, legacy, ring in cases:
+        for seconds in args.seconds:
+            legacy_time = timeit(legacy, seconds, args.repeat)
+            ring_time = timeit(ring, seconds, args.repeat)
+            print('{:10} {:>8.0f} {:>12.2f} {:>12.2f} {:>7.1f}x'.format(
+                name, seconds, legacy_time * 1000, ring_time * 1000,
+                legacy_time / ring_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Microbenchmark of the listener signal processing helpers.
+
+Compares the numpy helpers in source.client.listener.dsp against the
+audioop code they replaced, for the chunk sizes used by the listener.
+
+    rms:       RMS of a chunk, computed for each microphone chunk
+    debiased:  debiased energy, computed by the silence detector
+    zcr:       zero crossing rate (no audioop counterpart)
+    frames:    RMS of every chunk of one second of audio at once, per chunk
+    rolling:   adding a sample to the rolling energy mean
+
+Usage:
+    python -m test.benchmarks.dsp [--sizes 160 480 1024 4096]
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+from source.client.listener import dsp
+from source.client.listener.data_structures import RollingMean
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', DeprecationWarning)
+    try:
+        import audioop
+    except ImportError:  # Python 3.13
+        audioop = None
+
+
+def legacy_debiased_energy(audio_data):
+    energy = -audioop.rms(audio_data, 2)
+    energy_bytes = bytes([energy & 0xFF, (energy >> 8) & 0xFF])
+    return audioop.rms(
+        audioop.add(audio_data, energy_bytes * (len(audio_data) // 2), 2), 2
+    )
+
+
+class LegacyRollingMean:
+    """The rolling mean before it was backed by a numpy ring buffer."""
+    def __init__(self, mean_samples):
+        self.num_samples = mean_samples
+        self.samples = []
+        self.value = None
+        self.replace_pos = 0
+
+    def append_sample(self, sample):
+        sample = float(sample)
+        current_len = len(self.samples)
+        if current_len < self.num_samples:
+            self.samples.append(sample)
+            if self.value is not None:
+                avgsum = self.value * current_len + sample
+                self.value = avgsum / (current_len + 1)
+            else:
+                self.value = sample
+        else:
+            replace_val = self.samples[self.replace_pos]
+            self.value -= replace_val / self.num_samples
+            self.value += sample / self.num_samples
+            self.samples[self.replace_pos] = sample
+            self.replace_pos = (self.replace_pos + 1) % self.num_samples
+
+
+def bench(func, chunks, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for chunk in chunks:
+            func(chunk)
+    return (time.perf_counter() - start) / (repeat * len(chunks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[160, 480, 1024, 4096],
+                        help='Chunk sizes in samples')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print('{:10} {:>7} {:>14} {:>14} {:>8}'.format(
+        'case', 'samples', 'audioop (us)', 'numpy (us)', 'speedup'))
+
+    def row(name, size, legacy_time, new_time):
+        if legacy_time is None:
+            print('{:10} {:>7} {:>14} {:>14.2f} {:>8}'.format(
+                name, size, '-', new_time * 1e6, '-'))
+        else:
+            print('{:10} {:>7} {:>14.2f} {:>14.2f} {:>7.1f}x'.format(
+                name, size, legacy_time * 1e6, new_time * 1e6,
+                legacy_time / new_time))
+
+    def legacy_bench(func, chunks):
+        return bench(func, chunks, args.repeat) if audioop else None
+
+    for size in args.sizes:
+        chunks = [
+            rng.normal(0, 3000, size).astype(np.int16).tobytes()
+            for _ in range(10)
+        ]
+        rms_time = legacy_bench(lambda chunk: audioop.rms(chunk, 2), chunks)
+        row('rms', size, rms_time, bench(dsp.rms, chunks, args.repeat))
+        row('debiased', size, legacy_bench(legacy_debiased_energy, chunks),
+            bench(dsp.debiased_energy, chunks, args.repeat))
+        row('zcr', size, None,
+            bench(dsp.zero_crossing_rate, chunks, args.repeat))
+
+        second = b''.join(chunks * (16000 // (size * 10) + 1))
+        frame_time = bench(lambda audio: dsp.frame_rms(audio, size),
+                           [second], args.repeat)
+        row('frames', size, rms_time,
+            frame_time / (len(second) // (2 * size)))
+
+    energies = rng.normal(1000, 100, 1000).tolist()
+    samples = int(5 / 0.01)  # 5 s of 10 ms chunks, as the listener
+    row('rolling', 1,
+        bench(LegacyRollingMean(samples).append_sample, energies,
+              args.repeat),
+        bench(RollingMean(samples).append_sample, energies, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Microbenchmark of the LOG logging calls.
+
+Compares the per call cost of LOG against the previous implementation
+looking up the caller with inspect.stack() and attaching the handler on
+every call.
+
+    disabled: a debug call while the log level is INFO, as in hot loops.
+    enabled:  an info call written to a discarding stream.
+
+Usage:
+    python -m test.benchmarks.log [--calls 2000]
+"""
+import argparse
+import inspect
+import io
+import logging
+import time
+
+from source.util.log import LOG
+
+
+class LegacyLOG:
+    """The LOG implementation before the caller lookup was cached."""
+    handler = None
+
+    @classmethod
+    def init(cls, stream):
+        cls.handler = logging.StreamHandler(stream)
+        cls.handler.setFormatter(logging.Formatter(
+            "{asctime} | {levelname:8} | {name} | {message} | {process:5} |",
+            style="{"))
+
+    @classmethod
+    def create_logger(cls, name):
+        logger = logging.getLogger(name)
+        logger.propagate = False
+        logger.addHandler(cls.handler)
+        return logger
+
+    @classmethod
+    def _log(cls, func, *args, **kwargs):
+        try:
+            stack = inspect.stack()
+            record = stack[2]
+            mod = inspect.getmodule(record[0])
+            module_name = mod.__name__ if mod else ""
+            name = module_name + ":" + record[3] + ":" + str(record[2])
+        except Exception:
+            name = "core"
+        func(cls.create_logger(name), *args, **kwargs)
+
+    @classmethod
+    def debug(cls, *args, **kwargs):
+        cls._log(logging.Logger.debug, *args, **kwargs)
+
+    @classmethod
+    def info(cls, *args, **kwargs):
+        cls._log(logging.Logger.info, *args, **kwargs)
+
+
+class NullStream(io.TextIOBase):
+    def write(self, text):
+        return len(text)
+
+
+def bench(log_call, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        log_call('benchmark message %d', i)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--calls', type=int, default=2000,
+                        help='Number of log calls per case')
+    args = parser.parse_args()
+
+    stream = NullStream()
+    LegacyLOG.init(stream)
+    LOG.init()
+    if LOG._listener is not None:
+        LOG._listener.handlers[0].setStream(stream)
+    else:
+        LOG.handler.setStream(stream)
+    logging.getLogger().setLevel(logging.INFO)
+
+    print('{:10} {:>14} {:>14} {:>8}'.format(
+        'case', 'legacy (us)', 'LOG (us)', 'speedup'))
+    cases = [
+        ('disabled', LegacyLOG.debug, LOG.debug),
+        ('enabled', LegacyLOG.info, LOG.info),
+    ]
+    for name, legacy, new in cases:
+        legacy_time = bench(legacy, args.calls)
+        new_time = bench(new, args.calls)
+        LOG.flush()
+        print('{:10} {:>14.2f} {:>14.2f} {:>7.1f}x'.format(
+            name, legacy_time * 1e6, new_time * 1e6, legacy_time / new_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Load benchmark of the messagebus server.
+
+Starts the messagebus server in a separate process, connects N clients and
+sends M messages per second from one more client. Reports the CPU time used
+by the server and the latency from sending a message until each receiving
+client has parsed it.
+
+    broadcast:  all clients receive every message, as clients unaware of
+                subscriptions do.
+    subscribed: only --receivers clients subscribe to the benchmark message,
+                the others subscribe to an unrelated message type.
+
+Latency is measured on the same --receivers clients in both modes.
+
+Usage:
+    python -m test.benchmarks.messagebus_load [--clients 20] [--rate 200]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import statistics
+import time
+from threading import Thread
+
+import psutil
+from tornado import web
+from websocket import create_connection
+
+from source.messagebus.message import Message
+from source.messagebus.service.event_handler import MessageBusEventHandler
+
+HOST = "127.0.0.1"
+ROUTE = "/core"
+BENCH_TYPE = "bench.message"
+
+
+def serve(port):
+    async def _serve():
+        app = web.Application([(ROUTE, MessageBusEventHandler)])
+        app.listen(port, HOST)
+        await asyncio.Event().wait()
+
+    asyncio.run(_serve())
+
+
+def wait_for_server(url, timeout=10):
+    end = time.monotonic() + timeout
+    while True:
+        try:
+            return create_connection(url)
+        except ConnectionError:
+            if time.monotonic() > end:
+                raise
+            time.sleep(0.05)
+
+
+class BenchClient(Thread):
+    """Client parsing every received message like a bus client does."""
+    def __init__(self, url, subscribe=None):
+        super().__init__(daemon=True)
+        self.ws = create_connection(url)
+        self.ws.recv()  # connected message
+        if subscribe:
+            msg = Message("message_bus.subscribe", {"types": subscribe})
+            self.ws.send(msg.serialize())
+        self.latencies = []
+        self.received = 0
+
+    def run(self):
+        while True:
+            try:
+                raw = self.ws.recv()
+            except Exception:
+                return
+            if not raw:
+                return
+            message = Message.deserialize(raw)
+            self.received += 1
+            if message.msg_type == BENCH_TYPE:
+                self.latencies.append(time.monotonic() - message.data["sent"])
+
+
+def run(url, server, clients, receivers, rate, seconds, payload, subscribed):
+    bench_clients = []
+    for i in range(clients):
+        if subscribed:
+            types = [BENCH_TYPE] if i < receivers else ["bench.other"]
+        else:
+            types = None
+        bench_clients.append(BenchClient(url, types))
+    for client in bench_clients:
+        client.start()
+
+    sender = create_connection(url)
+    sender.recv()
+    sender.send(Message("message_bus.subscribe",
+                        {"types": ["bench.none"]}).serialize())
+    time.sleep(0.5)
+
+    cpu_start = sum(server.cpu_times()[:2])
+    start = time.monotonic()
+    count = int(rate * seconds)
+    for i in range(count):
+        next_send = start + i / rate
+        delay = next_send - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        data = {"sent": time.monotonic(), "payload": "x" * payload}
+        sender.send(json.dumps({"type": BENCH_TYPE, "data": data,
+                                "context": {}}))
+    time.sleep(1.0)
+    cpu = sum(server.cpu_times()[:2]) - cpu_start
+
+    latencies = []
+    for client in bench_clients[:receivers]:
+        latencies += client.latencies
+    for client in bench_clients:
+        client.ws.close()
+    sender.close()
+
+    latencies.sort()
+    p95 = latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0
+    median = statistics.median(latencies) if latencies else 0.0
+    return cpu / seconds, median, p95, len(latencies) / (receivers * count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--clients', type=int, default=20,
+                        help='Number of connected clients')
+    parser.add_argument('--receivers', type=int, default=2,
+                        help='Clients interested in the benchmark messages')
+    parser.add_argument('--rate', type=float, default=200,
+                        help='Messages sent per second')
+    parser.add_argument('--seconds', type=float, default=5,
+                        help='Duration of each run')
+    parser.add_argument('--payload', type=int, default=64,
+                        help='Size of the message payload in bytes')
+    parser.add_argument('--port', type=int, default=18181)
+    args = parser.parse_args()
+
+    process = multiprocessing.Process(target=serve, args=(args.port,),
+                                      daemon=True)
+    process.start()
+    url = "ws://{}:{}{}".format(HOST, args.port, ROUTE)
+    wait_for_server(url).close()
+    server = psutil.Process(process.pid)
+
+    print('{:11} {:>8} {:>10} {:>12} {:>12} {:>10}'.format(
+        'mode', 'clients', 'msg/s', 'server CPU', 'p50 (ms)', 'p95 (ms)'))
+    try:
+        for mode in ('broadcast', 'subscribed'):
+            cpu, p50, p95, delivered = run(
+                url, server, args.clients, args.receivers, args.rate,
+                args.seconds, args.payload, mode == 'subscribed')
+            print('{:11} {:>8} {:>10.0f} {:>11.0%} {:>12.2f} {:>12.2f}'.format(
+                mode, args.clients, args.rate, cpu, p50 * 1000, p95 * 1000))
+            if delivered < 1:
+                print('  only {:.0%} of messages delivered'.format(delivered))
+    finally:
+        process.terminate()
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
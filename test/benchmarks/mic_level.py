@@ -0,0 +1,78 @@
+"""Benchmark of publishing and reading the microphone level.
+
+Compares the MicLevelPage shared memory seqlock against the mic_level file
+the listener used to rewrite, and the CLI polled and parsed, before.
+
+    publish: listener side, per chunk
+    read:    consumer side, per poll
+
+Usage:
+    python -m test.benchmarks.mic_level [--repeat 100000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from os.path import join
+
+from source.client.listener.telemetry import WAITING, MicLevelPage
+
+
+def write_file(path, energy, threshold, muted):
+    """The write_mic_level file rewrite of the listener."""
+    with open(path, 'w') as f:
+        f.write('Energy:  cur={} thresh={:.3f} muted={}'.format(
+            energy, threshold, int(muted)))
+
+
+def read_file(path, st_results):
+    """The mtime check and parsing of the CLI mic monitor."""
+    new_results = os.stat(path)
+    if (st_results and new_results.st_ctime == st_results.st_ctime and
+            new_results.st_mtime == st_results.st_mtime):
+        return None
+    with open(path) as fh:
+        cur_text, thresh_text, _ = fh.readline().split(' ')[-3:]
+    return float(cur_text.split('=')[-1]), float(thresh_text.split('=')[-1])
+
+
+def bench(func, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=100000)
+    parser.add_argument('--directory', default=tempfile.gettempdir(),
+                        help='Directory of the files, e.g. the ipc '
+                             'directory on a RAM disk')
+    args = parser.parse_args()
+
+    file_path = join(args.directory, 'mic_level.bench')
+    page_path = join(args.directory, 'mic_level.page.bench')
+    page = MicLevelPage(page_path)
+    try:
+        write_time = bench(lambda i: write_file(file_path, i, 35.0, False),
+                           args.repeat)
+        read_time = bench(lambda i: read_file(file_path, None), args.repeat)
+        publish_time = bench(lambda i: page.publish(i, 35.0, 0.5, WAITING),
+                             args.repeat)
+        page_read_time = bench(lambda i: page.read(), args.repeat)
+    finally:
+        page.close()
+        os.remove(file_path)
+        os.remove(page_path)
+
+    print('{:8} {:>10} {:>10} {:>8}'.format(
+        'case', 'file (us)', 'page (us)', 'speedup'))
+    for name, file_time, page_time in (('publish', write_time, publish_time),
+                                       ('read', read_time, page_read_time)):
+        print('{:8} {:>10.2f} {:>10.2f} {:>7.1f}x'.format(
+            name, file_time * 1e6, page_time * 1e6, file_time / page_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark of splitting microphone audio into wake word engine frames.
+
+Compares the FrameAdapter used by FrameHotWordEngine against the previous
+PorcupineHotWord code unpacking each chunk into a list of ints and
+re-slicing the list for every frame. The engines themselves are not run.
+
+    legacy:  struct unpacking and list slicing
+    adapter: FrameAdapter frames converted to the list of ints pvporcupine
+             takes, as PorcupineHotWord does
+    views:   FrameAdapter frames used as numpy views, as an engine taking
+             arrays would
+
+All columns are CPU milliseconds spent per second of 16 kHz audio.
+
+Usage:
+    python -m test.benchmarks.porcupine_frames [--chunks 160 1024 4096]
+"""
+import argparse
+import struct
+import time
+
+import numpy as np
+
+from source.client.listener.data_structures import FrameAdapter
+
+SAMPLE_RATE = 16000
+
+
+class LegacyFrames:
+    """The buffering of PorcupineHotWord before the FrameAdapter."""
+    def __init__(self, frame_length):
+        self.frame_length = frame_length
+        self.audio_buffer = []
+        self.last_frame = None
+
+    def update(self, chunk):
+        pcm = struct.unpack_from("h" * (len(chunk) // 2), chunk)
+        self.audio_buffer += pcm
+        while True:
+            if len(self.audio_buffer) >= self.frame_length:
+                self.last_frame = self.audio_buffer[0:self.frame_length]
+                self.audio_buffer = self.audio_buffer[self.frame_length:]
+            else:
+                return
+
+
+class AdapterFrames:
+    def __init__(self, frame_length, to_list=True):
+        self.adapter = FrameAdapter(frame_length)
+        self.to_list = to_list
+        self.last_frame = None
+
+    def update(self, chunk):
+        for frame in self.adapter.frames(chunk):
+            self.last_frame = frame.tolist() if self.to_list else frame
+
+
+def run(frames, chunks):
+    start = time.process_time()
+    for chunk in chunks:
+        frames.update(chunk)
+    return time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--chunks', type=int, nargs='+',
+                        default=[160, 1024, 4096],
+                        help='Microphone chunk sizes in samples')
+    parser.add_argument('--frame-length', type=int, default=512,
+                        help='Engine frame length in samples')
+    parser.add_argument('--seconds', type=int, default=20,
+                        help='Seconds of audio per measurement')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    audio = rng.normal(0, 3000, args.seconds * SAMPLE_RATE)
+    audio = audio.astype(np.int16).tobytes()
+
+    print('{:>7} {:>8} {:>8} {:>8}'.format(
+        'chunk', 'legacy', 'adapter', 'views'))
+    for chunk_size in args.chunks:
+        size = chunk_size * 2
+        chunks = [audio[i:i + size] for i in range(0, len(audio), size)]
+        legacy = run(LegacyFrames(args.frame_length), chunks)
+        adapter = run(AdapterFrames(args.frame_length), chunks)
+        views = run(AdapterFrames(args.frame_length, to_list=False), chunks)
+        print('{:>7} {:>8.3f} {:>8.3f} {:>8.3f}'.format(
+            chunk_size, *(t * 1e3 / args.seconds
+                          for t in (legacy, adapter, views))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark of the TTS synthesis and playback pipeline.
+
+Speaks a multi sentence utterance through a fake TTS engine with a fixed
+synthesis time per word and a fake audio sink playing back in real time, and
+reports the latency until the first audio is played and the gaps of silence
+between consecutive sentences.
+
+    serial:    the whole utterance is synthesized before playback starts,
+               the behaviour before sentences were pipelined.
+    pipelined: the utterance is split in sentences, the next sentences are
+               synthesized while the current one is playing.
+
+Usage:
+    python -m test.benchmarks.tts_pipeline [--synth-ms 40] [--lookahead 2]
+"""
+import argparse
+import time
+import wave
+from threading import Event
+
+from source.tts.tts import TTS
+
+SAMPLE_RATE = 16000
+UTTERANCE = (
+    "The weather today will be mostly sunny with a high of twenty degrees. "
+    "There is a light breeze coming in from the west. "
+    "In the evening clouds will roll in and temperatures drop quickly. "
+    "Tomorrow expect rain during the morning hours. "
+    "It should clear up again by the afternoon."
+)
+
+
+class FakeBus:
+    def emit(self, message):
+        pass
+
+
+class FakeSink:
+    """Plays wav files by sleeping for their duration."""
+    def __init__(self):
+        self.plays = []
+        self.idle = Event()
+
+    def play_wav(self, uri, interrupted=None):
+        with wave.open(uri, 'rb') as wav:
+            duration = wav.getnframes() / wav.getframerate()
+        start = time.monotonic()
+        time.sleep(duration)
+        self.plays.append((start, time.monotonic()))
+        return True
+
+    def pause(self):
+        self.idle.set()
+
+    def close(self):
+        pass
+
+
+class FakeTTS(TTS):
+    """TTS spending a fixed time per word, producing silence."""
+    def __init__(self, synth_seconds, word_seconds):
+        super().__init__('en-us', {}, None)
+        self.synth_seconds = synth_seconds
+        self.word_seconds = word_seconds
+
+    def get_tts(self, sentence, wav_file):
+        words = len(sentence.split())
+        time.sleep(words * self.synth_seconds)
+        with wave.open(wav_file, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(SAMPLE_RATE)
+            frames = int(words * self.word_seconds * SAMPLE_RATE)
+            wav.writeframes(b'\0\0' * frames)
+        return wav_file, None
+
+
+class SerialFakeTTS(FakeTTS):
+    def preprocess_utterance(self, utterance):
+        return [utterance]
+
+
+def run(tts, sink):
+    tts.cache.cached_sentences.clear()
+    sink.plays = []
+    sink.idle.clear()
+    start = time.monotonic()
+    tts.execute(UTTERANCE, listen=False)
+    sink.idle.wait()
+
+    first_audio = sink.plays[0][0] - start
+    gaps = [nxt[0] - prev[1] for prev, nxt in zip(sink.plays, sink.plays[1:])]
+    total = sink.plays[-1][1] - start
+    return first_audio, max(gaps, default=0.0), total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--synth-ms', type=float, default=40,
+                        help='Synthesis time per word')
+    parser.add_argument('--word-ms', type=float, default=300,
+                        help='Playback time per word')
+    parser.add_argument('--lookahead', type=int, default=2,
+                        help='Sentences synthesized ahead of playback')
+    args = parser.parse_args()
+
+    sink = FakeSink()
+    engines = [
+        ('serial', SerialFakeTTS(args.synth_ms / 1000, args.word_ms / 1000)),
+        ('pipelined', FakeTTS(args.synth_ms / 1000, args.word_ms / 1000)),
+    ]
+    TTS.queue.maxsize = args.lookahead
+    TTS.playback.sink = sink
+    TTS.playback.set_bus(FakeBus())
+
+    print('{:10} {:>18} {:>14} {:>10}'.format(
+        'mode', 'first audio (ms)', 'max gap (ms)', 'total (s)'))
+    try:
+        for name, tts in engines:
+            first_audio, max_gap, total = run(tts, sink)
+            print('{:10} {:>18.0f} {:>14.0f} {:>10.2f}'.format(
+                name, first_audio * 1000, max_gap * 1000, total))
+    finally:
+        TTS.playback.stop()
+        TTS.playback.join()
+
+
+if __name__ == '__main__':
+    main()
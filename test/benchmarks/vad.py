@@ -0,0 +1,107 @@
+"""Offline benchmark of the Silero VAD.
+
+Runs recorded WAV files through the VAD frame by frame, as the silence
+detector does, and compares against the previous implementation running
+the model on each chunk with a default onnxruntime session.
+
+    frames/s:  VAD frames (30 ms) processed per second of CPU time
+    agreement: share of speech/silence decisions equal to the previous
+               implementation
+
+Usage:
+    python -m test.benchmarks.vad [--windows 1 2 4] [wav ...]
+"""
+import argparse
+import glob
+import time
+import wave
+from os.path import dirname, join
+
+import numpy as np
+import onnxruntime
+
+from source.client.listener.silence import SileroVAD
+
+FIXTURES = join(dirname(__file__), "..", "unittests", "client", "data")
+MODEL = join(dirname(__file__), "..", "..", "source", "client", "listener",
+             "silero_vad.onnx")
+FRAME_SAMPLES = 480
+
+
+class LegacyVAD:
+    """The VAD implementation running the model once per chunk."""
+    def __init__(self, threshold):
+        self.session = onnxruntime.InferenceSession(MODEL)
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self._h = np.zeros((2, 1, 64)).astype("float32")
+        self._c = np.zeros((2, 1, 64)).astype("float32")
+
+    def is_silent(self, chunk):
+        audio_array = np.expand_dims(np.frombuffer(chunk, dtype=np.int16), 0)
+        ort_inputs = {
+            "input": audio_array.astype(np.float32),
+            "h0": self._h,
+            "c0": self._c,
+        }
+        out, self._h, self._c = self.session.run(None, ort_inputs)
+        return out.squeeze(2)[:, 1][0] < self.threshold
+
+
+def read_frames(path):
+    with wave.open(path) as wav:
+        if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != \
+                (16000, 1, 2):
+            raise ValueError("{} is not 16kHz 16-bit mono".format(path))
+        audio = wav.readframes(wav.getnframes())
+    size = FRAME_SAMPLES * 2
+    return [audio[i:i + size] for i in range(0, len(audio) - size + 1, size)]
+
+
+def run(vad, recordings, repeat):
+    decisions = []
+    start = time.process_time()
+    for _ in range(repeat):
+        decisions = []
+        for frames in recordings:
+            vad.reset()
+            decisions += [vad.is_silent(frame) for frame in frames]
+    elapsed = time.process_time() - start
+    return decisions, len(decisions) * repeat / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('wavs', nargs='*',
+                        help='16kHz 16-bit mono WAV files, the unit test '
+                             'recordings by default')
+    parser.add_argument('--windows', type=int, nargs='+', default=[1, 2, 4],
+                        help='Frames per VAD window to compare')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Passes over the recordings')
+    args = parser.parse_args()
+
+    paths = args.wavs or sorted(glob.glob(join(FIXTURES, '*.wav')))
+    recordings = [read_frames(path) for path in paths]
+    frames = sum(len(r) for r in recordings)
+    print('{} recordings, {} frames, {:.1f} s of audio'.format(
+        len(recordings), frames, frames * FRAME_SAMPLES / 16000))
+
+    print('{:14} {:>10} {:>10}'.format('vad', 'frames/s', 'agreement'))
+    reference, legacy_rate = run(LegacyVAD(args.threshold), recordings,
+                                 args.repeat)
+    print('{:14} {:>10.0f} {:>10.1%}'.format('legacy', legacy_rate, 1))
+    for window in args.windows:
+        vad = SileroVAD({'threshold': args.threshold,
+                         'window_frames': window}, frame_samples=FRAME_SAMPLES)
+        decisions, rate = run(vad, recordings, args.repeat)
+        agreement = np.mean(np.array(decisions) == np.array(reference))
+        print('{:14} {:>10.0f} {:>10.1%}'.format(
+            'window {}'.format(window), rate, agreement))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark of Whisper model variants kept resident by the STT.
+
+Loads every combination of model and precision through the model residency,
+as the Whisper STT does, and transcribes a recording with it on the CPU.
+
+    load (s):  time to load, and quantize, the model
+    mem (MB):  memory of the weights and buffers
+    rtf:       decoding seconds per second of audio, after a warm up
+    reload:    seconds to get the model again once it was released
+
+Models are downloaded to the Whisper cache on first use.
+
+Usage:
+    python -m test.benchmarks.whisper_models [--models tiny.en base.en]
+                                             [--precisions fp32 int8]
+                                             [--repeat 3] [wav]
+"""
+import argparse
+import time
+import wave
+from os.path import dirname, join
+
+import numpy as np
+
+from source.stt.models import SAMPLE_RATE, ModelResidency, model_memory
+
+WAV = join(dirname(__file__), '..', 'unittests', 'client', 'data',
+           'weather_mycroft.wav')
+
+
+def read_audio(path):
+    with wave.open(path) as wav:
+        if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != \
+                (SAMPLE_RATE, 1, 2):
+            raise ValueError('{} is not 16kHz 16-bit mono'.format(path))
+        audio = wav.readframes(wav.getnframes())
+    return np.frombuffer(audio, dtype=np.int16).astype(np.float32) / 2**15
+
+
+def measure(residency, model, precision, audio, repeat):
+    start = time.perf_counter()
+    replica = residency.acquire(model, precision, 'cpu')
+    load = time.perf_counter() - start
+    memory = model_memory(replica.model)
+    replica.warmup()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = replica.transcribe(audio, language='en')['text'].strip()
+    rtf = (time.perf_counter() - start) / repeat / (len(audio) / SAMPLE_RATE)
+
+    residency.release(replica)
+    start = time.perf_counter()
+    residency.release(residency.acquire(model, precision, 'cpu'))
+    reload = time.perf_counter() - start
+    return load, memory, rtf, reload, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('wav', nargs='?', default=WAV,
+                        help='16kHz 16-bit mono WAV file to transcribe')
+    parser.add_argument('--models', nargs='+', default=['tiny.en', 'base.en'])
+    parser.add_argument('--precisions', nargs='+', default=['fp32', 'int8'])
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Transcriptions per model')
+    args = parser.parse_args()
+
+    audio = read_audio(args.wav)
+    print('{:.1f} s of audio'.format(len(audio) / SAMPLE_RATE))
+    print('{:10} {:6} {:>8} {:>8} {:>6} {:>8}  {}'.format(
+        'model', 'prec', 'load (s)', 'mem (MB)', 'rtf', 'reload', 'text'))
+    # Keep every variant resident to measure getting it again
+    variants = len(args.models) * len(args.precisions)
+    residency = ModelResidency(max_idle=variants)
+    for model in args.models:
+        for precision in args.precisions:
+            load, memory, rtf, reload, text = measure(
+                residency, model, precision, audio, args.repeat)
+            print('{:10} {:6} {:>8.2f} {:>8.0f} {:>6.3f} {:>8.4f}  {}'.format(
+                model, precision, load, memory / 2**20, rtf, reload,
+                text[:40]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+"""Offline evaluation of the speed and accuracy of STT engines.
+
+Transcribes a corpus of WAV files with reference transcripts through an STT
+engine, one file after the other as the listener does, and reports:
+
+    rtf:      transcription seconds per second of audio
+    latency:  p50 and p95 seconds per transcription
+    wer:      word error rate against the reference transcripts
+    rss:      peak resident memory of the process, including the engine
+
+The corpus is a directory of file.wav and file.txt pairs, the text file
+holding the reference transcript of the recording.
+
+Usage:
+    python -m test.stt_accuracy [--engine whisper] [--output results.json]
+                                [--repeat 1] [data]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import resource
+import time
+import wave
+from glob import glob
+from importlib import import_module
+from os.path import dirname, isfile, join, splitext
+
+import numpy as np
+from speech_recognition import AudioData
+
+from source.configuration import Configuration
+from source.messagebus.message import Message
+from source.stt import STTFactory
+from source.stt.base import STT
+
+DATA_DIR = join(dirname(__file__), 'data')
+
+
+def audio_digest(audio):
+    """Key identifying the raw data of an AudioData."""
+    return hashlib.sha1(audio.get_raw_data()).hexdigest()
+
+
+class FakeSTT(STT):
+    """Deterministic STT returning known transcripts.
+
+    Doesn't read the configuration or load a model, so the harness can be
+    run and tested offline.
+
+    Args:
+        transcripts (dict): transcripts keyed by audio_digest(), unknown
+                            audio is transcribed as an empty string
+        rtf (float): seconds to spend per second of audio, as a real
+                     engine would
+        drop_every (int): leave out every nth word of the transcripts to
+                          simulate recognition errors, 0 to keep all
+    """
+
+    def __init__(self, transcripts=None, rtf=0.0, drop_every=0):
+        self.lang = 'en-US'
+        self.config = {}
+        self.can_stream = False
+        self.transcripts = transcripts or {}
+        self.rtf = rtf
+        self.drop_every = drop_every
+
+    def execute(self, audio, language=None):
+        duration = len(audio.get_raw_data()) / (audio.sample_rate *
+                                                audio.sample_width)
+        time.sleep(duration * self.rtf)
+        words = self.transcripts.get(audio_digest(audio), '').split()
+        if self.drop_every:
+            words = [word for i, word in enumerate(words, 1)
+                     if i % self.drop_every]
+        return ' '.join(words)
+
+
+class Sample:
+    """Recording of the corpus and its reference transcript.
+
+    Args:
+        wav (str): 16-bit mono WAV file
+        reference (str): what is said in the recording
+    """
+
+    def __init__(self, wav, reference):
+        self.wav = wav
+        self.reference = reference
+        with wave.open(wav, 'rb') as f:
+            if f.getnchannels() != 1 or f.getsampwidth() != 2:
+                raise ValueError('{} is not 16-bit mono'.format(wav))
+            self.audio = AudioData(f.readframes(f.getnframes()),
+                                   f.getframerate(), f.getsampwidth())
+            self.duration = f.getnframes() / f.getframerate()
+
+
+class Corpus:
+    """WAV files with reference transcripts.
+
+    WAV files without a text file of the same name are skipped.
+
+    Args:
+        directory (str): corpus directory
+    """
+
+    def __init__(self, directory):
+        self.samples = []
+        for wav in sorted(glob(join(directory, '*.wav'))):
+            transcript = splitext(wav)[0] + '.txt'
+            if isfile(transcript):
+                with open(transcript) as f:
+                    self.samples.append(Sample(wav, f.read().strip()))
+
+    @property
+    def duration(self):
+        """Seconds of audio in the corpus."""
+        return sum(sample.duration for sample in self.samples)
+
+    def transcripts(self):
+        """Get the reference transcripts keyed by audio_digest()."""
+        return {audio_digest(sample.audio): sample.reference
+                for sample in self.samples}
+
+    def summary(self):
+        """Get a dict describing the corpus."""
+        return {
+            'files': len(self.samples),
+            'seconds': self.duration,
+            'words': sum(len(normalize(sample.reference))
+                         for sample in self.samples),
+        }
+
+
+def normalize(text):
+    """Split a transcript into lower case words without punctuation."""
+    return re.findall(r"[\w']+", text.lower())
+
+
+def word_errors(reference, hypothesis):
+    """Count the substituted, deleted and inserted words of a transcript.
+
+    Args:
+        reference (list): words actually said
+        hypothesis (list): words recognized
+
+    Returns:
+        int: the word level edit distance
+    """
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(
+                previous[j] + 1,  # Deletion
+                current[j - 1] + 1,  # Insertion
+                previous[j - 1] + (ref_word != hyp_word)  # Substitution
+            ))
+        previous = current
+    return previous[-1]
+
+
+def peak_rss():
+    """Peak resident memory of the process in bytes."""
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(values, percent):
+    if not values:
+        return None
+    return float(np.percentile(values, percent))
+
+
+def evaluate(corpus, engine, repeat=1):
+    """Transcribe the corpus and measure speed and accuracy.
+
+    The engine is warmed up first, so loading isn't counted as latency.
+
+    Args:
+        corpus (Corpus): recordings to transcribe
+        engine (STT): engine to evaluate
+        repeat (int): transcriptions of every recording, for steadier
+                      timings
+
+    Returns:
+        dict: the measured metrics and the transcript of every file
+    """
+    engine.warmup()
+    latencies = []
+    errors = 0
+    words = 0
+    files = []
+    for sample in corpus.samples:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            hypothesis = engine.execute(sample.audio, engine.lang) or ''
+            latencies.append(time.perf_counter() - start)
+        reference = normalize(sample.reference)
+        sample_errors = word_errors(reference, normalize(hypothesis))
+        errors += sample_errors
+        words += len(reference)
+        files.append({
+            'file': os.path.basename(sample.wav),
+            'seconds': sample.duration,
+            'latency': latencies[-1],
+            'reference': sample.reference,
+            'hypothesis': hypothesis,
+            'word_errors': sample_errors,
+        })
+
+    audio_seconds = corpus.duration * repeat
+    return {
+        'engine': type(engine).__name__,
+        'rtf': sum(latencies) / audio_seconds if audio_seconds else None,
+        'latency': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+        },
+        'wer': errors / words if words else None,
+        'peak_rss_bytes': peak_rss(),
+        'files': files,
+    }
+
+
+def create_engine(name, corpus):
+    """Create the STT engine to evaluate.
+
+    Args:
+        name (str): "fake", a module of the STTFactory or an STT plugin, or
+                    the import path of an STT class as "package.module:Class",
+                    None for the configured module
+        corpus (Corpus): corpus, the fake engine knows its transcripts
+
+    Returns:
+        STT: the engine, None if it couldn't be created
+    """
+    if name is None:
+        return STTFactory.create()
+    if name == 'fake':
+        return FakeSTT(corpus.transcripts())
+    if ':' in name:
+        module, clazz = name.split(':')
+        return getattr(import_module(module), clazz)()
+
+    # Engines read the config section of the configured module
+    Configuration.patch(Message('configuration.patch', {'config': {
+        'voice': {'stt': {'module': name}}
+    }}))
+    return STTFactory.create()
+
+
+def format_value(value, spec):
+    return '-' if value is None else spec.format(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('data', nargs='?', default=DATA_DIR,
+                        help='Corpus directory with WAV files and text '
+                             'files with their transcripts')
+    parser.add_argument('--engine',
+                        help='STT module, plugin or "package.module:Class" '
+                             'to evaluate, the configured STT module by '
+                             'default. "fake" returns the transcripts.')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Transcriptions of every file')
+    parser.add_argument('--output',
+                        help='Write the results to this JSON file')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Print the transcript of every file')
+    args = parser.parse_args()
+
+    corpus = Corpus(args.data)
+    if not corpus.samples:
+        parser.error('No wav files with transcripts found in {}'.format(
+            args.data))
+
+    engine = create_engine(args.engine, corpus)
+    if engine is None:
+        parser.error('Could not create the STT engine {}'.format(
+            args.engine or 'of the configuration'))
+    try:
+        result = evaluate(corpus, engine, args.repeat)
+    finally:
+        engine.shutdown()
+
+    if args.verbose:
+        for file in result['files']:
+            print('{}: {} error(s)\n  ref: {}\n  hyp: {}'.format(
+                file['file'], file['word_errors'], file['reference'],
+                file['hypothesis']))
+    print('{:18} {:>6} {:>8} {:>8} {:>7} {:>9}'.format(
+        'engine', 'rtf', 'p50 (s)', 'p95 (s)', 'wer', 'rss (MB)'))
+    print('{:18} {:>6} {:>8} {:>8} {:>7} {:>9.0f}'.format(
+        result['engine'],
+        format_value(result['rtf'], '{:.3f}'),
+        format_value(result['latency']['p50'], '{:.3f}'),
+        format_value(result['latency']['p95'], '{:.3f}'),
+        format_value(result['wer'], '{:.1%}'),
+        result['peak_rss_bytes'] / 2**20))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'corpus': dict(corpus.summary(), path=os.path.abspath(
+                    args.data)),
+                'repeat': args.repeat,
+                'results': result,
+            }, f, indent=2)
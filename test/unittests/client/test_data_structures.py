@@ -12,9 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+from threading import Thread
 from unittest import TestCase
 
-from source.client.listener.data_structures import (CyclicAudioBuffer,
+import numpy as np
+
+from source.client.listener.data_structures import (AmbientNoiseEstimator,
+                                                    AudioRingBuffer,
+                                                    CyclicAudioBuffer,
+                                                    FrameAdapter,
                                                     RollingMean)
 
 
@@ -45,6 +51,15 @@ class TestRollingMean(TestCase):
         # Values should now be 1, 1, 1, 1, 1, 2, 2, 2, 2, 2
         self.assertAlmostEqual(mean.value, 1.5)
 
+    def test_variance(self):
+        mean = RollingMean(4)
+        self.assertIsNone(mean.variance)
+        for sample in (2, 4, 4, 4, 5, 5, 7, 9):
+            mean.append_sample(sample)
+        # Values should now be 5, 5, 7, 9
+        self.assertAlmostEqual(mean.value, 6.5)
+        self.assertAlmostEqual(mean.variance, 2.75)
+
 
 class TestCyclicBuffer(TestCase):
     def test_init(self):
@@ -75,3 +90,162 @@ class TestCyclicBuffer(TestCase):
     def test_get_item(self):
         buff = CyclicAudioBuffer(6, b'abcdef')
         self.assertEqual(buff[:], b'abcdef')
+
+    def test_append_wrap_around(self):
+        buff = CyclicAudioBuffer(4, b'ab')
+        buff.append(b'cd')
+        buff.append(b'ef')
+        self.assertEqual(buff.get(), b'cdef')
+        buff.append(b'g')
+        self.assertEqual(buff.get(), b'defg')
+        self.assertEqual(buff.get_last(2), b'fg')
+
+    def test_append_larger_than_buffer(self):
+        buff = CyclicAudioBuffer(3, b'ab')
+        buff.append(b'cdefgh')
+        self.assertEqual(buff.get(), b'fgh')
+        self.assertEqual(len(buff), 3)
+
+    def test_view_last(self):
+        buff = CyclicAudioBuffer(4, b'abc')
+        buff.append(b'def')
+        view = buff.view_last(3)
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual(view, b'def')
+        self.assertEqual(buff.view_last(10), b'cdef')
+        self.assertEqual(buff.view(), b'cdef')
+
+    def test_clear(self):
+        buff = CyclicAudioBuffer(4, b'abc')
+        buff.clear()
+        self.assertEqual(len(buff), 0)
+        self.assertEqual(buff.get(), b'')
+        buff.append(b'de')
+        self.assertEqual(buff.get(), b'de')
+
+
+class TestFrameAdapter(TestCase):
+    def split(self, adapter, samples, chunk_size):
+        audio = samples.astype(np.int16).tobytes()
+        frames = []
+        for i in range(0, len(audio), chunk_size * 2):
+            frames += [frame.copy() for frame in
+                       adapter.frames(audio[i:i + chunk_size * 2])]
+        return frames
+
+    def test_frames_across_chunks(self):
+        samples = np.arange(1000)
+        for chunk_size in (1, 7, 160, 512, 1000):
+            adapter = FrameAdapter(128)
+            frames = self.split(adapter, samples, chunk_size)
+            self.assertEqual(len(frames), 7)
+            np.testing.assert_array_equal(np.concatenate(frames),
+                                          samples[:7 * 128])
+            self.assertEqual(len(adapter), 1000 - 7 * 128)
+
+    def test_frames_are_views_of_chunk(self):
+        adapter = FrameAdapter(4)
+        chunk = np.arange(8, dtype=np.int16).tobytes()
+        frames = list(adapter.frames(chunk))
+        self.assertEqual(len(frames), 2)
+        self.assertFalse(frames[1].flags.owndata)
+        self.assertEqual(frames[1].dtype, np.int16)
+
+    def test_incomplete_frame(self):
+        adapter = FrameAdapter(4)
+        self.assertEqual(list(adapter.frames(b'\x01\x00' * 3)), [])
+        self.assertEqual(len(adapter), 3)
+        frames = list(adapter.frames(b'\x02\x00'))
+        self.assertEqual(frames[0].tolist(), [1, 1, 1, 2])
+        self.assertEqual(len(adapter), 0)
+
+    def test_clear(self):
+        adapter = FrameAdapter(4)
+        list(adapter.frames(b'\x01\x00' * 3))
+        adapter.clear()
+        frames = list(adapter.frames(b'\x02\x00' * 4))
+        self.assertEqual(frames[0].tolist(), [2, 2, 2, 2])
+
+
+class TestAudioRingBuffer(TestCase):
+    def test_read_write(self):
+        buff = AudioRingBuffer(8)
+        buff.write(b'abcdef')
+        self.assertEqual(buff.read(4), b'abcd')
+        buff.write(b'ghijk')
+        self.assertEqual(len(buff), 7)
+        self.assertEqual(buff.read(10), b'efghijk')
+        self.assertEqual(len(buff), 0)
+
+    def test_overflow(self):
+        buff = AudioRingBuffer(4)
+        buff.write(b'abc')
+        buff.write(b'def')
+        self.assertEqual(buff.overflows, 1)
+        self.assertEqual(buff.dropped, 2)
+        self.assertEqual(buff.read(4), b'abcd')
+
+    def test_wait_for(self):
+        buff = AudioRingBuffer(64)
+        self.assertFalse(buff.wait_for(4, timeout=0.01))
+
+        def writer():
+            for _ in range(4):
+                buff.write(b'ab')
+
+        thread = Thread(target=writer)
+        thread.start()
+        self.assertTrue(buff.wait_for(8, timeout=5))
+        thread.join()
+        self.assertEqual(buff.read(8), b'abababab')
+
+    def test_close_wakes_reader(self):
+        buff = AudioRingBuffer(64)
+        thread = Thread(target=buff.close)
+        thread.start()
+        self.assertFalse(buff.wait_for(4, timeout=5))
+        thread.join()
+        self.assertTrue(buff.closed)
+
+    def test_clear(self):
+        buff = AudioRingBuffer(4)
+        buff.write(b'abc')
+        buff.clear()
+        buff.write(b'de')
+        self.assertEqual(buff.read(4), b'de')
+
+
+class TestAmbientNoiseEstimator(TestCase):
+    def test_uncalibrated(self):
+        noise = AmbientNoiseEstimator()
+        self.assertFalse(noise.calibrated)
+        self.assertIsNone(noise.floor)
+        self.assertIsNone(noise.threshold)
+        noise.update(100, 0.01)
+        self.assertTrue(noise.calibrated)
+        self.assertAlmostEqual(noise.floor, 100)
+        self.assertAlmostEqual(noise.threshold, 150)
+
+    def test_falls_fast_rises_slowly(self):
+        noise = AmbientNoiseEstimator(fall_seconds=0.5, rise_seconds=5)
+        noise.update(1000, 0.01)
+        for _ in range(200):  # 2 s of quiet
+            noise.update(100, 0.01)
+        self.assertLess(noise.floor, 110)
+
+        for _ in range(200):  # 2 s of noise just below the threshold
+            noise.update(140, 0.01)
+        self.assertLess(noise.floor, 125)
+        for _ in range(3000):
+            noise.update(140, 0.01)
+        self.assertAlmostEqual(noise.floor, 140, delta=1)
+
+    def test_speech(self):
+        noise = AmbientNoiseEstimator()
+        noise.update(100, 0.01)
+        for _ in range(300):  # 3 s of loud speech
+            noise.update(3000, 0.01)
+        self.assertLess(noise.floor, 200)
+        for _ in range(200):  # followed by a pause
+            noise.update(100, 0.01)
+        self.assertLess(noise.floor, 105)
@@ -0,0 +1,75 @@
+import unittest
+import warnings
+
+import numpy as np
+
+from source.client.listener import dsp
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', DeprecationWarning)
+    try:
+        import audioop
+    except ImportError:  # Python 3.13
+        audioop = None
+
+
+def random_audio(size, offset=0, scale=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    samples = rng.normal(offset, scale, size)
+    return np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
+
+
+@unittest.skipIf(audioop is None, 'audioop not available')
+class TestAudioopCompatibility(unittest.TestCase):
+    def legacy_debiased_energy(self, audio_data):
+        energy = -audioop.rms(audio_data, 2)
+        energy_bytes = bytes([energy & 0xFF, (energy >> 8) & 0xFF])
+        return audioop.rms(
+            audioop.add(audio_data, energy_bytes * (len(audio_data) // 2), 2),
+            2
+        )
+
+    def test_rms(self):
+        for size in (1, 160, 480, 4096):
+            audio = random_audio(size, seed=size)
+            self.assertEqual(dsp.rms(audio), audioop.rms(audio, 2))
+
+    def test_debiased_energy(self):
+        for size in (1, 160, 480, 4096):
+            for offset in (0, 10000, -30000):
+                audio = random_audio(size, offset, seed=size)
+                self.assertEqual(dsp.debiased_energy(audio),
+                                 self.legacy_debiased_energy(audio))
+
+    def test_debiased_energy_clipped(self):
+        audio = np.full(100, -32768, dtype=np.int16).tobytes()
+        self.assertEqual(dsp.debiased_energy(audio),
+                         self.legacy_debiased_energy(audio))
+
+
+class TestDsp(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(dsp.rms(b''), 0)
+        self.assertEqual(dsp.debiased_energy(b''), 0)
+        self.assertEqual(dsp.zero_crossing_rate(b''), 0.0)
+
+    def test_views(self):
+        audio = bytearray(random_audio(480))
+        view = memoryview(audio)[320:]
+        self.assertEqual(dsp.rms(view), dsp.rms(bytes(audio[320:])))
+        samples = np.frombuffer(audio, dtype=np.int16)
+        self.assertEqual(dsp.rms(samples), dsp.rms(audio))
+
+    def test_frame_rms(self):
+        audio = random_audio(1000)
+        result = dsp.frame_rms(audio, 160)
+        self.assertEqual(len(result), 6)
+        for i, value in enumerate(result):
+            frame = audio[i * 320:(i + 1) * 320]
+            self.assertEqual(int(value), dsp.rms(frame))
+
+    def test_zero_crossing_rate(self):
+        samples = np.array([1, -1, 1, -1, 1], dtype=np.int16)
+        self.assertEqual(dsp.zero_crossing_rate(samples), 1.0)
+        samples = np.array([1, 2, 3, -1, -2], dtype=np.int16)
+        self.assertEqual(dsp.zero_crossing_rate(samples), 0.25)
@@ -70,17 +70,16 @@ class DynamicEnergytest(TestCase):
         sec_per_buffer = float(source.CHUNK) / (source.SAMPLE_RATE *
                                                 source.SAMPLE_WIDTH)
 
-        test_seconds = 30.0
+        test_seconds = 120.0
         while test_seconds > 0:
             test_seconds -= sec_per_buffer
             data = source.stream.read(source.CHUNK)
             energy = recognizer.calc_energy(data, source.SAMPLE_WIDTH)
-            recognizer._adjust_threshold(energy, sec_per_buffer)
+            recognizer._update_noise(energy, sec_per_buffer)
 
         higher_base_energy = audioop.rms(higher_base, source.SAMPLE_WIDTH)
-        # after recalibration (because of max audio length) new threshold
-        # should be >= 1.5 * higher_base_energy
-        delta_below_threshold = (
-            recognizer.energy_threshold - higher_base_energy)
-        min_delta = higher_base_energy * .5
-        assert abs(delta_below_threshold - min_delta) < 1
+        # after the noise estimate has adapted to the new baseline the
+        # threshold should be 1.5 * higher_base_energy
+        expected = higher_base_energy * 1.5
+        self.assertAlmostEqual(recognizer.energy_threshold, expected,
+                               delta=expected * 0.02)
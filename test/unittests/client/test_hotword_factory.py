@@ -13,8 +13,14 @@
 # limitations under the License.
 #
 import unittest
+from unittest import mock
 
-from source.client.listener.hotword_factory import HotWordFactory
+import numpy as np
+
+from source.client.listener.hotword_factory import (FrameHotWordEngine,
+                                                    HotWordEngine,
+                                                    HotWordFactory,
+                                                    HotWordMultiplexer)
 
 
 class PocketSphinxTest(unittest.TestCase):
@@ -55,3 +61,121 @@ class PocketSphinxTest(unittest.TestCase):
         config = config['hey victoria']
         self.assertEqual(config['phonemes'], p.phonemes)
         self.assertEqual(p.key_phrase, 'hey victoria')
+
+
+class FakeFrameEngine(FrameHotWordEngine):
+    """Engine detecting the wake word in frames of only ones."""
+    def __init__(self, key_phrase='hey mycroft', frame_length=4, config=None):
+        super().__init__(key_phrase, config=config or {})
+        self.frame_length = frame_length
+        self.processed = []
+
+    def process_frame(self, frame):
+        self.processed.append(frame.tolist())
+        if np.all(frame == 1):
+            self.score = 0.9
+            return True
+        return False
+
+
+class FakeChunkEngine(HotWordEngine):
+    """Engine detecting the wake word in chunks starting with a two."""
+    def __init__(self, key_phrase='wake up'):
+        super().__init__(key_phrase, config={})
+        self.found = False
+        self.stopped = False
+
+    def update(self, chunk):
+        self.found |= chunk[0] == 2
+
+    def found_wake_word(self, frame_data):
+        found, self.found = self.found, False
+        return found
+
+    def stop(self):
+        self.stopped = True
+
+
+@mock.patch('source.client.listener.hotword_factory.Configuration')
+class TestFrameHotWordEngine(unittest.TestCase):
+    def test_update_in_frames(self, _):
+        engine = FakeFrameEngine()
+        engine.update(np.arange(3, dtype=np.int16).tobytes())
+        self.assertEqual(engine.processed, [])
+        engine.update(np.arange(3, 9, dtype=np.int16).tobytes())
+        self.assertEqual(engine.processed, [[0, 1, 2, 3], [4, 5, 6, 7]])
+        self.assertFalse(engine.found_wake_word(None))
+
+    def test_found_wake_word(self, _):
+        engine = FakeFrameEngine()
+        engine.update(np.ones(6, dtype=np.int16).tobytes())
+        engine.update(np.zeros(6, dtype=np.int16).tobytes())
+        self.assertTrue(engine.found_wake_word(None))
+        self.assertFalse(engine.found_wake_word(None))
+
+
+def samples(*values):
+    return np.array(values, dtype=np.int16).tobytes()
+
+
+@mock.patch('source.client.listener.hotword_factory.Configuration')
+class TestHotWordMultiplexer(unittest.TestCase):
+    def test_frame_engines_share_frames(self, _):
+        first = FakeFrameEngine('hey mycroft')
+        second = FakeFrameEngine('jarvis')
+        other = FakeFrameEngine('vasco', frame_length=2)
+        multiplexer = HotWordMultiplexer([first, second, other], 4)
+        self.assertEqual(multiplexer.key_phrase, 'hey mycroft')
+        self.assertEqual(len(multiplexer._frame_groups), 2)
+
+        multiplexer.update(samples(0, 0, 0))
+        multiplexer.update(samples(0, 1, 1, 1, 1))
+        self.assertEqual(first.processed, [[0, 0, 0, 0], [1, 1, 1, 1]])
+        self.assertEqual(second.processed, first.processed)
+        self.assertEqual(len(other.processed), 4)
+
+        self.assertTrue(multiplexer.found_wake_word(None))
+        detection = multiplexer.detection
+        self.assertEqual(detection.key_phrase, 'vasco')
+        self.assertEqual(detection.score, 0.9)
+        self.assertEqual(detection.offset, 1.5)
+        self.assertFalse(multiplexer.found_wake_word(None))
+
+    def test_chunk_engines(self, _):
+        frame_engine = FakeFrameEngine()
+        chunk_engine = FakeChunkEngine()
+        multiplexer = HotWordMultiplexer([frame_engine, chunk_engine], 4)
+        multiplexer.update(samples(2, 0))
+        self.assertTrue(multiplexer.found_wake_word(None))
+        self.assertEqual(multiplexer.detection.key_phrase, 'wake up')
+        self.assertIsNone(multiplexer.detection.score)
+        self.assertEqual(multiplexer.detection.offset, 0.5)
+
+        multiplexer.stop()
+        self.assertTrue(chunk_engine.stopped)
+
+    @mock.patch('source.client.listener.hotword_factory.histogram')
+    @mock.patch('source.client.listener.hotword_factory.LOG')
+    def test_cpu_budget(self, log, histogram, _):
+        engine = FakeFrameEngine(config={'cpu_budget': 0.1})
+        multiplexer = HotWordMultiplexer([engine], 4)
+        multiplexer.LOAD_PERIOD = 2
+        with mock.patch('time.thread_time', side_effect=[0.0, 0.5, 1.0, 1.5]):
+            multiplexer.update(samples(0, 0, 0, 0))
+            histogram.assert_not_called()
+            multiplexer.update(samples(0, 0, 0, 0))
+
+        histogram.assert_called_once_with('hotword.hey mycroft.cpu_load')
+        histogram.return_value.observe.assert_called_once_with(0.5)
+        self.assertEqual(log.warning.call_count, 1)
+
+    def test_create_multiplexer(self, _):
+        engines = {'hey mycroft': FakeFrameEngine(), 'jarvis': None}
+        config = {'hey mycroft': {'module': 'fake'},
+                  'jarvis': {'module': 'fake'}}
+        with mock.patch.object(HotWordFactory, 'load_module',
+                               side_effect=lambda m, h, *_: engines[h]):
+            multiplexer = HotWordFactory.create_multiplexer(
+                ['hey mycroft', 'jarvis', 'missing'], config)
+        self.assertIsInstance(multiplexer, HotWordMultiplexer)
+        self.assertEqual(multiplexer.engines, [engines['hey mycroft']])
@@ -0,0 +1,99 @@
+from queue import Queue
+from threading import Event
+from unittest import TestCase, mock
+
+from speech_recognition import AudioData
+
+from source.client.listener.listener import (AUDIO_DATA, AudioConsumer,
+                                             ListenerLoop, ListenerLoopState)
+from source.stt import STTService
+
+
+class SlowSTT:
+    lang = 'en-US'
+    can_stream = False
+
+    def __init__(self):
+        self.release = Event()
+
+    def execute(self, audio, language=None):
+        self.release.wait(5)
+        return 'turn on the lights'
+
+    def shutdown(self):
+        pass
+
+
+class UtteranceEmitter:
+    def __init__(self, expected):
+        self.utterances = []
+        self.expected = expected
+        self.received = Event()
+
+    def emit(self, event, data=None):
+        if event == 'recognizer_loop:utterance':
+            self.utterances.append(data['utterances'])
+            if len(self.utterances) == self.expected:
+                self.received.set()
+
+
+class TestAudioConsumer(TestCase):
+    def test_transcription_doesnt_block(self):
+        state = ListenerLoopState()
+        state.running = True
+        queue = Queue()
+        emitter = UtteranceEmitter(2)
+        stt = SlowSTT()
+        service = STTService(stt, warmup=False)
+        service.start()
+        self.addCleanup(service.stop)
+        consumer = AudioConsumer(state, queue, emitter, stt, None, None,
+                                 service)
+
+        audio = AudioData(bytes(32000), 16000, 2)
+        queue.put((AUDIO_DATA, audio))
+        queue.put((AUDIO_DATA, audio))
+        # The consumer takes the second utterance while the first one is
+        # still transcribed
+        consumer.read()
+        consumer.read()
+        self.assertTrue(queue.empty())
+        self.assertEqual(emitter.utterances, [])
+
+        stt.release.set()
+        self.assertTrue(emitter.received.wait(5))
+        self.assertEqual(emitter.utterances, [['turn on the lights']] * 2)
+
+
+def voice_config(model='base.en', precision='fp32', lang='en-us'):
+    return {
+        'lang': lang,
+        'listener': {'sample_rate': 16000},
+        'stt': {'module': 'whisper',
+                'whisper': {'model': model, 'precision': precision}}
+    }
+
+
+class TestSwapSTTModel(TestCase):
+    def setUp(self):
+        # Only the configuration and the STT service are used
+        self.loop = ListenerLoop.__new__(ListenerLoop)
+        self.loop.config_core = voice_config()
+        self.loop.stt_service = mock.Mock()
+
+    def test_model_change(self):
+        config = voice_config('small.en', 'int8')
+        self.assertTrue(self.loop.swap_stt_model(config))
+        self.loop.stt_service.swap_model.assert_called_once_with(
+            model='small.en', precision='int8')
+        self.assertEqual(self.loop.config_core, config)
+
+    def test_other_change(self):
+        config = voice_config('small.en', lang='de-de')
+        self.assertFalse(self.loop.swap_stt_model(config))
+        self.loop.stt_service.swap_model.assert_not_called()
+
+    def test_engine_cant_swap(self):
+        self.loop.stt_service.swap_model.return_value = False
+        self.assertFalse(self.loop.swap_stt_model(voice_config('small.en')))
+        self.assertEqual(self.loop.config_core, voice_config())
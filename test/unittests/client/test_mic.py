@@ -0,0 +1,201 @@
+import tempfile
+from os.path import join
+from threading import Thread
+from unittest import TestCase, mock
+
+import numpy as np
+from pyee import EventEmitter
+from speech_recognition import AudioSource
+
+from source.client.listener import mic, telemetry
+from source.client.listener.mic import MutableStream, ResponsiveRecognizer
+
+CHUNK = 160
+MARKER = -20000  # Sample value triggering the fake wake word engine
+
+
+@mock.patch('source.client.listener.mic.pyaudio')
+class TestMutableStream(TestCase):
+    def create_stream(self, pyaudio, **kwargs):
+        pyaudio.get_sample_size.return_value = 2
+        pyaudio.paInputOverflow = 2
+        pyaudio.paInputOverflowed = -9981
+        stream = MutableStream(frames_per_buffer=4, **kwargs)
+        stream.wrapped_stream = mock.Mock()
+        stream.wrapped_stream.get_input_latency.return_value = 0.01
+        return stream
+
+    def test_read_waits_for_frames(self, pyaudio):
+        stream = self.create_stream(pyaudio)
+
+        def capture():
+            for i in range(3):
+                stream.callback(bytes([i]) * 4, 2, {}, 0)
+
+        thread = Thread(target=capture)
+        thread.start()
+        self.assertEqual(stream.read(6), b'\x00' * 4 + b'\x01' * 4 + b'\x02' * 4)
+        thread.join()
+
+    def test_muted_callback_writes_silence(self, pyaudio):
+        stream = self.create_stream(pyaudio)
+        stream.mute()
+        stream.callback(b'\x01' * 8, 4, {}, 0)
+        stream.unmute()
+        stream.callback(b'\x02' * 8, 4, {}, 0)
+        self.assertEqual(stream.read(8), b'\x00' * 8 + b'\x02' * 8)
+
+    def test_overflows_are_counted(self, pyaudio):
+        stream = self.create_stream(pyaudio, buffer_size=8)
+        stream.callback(b'\x01' * 8, 4, {}, 2)
+        stream.callback(b'\x02' * 8, 4, {}, 0)
+        self.assertEqual(stream.input_overflows, 1)
+        self.assertEqual(stream.overflows, 2)
+        self.assertEqual(stream.read(4), b'\x01' * 8)
+
+        stream.callback(b'\x03' * 8, 4, {}, 2)
+        with self.assertRaises(IOError) as ctx:
+            stream.read(4, of_exc=True)
+        self.assertEqual(ctx.exception.errno, -9981)
+
+    @mock.patch.object(mic, 'READ_TIMEOUT', 0.01)
+    def test_read_timeout(self, pyaudio):
+        stream = self.create_stream(pyaudio)
+        with self.assertRaises(IOError):
+            stream.read(4)
+        stream.close()
+        with self.assertRaises(IOError):
+            stream.read(4)
+
+
+class ScriptedStream:
+    """Stream reading prepared chunks, then silence."""
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def read(self, size, of_exc=False):
+        if self.chunks:
+            return self.chunks.pop(0)
+        return bytes(size * 2)
+
+
+class ScriptedSource(AudioSource):
+    def __init__(self, chunks):
+        self.stream = ScriptedStream(chunks)
+        self.CHUNK = CHUNK
+        self.SAMPLE_RATE = 16000
+        self.SAMPLE_WIDTH = 2
+        self.muted = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def duration_to_bytes(self, sec):
+        return int(sec * self.SAMPLE_RATE) * self.SAMPLE_WIDTH
+
+
+class MarkerHotWord:
+    """Wake word engine detecting the marker samples."""
+    key_phrase = 'marker'
+    expected_duration = 1
+    num_phonemes = 5
+
+    def update(self, chunk):
+        pass
+
+    def found_wake_word(self, frame_data):
+        return MARKER in np.frombuffer(frame_data, dtype=np.int16)
+
+
+class TestListen(TestCase):
+    def setUp(self):
+        # Keep the process wide signal page out of the test
+        patcher = mock.patch.object(mic, 'check_for_signal',
+                                    return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(telemetry, 'get_mic_level_path',
+                                    return_value=join(directory.name, 'mic'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.recognizer = ResponsiveRecognizer(MarkerHotWord())
+        self.recognizer.recording_timeout = 3
+
+    def command(self):
+        """Two seconds of counting samples, any loss or repeat shows."""
+        samples = np.arange(1, 2 * 16000 + 1, dtype=np.int16)
+        return [samples[i:i + CHUNK].tobytes()
+                for i in range(0, len(samples), CHUNK)]
+
+    def listen(self, chunks):
+        source = ScriptedSource(chunks)
+        audio = self.recognizer.listen(source, EventEmitter())
+        return np.frombuffer(audio.frame_data, dtype=np.int16)
+
+    def assert_command_recorded(self, audio):
+        command = np.arange(1, 2 * 16000 + 1, dtype=np.int16)
+        start = int(np.flatnonzero(audio == 1)[0])
+        np.testing.assert_array_equal(audio[start:start + len(command)],
+                                      command)
+        # The wake word and pre-roll come before the command, exactly once
+        self.assertEqual(np.count_nonzero(audio == MARKER), CHUNK)
+        self.assertEqual(audio[start - 1], MARKER)
+        self.assertEqual(np.count_nonzero(audio == 1), 1)
+
+    def test_command_directly_after_wake_word(self):
+        noise = (np.arange(CHUNK) % 3 - 3).astype(np.int16).tobytes()
+        marker = np.full(CHUNK, MARKER, dtype=np.int16).tobytes()
+        audio = self.listen([noise] * 100 + [marker] + self.command())
+        self.assert_command_recorded(audio)
+        level = self.recognizer.mic_level.read()
+        self.assertEqual(level.state, telemetry.RECORDING)
+        self.assertIsNotNone(level.vad_probability)
+
+    def test_pre_roll_from_detection(self):
+        noise = (np.arange(CHUNK) % 3 - 3).astype(np.int16).tobytes()
+        marker = np.full(CHUNK, MARKER, dtype=np.int16).tobytes()
+        chunks = [noise] * 100 + [marker] + self.command()
+        source = ScriptedSource(chunks)
+        ww_data = self.recognizer._wait_until_wake_word(
+            source, CHUNK / source.SAMPLE_RATE)
+        self.assertTrue(ww_data.found)
+        # Exactly pre_roll_seconds, ending where the wake word was detected
+        read = b''.join(chunks[:len(chunks) - len(source.stream.chunks)])
+        pre_roll = b''.join(ww_data.end_audio)
+        self.assertEqual(len(pre_roll), source.duration_to_bytes(0.1))
+        self.assertTrue(read.endswith(ww_data.audio + pre_roll))
+
+    @mock.patch.object(ResponsiveRecognizer, 'confirm_listening')
+    def test_audio_kept_during_confirmation(self, confirm_listening):
+        playback = mock.Mock()
+        playback.poll.side_effect = [None] * 50 + [0]
+        confirm_listening.return_value = playback
+        noise = (np.arange(CHUNK) % 3 - 3).astype(np.int16).tobytes()
+        marker = np.full(CHUNK, MARKER, dtype=np.int16).tobytes()
+        audio = self.listen([noise] * 100 + [marker] + self.command())
+        self.assert_command_recorded(audio)
+        self.assertEqual(playback.poll.call_count, 51)
+
+    @mock.patch.object(ResponsiveRecognizer, 'confirm_listening')
+    def test_confirmation_not_checked_for_silence(self, confirm_listening):
+        playback = mock.Mock()
+        playback.poll.side_effect = [None] * 50 + [0]
+        confirm_listening.return_value = playback
+        noise = (np.arange(CHUNK) % 3 - 3).astype(np.int16).tobytes()
+        marker = np.full(CHUNK, MARKER, dtype=np.int16).tobytes()
+        with mock.patch.object(self.recognizer.silence_detector, 'process',
+                               wraps=self.recognizer.silence_detector.process
+                               ) as process:
+            self.listen([noise] * 100 + [marker] + self.command())
+        processed = np.concatenate([
+            np.frombuffer(c[0][0], dtype=np.int16)
+            for c in process.call_args_list])
+        # The command chunks read while the sound played never reach the
+        # detector, the ones after it do
+        self.assertFalse(((processed > 0) & (processed <= 50 * CHUNK)).any())
+        self.assertIn(50 * CHUNK + 1, processed)
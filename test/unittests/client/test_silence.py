@@ -0,0 +1,84 @@
+import unittest
+import wave
+from os.path import dirname, join
+
+import numpy as np
+
+from source.client.listener.silence import SileroVAD, VadState
+
+DATA_DIR = join(dirname(__file__), 'data')
+
+
+def read_audio(name):
+    with wave.open(join(DATA_DIR, name)) as wav:
+        return wav.readframes(wav.getnframes())
+
+
+class TestSileroVAD(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.audio = read_audio('weather_mycroft.wav')
+        cls.frame_bytes = 480 * 2
+        cls.frames = len(cls.audio) // cls.frame_bytes
+
+    def per_frame_probabilities(self, vad):
+        """Run the model once per frame as a reference."""
+        vad.reset()
+        probabilities = []
+        for i in range(self.frames):
+            frame = self.audio[i * self.frame_bytes:(i + 1) * self.frame_bytes]
+            probabilities.append(vad(np.frombuffer(frame, dtype=np.int16))[0])
+        vad.reset()
+        return np.array(probabilities)
+
+    def test_process_frames(self):
+        vad = SileroVAD({})
+        expected = self.per_frame_probabilities(vad.vad)
+
+        samples = np.frombuffer(self.audio, dtype=np.int16)
+        frames = samples[:self.frames * 480].reshape(self.frames, 480)
+        result = vad.vad.process_frames(frames)
+        np.testing.assert_allclose(result, expected, atol=1e-6)
+
+    def test_process_stream(self):
+        """Chunks not aligned to frames give the per frame results."""
+        vad = SileroVAD({})
+        expected = self.per_frame_probabilities(vad.vad)
+
+        probabilities = []
+        for i in range(0, len(self.audio), 320):
+            probabilities.extend(vad.process(self.audio[i:i + 320]))
+        np.testing.assert_allclose(probabilities, expected, atol=1e-6)
+        self.assertEqual(vad.speech_probability, probabilities[-1])
+
+    def test_window_frames(self):
+        vad = SileroVAD({'window_frames': 2})
+        self.assertEqual(len(vad.process(self.audio[:self.frame_bytes])), 0)
+        probabilities = vad.process(self.audio[self.frame_bytes:
+                                               3 * self.frame_bytes])
+        self.assertEqual(len(probabilities), 2)
+        self.assertEqual(probabilities[0], probabilities[1])
+
+    def test_speech_probabilities_keeps_state(self):
+        vad = SileroVAD({})
+        vad.process(self.audio[:4 * self.frame_bytes])
+        state = vad.vad.state
+        h, c = state.h.copy(), state.c.copy()
+
+        probabilities = vad.speech_probabilities(self.audio)
+        self.assertEqual(len(probabilities), self.frames)
+        self.assertIs(vad.vad.state, state)
+        np.testing.assert_array_equal(state.h, h)
+        np.testing.assert_array_equal(state.c, c)
+
+        # Same as a stream starting from a fresh state
+        expected = self.per_frame_probabilities(vad.vad)
+        np.testing.assert_allclose(probabilities, expected, atol=1e-6)
+
+    def test_separate_states(self):
+        vad = SileroVAD({})
+        frames = np.frombuffer(self.audio, dtype=np.int16)[:4800]
+        frames = frames.reshape(10, 480)
+        first = vad.vad.process_frames(frames, VadState())
+        second = vad.vad.process_frames(frames, VadState())
+        np.testing.assert_array_equal(first, second)
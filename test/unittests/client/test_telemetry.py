@@ -0,0 +1,57 @@
+import struct
+import tempfile
+from os.path import join
+from unittest import TestCase
+
+from source.client.listener.telemetry import (IDLE, RECORDING, WAITING,
+                                              MicLevelPage)
+
+
+class TestMicLevelPage(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = join(self.directory.name, 'mic_level.page')
+        self.writer = MicLevelPage(self.path)
+        self.reader = MicLevelPage(self.path)
+
+    def tearDown(self):
+        self.writer.close()
+        self.reader.close()
+        self.directory.cleanup()
+
+    def test_nothing_published(self):
+        self.assertIsNone(self.reader.read())
+
+    def test_publish(self):
+        self.writer.publish(120.0, 35.5, 0.75, RECORDING, muted=True)
+        level = self.reader.read()
+        self.assertEqual(level.energy, 120.0)
+        self.assertEqual(level.threshold, 35.5)
+        self.assertEqual(level.vad_probability, 0.75)
+        self.assertEqual(level.state, RECORDING)
+        self.assertTrue(level.muted)
+
+        self.writer.publish(10.0, 36.0, state=WAITING)
+        newer = self.reader.read()
+        self.assertGreater(newer.sequence, level.sequence)
+        self.assertIsNone(newer.vad_probability)
+        self.assertEqual(newer.state, WAITING)
+        self.assertFalse(newer.muted)
+
+    def test_reopen_keeps_level(self):
+        self.writer.publish(1.0, 2.0)
+        self.writer.close()
+        self.writer = MicLevelPage(self.path)
+        self.assertEqual(self.writer.read().state, IDLE)
+        self.writer.publish(3.0, 2.0)
+        self.assertEqual(self.reader.read().energy, 3.0)
+        self.assertEqual(self.reader.read().sequence, 4)
+
+    def test_update_in_progress(self):
+        self.writer.publish(1.0, 2.0)
+        # A writer which stopped in the middle of an update
+        struct.pack_into('=Q', self.writer._map, 8, 3)
+        self.assertIsNone(self.reader.read())
+        self.writer.publish(5.0, 2.0)
+        level = self.reader.read()
+        self.assertEqual((level.sequence, level.energy), (6, 5.0))
@@ -0,0 +1,89 @@
+import wave
+from os.path import dirname, join
+from unittest import TestCase, mock
+
+import numpy as np
+from speech_recognition import AudioData
+
+from source.client.listener.trim import Segment, SpeechTrimmer, TimingMap
+
+DATA = join(dirname(__file__), 'data')
+FRAME = 480  # Samples per VAD frame, 30 ms
+
+
+def silence(seconds):
+    return bytes(int(seconds * 16000) * 2)
+
+
+def frames_audio(speech):
+    """Audio of one frame per item of speech, noise for the speech frames.
+
+    Returns:
+        tuple: the AudioData and the speech probabilities of its frames
+    """
+    noise = np.random.default_rng(0).integers(-3000, 3000, FRAME,
+                                              dtype=np.int16).tobytes()
+    data = b''.join(noise if s else bytes(FRAME * 2) for s in speech)
+    return AudioData(data, 16000, 2), np.array(speech, dtype=np.float32)
+
+
+class TestTimingMap(TestCase):
+    def test_to_original(self):
+        timing = TimingMap([Segment(0.5, 0.0, 1.0), Segment(2.0, 1.0, 0.5)],
+                           3.0)
+        self.assertAlmostEqual(timing.duration, 1.5)
+        self.assertAlmostEqual(timing.removed, 1.5)
+        self.assertAlmostEqual(timing.to_original(0.0), 0.5)
+        self.assertAlmostEqual(timing.to_original(0.75), 1.25)
+        self.assertAlmostEqual(timing.to_original(1.25), 2.25)
+        # Beyond the end of the trimmed audio
+        self.assertAlmostEqual(timing.to_original(2.0), 2.5)
+
+    def test_identity(self):
+        timing = TimingMap.identity(2.0)
+        self.assertEqual(timing.removed, 0)
+        self.assertEqual(timing.to_original(1.5), 1.5)
+
+
+class TestSpeechTrimmer(TestCase):
+    def trim(self, speech, **kwargs):
+        trimmer = SpeechTrimmer({'threshold': 0.5}, **kwargs)
+        audio, probabilities = frames_audio(speech)
+        with mock.patch.object(trimmer.vad, 'speech_probabilities',
+                               return_value=probabilities):
+            return audio, trimmer.trim(audio)
+
+    def test_trim_leading_and_trailing(self):
+        speech = [0] * 10 + [1] * 5 + [0] * 10 + [1] * 5 + [0] * 20
+        audio, (trimmed, timing) = self.trim(speech, padding=0.06)
+        # Two frames of padding around the speech, the pause is kept
+        self.assertEqual(len(trimmed.frame_data), 24 * FRAME * 2)
+        self.assertEqual(trimmed.frame_data,
+                         audio.frame_data[8 * FRAME * 2:32 * FRAME * 2])
+        self.assertAlmostEqual(timing.to_original(0.0), 8 * 0.03)
+
+    def test_compact(self):
+        speech = [0] * 10 + [1] * 5 + [0] * 10 + [1] * 5 + [0] * 20
+        audio, (trimmed, timing) = self.trim(speech, padding=0.06,
+                                             compact=True)
+        # The pause is shortened to twice the padding
+        self.assertEqual(len(trimmed.frame_data), 2 * 9 * FRAME * 2)
+        self.assertEqual(len(timing.segments), 2)
+        self.assertAlmostEqual(timing.to_original(9 * 0.03), 23 * 0.03)
+
+    def test_no_speech(self):
+        audio, (trimmed, timing) = self.trim([0] * 20)
+        self.assertIs(trimmed, audio)
+        self.assertEqual(timing.removed, 0)
+
+    def test_padding_longer_than_audio(self):
+        audio, (trimmed, timing) = self.trim([0, 1, 0], padding=1.0)
+        self.assertEqual(trimmed.frame_data, audio.frame_data)
+
+    def test_recording(self):
+        with wave.open(join(DATA, 'weather_mycroft.wav')) as f:
+            speech = f.readframes(f.getnframes())
+        audio = AudioData(silence(2) + speech + silence(2), 16000, 2)
+        trimmed, timing = SpeechTrimmer().trim(audio)
+        self.assertGreater(timing.removed, 3.5)
+        self.assertIn(trimmed.frame_data, audio.frame_data)
@@ -1,3 +1,4 @@
+from threading import Thread
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
@@ -33,17 +34,94 @@ class TestConfiguration(TestCase):
         self.assertTrue(rc['test_config'])
         self.assertEqual(rc['location']['city']['name'], 'Stockholm')
 
-    @patch('core.configuration.config.RemoteConf')
-    @patch('core.configuration.config.LocalConf')
-    def test_update(self, mock_remote, mock_local):
-        mock_remote.return_value = {}
+    @patch('source.configuration.config.FileWatcher')
+    @patch('source.configuration.config.LocalConf')
+    def test_update(self, mock_local, _):
         mock_local.return_value = {'a': 1}
         c = source.configuration.Configuration.get()
         self.assertEqual(c, {'a': 1})
 
         mock_local.return_value = {'a': 2}
         source.configuration.Configuration.updated('message')
-        self.assertEqual(c, {'a': 2})
+        # Published snapshots are never modified, a new one replaces it
+        self.assertEqual(c, {'a': 1})
+        self.assertEqual(source.configuration.Configuration.get(), {'a': 2})
+
+    @patch('source.configuration.config.FileWatcher')
+    @patch('source.configuration.config.LocalConf')
+    def test_generation(self, mock_local, _):
+        mock_local.return_value = {'a': 1}
+        Configuration = source.configuration.Configuration
+        c = Configuration.get()
+        generation = Configuration.generation()
+
+        # Reads are served from the cache without bumping the generation
+        self.assertIs(Configuration.get(), c)
+        self.assertEqual(Configuration.generation(), generation)
+
+        Configuration.updated('message')
+        self.assertGreater(Configuration.generation(), generation)
+        snapshot = Configuration.snapshot()
+        self.assertEqual(snapshot.generation, Configuration.generation())
+        self.assertIs(snapshot.config, Configuration.get())
+
+    @patch('source.configuration.config.FileWatcher')
+    @patch('source.configuration.config.LocalConf')
+    def test_patch(self, mock_local, _):
+        mock_local.return_value = {}
+        Configuration = source.configuration.Configuration
+        Configuration.patch(MagicMock(data={'config': {'b': {'c': 1}}}))
+        c = Configuration.get()
+        self.assertEqual(c, {'b': {'c': 1}})
+
+        Configuration.patch(MagicMock(data={'config': {'b': {'c': 2}}}))
+        self.assertEqual(c, {'b': {'c': 1}})
+        self.assertEqual(Configuration.get(), {'b': {'c': 2}})
+
+        Configuration.patch_clear(MagicMock())
+        self.assertEqual(Configuration.get(), {})
+
+    @patch('source.configuration.config.FileWatcher')
+    @patch('source.configuration.config.LocalConf')
+    def test_file_change(self, mock_local, _):
+        mock_local.return_value = {'a': 1}
+        Configuration = source.configuration.Configuration
+        Configuration.get()
+        generation = Configuration.generation()
+
+        # Changes to unrelated files are ignored
+        Configuration._on_file_change('/tmp/not_a_config.json')
+        self.assertEqual(Configuration.generation(), generation)
+
+        mock_local.return_value = {'a': 2}
+        Configuration._on_file_change(source.configuration.config.DEFAULT_CONFIG)
+        self.assertGreater(Configuration.generation(), generation)
+        self.assertEqual(Configuration.get(), {'a': 2})
+
+    @patch('source.configuration.config.FileWatcher')
+    @patch('source.configuration.config.LocalConf')
+    def test_concurrent_patches(self, mock_local, _):
+        mock_local.return_value = {}
+        Configuration = source.configuration.Configuration
+        errors = []
+
+        def patch_keys(thread):
+            try:
+                for i in range(50):
+                    key = '{}-{}'.format(thread, i)
+                    Configuration.patch(MagicMock(data={'config': {key: i}}))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [Thread(target=patch_keys, args=(t,)) for t in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        # The latest generation holds every patch
+        self.assertEqual(len(Configuration.get()), 4 * 50)
+        Configuration.patch_clear(MagicMock())
 
     def tearDown(self):
         source.configuration.Configuration.load_config_stack([{}], True)
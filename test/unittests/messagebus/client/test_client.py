@@ -16,6 +16,7 @@ from unittest import TestCase
 from unittest.mock import Mock, patch
 
 from source.messagebus.client import MessageBusClient, MessageWaiter
+from source.messagebus.message import Message
 
 WS_CONF = {
     'websocket': {
@@ -39,6 +40,25 @@ class TestMessageBusClient:
         mc = MessageBusClient()
         assert mc.client.url == 'ws://testhost:1337/core'
 
+    @patch('source.configuration.Configuration.get', return_value=WS_CONF)
+    def test_subscribe(self, mock_conf):
+        mc = MessageBusClient()
+        mc.client = Mock()
+        # Subscriptions are stored until connected
+        mc.subscribe('speak', 'recognizer_loop:*')
+        assert not mc.client.send.called
+
+        mc.on_open()
+        sent = Message.deserialize(mc.client.send.call_args[0][0])
+        assert sent.msg_type == 'message_bus.subscribe'
+        assert sent.data['types'] == ['recognizer_loop:*', 'speak']
+
+        mc.unsubscribe('speak')
+        sent = Message.deserialize(mc.client.send.call_args[0][0])
+        assert sent.msg_type == 'message_bus.unsubscribe'
+        assert sent.data['types'] == ['speak']
+        assert mc.subscriptions == {'recognizer_loop:*'}
+
 
 class TestMessageWaiter(TestCase):
     def test_message_wait_success(self):
@@ -0,0 +1,117 @@
+from unittest import TestCase, mock
+
+from source.messagebus.message import Message
+from source.messagebus.service import event_handler
+from source.messagebus.service.event_handler import (MessageBusEventHandler,
+                                                     Subscriptions)
+
+
+def create_handler():
+    with mock.patch.object(event_handler.WebSocketHandler, '__init__',
+                           return_value=None):
+        handler = MessageBusEventHandler(None, None)
+    handler.write_message = mock.Mock()
+    return handler
+
+
+class TestSubscriptions(TestCase):
+    def test_default(self):
+        subscriptions = Subscriptions()
+        self.assertTrue(subscriptions.matches('speak'))
+        self.assertTrue(subscriptions.matches('recognizer_loop:utterance'))
+
+    def test_exact(self):
+        subscriptions = Subscriptions()
+        subscriptions.add(['speak'])
+        self.assertTrue(subscriptions.matches('speak'))
+        self.assertFalse(subscriptions.matches('speak.response'))
+
+    def test_glob(self):
+        subscriptions = Subscriptions()
+        subscriptions.add(['recognizer_loop:*', 'speak'])
+        self.assertTrue(subscriptions.matches('recognizer_loop:utterance'))
+        self.assertTrue(subscriptions.matches('speak'))
+        self.assertFalse(subscriptions.matches('mycroft.mic.listen'))
+
+        subscriptions.remove(['recognizer_loop:*'])
+        self.assertFalse(subscriptions.matches('recognizer_loop:utterance'))
+        self.assertTrue(subscriptions.matches('speak'))
+
+    def test_remove_all(self):
+        subscriptions = Subscriptions()
+        subscriptions.add(['speak'])
+        self.assertFalse(subscriptions.matches('recognizer_loop:utterance'))
+        # Without subscriptions left everything is received again
+        subscriptions.remove(['speak'])
+        self.assertIsNone(subscriptions.patterns)
+        self.assertTrue(subscriptions.matches('recognizer_loop:utterance'))
+
+    def test_add_empty(self):
+        subscriptions = Subscriptions()
+        subscriptions.add([])
+        self.assertIsNone(subscriptions.patterns)
+        self.assertTrue(subscriptions.matches('speak'))
+
+        subscriptions.add(['speak'])
+        subscriptions.add([])
+        self.assertTrue(subscriptions.matches('speak'))
+        self.assertFalse(subscriptions.matches('recognizer_loop:utterance'))
+
+    def test_wildcard(self):
+        subscriptions = Subscriptions()
+        subscriptions.add(['*'])
+        self.assertTrue(subscriptions.matches('anything'))
+
+
+class TestMessageBusEventHandler(TestCase):
+    def setUp(self):
+        self.legacy = create_handler()
+        self.subscriber = create_handler()
+        event_handler.client_connections[:] = [self.legacy, self.subscriber]
+
+    def tearDown(self):
+        event_handler.client_connections.clear()
+
+    def test_broadcast(self):
+        message = Message('speak', {'utterance': 'hello'}).serialize()
+        self.legacy.on_message(message)
+        self.legacy.write_message.assert_called_once_with(message)
+        self.subscriber.write_message.assert_called_once_with(message)
+
+    def test_routing(self):
+        subscribe = Message('message_bus.subscribe',
+                            {'types': ['speak', 'core.mic.listen']})
+        self.subscriber.on_message(subscribe.serialize())
+        # Subscription messages are handled by the server, not broadcast
+        self.assertFalse(self.legacy.write_message.called)
+
+        utterance = Message('recognizer_loop:utterance').serialize()
+        self.legacy.on_message(utterance)
+        self.legacy.write_message.assert_called_once_with(utterance)
+        self.assertFalse(self.subscriber.write_message.called)
+
+        speak = Message('speak').serialize()
+        self.legacy.on_message(speak)
+        self.subscriber.write_message.assert_called_once_with(speak)
+
+        unsubscribe = Message('message_bus.unsubscribe', {'types': ['speak']})
+        self.subscriber.on_message(unsubscribe.serialize())
+        self.subscriber.write_message.reset_mock()
+        self.legacy.on_message(speak)
+        self.assertFalse(self.subscriber.write_message.called)
+
+        # Without subscriptions left the client receives everything again
+        unsubscribe = Message('message_bus.unsubscribe',
+                              {'types': ['core.mic.listen']})
+        self.subscriber.on_message(unsubscribe.serialize())
+        self.legacy.on_message(speak)
+        self.subscriber.write_message.assert_called_once_with(speak)
+
+    def test_subscribe_without_types(self):
+        for data in ({'types': []}, {}):
+            subscribe = Message('message_bus.subscribe', data)
+            self.subscriber.on_message(subscribe.serialize())
+
+        speak = Message('speak').serialize()
+        self.legacy.on_message(speak)
+        self.subscriber.write_message.assert_called_once_with(speak)
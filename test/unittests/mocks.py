@@ -79,7 +79,6 @@ def mock_config(temp_dir):
     config = base_config()
     config['skills']['priority_skills'] = ['foobar']
     config['data_dir'] = str(temp_dir)
-    config['server']['metrics'] = False
     config['enclosure'] = {}
 
     get_config_mock.return_value = config
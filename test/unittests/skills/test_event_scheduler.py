@@ -2,13 +2,16 @@
     Test cases regarding the event scheduler.
 """
 
+import tempfile
 import unittest
 import time
+from shutil import rmtree
+from threading import Event
 from pyee import ExecutorEventEmitter
 
 from unittest.mock import MagicMock, patch
-from mycroft.skills.event_scheduler import (EventScheduler,
-                                            EventSchedulerInterface)
+from source.core.event_scheduler import (EventScheduler,
+                                         EventSchedulerInterface)
 
 
 class TestEventScheduler(unittest.TestCase):
@@ -77,8 +80,11 @@ class TestEventScheduler(unittest.TestCase):
         es.shutdown()
 
         # Make sure the dump method wasn't called with test-repeat
-        self.assertEqual(mock_dump.call_args[0][0],
-                         {'test': [(900000000000, None, {}, None)]})
+        stored = mock_dump.call_args[0][0]
+        self.assertEqual(list(stored), ['test'])
+        # The stored event ends with its id
+        self.assertEqual([e[:4] for e in stored['test']],
+                         [(900000000000, None, {}, None)])
 
     @patch('threading.Thread')
     @patch('json.load')
@@ -102,6 +108,108 @@ class TestEventScheduler(unittest.TestCase):
         es.shutdown()
 
 
+class TestEventSchedulerQueue(unittest.TestCase):
+    """Tests using the scheduler thread and a real schedule file."""
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.addCleanup(rmtree, self.config_dir)
+        xdg_patch = patch('source.core.event_scheduler.xdg.BaseDirectory.'
+                          'load_first_config', return_value=self.config_dir)
+        xdg_patch.start()
+        self.addCleanup(xdg_patch.stop)
+
+    def test_wakeup_on_schedule(self):
+        """
+            Test an event is sent on time while the thread is waiting.
+        """
+        sent = Event()
+        emitter = MagicMock()
+        emitter.emit.side_effect = lambda message: sent.set()
+        es = EventScheduler(emitter)
+        self.addCleanup(es.shutdown)
+        es.schedule_event('later', time.time() + 3600, None)
+        time.sleep(0.1)  # let the thread wait for the later event
+
+        start = time.monotonic()
+        es.schedule_event('test', time.time() + 0.05, None)
+        self.assertTrue(sent.wait(1))
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertEqual(emitter.emit.call_args[0][0].msg_type, 'test')
+        self.assertNotIn('test', es.events)
+        self.assertIn('later', es.events)
+
+    def test_repeating_event(self):
+        """
+            Test a repeating event is rescheduled after triggering.
+        """
+        emitter = MagicMock()
+        es = EventScheduler(emitter)
+        self.addCleanup(es.shutdown)
+        sched_time = time.time() - 1
+        es.schedule_event('test-repeat', sched_time, 60)
+
+        es.check_state()
+        self.assertEqual(emitter.emit.call_count, 1)
+        next_time = es.events['test-repeat'][0][0]
+        self.assertGreater(next_time, time.time())
+        es.check_state()
+        self.assertEqual(emitter.emit.call_count, 1)
+
+    def test_recover_from_journal(self):
+        """
+            Test the schedule is restored after a crash.
+        """
+        emitter = MagicMock()
+        es = EventScheduler(emitter)
+        es.schedule_event('test', 900000000000, None, {'a': 1})
+        es.schedule_event('test-2', 900000000000, None)
+        es.schedule_event('test-repeat', time.time() - 1, 60)
+        es.schedule_event('test-done', time.time() - 1, None)
+        es.update_event('test', {'a': 2})
+        es.remove_event('test-2')
+        es.check_state()
+        # Stop the thread without storing the schedule
+        with es.event_lock:
+            es.is_running = False
+            es._wakeup.notify()
+        es.join()
+        expected = es.events
+
+        restored = EventScheduler(emitter)
+        self.addCleanup(restored.shutdown)
+        self.assertEqual(
+            restored.events['test'],
+            [(900000000000, None, {'a': 2}, None)]
+        )
+        # Repeating events are dropped like on a clean shutdown
+        del expected['test-repeat']
+        self.assertEqual(restored.events.keys(), expected.keys())
+
+    def test_journal_after_interrupted_compaction(self):
+        """
+            Test replaying a journal that was already compacted keeps
+            distinct events with the same name and time.
+        """
+        emitter = MagicMock()
+        es = EventScheduler(emitter)
+        es.schedule_event('test', 900000000000, None, {'a': 1})
+        # Compact without removing the journal
+        with patch('source.core.event_scheduler.os.remove'):
+            es.store()
+        es.schedule_event('test', 900000000000, None, {'a': 2})
+        es.schedule_event('test', 900000000000, None, {'a': 2})
+        # Stop the thread without storing the schedule
+        with es.event_lock:
+            es.is_running = False
+            es._wakeup.notify()
+        es.join()
+
+        restored = EventScheduler(emitter)
+        self.addCleanup(restored.shutdown)
+        self.assertEqual(restored.events['test'], es.events['test'])
+        self.assertEqual(len(restored.events['test']), 3)
+
+
 class TestEventSchedulerInterface(unittest.TestCase):
     def test_shutdown(self):
         def f(message):
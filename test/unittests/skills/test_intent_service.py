@@ -27,7 +27,7 @@ BASE_CONF = base_config()
 BASE_CONF['lang'] = 'it-it'
 
 NO_LANG_CONF = base_config()
-NO_LANG_CONF.pop('lang')
+NO_LANG_CONF.pop('lang', None)
 
 
 class MockEmitter(object):
@@ -81,34 +81,50 @@ class ContextManagerTest(TestCase):
         self.assertEqual(len(self.context_manager.frame_stack), 0)
 
 
-def check_converse_request(message, skill_id):
-    return (message.msg_type == 'skill.converse.request' and
-            message.data['skill_id'] == skill_id)
-
-
 class ConversationTest(TestCase):
     def setUp(self):
         bus = mock.Mock()
+        self.handlers = {}
+        self.responses = {}
+
+        def on(msg_type, handler):
+            self.handlers.setdefault(msg_type, []).append(handler)
+
+        def remove(msg_type, handler):
+            self.handlers[msg_type].remove(handler)
+
+        def emit(message):
+            """Answer converse requests with the prepared responses."""
+            if message.msg_type != 'skill.converse.request':
+                return
+            data = self.responses.get(message.data['skill_id'])
+            if data is not None:
+                reply = message.reply('skill.converse.response', data)
+                for handler in list(self.handlers.get(reply.msg_type, [])):
+                    handler(reply)
+
+        bus.on.side_effect = on
+        bus.remove.side_effect = remove
+        bus.emit.side_effect = emit
         self.intent_service = IntentService(bus)
         self.intent_service.add_active_skill('atari_skill')
         self.intent_service.add_active_skill('c64_skill')
 
+    def sent_converse_requests(self):
+        return [call[0][0].data['skill_id']
+                for call in self.intent_service.bus.emit.call_args_list
+                if call[0][0].msg_type == 'skill.converse.request']
+
     def test_converse(self):
         """Check that the _converse method reports if the utterance is handled.
 
         Also check that the skill that handled the query is moved to the
         top of the active skill list.
         """
-        def response(message, return_msg_type):
-            c64 = Message(return_msg_type, {'skill_id': 'c64_skill',
-                                            'result': False})
-            atari = Message(return_msg_type, {'skill_id': 'atari_skill',
-                                              'result': True})
-            msgs = {'c64_skill': c64, 'atari_skill': atari}
-
-            return msgs[message.data['skill_id']]
-
-        self.intent_service.bus.wait_for_response.side_effect = response
+        self.responses = {
+            'c64_skill': {'skill_id': 'c64_skill', 'result': False},
+            'atari_skill': {'skill_id': 'atari_skill', 'result': True}
+        }
 
         hello = ['hello old friend']
         utterance_msg = Message('recognizer_loop:utterance',
@@ -124,26 +140,48 @@ class ConversationTest(TestCase):
         # Check that a skill responded that it could handle the message
         self.assertTrue(result)
 
+    def test_converse_recency(self):
+        """Check that the most recently active skill wins."""
+        self.responses = {
+            'c64_skill': {'skill_id': 'c64_skill', 'result': True},
+            'atari_skill': {'skill_id': 'atari_skill', 'result': True}
+        }
+
+        hello = ['hello old friend']
+        utterance_msg = Message('recognizer_loop:utterance',
+                                data={'lang': 'en-US',
+                                      'utterances': hello})
+        result = self.intent_service._converse(hello, 'en-US', utterance_msg)
+        self.assertEqual(result.skill_id, 'c64_skill')
+
+    def test_converse_deadline(self):
+        """Check that skills not answering before the deadline are skipped."""
+        self.responses = {
+            'atari_skill': {'skill_id': 'atari_skill', 'result': True}
+        }
+        self.intent_service.converse_deadline = 0.1
+
+        hello = ['hello old friend']
+        utterance_msg = Message('recognizer_loop:utterance',
+                                data={'lang': 'en-US',
+                                      'utterances': hello})
+        result = self.intent_service._converse(hello, 'en-US', utterance_msg)
+        self.assertEqual(result.skill_id, 'atari_skill')
+        # The response handler is removed after the converse phase
+        self.assertEqual(self.handlers['skill.converse.response'], [])
+
     def test_converse_error(self):
         """Check that all skill IDs in the active_skills list are called.
         even if there's an error.
         """
-        def response(message, return_msg_type):
-            c64 = Message(return_msg_type, {'skill_id': 'c64_skill',
-                                            'result': False})
-            amiga = Message(return_msg_type,
-                            {'skill_id': 'amiga_skill',
-                             'error': 'skill id does not exist'})
-            atari = Message(return_msg_type, {'skill_id': 'atari_skill',
-                                              'result': False})
-            msgs = {'c64_skill': c64,
-                    'atari_skill': atari,
-                    'amiga_skill': amiga}
-
-            return msgs[message.data['skill_id']]
+        self.responses = {
+            'c64_skill': {'skill_id': 'c64_skill', 'result': False},
+            'amiga_skill': {'skill_id': 'amiga_skill',
+                            'error': 'skill id does not exist'},
+            'atari_skill': {'skill_id': 'atari_skill', 'result': False}
+        }
 
         self.intent_service.add_active_skill('amiga_skill')
-        self.intent_service.bus.wait_for_response.side_effect = response
 
         hello = ['hello old friend']
         utterance_msg = Message('recognizer_loop:utterance',
@@ -151,41 +189,32 @@ class ConversationTest(TestCase):
                                       'utterances': hello})
         result = self.intent_service._converse(hello, 'en-US', utterance_msg)
 
-        # Check that the active skill list was updated to set the responding
-        # Skill first.
-
         # Check that a skill responded that it couldn't handle the message
         self.assertFalse(result)
 
         # Check that each skill in the list of active skills were called
-        call_args = self.intent_service.bus.wait_for_response.call_args_list
-        sent_skill_ids = [call[0][0].data['skill_id'] for call in call_args]
-        self.assertEqual(sent_skill_ids,
+        self.assertEqual(self.sent_converse_requests(),
                          ['amiga_skill', 'c64_skill', 'atari_skill'])
 
+        # Check that the non-existing skill was removed
+        active = [skill[0] for skill in self.intent_service.active_skills]
+        self.assertEqual(active, ['c64_skill', 'atari_skill'])
+
     def test_reset_converse(self):
         """Check that a blank stt sends the reset signal to the skills."""
-        def response(message, return_msg_type):
-            c64 = Message(return_msg_type,
-                          {'skill_id': 'c64_skill',
-                           'error': 'skill id does not exist'})
-            atari = Message(return_msg_type, {'skill_id': 'atari_skill',
-                                              'result': False})
-            msgs = {'c64_skill': c64, 'atari_skill': atari}
-
-            return msgs[message.data['skill_id']]
+        self.responses = {
+            'c64_skill': {'skill_id': 'c64_skill',
+                          'error': 'skill id does not exist'},
+            'atari_skill': {'skill_id': 'atari_skill', 'result': False}
+        }
 
         reset_msg = Message('core.speech.recognition.unknown',
                             data={'lang': 'en-US'})
-        self.intent_service.bus.wait_for_response.side_effect = response
 
         self.intent_service.reset_converse(reset_msg)
         # Check send messages
-        wait_for_response_mock = self.intent_service.bus.wait_for_response
-        c64_message = wait_for_response_mock.call_args_list[0][0][0]
-        self.assertTrue(check_converse_request(c64_message, 'c64_skill'))
-        atari_message = wait_for_response_mock.call_args_list[1][0][0]
-        self.assertTrue(check_converse_request(atari_message, 'atari_skill'))
+        self.assertEqual(self.sent_converse_requests(),
+                         ['c64_skill', 'atari_skill'])
         first_active_skill = self.intent_service.active_skills[0][0]
         self.assertEqual(first_active_skill, 'atari_skill')
 
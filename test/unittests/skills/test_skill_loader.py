@@ -16,14 +16,14 @@
 from time import time
 from unittest.mock import call, MagicMock, Mock, patch
 
-from mycroft.skills.skill_loader import _get_last_modified_time, SkillLoader
-from ..base import MycroftUnitTestBase
+from source.core.skill_loader import _get_last_modified_time, SkillLoader
+from ..base import CoreUnitTestBase
 
 ONE_MINUTE = 60
 
 
-class TestSkillLoader(MycroftUnitTestBase):
-    mock_package = 'mycroft.skills.skill_loader.'
+class TestSkillLoader(CoreUnitTestBase):
+    mock_package = 'source.core.skill_loader.'
 
     def setUp(self):
         super().setUp()
@@ -73,6 +73,17 @@ class TestSkillLoader(MycroftUnitTestBase):
 
         self.assertFalse(self.loader.reload_needed())
 
+    def test_skill_modified_time_known(self):
+        """A known modification time should be used without scanning."""
+        self.loader.instance = Mock()
+        self.loader.instance.reload_skill = True
+        self.loader.last_loaded = 100
+
+        with patch(self.mock_package + '_get_last_modified_time') as scan:
+            self.assertTrue(self.loader.reload_needed(200))
+            self.assertFalse(self.loader.reload_needed(50))
+        scan.assert_not_called()
+
     def test_skill_reloading_blocked(self):
         """The loader should skip reloads for skill that doesn't allow it."""
         self.loader.instance = Mock()
@@ -97,14 +108,13 @@ class TestSkillLoader(MycroftUnitTestBase):
 
         with patch(self.mock_package + 'time') as time_mock:
             time_mock.return_value = 100
-            with patch(self.mock_package + 'SettingsMetaUploader'):
-                self.loader.reload()
+            self.loader.reload()
 
         self.assertTrue(self.loader.load_attempted)
         self.assertTrue(self.loader.loaded)
         self.assertEqual(100, self.loader.last_loaded)
         self.assertListEqual(
-            ['mycroft.skills.shutdown', 'mycroft.skills.loaded'],
+            ['core.skills.shutdown', 'core.skills.loaded'],
             self.message_bus_mock.message_types
         )
         log_messages = [
@@ -117,14 +127,13 @@ class TestSkillLoader(MycroftUnitTestBase):
     def test_skill_load(self):
         with patch(self.mock_package + 'time') as time_mock:
             time_mock.return_value = 100
-            with patch(self.mock_package + 'SettingsMetaUploader'):
-                self.loader.load()
+            self.loader.load()
 
         self.assertTrue(self.loader.load_attempted)
         self.assertTrue(self.loader.loaded)
         self.assertEqual(100, self.loader.last_loaded)
         self.assertListEqual(
-            ['mycroft.skills.loaded'],
+            ['core.skills.loaded'],
             self.message_bus_mock.message_types
         )
         log_messages = [
@@ -136,13 +145,12 @@ class TestSkillLoader(MycroftUnitTestBase):
     def test_skill_load_blacklisted(self):
         """Skill should not be loaded if it is blacklisted"""
         self.loader.config['skills']['blacklisted_skills'] = ['test_skill']
-        with patch(self.mock_package + 'SettingsMetaUploader'):
-            self.loader.load()
+        self.loader.load()
 
         self.assertTrue(self.loader.load_attempted)
         self.assertFalse(self.loader.loaded)
         self.assertListEqual(
-            ['mycroft.skills.loading_failure'],
+            ['core.skills.loading_failure'],
             self.message_bus_mock.message_types
         )
         log_messages = [
@@ -20,7 +20,6 @@ from source.core.skill_loader import SkillLoader
 from source.core.skill_manager import SkillManager, UploadQueue
 
 from ..base import CoreUnitTestBase
-from ..mocks import mock_msm
 
 
 class TestUploadQueue(TestCase):
@@ -61,39 +60,24 @@ class TestUploadQueue(TestCase):
 
 
 class TestSkillManager(CoreUnitTestBase):
-    mock_package = 'core.skills.skill_manager.'
-    use_msm_mock = True
+    mock_package = 'source.core.skill_manager.'
 
     def setUp(self):
         super().setUp()
-        self._mock_skill_updater()
-        self._mock_skill_settings_downloader()
+        self._mock_file_watcher()
         self.skill_manager = SkillManager(self.message_bus_mock)
         self._mock_skill_loader_instance()
 
-    def _mock_msm(self):
-        if self.use_msm_mock:
-            msm_patch = patch(self.mock_package + 'msm_creator')
-            self.addCleanup(msm_patch.stop)
-            self.create_msm_mock = msm_patch.start()
-            self.msm_mock = mock_msm(str(self.temp_dir))
-            self.create_msm_mock.return_value = self.msm_mock
-
-    def _mock_skill_settings_downloader(self):
-        settings_download_patch = patch(
-            self.mock_package + 'SkillSettingsDownloader',
-            spec=True
+    def _mock_file_watcher(self):
+        config_dir_patch = patch(
+            self.mock_package + 'get_core_config_dir',
+            return_value=str(self.temp_dir.joinpath('config'))
         )
-        self.addCleanup(settings_download_patch.stop)
-        self.settings_download_mock = settings_download_patch.start()
-
-    def _mock_skill_updater(self):
-        skill_updater_patch = patch(
-            self.mock_package + 'SkillUpdater',
-            spec=True
-        )
-        self.addCleanup(skill_updater_patch.stop)
-        self.skill_updater_mock = skill_updater_patch.start()
+        self.addCleanup(config_dir_patch.stop)
+        config_dir_patch.start()
+        file_watcher_patch = patch(self.mock_package + 'FileWatcher')
+        self.addCleanup(file_watcher_patch.stop)
+        self.file_watcher_mock = file_watcher_patch.start()
 
     def _mock_skill_loader_instance(self):
         self.skill_dir = self.temp_dir.joinpath('test_skill')
@@ -377,6 +361,77 @@ class TestSkillManager(CoreUnitTestBase):
             self.skill_manager.skill_loaders[str(self.skill_dir)]
         )
 
+    def test_skill_file_change(self):
+        self.skill_dir.mkdir(parents=True)
+        self.skill_dir.joinpath('__init__.py').touch()
+        self.skill_manager.skills_dir_path = str(self.temp_dir)
+        self.skill_manager._reload_debounce = 0
+        self.skill_loader_mock.reload_needed.return_value = True
+
+        file_path = str(self.skill_dir.joinpath('__init__.py'))
+        self.skill_manager._handle_skill_file_change(file_path)
+        self.assertTrue(self.skill_manager._skills_changed.is_set())
+        self.assertIsNone(self.skill_manager._update_changed_skills())
+
+        self.skill_loader_mock.reload_needed.assert_called_once_with(
+            path.getmtime(file_path)
+        )
+        self.skill_loader_mock.reload.assert_called_once_with()
+        self.assertDictEqual({}, self.skill_manager._changed_skills)
+
+    def test_skill_file_change_debounce(self):
+        self.skill_dir.mkdir(parents=True)
+        self.skill_dir.joinpath('__init__.py').touch()
+        self.skill_manager.skills_dir_path = str(self.temp_dir)
+        self.skill_manager._reload_debounce = 60
+
+        file_path = str(self.skill_dir.joinpath('__init__.py'))
+        self.skill_manager._handle_skill_file_change(file_path)
+        self.skill_manager._handle_skill_file_change(file_path)
+        next_due = self.skill_manager._update_changed_skills()
+
+        self.assertGreater(next_due, 0)
+        self.assertLessEqual(next_due, 60)
+        self.skill_loader_mock.reload_needed.assert_not_called()
+        self.assertListEqual(
+            [str(self.skill_dir)],
+            list(self.skill_manager._changed_skills)
+        )
+
+    def test_skill_file_change_ignored(self):
+        self.skill_manager.skills_dir_path = str(self.temp_dir)
+        ignored = [
+            'test_skill/settings.json',
+            'test_skill/__pycache__/skill.cpython-311.pyc',
+            'test_skill/.git/index',
+            'test_skill/ui/main.qmlc',
+        ]
+        for file_path in ignored:
+            self.skill_manager._handle_skill_file_change(
+                str(self.temp_dir.joinpath(file_path))
+            )
+        self.assertDictEqual({}, self.skill_manager._changed_skills)
+        self.assertFalse(self.skill_manager._skills_changed.is_set())
+
+    def test_update_removed_skill(self):
+        self.skill_manager._update_skill(str(self.skill_dir), 0)
+
+        self.assertDictEqual({}, self.skill_manager.skill_loaders)
+        self.skill_loader_mock.unload.assert_called_once_with()
+
+    def test_update_new_skill(self):
+        self.skill_dir.mkdir(parents=True)
+        self.skill_dir.joinpath('__init__.py').touch()
+        patch_obj = self.mock_package + 'SkillLoader'
+        self.skill_manager.skill_loaders = {}
+        with patch(patch_obj, spec=True) as loader_mock:
+            self.skill_manager._update_skill(str(self.skill_dir), 0)
+            loader_mock.return_value.load.assert_called_once_with()
+            self.assertEqual(
+                loader_mock.return_value,
+                self.skill_manager.skill_loaders[str(self.skill_dir)]
+            )
+
     def test_update_skills(self):
         updater_mock = Mock()
         updater_mock.update_skills = Mock()
@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+from source.stt.local_agreement import HypothesisBuffer, words_to_text
+
+
+def words(*texts, start=0.0, duration=0.5):
+    """Create word tuples with consecutive timestamps."""
+    return [(start + i * duration, start + (i + 1) * duration, ' ' + t)
+            for i, t in enumerate(texts)]
+
+
+class TestHypothesisBuffer(TestCase):
+    def test_first_hypothesis_is_not_committed(self):
+        hypothesis = HypothesisBuffer()
+        hypothesis.insert(words('turn', 'on'))
+        self.assertEqual(hypothesis.flush(), [])
+        self.assertEqual(words_to_text(hypothesis.complete()), 'turn on')
+
+    def test_commit_agreed_prefix(self):
+        hypothesis = HypothesisBuffer()
+        hypothesis.insert(words('turn', 'of'))
+        hypothesis.flush()
+        hypothesis.insert(words('turn', 'off', 'the'))
+        committed = hypothesis.flush()
+        self.assertEqual(words_to_text(committed), 'turn')
+        self.assertEqual(words_to_text(hypothesis.complete()), 'off the')
+
+        hypothesis.insert(words('turn', 'off', 'the', 'lights'))
+        committed = hypothesis.flush()
+        self.assertEqual(words_to_text(committed), 'off the')
+        self.assertEqual(hypothesis.last_committed_time, 1.5)
+
+    def test_committed_words_are_not_repeated(self):
+        hypothesis = HypothesisBuffer()
+        for _ in range(2):
+            hypothesis.insert(words('what', 'time'))
+            hypothesis.flush()
+        self.assertEqual(words_to_text(hypothesis.committed), 'what time')
+
+        # Window shifted so timestamps overlap the committed words
+        hypothesis.insert(words('time', 'is', 'it', start=0.6), offset=0.0)
+        self.assertEqual(words_to_text(hypothesis.new), 'is it')
+
+    def test_pop_committed(self):
+        hypothesis = HypothesisBuffer()
+        for _ in range(2):
+            hypothesis.insert(words('a', 'b', 'c'))
+            hypothesis.flush()
+        hypothesis.pop_committed(1.0)
+        self.assertEqual(words_to_text(hypothesis.committed), 'c')
+
+    def test_offset(self):
+        hypothesis = HypothesisBuffer()
+        hypothesis.insert(words('hello'), offset=2.0)
+        self.assertEqual(hypothesis.new, [(2.0, 2.5, ' hello')])
@@ -0,0 +1,96 @@
+from unittest import TestCase, mock
+
+import numpy as np
+import torch
+from whisper.model import ModelDimensions, Whisper
+
+from source.stt.models import (ModelResidency, ResidentModel, model_key,
+                               model_memory, quantize)
+from source.util.metrics import gauge, histogram
+
+# Smallest dimensions whisper.transcribe() accepts, the weights are random
+TINY_DIMS = ModelDimensions(
+    n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2,
+    n_audio_layer=1, n_vocab=51864, n_text_ctx=448, n_text_state=64,
+    n_text_head=2, n_text_layer=1)
+
+
+def load_model(name, device=None):
+    return mock.Mock(name=name, **{'state_dict.return_value': {}})
+
+
+@mock.patch('source.stt.models.whisper.load_model', side_effect=load_model)
+class TestModelResidency(TestCase):
+    def test_reuse_released(self, mock_load):
+        residency = ModelResidency()
+        replica = residency.acquire('tiny.en', device='cpu')
+        residency.release(replica)
+        self.assertIs(residency.acquire('tiny.en', device='cpu'), replica)
+        self.assertEqual(mock_load.call_count, 1)
+
+    def test_replica_per_lease(self, mock_load):
+        residency = ModelResidency()
+        first = residency.acquire('tiny.en', device='cpu')
+        second = residency.acquire('tiny.en', device='cpu')
+        self.assertIsNot(first.model, second.model)
+        self.assertEqual(len(residency.resident()), 2)
+
+    def test_evict_least_recently_used(self, mock_load):
+        residency = ModelResidency(max_idle=1)
+        tiny = residency.acquire('tiny.en', device='cpu')
+        base = residency.acquire('base.en', device='cpu')
+        residency.release(tiny)
+        residency.release(base)
+        self.assertEqual(residency.resident(),
+                         [model_key('base.en', device='cpu')])
+
+    def test_load_metrics(self, mock_load):
+        residency = ModelResidency()
+        with mock.patch('source.stt.models.model_memory', return_value=100):
+            residency.acquire('tiny.en', device='cpu')
+        self.assertEqual(
+            gauge('stt.model.tiny.en.fp32.cpu.memory_bytes').value, 100)
+        self.assertGreaterEqual(
+            gauge('stt.model.tiny.en.fp32.cpu.load_seconds').value, 0)
+
+
+class TestModelKey(TestCase):
+    def test_unknown_model(self):
+        with self.assertRaises(ValueError):
+            model_key('huge.en')
+
+    def test_unknown_precision(self):
+        with self.assertRaises(ValueError):
+            model_key('tiny.en', 'int4')
+
+    def test_device_precision(self):
+        with self.assertRaises(ValueError):
+            model_key('tiny.en', 'int8', 'cuda')
+        with self.assertRaises(ValueError):
+            model_key('tiny.en', 'fp16', 'cpu')
+        self.assertEqual(model_key('tiny.en', 'int8', 'cpu').precision,
+                         'int8')
+
+
+class TestQuantize(TestCase):
+    def test_quantize(self):
+        model = Whisper(TINY_DIMS).eval()
+        memory = model_memory(model)
+        quantized = quantize(model)
+        layer = quantized.encoder.blocks[0].mlp[0]
+        self.assertIsInstance(layer, torch.ao.nn.quantized.dynamic.Linear)
+        self.assertLess(model_memory(quantized), memory)
+
+    def test_warmup(self):
+        rtf = histogram('stt.model.tiny.en.int8.cpu.rtf')
+        count = rtf.count
+        replica = ResidentModel(model_key('tiny.en', 'int8', 'cpu'),
+                                quantize(Whisper(TINY_DIMS).eval()))
+        replica.model.transcribe = mock.Mock(return_value={'text': ''})
+        replica.warmup()
+        replica.warmup()
+        replica.model.transcribe.assert_called_once()
+        self.assertFalse(replica.model.transcribe.call_args[1]['fp16'])
+        self.assertEqual(rtf.count, count + 1)
+        self.assertEqual(
+            replica.model.transcribe.call_args[0][0].dtype, np.float32)
@@ -0,0 +1,62 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from source.stt.base import StreamingSTT, StreamThread
+
+
+class EchoStreamThread(StreamThread):
+    def handle_audio_stream(self, audio, language):
+        text = ''
+        for chunk in audio:
+            text += chunk.decode()
+            self.report_partial(text)
+        return text
+
+
+class EchoSTT(StreamingSTT):
+    def create_streaming_thread(self, language):
+        return EchoStreamThread(self.queue, language, self.on_partial)
+
+
+CONFIG = {'voice': {'lang': 'en-us', 'stt': {'module': 'echo'}}}
+
+
+@patch('source.stt.base.Configuration.get', return_value=CONFIG)
+class TestStreamingSTT(TestCase):
+    def test_stream(self, _):
+        stt = EchoSTT()
+        partials = []
+        stt.on_partial = partials.append
+        self.assertTrue(stt.can_stream)
+
+        stt.stream_start()
+        stt.stream_data(b'turn ')
+        stt.stream_data(b'on')
+        self.assertEqual(stt.stream_stop(), 'turn on')
+        self.assertEqual(partials, ['turn ', 'turn on'])
+
+    def test_stop_without_stream(self, _):
+        stt = EchoSTT()
+        self.assertIsNone(stt.stream_stop())
+        stt.stream_data(b'ignored')
+        self.assertIsNone(stt.execute(None))
+
+    def test_execute_ends_stream(self, _):
+        stt = EchoSTT()
+        stt.stream_start()
+        stt.stream_data(b'hello')
+        self.assertEqual(stt.execute(None), 'hello')
+        self.assertIsNone(stt.stream)
+
+    def test_detach_stream(self, _):
+        stt = EchoSTT()
+        stt.stream_start()
+        stt.stream_data(b'first')
+        stream = stt.detach_stream()
+        self.assertIsNone(stt.stream)
+        stt.stream_start()
+        stt.stream_data(b'second')
+        stream.join()
+        self.assertEqual(stream.text, 'first')
+        self.assertEqual(stt.stream_stop(), 'second')
+        self.assertIsNone(stt.detach_stream())
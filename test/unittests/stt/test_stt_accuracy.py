@@ -0,0 +1,94 @@
+import json
+import tempfile
+import wave
+from os.path import join
+from unittest import TestCase, mock
+
+from test.stt_accuracy.harness import (Corpus, FakeSTT, evaluate, main,
+                                       normalize, word_errors)
+
+
+def write_sample(directory, name, seconds, transcript):
+    with wave.open(join(directory, name + '.wav'), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        # Recordings differ in length, so their audio differs
+        f.writeframes(bytes(int(seconds * 16000) * 2))
+    if transcript is not None:
+        with open(join(directory, name + '.txt'), 'w') as f:
+            f.write(transcript)
+
+
+class TestWordErrors(TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize("What's the Weather?"),
+                         ["what's", 'the', 'weather'])
+
+    def test_word_errors(self):
+        reference = normalize('what is the weather like')
+        self.assertEqual(word_errors(reference, reference), 0)
+        # Substitution, deletion and insertion
+        self.assertEqual(
+            word_errors(reference, normalize('what was the weather')), 2)
+        self.assertEqual(
+            word_errors(reference, normalize('so what is the weather like')),
+            1)
+        self.assertEqual(word_errors(reference, []), 5)
+        self.assertEqual(word_errors([], ['hello']), 1)
+
+
+class TestHarness(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        write_sample(self.directory, 'weather', 0.5,
+                     'What is the weather like')
+        write_sample(self.directory, 'lights', 0.25, 'Turn on the lights')
+        write_sample(self.directory, 'untranscribed', 0.1, None)
+
+    def test_corpus(self):
+        corpus = Corpus(self.directory)
+        self.assertEqual(len(corpus.samples), 2)
+        self.assertAlmostEqual(corpus.duration, 0.75)
+        self.assertEqual(corpus.summary()['words'], 9)
+
+    def test_evaluate(self):
+        corpus = Corpus(self.directory)
+        engine = FakeSTT(corpus.transcripts(), rtf=0.1)
+        result = evaluate(corpus, engine, repeat=2)
+        self.assertEqual(result['engine'], 'FakeSTT')
+        self.assertEqual(result['wer'], 0)
+        self.assertGreaterEqual(result['rtf'], 0.1)
+        self.assertGreaterEqual(result['latency']['p95'],
+                                result['latency']['p50'])
+        self.assertGreater(result['peak_rss_bytes'], 0)
+        self.assertEqual([f['hypothesis'] for f in result['files']],
+                         ['Turn on the lights', 'What is the weather like'])
+
+    def test_recognition_errors(self):
+        corpus = Corpus(self.directory)
+        result = evaluate(corpus, FakeSTT(corpus.transcripts(),
+                                          drop_every=2))
+        # Every second word is missing
+        self.assertAlmostEqual(result['wer'], 4 / 9)
+
+    def test_main_output(self):
+        output = join(self.directory, 'results.json')
+        argv = ['stt_accuracy', self.directory, '--engine', 'fake',
+                '--output', output]
+        with mock.patch('sys.argv', argv), mock.patch('builtins.print'):
+            main()
+        with open(output) as f:
+            results = json.load(f)
+        self.assertEqual(results['corpus']['files'], 2)
+        self.assertEqual(results['results']['wer'], 0)
+
+    @mock.patch('test.stt_accuracy.harness.STTFactory')
+    def test_main_engine_failed(self, factory):
+        factory.create.return_value = None
+        argv = ['stt_accuracy', self.directory]
+        with mock.patch('sys.argv', argv), mock.patch('sys.stderr'):
+            with self.assertRaises(SystemExit):
+                main()
@@ -0,0 +1,156 @@
+import time
+from queue import Full
+from threading import Event
+from unittest import TestCase, mock
+
+from source.stt.service import STTService
+from source.util.metrics import histogram
+
+
+class BlockingSTT:
+    """STT returning the audio as text once released."""
+    def __init__(self):
+        self.release = Event()
+        self.started = Event()
+        self.warmed_up = False
+
+    def warmup(self):
+        self.warmed_up = True
+
+    def shutdown(self):
+        pass
+
+    def execute(self, audio, language=None):
+        self.started.set()
+        self.release.wait(5)
+        return audio
+
+
+class FinishedStream:
+    text = 'streamed'
+
+    def join(self, timeout=None):
+        pass
+
+    def is_alive(self):
+        return False
+
+
+class TestSTTService(TestCase):
+    def setUp(self):
+        self.stt = BlockingSTT()
+        self.results = []
+
+    def create_service(self, **kwargs):
+        service = STTService(self.stt, **kwargs)
+        service.start()
+        self.addCleanup(service.stop)
+        self.assertTrue(service.ready.wait(5))
+        return service
+
+    def test_result_callback(self):
+        decodes = histogram('stt.decode_time').count
+        service = self.create_service()
+        self.assertTrue(self.stt.warmed_up)
+        self.stt.release.set()
+        request = service.submit('hello', self.results.append)
+        self.assertTrue(request.wait(5))
+        self.assertEqual(self.results, [request])
+        self.assertEqual(request.text, 'hello')
+        self.assertIsNone(request.error)
+        self.assertEqual(histogram('stt.decode_time').count, decodes + 1)
+
+    def test_stream(self):
+        service = self.create_service(warmup=False)
+        self.assertFalse(self.stt.warmed_up)
+        request = service.submit(callback=self.results.append,
+                                 stream=FinishedStream())
+        self.assertTrue(request.wait(5))
+        self.assertEqual(request.text, 'streamed')
+
+    def test_bounded_queue(self):
+        service = self.create_service(queue_size=1)
+        service.submit('first')
+        self.assertTrue(self.stt.started.wait(5))
+        service.submit('second')
+        with self.assertRaises(Full):
+            service.submit('third')
+        self.stt.release.set()
+
+    def test_cancel(self):
+        service = self.create_service()
+        running = service.submit('running', self.results.append)
+        self.assertTrue(self.stt.started.wait(5))
+        queued = service.submit('queued', self.results.append)
+        self.assertEqual(service.cancel_all(), 2)
+        self.stt.release.set()
+        self.assertTrue(queued.wait(5))
+        self.assertTrue(running.wait(5))
+        self.assertEqual(self.results, [])
+
+    def test_deadline(self):
+        service = self.create_service()
+        late = service.submit('late', self.results.append, timeout=0.05)
+        self.assertTrue(self.stt.started.wait(5))
+        expired = service.submit('expired', self.results.append,
+                                 timeout=0.05)
+        time.sleep(0.1)  # Let the deadlines pass
+        self.stt.release.set()
+        self.assertTrue(expired.wait(5))
+        self.assertEqual(self.results, [late, expired])
+        self.assertIsInstance(late.error, TimeoutError)
+        self.assertIsNone(late.text)
+        self.assertIsInstance(expired.error, TimeoutError)
+
+    def test_more_workers(self):
+        engines = [BlockingSTT(), BlockingSTT()]
+        create_stt = mock.Mock(side_effect=engines)
+        service = self.create_service(workers=3, create_stt=create_stt)
+        self.assertEqual(create_stt.call_count, 2)
+        self.assertTrue(all(stt.warmed_up for stt in engines))
+
+        # All workers decode at the same time
+        requests = [service.submit(str(i)) for i in range(3)]
+        for stt in [self.stt] + engines:
+            self.assertTrue(stt.started.wait(5))
+        for stt in [self.stt] + engines:
+            stt.release.set()
+        for request in requests:
+            self.assertTrue(request.wait(5))
+
+    def test_single_worker_without_factory(self):
+        service = STTService(self.stt, workers=2)
+        self.assertEqual(service.workers, 1)
+
+    def test_stop_shuts_down_engines(self):
+        self.stt.shutdown = mock.Mock()
+        service = self.create_service()
+        service.stop()
+        self.stt.shutdown.assert_called_once_with()
+        self.assertEqual(service.engines, [])
+
+    def test_swap_model(self):
+        service = self.create_service()
+        self.assertFalse(service.swap_model(model='tiny.en'))
+        self.stt.swap_model = mock.Mock()
+        self.assertTrue(service.swap_model(model='tiny.en'))
+        self.stt.swap_model.assert_called_once_with(model='tiny.en')
+
+    def test_preprocess(self):
+        preprocess = mock.Mock(return_value=('trimmed', 'timing'))
+        service = self.create_service(preprocess=preprocess)
+        self.stt.release.set()
+        request = service.submit('recording')
+        self.assertTrue(request.wait(5))
+        preprocess.assert_called_once_with('recording')
+        self.assertEqual(request.text, 'trimmed')
+        self.assertEqual(request.timing, 'timing')
+
+    def test_preprocess_failure(self):
+        preprocess = mock.Mock(side_effect=ValueError)
+        service = self.create_service(preprocess=preprocess)
+        self.stt.release.set()
+        request = service.submit('recording')
+        self.assertTrue(request.wait(5))
+        self.assertEqual(request.text, 'recording')
+        self.assertIsNone(request.error)
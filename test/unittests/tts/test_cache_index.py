@@ -0,0 +1,165 @@
+"""Unit tests for the persistent TTS cache and its index."""
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, mock
+
+from source.tts.cache import (CacheIndex, TextToSpeechCache, cache_key,
+                              hash_sentence)
+from source.util.metrics import gauge
+
+
+class TestCacheKey(TestCase):
+    def test_whitespace_normalized(self):
+        self.assertEqual(
+            cache_key('Mimic3', 'apl', 'en-us', 'Hello  world '),
+            cache_key('Mimic3', 'apl', 'en-us', 'Hello world'))
+
+    def test_settings_in_key(self):
+        key = cache_key('OpenAITTS', 'onyx', 'en-us', 'Hello',
+                        {'model': 'tts-1'})
+        self.assertNotEqual(
+            key, cache_key('OpenAITTS', 'alloy', 'en-us', 'Hello',
+                           {'model': 'tts-1'}))
+        self.assertNotEqual(
+            key, cache_key('OpenAITTS', 'onyx', 'en-us', 'Hello',
+                           {'model': 'tts-1-hd'}))
+        self.assertNotEqual(
+            key, cache_key('OpenAITTS', 'onyx', 'de-de', 'Hello',
+                           {'model': 'tts-1'}))
+
+
+class TestCacheIndex(TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name, 'index.sqlite')
+
+    def test_reload(self):
+        index = CacheIndex(self.path)
+        index.add('a', 'a.wav', None, 10)
+        index.add('b', 'b.wav', 'b.pho', 20)
+        index.remove(['a'])
+        index.close()
+
+        index = CacheIndex(self.path)
+        self.assertEqual(list(index.entries), ['b'])
+        self.assertEqual(index.entries['b'].phonemes, 'b.pho')
+        self.assertEqual(index.size, 20)
+        index.close()
+
+    def test_touch_flushed(self):
+        index = CacheIndex(self.path)
+        index.add('a', 'a.wav', None, 10)
+        index.add('b', 'b.wav', None, 10)
+        index.entries['a'].last_used = index.entries['b'].last_used = 0
+        index.touch('a')
+        self.assertEqual([key for key, _ in index.least_recently_used()],
+                         ['b', 'a'])
+        index.close()
+
+        index = CacheIndex(self.path)
+        self.assertGreater(index.entries['a'].last_used, 0)
+        index.close()
+
+
+class TestPersistentCache(TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache_dir = Path(directory.name)
+
+    def create_cache(self, max_mb=200):
+        cache = TextToSpeechCache({}, 'TestTTS', 'wav', {
+            'persistent': True, 'path': str(self.cache_dir),
+            'max_mb': max_mb, 'curate_interval': 3600
+        })
+        # Evict in the tests instead of the background thread
+        with mock.patch.object(TextToSpeechCache, '_run_evictor'):
+            cache.load()
+        self.addCleanup(cache.index.close)
+        return cache
+
+    def synthesize(self, cache, sentence, size=1000):
+        key = cache_key('TestTTS', None, 'en-us', sentence)
+        audio_file = cache.define_audio_file(key)
+        audio_file.save(bytes(size))
+        cache.add(key, audio_file)
+        return key
+
+    def test_survives_restart(self):
+        cache = self.create_cache()
+        key = self.synthesize(cache, 'Hello world')
+        cache.index.close()
+
+        cache = self.create_cache()
+        audio_file, phoneme_file = cache.lookup(key)
+        self.assertEqual(audio_file.path, self.cache_dir / (key + '.wav'))
+        self.assertIsNone(phoneme_file)
+
+    def test_hit_metrics(self):
+        cache = self.create_cache()
+        key = self.synthesize(cache, 'Hello world', size=1000)
+        self.assertIsNone(cache.lookup('unknown'))
+        self.assertIsNotNone(cache.lookup(key))
+        self.assertEqual(gauge('tts.cache.hit_rate').value, 0.5)
+        self.assertEqual(gauge('tts.cache.bytes_saved').value, 1000)
+        self.assertEqual(gauge('tts.cache.entries').value, 1)
+
+    def test_legacy_hash(self):
+        cache = self.create_cache()
+        sentence_hash = hash_sentence('Hello world')
+        audio_file = cache.define_audio_file(sentence_hash)
+        audio_file.save(b'audio')
+        cache.cached_sentences[sentence_hash] = (audio_file, None)
+        cached = cache.lookup('unknown', sentence_hash)
+        self.assertEqual(cached[0].path, audio_file.path)
+
+    def test_evict_least_recently_used(self):
+        # Room for two of the three sentences
+        cache = self.create_cache(max_mb=2.5)
+        first = self.synthesize(cache, 'First', size=2**20)
+        time.sleep(0.01)
+        second = self.synthesize(cache, 'Second', size=2**20)
+        time.sleep(0.01)
+        cache.lookup(first)
+        third = self.synthesize(cache, 'Third', size=2**20)
+
+        # Eviction is left to the background thread
+        self.assertTrue(cache._curate_event.is_set())
+        self.assertIn(second, cache.index.entries)
+        self.assertEqual(cache.evict(), [second])
+        self.assertIsNone(cache.lookup(second))
+        self.assertFalse((self.cache_dir / (second + '.wav')).exists())
+        self.assertIsNotNone(cache.lookup(first))
+        self.assertIsNotNone(cache.lookup(third))
+
+    def test_evict_deleted_files(self):
+        cache = self.create_cache()
+        key = self.synthesize(cache, 'Hello world')
+        (self.cache_dir / (key + '.wav')).unlink()
+        self.assertEqual(cache.evict(), [key])
+        self.assertNotIn(key, cache.index.entries)
+
+    def test_curate_left_to_evictor(self):
+        cache = self.create_cache()
+        cache.curate()
+        self.assertFalse(cache._curate_event.is_set())
+
+    def test_shutdown(self):
+        cache = TextToSpeechCache({}, 'TestTTS', 'wav', {
+            'persistent': True, 'path': str(self.cache_dir),
+            'curate_interval': 3600
+        })
+        cache.load()
+        evictor = cache._evictor
+        self.assertTrue(evictor.is_alive())
+        index = cache.index
+        cache.shutdown()
+        self.assertFalse(evictor.is_alive())
+        self.assertIsNone(cache.index)
+        # The cache keeps working without the closed index
+        key = self.synthesize(cache, 'Hello world')
+        self.assertIsNotNone(cache.lookup(key))
+        self.assertNotIn(key, index.entries)
+
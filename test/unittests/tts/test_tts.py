@@ -2,6 +2,7 @@ import time
 import unittest
 from pathlib import Path
 from queue import Queue
+from threading import Thread
 from unittest import mock
 
 import source.tts
@@ -51,9 +52,9 @@ class TestPlaybackThread(unittest.TestCase):
         playback.stop()
         playback.join()
 
-    @mock.patch('core.tts.tts.time')
-    @mock.patch('core.tts.tts.play_wav')
-    @mock.patch('core.tts.tts.play_mp3')
+    @mock.patch('source.tts.tts.time')
+    @mock.patch('source.tts.tts.play_wav')
+    @mock.patch('source.tts.tts.play_mp3')
     def test_process_queue(self, mock_play_mp3, mock_play_wav, mock_time):
         queue = Queue()
         playback = source.tts.PlaybackThread(queue)
@@ -94,7 +95,56 @@ class TestPlaybackThread(unittest.TestCase):
             playback.join()
 
 
-@mock.patch('core.tts.tts.PlaybackThread')
+class TestQueueAudio(unittest.TestCase):
+    def setUp(self):
+        self.queue = Queue(maxsize=1)
+        self.playback = source.tts.PlaybackThread(self.queue)
+        for name, value in (('queue', self.queue),
+                            ('playback', self.playback)):
+            patcher = mock.patch.object(source.tts.TTS, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def queue_in_thread(self, item):
+        result = []
+        thread = Thread(target=lambda: result.append(
+            source.tts.TTS._queue_audio(item, self.playback.generation)))
+        thread.start()
+        return thread, result
+
+    def test_wakes_when_played(self):
+        self.queue.put(('wav', 'first', None, 0, False))
+        thread, result = self.queue_in_thread(('wav', 'second', None, 0,
+                                               False))
+        time.sleep(0.1)
+        self.assertTrue(thread.is_alive())
+
+        with mock.patch.object(self.playback, '_play') as mock_play:
+            self.playback.start()
+            try:
+                thread.join(timeout=1)
+                self.assertEqual(result, [True])
+                time.sleep(0.1)
+                self.assertEqual(mock_play.call_count, 2)
+            finally:
+                self.playback.stop()
+                self.playback.join()
+
+    def test_wakes_when_cleared(self):
+        self.queue.put(('wav', 'first', None, 0, False))
+        thread, result = self.queue_in_thread(('wav', 'second', None, 0,
+                                               False))
+        time.sleep(0.1)
+        self.assertTrue(thread.is_alive())
+
+        self.playback.clear_queue()
+        thread.join(timeout=1)
+        # Audio of the cleared utterance isn't queued
+        self.assertEqual(result, [False])
+        self.assertTrue(self.queue.empty())
+
+
+@mock.patch('source.tts.tts.PlaybackThread')
 class TestTTS(unittest.TestCase):
     def test_execute(self, mock_playback_thread):
         tts = MockTTS("en-US", {}, MockTTSValidator(None))
@@ -103,14 +153,14 @@ class TestTTS(unittest.TestCase):
         self.assertTrue(tts.bus is bus_mock)
 
         source.tts.TTS.queue = mock.Mock()
-        with mock.patch('core.tts.tts.open'):
+        with mock.patch('source.tts.tts.open'):
             tts.cache.temporary_cache_dir = Path('/tmp/dummy')
-            tts.execute('Oh no, not again', 42)
+            tts.execute('Oh no, not again', 42, listen=False)
         tts.get_tts.assert_called_with(
             'Oh no, not again',
-            '/tmp/dummy/8da7f22aeb16bc3846ad07b644d59359.wav'
+            '/tmp/dummy/{}.wav'.format(tts.cache_key('Oh no, not again'))
         )
-        source.tts.TTS.queue.put.assert_called_with(
+        source.tts.TTS.queue.put_nowait.assert_called_with(
             (
                 'wav',
                 mock_audio,
@@ -128,14 +178,14 @@ class TestTTS(unittest.TestCase):
         self.assertTrue(tts.bus is bus_mock)
 
         source.tts.TTS.queue = mock.Mock()
-        with mock.patch('core.tts.tts.open'):
+        with mock.patch('source.tts.tts.open'):
             tts.cache.temporary_cache_dir = Path('/tmp/dummy')
-            tts.execute('Oh no, not again', 42)
+            tts.execute('Oh no, not again', 42, listen=False)
         tts.get_tts.assert_called_with(
             'Oh no, not again',
-            '/tmp/dummy/8da7f22aeb16bc3846ad07b644d59359.wav'
+            '/tmp/dummy/{}.wav'.format(tts.cache_key('Oh no, not again'))
         )
-        source.tts.TTS.queue.put.assert_called_with(
+        source.tts.TTS.queue.put_nowait.assert_called_with(
             (
                 'wav',
                 mock_audio,
@@ -145,7 +195,38 @@ class TestTTS(unittest.TestCase):
             )
         )
 
-    @mock.patch('core.tts.tts.open')
+    def test_execute_sentences(self, mock_playback_thread):
+        tts = MockTTS("en-US", {}, MockTTSValidator(None))
+        tts.init(mock.Mock())
+        source.tts.TTS.queue = mock.Mock()
+        tts.cache.temporary_cache_dir = Path('/tmp/dummy')
+        tts.execute('Oh no. Not again. Please stop.', 42)
+
+        self.assertEqual(tts.get_tts.call_count, 3)
+        queued = [c[0][0] for c in
+                  source.tts.TTS.queue.put_nowait.call_args_list]
+        # Only the last sentence triggers listening
+        self.assertEqual([q[4] for q in queued], [False, False, True])
+
+    def test_execute_cleared(self, mock_playback_thread):
+        tts = MockTTS("en-US", {}, MockTTSValidator(None))
+        tts.init(mock.Mock())
+        source.tts.TTS.queue = mock.Mock()
+        source.tts.TTS.playback.generation = 0
+
+        def clear_playback(*args):
+            source.tts.TTS.playback.generation += 1
+
+        # Playback is stopped while the first sentence is queued
+        source.tts.TTS.queue.put_nowait.side_effect = clear_playback
+        tts.cache.temporary_cache_dir = Path('/tmp/dummy')
+        tts.execute('Oh no. Not again. Please stop.', 42)
+
+        # Remaining sentences are neither synthesized nor queued
+        self.assertEqual(tts.get_tts.call_count, 1)
+        self.assertEqual(source.tts.TTS.queue.put_nowait.call_count, 1)
+
+    @mock.patch('source.tts.tts.open')
     def test_phoneme_cache(self, mock_open, _):
         tts = MockTTS("en-US", {}, MockTTSValidator(None))
         mock_context = mock.Mock(name='context')
@@ -162,7 +243,7 @@ class TestTTS(unittest.TestCase):
         mock_context.read.return_value = 'phonemes '
         read_phonemes = tts.load_phonemes('abc')
         self.assertEqual(read_phonemes, None)
-        with mock.patch('core.tts.tts.os.path.exists') as _:
+        with mock.patch('source.tts.tts.os.path.exists') as _:
             read_phonemes = tts.load_phonemes('abc')
             self.assertEqual(read_phonemes, 'phonemes')  # assert stripped
 
@@ -233,7 +314,7 @@ class TestTTS(unittest.TestCase):
 
 
 class TestTTSFactory(unittest.TestCase):
-    @mock.patch('core.tts.tts.Configuration')
+    @mock.patch('source.tts.tts.Configuration')
     def test_create(self, mock_config):
         config = {
             'tts': {
@@ -0,0 +1,133 @@
+"""Unit tests for the warmup of the persistent TTS cache."""
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Event, Lock
+from unittest import TestCase, mock
+
+from source.tts.cache import TextToSpeechCache, cache_key
+from source.tts.warmup import CacheWarmup, dialog_sentences
+
+
+class FakeTTS:
+    """Engine rendering silence, recording the rendered sentences."""
+    thread_safe = False
+
+    def __init__(self, cache_dir, synth_seconds=0.0):
+        self.cache = TextToSpeechCache({}, 'FakeTTS', 'wav', {
+            'persistent': True, 'path': str(cache_dir),
+            'curate_interval': 3600
+        })
+        with mock.patch.object(TextToSpeechCache, '_run_evictor'):
+            self.cache.load()
+        self.idle = Event()
+        self.idle.set()
+        self.last_active = 0.0
+        self.synth_seconds = synth_seconds
+        self.rendered = []
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self._lock = Lock()
+
+    def prepare_sentences(self, utterance):
+        return [utterance]
+
+    def cache_key(self, sentence):
+        return cache_key('FakeTTS', None, 'en-us', sentence)
+
+    def synthesize(self, sentence, sentence_hash):
+        with self._lock:
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        time.sleep(self.synth_seconds)
+        audio_file = self.cache.define_audio_file(sentence_hash)
+        audio_file.save(b'audio')
+        self.cache.add(sentence_hash, audio_file)
+        with self._lock:
+            self.concurrent -= 1
+            self.rendered.append(sentence)
+        return audio_file, None
+
+
+def run(warmup):
+    warmup.start()
+    warmup.join(timeout=5)
+
+
+class TestDialogSentences(TestCase):
+    def test_count(self):
+        with TemporaryDirectory() as directory:
+            Path(directory, 'a.dialog').write_text(
+                'Sorry. I failed.\nHello {{name}}\n\n')
+            Path(directory, 'b.dialog').write_text('Sorry. Try again.\n')
+            Path(directory, 'c.voc').write_text('Sorry.\n')
+            sentences = dialog_sentences(directory)
+        self.assertEqual(sentences, {'Sorry.': 2, 'I failed.': 1,
+                                     'Try again.': 1})
+
+
+class TestCacheWarmup(TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.tts = FakeTTS(directory.name)
+        self.addCleanup(self.tts.cache.index.close)
+
+    def test_priority_order(self):
+        run(CacheWarmup(self.tts, {'one': 1, 'three': 3, 'two': 2},
+                        idle_seconds=0))
+        self.assertEqual(self.tts.rendered, ['three', 'two', 'one'])
+        self.assertIn(self.tts.cache_key('one'), self.tts.cache)
+
+    def test_max_sentences(self):
+        run(CacheWarmup(self.tts, {'one': 1, 'three': 3, 'two': 2},
+                        idle_seconds=0, max_sentences=2))
+        self.assertEqual(self.tts.rendered, ['three', 'two'])
+
+    def test_resume(self):
+        run(CacheWarmup(self.tts, {'one': 1}, idle_seconds=0))
+        warmup = CacheWarmup(self.tts, {'one': 1, 'two': 2}, idle_seconds=0)
+        run(warmup)
+        # Only the sentence missing from the cache is rendered again
+        self.assertEqual(self.tts.rendered, ['one', 'two'])
+        self.assertEqual(warmup.rendered, 1)
+
+    def test_parallel(self):
+        self.tts.thread_safe = True
+        self.tts.synth_seconds = 0.05
+        sentences = {str(i): 1 for i in range(8)}
+        run(CacheWarmup(self.tts, sentences, workers=3, idle_seconds=0))
+        self.assertEqual(len(self.tts.rendered), 8)
+        self.assertEqual(self.tts.max_concurrent, 3)
+
+    def test_engine_not_thread_safe(self):
+        self.tts.synth_seconds = 0.02
+        sentences = {str(i): 1 for i in range(4)}
+        warmup = CacheWarmup(self.tts, sentences, workers=3, idle_seconds=0)
+        run(warmup)
+        self.assertEqual(warmup.workers, 1)
+        self.assertEqual(self.tts.max_concurrent, 1)
+
+    def test_waits_for_idle(self):
+        self.tts.idle.clear()
+        warmup = CacheWarmup(self.tts, {'one': 1}, idle_seconds=0.2)
+        warmup.start()
+        time.sleep(0.1)
+        self.assertEqual(self.tts.rendered, [])
+
+        # Speech just ended, wait for idle_seconds
+        self.tts.last_active = time.monotonic()
+        self.tts.idle.set()
+        time.sleep(0.1)
+        self.assertEqual(self.tts.rendered, [])
+        warmup.join(timeout=5)
+        self.assertEqual(self.tts.rendered, ['one'])
+
+    def test_stop(self):
+        self.tts.idle.clear()
+        warmup = CacheWarmup(self.tts, {'one': 1}, idle_seconds=0)
+        warmup.start()
+        warmup.stop()
+        warmup.join(timeout=5)
+        self.tts.idle.set()
+        self.assertEqual(self.tts.rendered, [])
@@ -1,8 +1,9 @@
-
+import wave
 from test.util import Anything
 from unittest import TestCase, mock
 
 from source.util import play_audio_file, play_mp3, play_ogg, play_wav, record
+from source.util.audio_utils import AudioOutputSink
 from source.util.file_utils import get_temp_path
 
 test_config = {
@@ -161,3 +162,47 @@ class TestRecordSounds(TestCase):
                                                        '-c', str(channels),
                                                        filename])
         self.assertEqual(res, mock_proc)
+
+
+def write_test_wav(path, frames, rate=16000):
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b'\0\0' * frames)
+
+
+@mock.patch('source.util.audio_utils.pyaudio')
+class TestAudioOutputSink(TestCase):
+    def test_play_wav(self, mock_pyaudio):
+        filename = get_temp_path('sink_test.wav')
+        write_test_wav(filename, 2048)
+        sink = AudioOutputSink(block_frames=1024)
+        self.assertTrue(sink.play_wav(filename))
+        self.assertTrue(sink.play_wav(filename))
+
+        # The output stream is opened once and reused
+        mock_audio = mock_pyaudio.PyAudio.return_value
+        self.assertEqual(mock_audio.open.call_count, 1)
+        stream = mock_audio.open.return_value
+        self.assertEqual(stream.write.call_count, 4)
+
+        # A different format reopens the stream
+        write_test_wav(filename, 1024, rate=22050)
+        sink.play_wav(filename)
+        self.assertEqual(mock_audio.open.call_count, 2)
+        self.assertTrue(stream.close.called)
+
+    def test_interrupt(self, mock_pyaudio):
+        filename = get_temp_path('sink_test.wav')
+        write_test_wav(filename, 4096)
+        sink = AudioOutputSink(block_frames=1024)
+        blocks = []
+
+        def interrupted():
+            return len(blocks) >= 2
+
+        stream = mock_pyaudio.PyAudio.return_value.open.return_value
+        stream.write.side_effect = blocks.append
+        self.assertFalse(sink.play_wav(filename, interrupted))
+        self.assertEqual(len(blocks), 2)
@@ -5,9 +5,13 @@ from os.path import abspath, dirname, exists, expanduser, isdir, join, normpath
 from unittest import TestCase, mock
 
 from source import CORE_ROOT_PATH
+from watchdog.events import (FileClosedEvent, FileCreatedEvent,
+                             FileModifiedEvent)
+
 from source.util import (create_file, curate_cache, get_cache_directory,
                          get_temp_path, read_dict, read_stripped_lines,
                          resolve_resource_file)
+from source.util.file_utils import FileEventHandler
 
 test_config = {
     'data_dir': join(dirname(__file__), 'datadir'),
@@ -205,3 +209,24 @@ class TestCreateFile(TestCase):
 
     def tearDownClass():
         shutil.rmtree(TEST_CREATE_FILE_DIR, ignore_errors=True)
+
+
+class TestFileEventHandler(TestCase):
+    def test_wait_for_closed(self):
+        callback = mock.Mock()
+        handler = FileEventHandler('/tmp/watched', callback)
+        handler.on_any_event(FileCreatedEvent('/tmp/watched/a'))
+        handler.on_any_event(FileModifiedEvent('/tmp/watched/a'))
+        callback.assert_not_called()
+        handler.on_any_event(FileClosedEvent('/tmp/watched/a'))
+        callback.assert_called_once_with('/tmp/watched/a')
+
+    def test_report_modified(self):
+        """Without closed events every modification is reported."""
+        callback = mock.Mock()
+        handler = FileEventHandler('/tmp/watched', callback,
+                                   report_modified=True)
+        handler.on_any_event(FileModifiedEvent('/tmp/watched/a'))
+        handler.on_any_event(FileModifiedEvent('/tmp/watched/a'))
+        self.assertEqual(callback.call_args_list,
+                         [mock.call('/tmp/watched/a')] * 2)
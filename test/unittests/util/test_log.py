@@ -12,12 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import json
+import logging
 import sys
 import unittest
 from io import StringIO
 from threading import Thread
 
-from source.util.log import LOG
+from source.util.log import LOG, JsonFormatter
 
 
 class CaptureLogs(list):
@@ -33,6 +35,7 @@ class CaptureLogs(list):
         return self
 
     def __exit__(self, *args):
+        LOG.flush()
         self.extend(self._stringio.getvalue().splitlines())
         del self._stringio    # free up some memory
         sys.stdout = self._stdout
@@ -67,6 +70,36 @@ class TestLog(unittest.TestCase):
                     found_msg = True
             assert found_msg
 
+    def test_caller(self):
+        with CaptureLogs() as output:
+            LOG.info('testing caller')
+        self.assertEqual(len(output), 1)
+        self.assertIn(__name__ + ':test_caller:', output[0])
+
+    def test_level(self):
+        with CaptureLogs() as output:
+            logging.getLogger().setLevel('INFO')
+            LOG.debug('testing %s', 'debug')
+            LOG.info('testing %s', 'info')
+        self.assertEqual(len(output), 1)
+        self.assertIn('testing info', output[0])
+
+    def test_logger_per_module(self):
+        LOG.info('testing')
+        LOG.warning('testing')
+        self.assertIs(LOG.create_logger(__name__), LOG._loggers[__name__])
+        handlers = LOG._loggers[__name__].handlers
+        self.assertEqual(handlers.count(LOG.handler), 1)
+
+    def test_json(self):
+        record = logging.LogRecord('test', logging.INFO, __file__, 42,
+                                   'testing %s', ('json',), None, 'func')
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry['message'], 'testing json')
+        self.assertEqual(entry['level'], 'INFO')
+        self.assertEqual(entry['line'], 42)
+        self.assertEqual(entry['function'], 'func')
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+from source.util.metrics import Histogram, gauge, get_metrics, histogram
+
+
+class TestHistogram(TestCase):
+    def test_observe(self):
+        metric = Histogram('test', window=10)
+        self.assertIsNone(metric.percentile(50))
+        for value in range(20):
+            metric.observe(value)
+        self.assertEqual(metric.count, 20)
+        self.assertEqual(metric.sum, sum(range(20)))
+        # Percentiles are computed over the recent values
+        self.assertEqual(metric.percentile(0), 10)
+        self.assertEqual(metric.percentile(50), 15)
+        self.assertEqual(metric.percentile(100), 19)
+
+    def test_registry(self):
+        metric = histogram('test.registry')
+        self.assertIs(histogram('test.registry'), metric)
+        metric.observe(1.5)
+        snapshot = get_metrics()['test.registry']
+        self.assertEqual(snapshot['count'], 1)
+        self.assertEqual(snapshot['p50'], 1.5)
+
+
+class TestGauge(TestCase):
+    def test_registry(self):
+        metric = gauge('test.gauge')
+        self.assertIs(gauge('test.gauge'), metric)
+        self.assertEqual(get_metrics()['test.gauge'], {'value': None})
+        metric.set(3.5)
+        self.assertEqual(get_metrics()['test.gauge'], {'value': 3.5})
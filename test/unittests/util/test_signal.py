@@ -12,37 +12,116 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import multiprocessing
+import os
+import shutil
+import time
 import unittest
-from os.path import exists, isfile, join
-from shutil import rmtree
-from tempfile import gettempdir
+import unittest.mock
+from threading import Thread
 
-from source.util import check_for_signal, create_signal
+from source.util import (check_for_signal, clear_signal, create_signal,
+                         wait_for_signal, wait_for_signal_clear)
+from source.util.signal import _WAIT_INTERVAL, _get_page
+
+
+def set_signal_in_child(signal_name, delay=0):
+    time.sleep(delay)
+    create_signal(signal_name)
 
 
 class TestSignals(unittest.TestCase):
     def setUp(self):
-        if exists(join(gettempdir(), 'core')):
-            print("True")
-            rmtree(join(gettempdir(), 'core'))
+        clear_signal('test_signal')
 
     def test_create_signal(self):
-        create_signal('test_signal')
-        self.assertTrue(isfile(join(gettempdir(),
-                                    'core/ipc/signal/test_signal')))
+        self.assertTrue(create_signal('test_signal'))
+        self.assertTrue(check_for_signal('test_signal', -1))
 
     def test_check_signal(self):
-        if exists(join(gettempdir(), 'core')):
-            rmtree(join(gettempdir(), 'core'))
-        # check that signal is not found if file does not exist
+        # check that signal is not found if it was never created
         self.assertFalse(check_for_signal('test_signal'))
 
         # Check that the signal is found when created
         create_signal('test_signal')
         self.assertTrue(check_for_signal('test_signal'))
         # Check that the signal is removed after use
-        self.assertFalse(isfile(join(gettempdir(),
-                                     'core/ipc/signal/test_signal')))
+        self.assertFalse(check_for_signal('test_signal', -1))
+
+    def test_signal_lifetime(self):
+        create_signal('test_signal')
+        self.assertTrue(check_for_signal('test_signal', 10))
+        self.assertTrue(check_for_signal('test_signal', 10))
+        with unittest.mock.patch('source.util.signal.time.time',
+                                 return_value=time.time() + 20):
+            self.assertFalse(check_for_signal('test_signal', 10))
+        self.assertFalse(check_for_signal('test_signal', -1))
+
+    def test_clear_signal(self):
+        self.assertFalse(clear_signal('test_signal'))
+        create_signal('test_signal')
+        self.assertTrue(clear_signal('test_signal'))
+        self.assertFalse(check_for_signal('test_signal', -1))
+
+    def test_long_name(self):
+        name = 'x' * 100
+        with unittest.mock.patch('source.util.signal.LOG') as mock_log:
+            self.assertFalse(create_signal(name))
+            self.assertFalse(check_for_signal(name))
+            self.assertFalse(clear_signal(name))
+            self.assertFalse(wait_for_signal(name, timeout=0))
+            self.assertTrue(wait_for_signal_clear(name, timeout=0))
+        self.assertEqual(mock_log.error.call_count, 5)
+
+    def test_wait_timeout(self):
+        start = time.monotonic()
+        self.assertFalse(wait_for_signal('test_signal', timeout=0.1))
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+        create_signal('test_signal')
+        self.assertFalse(wait_for_signal_clear('test_signal', timeout=0.1))
+
+    def test_wait_for_clear(self):
+        create_signal('test_signal')
+
+        def clear():
+            time.sleep(0.1)
+            clear_signal('test_signal')
+
+        Thread(target=clear).start()
+        self.assertTrue(wait_for_signal_clear('test_signal', timeout=5))
+        self.assertFalse(check_for_signal('test_signal', -1))
+
+    def test_other_process(self):
+        process = multiprocessing.Process(target=set_signal_in_child,
+                                          args=('test_signal',))
+        process.start()
+        self.assertTrue(wait_for_signal('test_signal', timeout=5))
+        process.join()
+
+    def test_other_process_wakeup(self):
+        process = multiprocessing.Process(target=set_signal_in_child,
+                                          args=('test_signal', 0.3))
+        process.start()
+        start = time.monotonic()
+        self.assertTrue(wait_for_signal('test_signal', timeout=5))
+        # Woken up by the change, not by rechecking the signal
+        self.assertLess(time.monotonic() - start, _WAIT_INTERVAL)
+        process.join()
+        # The pipe of the waiter is removed
+        waiters = os.listdir(_get_page().waiters_dir)
+        self.assertFalse([name for name in waiters
+                          if name.startswith('{}.'.format(os.getpid()))])
+
+    def test_page_removed(self):
+        create_signal('test_signal')
+        shutil.rmtree(os.path.dirname(_get_page().path))
+        self.assertFalse(check_for_signal('test_signal', -1))
+        process = multiprocessing.Process(target=set_signal_in_child,
+                                          args=('test_signal', 0.3))
+        process.start()
+        self.assertTrue(wait_for_signal('test_signal', timeout=5))
+        process.join()
 
 
 if __name__ == "__main__":
@@ -12,230 +12,345 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+"""Offline evaluation of the wake word engines and VAD.
+
+Replays WAV corpora through ResponsiveRecognizer as fast as possible, with
+the microphone replaced by a file backed stream, and reports for every
+combination of hotword and VAD silence method:
+
+    frr:            share of files with the wake word not triggering
+    far/h:          false accepts per hour of audio without the wake word
+    wake-to-record: audio seconds from the end of the wake word to the start
+                    of the recording, for files listed in labels.json
+    cpu/s:          CPU seconds per second of replayed audio
+
+Usage:
+    python -m test.wake_word [--hotwords "hey mycroft" jarvis]
+                             [--vad vad_and_ratio ratio_only]
+                             [--output results.json] [data]
+"""
+import argparse
+import json
 import os
 import time
 import wave
 from glob import glob
-from os.path import dirname, join
+from os.path import basename, dirname, isfile, join
 
-import pyee
+import numpy as np
+from pyee import EventEmitter
 from speech_recognition import AudioSource
 
-from source.client.speech.listener import RecognizerLoop
-from source.client.speech.mic import ResponsiveRecognizer
+from source.client.listener.hotword_factory import HotWordFactory
+from source.client.listener.mic import ResponsiveRecognizer
+from source.configuration import Configuration
+from source.messagebus.message import Message
 
-"""Tests for determining the accuracy of the selected wake word engine."""
-
-
-def to_percent(val):
-    return "{0:.2f}".format(100.0 * val) + "%"
+DATA_DIR = join(dirname(__file__), 'data')
+CHUNK_SIZE = 160  # Samples per read, as the MutableMicrophone default
 
 
 class FileStream:
-    MIN_S_TO_DEBUG = 5.0
+    """MutableStream stand-in reading audio from a WAV file.
 
-    # How long between printing debug info to screen
-    UPDATE_INTERVAL_S = 1.0
+    Reading past the end of the file raises EOFError, ending the replay.
+    While muted the file keeps playing but silence is returned, as a real
+    microphone keeps running while it is muted.
+
+    Args:
+        file_name (str): 16-bit mono WAV file
+    """
 
     def __init__(self, file_name):
         self.file = wave.open(file_name, 'rb')
-        self.size = self.file.getnframes()
+        if self.file.getnchannels() != 1 or self.file.getsampwidth() != 2:
+            raise ValueError('{} is not 16-bit mono'.format(file_name))
         self.sample_rate = self.file.getframerate()
-        self.sample_width = self.file.getsampwidth()
-        self.last_update_time = 0.0
-
-        self.total_s = self.size / self.sample_rate / self.sample_width
-        if self.total_s > self.MIN_S_TO_DEBUG:
-            self.debug = True
-        else:
-            self.debug = False
-
-    def calc_progress(self):
-        return float(self.file.tell()) / self.size
+        self.SAMPLE_WIDTH = self.file.getsampwidth()
+        self.num_frames = self.file.getnframes()
+        self.muted = False
 
-    def read(self, chunk_size, of_exc=False):
+    @property
+    def position(self):
+        """Seconds of audio read so far."""
+        return self.file.tell() / self.sample_rate
 
-        progress = self.calc_progress()
-        if progress == 1.0:
-            raise EOFError
+    @property
+    def duration(self):
+        """Length of the file in seconds."""
+        return self.num_frames / self.sample_rate
 
-        if self.debug:
-            cur_time = time.time()
-            dt = cur_time - self.last_update_time
-            if dt > self.UPDATE_INTERVAL_S:
-                self.last_update_time = cur_time
-                print(to_percent(progress))
+    def read(self, size, of_exc=False):
+        """Read the next frames of the file.
 
-        return self.file.readframes(chunk_size)
+        Args:
+            size (int): number of frames to read
+            of_exc (bool): unused, a file can't overflow
 
-    def close(self):
-        self.file.close()
+        Returns:
+            bytes: audio, silence while muted
+        """
+        if self.file.tell() >= self.num_frames:
+            raise EOFError
+        data = self.file.readframes(size)
+        if self.muted:
+            return bytes(len(data))
+        return data
 
+    def mute(self):
+        self.muted = True
 
-class FileMockMicrophone(AudioSource):
-    def __init__(self, file_name):
-        self.stream = FileStream(file_name)
-        self.SAMPLE_RATE = self.stream.sample_rate
-        self.SAMPLE_WIDTH = self.stream.sample_width
-        self.CHUNK = 1024
+    def unmute(self):
         self.muted = False
 
-    def mute(self):
-        pass
+    def is_stopped(self):
+        return False
 
-    def unmute(self):
+    def stop_stream(self):
         pass
 
     def close(self):
-        self.stream.close()
-
-    def duration_to_bytes(self, ww_duration):
-        return int(ww_duration * self.SAMPLE_RATE * self.SAMPLE_WIDTH)
-
-
-class AudioTester:
-    def __init__(self, samp_rate):
-        print()  # Pad debug messages
-        self.ww_recognizer = RecognizerLoop().create_wake_word_recognizer()
-        self.listener = ResponsiveRecognizer(self.ww_recognizer)
-        self.listener.config['confirm_listening'] = False
-        print()
-
-    def test_audio(self, file_name):
-        source = FileMockMicrophone(file_name)
-        ee = pyee.EventEmitter()
-
-        class SharedData:
-            times_found = 0
-            found = False
-
-        def on_found_wake_word():
-            SharedData.times_found += 1
-
-        ee.on('recognizer_loop:record_begin', on_found_wake_word)
-
-        try:
-            while True:
-                self.listener.listen(source, ee)
-        except EOFError:
-            # Give the wake word engine some time to detect
-            cnt = 0
-            while cnt < 2.0:
-                if SharedData.times_found > 0:
-                    break
-                else:
-                    time.sleep(0.1)
-                    cnt += 0.1
-
-        return SharedData.times_found
-
-
-class Color:
-    BOLD = '\033[1m'
-    NORMAL = '\033[0m'
-    GREEN = '\033[92m'
-    RED = '\033[91m'
-
-
-def bold_str(val):
-    return Color.BOLD + str(val) + Color.NORMAL
+        self.file.close()
 
 
-def get_root_dir():
-    return dirname(dirname(__file__))
+class FileMicrophone(AudioSource):
+    """MutableMicrophone stand-in replaying a WAV file.
 
+    Args:
+        file_name (str): 16-bit mono WAV file
+        chunk_size (int): frames per read
+    """
 
-def get_file_names(folder):
-    query = join(folder, '*.wav')
-    root_dir = get_root_dir()
-    full_path = join(root_dir, query)
-    file_names = sorted(glob(full_path))
+    def __init__(self, file_name, chunk_size=CHUNK_SIZE):
+        self.stream = FileStream(file_name)
+        self.SAMPLE_RATE = self.stream.sample_rate
+        self.SAMPLE_WIDTH = self.stream.SAMPLE_WIDTH
+        self.CHUNK = chunk_size
+        self.muted = False
 
-    if len(file_names) < 1:
-        raise IOError
+    def __enter__(self):
+        return self
 
-    return file_names
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream.close()
 
+    def mute(self):
+        self.muted = True
+        self.stream.mute()
 
-def test_audio_files(tester, file_names, on_file_finish):
-    num_found = 0
-    for file_name in file_names:
-        short_name = os.path.basename(file_name)
-        times_found = tester.test_audio(file_name)
+    def unmute(self):
+        self.muted = False
+        self.stream.unmute()
 
-        num_found += times_found
-        on_file_finish(short_name, times_found)
+    def is_muted(self):
+        return self.muted
 
-    return num_found
+    def duration_to_bytes(self, sec):
+        return int(sec * self.SAMPLE_RATE) * self.SAMPLE_WIDTH
 
 
-def file_frame_rate(file_name):
-    wf = wave.open(file_name, 'rb')
-    frame_rate = wf.getframerate()
-    wf.close()
-    return frame_rate
+class Corpus:
+    """WAV files with and without the wake word.
 
+    The files are read from the with_wake_word and without_wake_word
+    subdirectories. An optional labels.json in with_wake_word maps file
+    names to the second the wake word ends at, used to measure latency.
 
-def print_ww_found_status(word, short_name):
-    print("Wake word " + bold_str(word) + " - " + short_name)
+    Args:
+        directory (str): corpus directory
+    """
 
+    def __init__(self, directory):
+        positive_dir = join(directory, 'with_wake_word')
+        self.positives = sorted(glob(join(positive_dir, '*.wav')))
+        self.negatives = sorted(
+            glob(join(directory, 'without_wake_word', '*.wav')))
+        labels_file = join(positive_dir, 'labels.json')
+        self.labels = {}
+        if isfile(labels_file):
+            with open(labels_file) as f:
+                self.labels = json.load(f)
 
-def test_false_negative(directory):
-    file_names = get_file_names(directory)
+    def summary(self):
+        """Get a dict describing the corpus."""
+        return {
+            'positives': len(self.positives),
+            'negatives': len(self.negatives),
+            'labelled': len(self.labels),
+        }
 
-    # Grab audio format info from first file
-    tester = AudioTester(file_frame_rate(file_names[0]))
 
-    def on_file_finish(short_name, times_found):
-        not_found_str = Color.RED + "Not found"
-        found_str = Color.GREEN + "Detected "
-        status_str = not_found_str if times_found == 0 else found_str
-        print_ww_found_status(status_str, short_name)
+class Replay:
+    """Detections and recordings while replaying a file."""
 
-    num_found = test_audio_files(tester, file_names, on_file_finish)
-    total = len(file_names)
+    def __init__(self, emitter, source):
+        self.detections = []  # Stream positions of the wake word events
+        self.recordings = []  # Stream positions of the record_begin events
+        emitter.on('recognizer_loop:wakeword', self._on_wakeword)
+        emitter.on('recognizer_loop:record_begin', self._on_record_begin)
+        self.source = source
 
-    print
-    print("Found " + bold_str(num_found) + " out of " + bold_str(total))
-    print(bold_str(to_percent(float(num_found) / total)) + " accuracy.")
-    print
+    def _on_wakeword(self, event=None):
+        self.detections.append(self.source.stream.position)
 
+    def _on_record_begin(self):
+        self.recordings.append(self.source.stream.position)
 
-def test_false_positive(directory):
-    file_names = get_file_names(directory)
 
-    # Grab audio format info from first file
-    tester = AudioTester(file_frame_rate(file_names[0]))
+def replay(listener, file_name):
+    """Run the listener on a file until the end of the file.
 
-    def on_file_finish(short_name, times_found):
-        not_found_str = Color.GREEN + "Not found"
-        found_str = Color.RED + "Detected "
-        status_str = not_found_str if times_found == 0 else found_str
-        print_ww_found_status(status_str, short_name)
+    Args:
+        listener (ResponsiveRecognizer): listener to evaluate
+        file_name (str): WAV file
 
-    num_found = test_audio_files(tester, file_names, on_file_finish)
-    total = len(file_names)
+    Returns:
+        tuple: Replay with the events, duration in seconds and CPU seconds
+    """
+    emitter = EventEmitter()
+    with FileMicrophone(file_name) as source:
+        result = Replay(emitter, source)
+        start = time.process_time()
+        try:
+            while True:
+                listener.listen(source, emitter)
+        except EOFError:
+            pass
+        cpu = time.process_time() - start
+        return result, source.stream.duration, cpu
 
-    print
-    print("Found " + bold_str(num_found) + " false positives")
-    print("in " + bold_str(str(total)) + " files")
-    print
 
+def percentile(values, percent):
+    if not values:
+        return None
+    return float(np.percentile(values, percent))
 
-def run_test():
-    directory = join(dirname(__file__), 'data')
 
-    false_neg_dir = join(directory, 'with_wake_word')
-    false_pos_dir = join(directory, 'without_wake_word')
+def evaluate(corpus, hotword, engine, vad):
+    """Evaluate a hotword engine and VAD silence method on the corpus.
 
-    try:
-        test_false_negative(false_neg_dir)
-    except IOError:
-        print(bold_str("Warning: No wav files found in " + false_neg_dir))
+    Args:
+        corpus (Corpus): audio to replay
+        hotword (str): name of the hotword in the configuration
+        engine (HotWordEngine): engine loaded for the hotword
+        vad (str): silence_method of the listener
 
+    Returns:
+        dict: the measured metrics
+    """
+    Configuration.patch(Message('configuration.patch', {'config': {
+        'voice': {'listener': {'VAD': {'silence_method': vad}}}
+    }}))
     try:
-        test_false_positive(false_pos_dir)
-    except IOError:
-        print(bold_str("Warning: No wav files found in " + false_pos_dir))
-
-    print("Complete!")
+        listener = ResponsiveRecognizer(engine)
+        audio_seconds = 0.0
+        cpu_seconds = 0.0
+
+        missed = 0
+        latencies = []
+        for file_name in corpus.positives:
+            engine.found_wake_word(b'')  # Clear detections of other files
+            result, duration, cpu = replay(listener, file_name)
+            audio_seconds += duration
+            cpu_seconds += cpu
+            if not result.detections:
+                missed += 1
+            wake_word_end = corpus.labels.get(basename(file_name))
+            if wake_word_end is not None and result.recordings:
+                latencies.append(result.recordings[0] - wake_word_end)
+
+        false_accepts = 0
+        negative_seconds = 0.0
+        for file_name in corpus.negatives:
+            engine.found_wake_word(b'')
+            result, duration, cpu = replay(listener, file_name)
+            audio_seconds += duration
+            negative_seconds += duration
+            cpu_seconds += cpu
+            false_accepts += len(result.detections)
+    finally:
+        Configuration.patch_clear(None)
+
+    positives = len(corpus.positives)
+    negative_hours = negative_seconds / 3600
+    return {
+        'hotword': hotword,
+        'module': type(engine).__name__,
+        'vad': vad,
+        'missed': missed,
+        'frr': missed / positives if positives else None,
+        'false_accepts': false_accepts,
+        'negative_hours': negative_hours,
+        'far_per_hour': (false_accepts / negative_hours
+                         if negative_hours else None),
+        'wake_to_record': {
+            'count': len(latencies),
+            'mean': float(np.mean(latencies)) if latencies else None,
+            'p95': percentile(latencies, 95),
+        },
+        'cpu_per_audio_second': (cpu_seconds / audio_seconds
+                                 if audio_seconds else None),
+    }
+
+
+def format_value(value, spec):
+    return '-' if value is None else spec.format(value)
+
+
+def print_result(result):
+    print('{:16} {:18} {:14} {:>7} {:>7} {:>9} {:>8}'.format(
+        result['hotword'], result['module'], result['vad'],
+        format_value(result['frr'], '{:.1%}'),
+        format_value(result['far_per_hour'], '{:.2f}'),
+        format_value(result['wake_to_record']['mean'], '{:.3f}'),
+        format_value(result['cpu_per_audio_second'], '{:.4f}')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('data', nargs='?', default=DATA_DIR,
+                        help='Corpus directory with with_wake_word and '
+                             'without_wake_word subdirectories')
+    parser.add_argument('--hotwords', nargs='+',
+                        help='Hotwords from the configuration to evaluate, '
+                             'the listener wake_word by default')
+    parser.add_argument('--vad', nargs='+',
+                        help='Listener silence methods to evaluate, the '
+                             'configured one by default')
+    parser.add_argument('--output',
+                        help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    corpus = Corpus(args.data)
+    if not corpus.positives and not corpus.negatives:
+        parser.error('No wav files found in {}'.format(args.data))
+
+    config = Configuration.get()
+    listener_config = config['voice']['listener']
+    hotwords = args.hotwords or [listener_config.get('wake_word',
+                                                     'hey mycroft')]
+    vads = args.vad or [listener_config['VAD'].get('silence_method',
+                                                   'vad_and_ratio')]
+
+    print('{:16} {:18} {:14} {:>7} {:>7} {:>9} {:>8}'.format(
+        'hotword', 'module', 'vad', 'frr', 'far/h', 'w2r (s)', 'cpu/s'))
+    results = []
+    for hotword in hotwords:
+        engine = HotWordFactory.create_hotword(
+            hotword, lang=config['voice'].get('lang', 'en-us'))
+        try:
+            for vad in vads:
+                result = evaluate(corpus, hotword, engine, vad)
+                print_result(result)
+                results.append(result)
+        finally:
+            engine.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'corpus': dict(corpus.summary(), path=os.path.abspath(
+                    args.data)),
+                'results': results,
+            }, f, indent=2)